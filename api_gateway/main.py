@@ -4,7 +4,7 @@ Healthcare Platform API Gateway
 Minimal main file with core FastAPI setup and routing
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import socketio
@@ -12,6 +12,9 @@ import uvicorn
 import logging
 import warnings
 from datetime import datetime
+from common.metrics import CONTENT_TYPE, render_metrics, start_loop_lag_monitor, stop_loop_lag_monitor
+from common.llm_replay import configure_llm_replay
+from common.tracing import TracingMiddleware, get_tracer
 
 # Configure logging to reduce verbosity
 logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
@@ -60,11 +63,15 @@ async def lifespan(app: FastAPI):
     """Lifespan event handler for startup and shutdown"""
     # Startup
     await health_monitor.startup_health_display()
+    start_loop_lag_monitor()
     # Initialize schedule controller
     # await initialize_schedule_controller()
     
     yield
 
+    stop_loop_lag_monitor()
+    get_tracer().flush()
+
 # Create FastAPI app
 app = FastAPI(
     title="Healthcare Platform API Gateway with Call Interface",
@@ -87,6 +94,12 @@ app.add_middleware(
 # Add JWT authentication middleware
 app.add_middleware(JWTAuthMiddleware)
 
+# Outermost: one server span per request, so JWT checks and routing are part of the turn's trace
+app.add_middleware(TracingMiddleware, service="api_gateway")
+
+# Serve Gemini from recorded fixtures when LLM_REPLAY_MODE is set (intent detection, entry chatbot)
+configure_llm_replay()
+
 # Setup all application routers
 app = setup_routers(app)
 
@@ -101,6 +114,11 @@ async def health_check():
     """Simple health check endpoint"""
     return {"status": "healthy", "service": "api_gateway_with_call_interface"}
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
 @app.get("/health/services")
 async def comprehensive_health_check():
     """Comprehensive health check for all microservices using HealthMonitor"""
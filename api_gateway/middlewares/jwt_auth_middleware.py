@@ -26,6 +26,7 @@ class JWTAuthMiddleware(BaseHTTPMiddleware):
             "/redoc",
             "/openapi.json",
             "/health",
+            "/metrics",
             "/marketing",
             "/marketing/about",
             "/marketing/features",
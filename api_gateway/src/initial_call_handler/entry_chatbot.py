@@ -4,8 +4,9 @@
 # =======================
 
 import google.generativeai as genai
-from typing import List
+from typing import List, Tuple
 import time
+from common.llm_gateway import get_llm_gateway
 from .schema import ConversationMessage
 
 class EntryChatbot:
@@ -50,10 +51,8 @@ class EntryChatbot:
 
         Keep it conversational and authentic - like how you'd naturally respond to a friend."""
 
-    def generate_response(self, message: str, conversation_history: List[ConversationMessage], needs_more_info: bool = False) -> str:
-        """Generate fast, empathetic responses optimized for immediate delivery"""
-        
-        start_time = time.time()
+    def _build_prompt(self, message: str, conversation_history: List[ConversationMessage], needs_more_info: bool) -> Tuple[str, bool]:
+        """Build the full prompt; also reports whether the message is a short greeting"""
         
         # Use minimal context for speed - only last 3 exchanges
         context = ""
@@ -78,44 +77,68 @@ class EntryChatbot:
         else:
             full_prompt = f"{self.system_prompt}\n\nConversation:\n{context}\n\nRemember: Match your response length to the depth of what they shared. Be genuine and human. Do not use emojis or symbols.\n\nassistant:"
         
+        return full_prompt, is_short_greeting
+
+    def _fallback_response(self, message: str, is_short_greeting: bool, needs_more_info: bool) -> str:
+        """Context-appropriate fallbacks based on message type"""
+        if is_short_greeting:
+            fallbacks = [
+                "Hi there! How are you doing today?",
+                "Hello! Great to meet you.",
+                "Hey! How's your day going?",
+                "Good morning! Hope you're having a nice day."
+            ]
+        elif needs_more_info:
+            fallbacks = [
+                "I'd love to understand how I can best help you. What's been on your mind lately?",
+                "Tell me more about what's going on. I'm here to listen and support you.",
+                "I want to make sure I understand your situation. What would be most helpful to talk about?",
+                "What brings you here today? I'm here to help however I can."
+            ]
+        else:
+            fallbacks = [
+                "I'm here to listen and support you. How are you feeling about everything?",
+                "Thank you for sharing that with me. I want to understand how I can help.",
+                "I hear you. What's the most important thing on your mind right now?",
+                "That sounds like a lot to handle. I'm here for you."
+            ]
+        
+        # Consistent fallback selection based on message content
+        fallback_index = abs(hash(message)) % len(fallbacks)
+        return fallbacks[fallback_index]
+
+    def generate_response(self, message: str, conversation_history: List[ConversationMessage], needs_more_info: bool = False) -> str:
+        """Generate fast, empathetic responses optimized for immediate delivery (blocking)"""
+        
+        full_prompt, is_short_greeting = self._build_prompt(message, conversation_history, needs_more_info)
+        
         try:
             response = self.model.generate_content(
                 full_prompt,
                 generation_config=self.generation_config
             )
             
-            generation_time = time.time() - start_time
-            # Suppress timing logs during startup
-            # print(f"Chatbot response generated in {generation_time:.2f}s")
-            
             return response.text.strip()
             
         except Exception as e:
             print(f"Error generating response: {e}")
+            return self._fallback_response(message, is_short_greeting, needs_more_info)
+
+    async def generate_response_async(self, message: str, conversation_history: List[ConversationMessage], needs_more_info: bool = False) -> str:
+        """Async response generation through the shared LLM gateway"""
+        
+        full_prompt, is_short_greeting = self._build_prompt(message, conversation_history, needs_more_info)
+        
+        try:
+            async with get_llm_gateway().request("entry_chatbot") as call:
+                response = await self.model.generate_content_async(
+                    full_prompt,
+                    generation_config=self.generation_config
+                )
+                call.record_response(full_prompt, response)
             
-            # Context-appropriate fallbacks based on message type
-            if is_short_greeting:
-                fallbacks = [
-                    "Hi there! How are you doing today?",
-                    "Hello! Great to meet you.",
-                    "Hey! How's your day going?",
-                    "Good morning! Hope you're having a nice day."
-                ]
-            elif needs_more_info:
-                fallbacks = [
-                    "I'd love to understand how I can best help you. What's been on your mind lately?",
-                    "Tell me more about what's going on. I'm here to listen and support you.",
-                    "I want to make sure I understand your situation. What would be most helpful to talk about?",
-                    "What brings you here today? I'm here to help however I can."
-                ]
-            else:
-                fallbacks = [
-                    "I'm here to listen and support you. How are you feeling about everything?",
-                    "Thank you for sharing that with me. I want to understand how I can help.",
-                    "I hear you. What's the most important thing on your mind right now?",
-                    "That sounds like a lot to handle. I'm here for you."
-                ]
+            return response.text.strip()
             
-            # Consistent fallback selection based on message content
-            fallback_index = abs(hash(message)) % len(fallbacks)
-            return fallbacks[fallback_index]
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            return self._fallback_response(message, is_short_greeting, needs_more_info)
@@ -10,13 +10,19 @@ import re
 from typing import List, Dict, Optional
 import asyncio
 import time
+from common.gemini_client import AsyncGeminiClient
 from .schema import IntentResult, ConversationMessage
 
+# Intent prompts are deterministic (temperature 0.2) over the recent history
+INTENT_CACHE_TTL = 600
+
 class IntentDetector:
     def __init__(self, api_key: str):
         genai.configure(api_key=api_key)
         # Use faster model for better latency
         self.model = genai.GenerativeModel('models/gemini-2.5-flash-lite')
+        # Async calls: LLM gateway admission, coalescing and the response cache
+        self.client = AsyncGeminiClient(api_key, model_name=self.model.model_name, caller="intent_detector")
         
         # Configure generation for optimal speed/accuracy balance
         self.generation_config = genai.types.GenerationConfig(
@@ -55,17 +61,11 @@ class IntentDetector:
         }}
         """
 
-    def detect_intent_with_gemini(self, conversation_history: List[ConversationMessage]) -> IntentResult:
-        """Enhanced LLM-based intent detection focused on accuracy"""
-        
+    def _build_prompt(self, conversation_history: List[ConversationMessage]) -> Optional[str]:
+        """Build the analysis prompt, or None when there is nothing to analyse"""
         user_messages = [msg.content for msg in conversation_history if msg.role == "user"]
         if not user_messages:
-            return IntentResult(
-                intent="none",
-                confidence=0.0,
-                reasoning="No user messages available for analysis",
-                keywords=[]
-            )
+            return None
         
         # Build comprehensive context - use more context for better accuracy
         context = ""
@@ -75,34 +75,66 @@ class IntentDetector:
             content = msg.content[:300] + "..." if len(msg.content) > 300 else msg.content
             context += f"{role_prefix}: {content}\n"
         
-        prompt = self.intent_prompt_template.format(context=context)
+        return self.intent_prompt_template.format(context=context)
+
+    def _no_user_messages_result(self) -> IntentResult:
+        return IntentResult(
+            intent="none",
+            confidence=0.0,
+            reasoning="No user messages available for analysis",
+            keywords=[]
+        )
+
+    def _error_result(self, e: Exception) -> IntentResult:
+        print(f"Error in LLM intent detection: {e}")
+        # Return low confidence result instead of failing
+        return IntentResult(
+            intent="none",
+            confidence=0.0,
+            reasoning=f"Error in intent detection: {str(e)}",
+            keywords=[]
+        )
+
+    def detect_intent_with_gemini(self, conversation_history: List[ConversationMessage]) -> IntentResult:
+        """Enhanced LLM-based intent detection focused on accuracy (blocking)"""
+        
+        prompt = self._build_prompt(conversation_history)
+        if prompt is None:
+            return self._no_user_messages_result()
         
         try:
-            start_time = time.time()
-            
             response = self.model.generate_content(
                 prompt,
                 generation_config=self.generation_config
             )
             
-            generation_time = time.time() - start_time
-            # Suppress timing logs during startup
-            # print(f"LLM intent detection took {generation_time:.2f}s")
-            
             response_text = response.text.strip()
             
             # Enhanced JSON extraction with better error handling
             return self._extract_intent_result(response_text)
                 
         except Exception as e:
-            print(f"Error in LLM intent detection: {e}")
-            # Return low confidence result instead of failing
-            return IntentResult(
-                intent="none",
-                confidence=0.0,
-                reasoning=f"Error in intent detection: {str(e)}",
-                keywords=[]
+            return self._error_result(e)
+
+    async def detect_intent(self, conversation_history: List[ConversationMessage]) -> IntentResult:
+        """Async intent detection through the shared LLM gateway (rate limit, priority, quota backoff)"""
+        
+        prompt = self._build_prompt(conversation_history)
+        if prompt is None:
+            return self._no_user_messages_result()
+        
+        try:
+            # Background re-detection for a double-posted turn shares the in-flight call or its cached answer
+            response = await self.client.generate_content(
+                prompt,
+                generation_config=self.generation_config,
+                cache_ttl=INTENT_CACHE_TTL
             )
+            
+            return self._extract_intent_result(response.text.strip())
+                
+        except Exception as e:
+            return self._error_result(e)
 
     def _extract_intent_result(self, response_text: str) -> IntentResult:
         """Enhanced extraction of intent result from LLM response"""
@@ -3,16 +3,18 @@
 # routes.py (PARALLEL EXECUTION OPTIMIZATION)
 # =======================
 
-from fastapi import FastAPI, HTTPException, APIRouter
+from fastapi import FastAPI, HTTPException, APIRouter, Header
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import logging
 from dotenv import load_dotenv
-from typing import Dict, List
+from typing import Dict, List, Optional
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 import time
 
+from common.deadline import DEADLINE_HEADER, adopt_deadline, timeout_for
+from common.llm_gateway import PRIORITY_HEADER, LLMPriority, parse_priority, set_priority
+from common.metrics import register_cache_sizes
 from .schema import ChatRequest, ChatResponse, ConversationMessage, AgentType
 from .intent_detector import IntentDetector
 from .agent_selector import AgentSelector  
@@ -32,12 +34,10 @@ intent_detector = IntentDetector(GEMINI_API_KEY)
 agent_selector = AgentSelector()
 entry_chatbot = EntryChatbot(GEMINI_API_KEY)
 
-# Thread pool for parallel execution
-executor = ThreadPoolExecutor(max_workers=6)
-
 # Storage
 conversations: Dict[str, List[ConversationMessage]] = {}
 user_agents: Dict[str, Dict] = {}
+register_cache_sizes("initial_call", lambda: {"conversations": len(conversations), "user_agents": len(user_agents)})
 
 def clear_user_intent_state_internal(user_id: str) -> bool:
     """
@@ -72,20 +72,12 @@ def clear_user_intent_state_internal(user_id: str) -> bool:
     return cleared_any
 
 async def run_intent_detection_parallel(conversation_history: List[ConversationMessage]) -> "IntentResult":
-    """Run intent detection in parallel using thread pool"""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(
-        executor, 
-        intent_detector.detect_intent_with_gemini,
-        conversation_history
-    )
+    """Run intent detection asynchronously through the shared LLM gateway"""
+    return await intent_detector.detect_intent(conversation_history)
 
 async def run_chatbot_response_parallel(message: str, conversation_history: List[ConversationMessage], needs_more_info: bool) -> str:
-    """Run chatbot response generation in parallel using thread pool"""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(
-        executor,
-        entry_chatbot.generate_response,
+    """Run chatbot response generation asynchronously through the shared LLM gateway"""
+    return await entry_chatbot.generate_response_async(
         message,
         conversation_history,
         needs_more_info
@@ -106,9 +98,19 @@ def assign_agent(user_id: str, agent_selection, intent_result, conversation_turn
         print(f"Agent assigned to user {user_id}: {agent_selection.agent_name} (confidence: {intent_result.confidence:.1%})")
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(
+    request: ChatRequest,
+    llm_priority: Optional[str] = Header(None, alias=PRIORITY_HEADER),
+    deadline_ms: Optional[str] = Header(None, alias=DEADLINE_HEADER)
+):
     """Optimized chat endpoint with parallel execution of intent detection and chatbot response"""
     
+    # Voice callers mark their turns so the LLM gateway serves them first; the turn
+    # gets the caller's remaining deadline, or its channel's budget
+    priority = parse_priority(llm_priority)
+    set_priority(priority)
+    adopt_deadline(deadline_ms, "voice" if priority == LLMPriority.VOICE else "chat")
+    
     try:
         start_time = time.time()
         user_id = request.user_id or "default_user"
@@ -172,7 +174,7 @@ async def chat_endpoint(request: ChatRequest):
                 # Use asyncio.gather for proper parallel execution with timeout
                 intent_result, bot_response = await asyncio.wait_for(
                     asyncio.gather(intent_task, chatbot_task),
-                    timeout=8.0  # 8 second timeout for both tasks
+                    timeout=timeout_for(8.0)  # 8 second timeout for both tasks, less if the deadline is closer
                 )
                 
                 parallel_time = time.time() - parallel_start
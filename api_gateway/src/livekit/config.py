@@ -7,6 +7,7 @@ except ImportError:  # Fallback for pydantic <2
     SettingsConfigDict = None  # type: ignore
 
 from pydantic import Field, AnyUrl
+from typing import Optional
 
 class LiveKitVoiceSettings(BaseSettings):
     # LiveKit settings - All from environment
@@ -17,6 +18,8 @@ class LiveKitVoiceSettings(BaseSettings):
 
     # Custom orchestrator endpoint
     ORCHESTRATOR_ENDPOINT: str
+    # SSE variant of the orchestrator endpoint; defaults to ORCHESTRATOR_ENDPOINT + "/stream"
+    ORCHESTRATOR_STREAM_ENDPOINT: Optional[str] = None
     
     # Default session values for testing
     DEFAULT_CONVERSATION_ID: str 
@@ -4,16 +4,24 @@ Updated to work with LiveKit AI Agent (main_prod.py)
 """
 
 from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from fastapi import WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import AsyncIterator, Optional, Dict, Any
 import asyncio
 import logging
 import json
 import time
+import uuid
 import aiohttp
 from datetime import datetime, timedelta
 from .config import get_livekit_settings
+from common.deadline import budget_for_channel, deadline_headers, expired, set_deadline, timeout_for
+from common.llm_gateway import PRIORITY_HEADER
+from common.metrics import observe_stage, register_cache_sizes
+from common.resilience import CircuitOpenError, get_breaker
+from common.sse import SSE_HEADERS, SSE_MEDIA_TYPE, SentenceBuffer, encode_event, parse_event_line, split_sentences
+from common.tracing import CLIENT, inject_headers, start_detached_span, start_span
 from livekit import api
 from livekit.api import LiveKitAPI, CreateRoomRequest, UpdateRoomMetadataRequest
 import os
@@ -23,6 +31,16 @@ logger = logging.getLogger(__name__)
 # Get configuration from settings
 settings = get_livekit_settings()
 
+# Turns are not sent while the orchestrator keeps failing (see common.resilience)
+_orchestrator_breaker = get_breaker("orchestrator")
+
+# Channel of voice turns; it selects the voice deadline budget and LLM priority downstream
+VOICE_CHANNEL = "livekit_agent"
+
+def _start_turn_deadline() -> None:
+    """Give the voice turn being handled its end-to-end budget (passed on as X-Deadline-Ms)"""
+    set_deadline(budget_for_channel(VOICE_CHANNEL))
+
 # Simple JWT token creation (replace with proper implementation)
 def create_jwt_token(payload: Dict[str, Any]) -> str:
     """Create proper LiveKit JWT token"""
@@ -84,19 +102,78 @@ async def clear_intent_detection_state(user_profile_id: str, individual_id: str)
         return False
 
 async def send_to_orchestrator(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    """Send request to orchestrator"""
+    """
+    Send request to orchestrator; fails fast while the orchestrator's circuit is
+    open, and gives up once the turn's deadline has passed
+    """
+    if expired():
+        logger.warning("⚠️ Turn deadline passed, not sending to orchestrator")
+        return None
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(settings.ORCHESTRATOR_ENDPOINT, json=payload) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    logger.error(f"Orchestrator error: {response.status}")
-                    return None
+        # aiohttp's default 300s total, cut to what is left of the turn
+        timeout = aiohttp.ClientTimeout(total=timeout_for(300.0), sock_connect=settings.CONNECTION_TIMEOUT)
+        started = time.perf_counter()
+        with _orchestrator_breaker.guard(), start_span("POST orchestrator", CLIENT, {"conversation.id": payload.get("conversation_id")}) as span:
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.post(settings.ORCHESTRATOR_ENDPOINT, json=payload, headers=inject_headers(deadline_headers())) as response:
+                    span.set_attribute("http.status_code", response.status)
+                    if response.status >= 500:
+                        response.raise_for_status()
+                    if response.status == 200:
+                        result = await response.json()
+                        observe_stage(
+                            "orchestrator_call", (time.perf_counter() - started) * 1000,
+                            payload.get("detected_agent"), payload.get("plan")
+                        )
+                        return result
+        logger.error(f"Orchestrator error: {response.status}")
+        return None
+    except CircuitOpenError as e:
+        logger.warning(f"⚠️ Not sending to orchestrator: {e}")
+        return None
     except Exception as e:
         logger.error(f"Failed to send to orchestrator: {e}")
         return None
 
+async def stream_from_orchestrator(payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream a turn from the orchestrator's SSE endpoint, yielding its events
+    ("start", "content", "complete", "error") as they arrive.
+    """
+    url = settings.ORCHESTRATOR_STREAM_ENDPOINT or f"{settings.ORCHESTRATOR_ENDPOINT.rstrip('/')}/stream"
+    if expired():
+        yield {"type": "error", "data": "Turn deadline passed before the orchestrator was called"}
+        return
+    # The gap before the first event (and between events) is bounded by the turn's deadline
+    timeout = aiohttp.ClientTimeout(
+        total=None,
+        sock_connect=settings.CONNECTION_TIMEOUT,
+        sock_read=timeout_for(settings.RESPONSE_TIMEOUT)
+    )
+    # Not made current: the caller's code runs between our yields
+    span = start_detached_span("POST orchestrator (stream)", CLIENT, {"conversation.id": payload.get("conversation_id")})
+    try:
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.post(url, json=payload, headers=inject_headers(deadline_headers(), span)) as response:
+                span.set_attribute("http.status_code", response.status)
+                if response.status != 200:
+                    logger.error(f"Orchestrator stream error: {response.status}")
+                    yield {"type": "error", "data": f"Orchestrator returned {response.status}"}
+                    return
+                # SSE frames are newline-delimited; readline() keeps partial lines buffered
+                while True:
+                    line = await response.content.readline()
+                    if not line:
+                        break
+                    event = parse_event_line(line.decode("utf-8").strip())
+                    if event is not None:
+                        yield event
+    except Exception as e:
+        span.record_error(e)
+        raise
+    finally:
+        span.end()
+
 async def send_to_intent_detector(message: str, conversation_history: list, user_id: str = None) -> Optional[Dict[str, Any]]:
     """Send request to intent detection endpoint with proper user identification"""
     try:
@@ -114,7 +191,11 @@ async def send_to_intent_detector(message: str, conversation_history: list, user
         logger.info(f"Sending to intent detector with {len(conversation_history)} context messages")
         
         async with aiohttp.ClientSession() as session:
-            async with session.post(f"http://localhost:{settings.SERVICE_PORT}/initial/chat", json=payload) as response:
+            async with session.post(
+                f"http://localhost:{settings.SERVICE_PORT}/initial/chat",
+                json=payload,
+                headers=inject_headers({PRIORITY_HEADER: "voice", **deadline_headers()})
+            ) as response:
                 if response.status == 200:
                     result = await response.json()
                     logger.info(f"Intent detector response: {result}")
@@ -261,9 +342,101 @@ class VoiceMessageRequest(BaseModel):
     individual_id: str
     user_profile_id: str
     audio_metadata: Optional[Dict[str, Any]] = None
+    # Idempotency key of the turn; a client retrying a message sends the same one
+    turn_id: Optional[str] = None
 
 # In-memory session storage
 active_voice_sessions = {}
+register_cache_sizes("voice_sessions", lambda: {"active_voice_sessions": len(active_voice_sessions)})
+
+ROUTED_FALLBACK_RESPONSE = "I'm here to help. What would you like to talk about?"
+
+def _get_or_create_voice_session(request: VoiceMessageRequest) -> dict:
+    """Return the session for this message, creating a minimal one if it is unknown"""
+    session_data = active_voice_sessions.get(request.session_id)
+    
+    if not session_data:
+        logger.warning(f"Session not found: {request.session_id}, creating minimal session")
+        # Create minimal session for standalone operation
+        session_data = {
+            "session_id": request.session_id,
+            "conversation_id": request.conversation_id,
+            "user_profile_id": request.user_profile_id,
+            "individual_id": request.individual_id,
+            "conversation_state": {
+                "turn_count": 0,
+                "intent_detected": False,
+                "context_history": [],
+                "detected_intent": None,
+                "selected_agent": None,
+                "created_at": datetime.utcnow().isoformat()  # Add created_at field
+            }
+        }
+        active_voice_sessions[request.session_id] = session_data
+    return session_data
+
+def _new_turn_id() -> str:
+    return uuid.uuid4().hex
+
+# Turn ids remembered per session, so a retried message keeps its turn number
+MAX_REMEMBERED_TURNS = 20
+
+def _start_turn(session_data: dict, turn_id: str) -> int:
+    """Turn number of this message; a retry (same turn_id) gets the number of its first submission"""
+    conversation_state = session_data["conversation_state"]
+    turn_numbers = conversation_state.setdefault("turn_numbers", {})
+    if turn_id not in turn_numbers:
+        conversation_state["turn_count"] += 1
+        turn_numbers[turn_id] = conversation_state["turn_count"]
+        while len(turn_numbers) > MAX_REMEMBERED_TURNS:
+            del turn_numbers[next(iter(turn_numbers))]
+    return turn_numbers[turn_id]
+
+def _append_exchange(session_data: dict, user_text: str, assistant_response: str, turn_count: int, turn_id: str) -> None:
+    """Add an exchange to the session history once per turn_id, keeping the last 10"""
+    history = session_data["conversation_state"]["context_history"]
+    if any(exchange.get("turn_id") == turn_id for exchange in history):
+        return
+    history.append({
+        "user": user_text,
+        "assistant": assistant_response,
+        "timestamp": datetime.utcnow().isoformat(),
+        "turn": turn_count,
+        "turn_id": turn_id
+    })
+    if len(history) > 10:
+        session_data["conversation_state"]["context_history"] = history[-10:]
+
+def _build_orchestrator_payload(request: VoiceMessageRequest, session_data: dict) -> Dict[str, Any]:
+    # The orchestrator processes a turn once per turn_id, so retries of this payload are safe
+    return {
+        "text": request.text,
+        "conversation_id": request.conversation_id,
+        "plan": "lite",
+        "services": [],
+        "individual_id": request.individual_id,
+        "user_profile_id": request.user_profile_id,
+        "detected_agent": session_data["conversation_state"]["selected_agent"] or session_data.get("detected_agent", "loneliness"),
+        "agent_instance_id": session_data.get("agent_instance_id", "loneliness_658"),
+        "call_log_id": session_data.get("call_log_id", f"voice_call_{request.session_id}"),
+        "channel": VOICE_CHANNEL,
+        "turn_id": request.turn_id
+    }
+
+def _record_routed_exchange(request: VoiceMessageRequest, session_data: dict, assistant_response: str, turn_count: int) -> Dict[str, Any]:
+    """Append a routed exchange to the session history and build the voice-message result"""
+    _append_exchange(session_data, request.text, assistant_response, turn_count, request.turn_id)
+    
+    active_voice_sessions[request.session_id] = session_data
+    
+    return {
+        "status": "success",
+        "session_id": request.session_id,
+        "assistant_response": assistant_response,
+        "turn_count": turn_count,
+        "intent_status": "routed",
+        "detected_intent": session_data["conversation_state"]["detected_intent"]
+    }
 
 @router.post("/voice-sessions")
 async def create_voice_session(request: VoiceSessionRequest):
@@ -442,31 +615,14 @@ async def process_voice_message(request: VoiceMessageRequest):
                 "intent_status": "greeting"
             }
         
+        _start_turn_deadline()
+
         # Get session data
-        session_data = active_voice_sessions.get(request.session_id)
+        session_data = _get_or_create_voice_session(request)
         
-        if not session_data:
-            logger.warning(f"Session not found: {request.session_id}, creating minimal session")
-            # Create minimal session for standalone operation
-            session_data = {
-                "session_id": request.session_id,
-                "conversation_id": request.conversation_id,
-                "user_profile_id": request.user_profile_id,
-                "individual_id": request.individual_id,
-                "conversation_state": {
-                    "turn_count": 0,
-                    "intent_detected": False,
-                    "context_history": [],
-                    "detected_intent": None,
-                    "selected_agent": None,
-                    "created_at": datetime.utcnow().isoformat()  # Add created_at field
-                }
-            }
-            active_voice_sessions[request.session_id] = session_data
-        
-        # Update turn count
-        session_data["conversation_state"]["turn_count"] += 1
-        turn_count = session_data["conversation_state"]["turn_count"]
+        # Update turn count; a retried message (same turn_id) is the same turn
+        request.turn_id = request.turn_id or _new_turn_id()
+        turn_count = _start_turn(session_data, request.turn_id)
         
         logger.info(f"Turn count: {turn_count}")
         logger.info(f"Intent detected: {session_data['conversation_state']['intent_detected']}")
@@ -477,48 +633,14 @@ async def process_voice_message(request: VoiceMessageRequest):
             logger.info(f"Routing to orchestrator with agent: {session_data['conversation_state']['selected_agent']}")
             
             # Route to orchestrator
-            orchestrator_payload = {
-                "text": request.text,
-                "conversation_id": request.conversation_id,
-                "plan": "lite",
-                "services": [],
-                "individual_id": request.individual_id,
-                "user_profile_id": request.user_profile_id,
-                "detected_agent": session_data["conversation_state"]["selected_agent"] or session_data.get("detected_agent", "loneliness"),
-                "agent_instance_id": session_data.get("agent_instance_id", "loneliness_658"),
-                "call_log_id": session_data.get("call_log_id", f"voice_call_{request.session_id}"),
-                "channel": "livekit_agent"
-            }
-            
-            orchestrator_response = await send_to_orchestrator(orchestrator_payload)
+            orchestrator_response = await send_to_orchestrator(_build_orchestrator_payload(request, session_data))
             
             if orchestrator_response and "response" in orchestrator_response:
                 assistant_response = orchestrator_response["response"]
             else:
-                assistant_response = "I'm here to help. What would you like to talk about?"
-            
-            # Update context
-            session_data["conversation_state"]["context_history"].append({
-                "user": request.text,
-                "assistant": assistant_response,
-                "timestamp": datetime.utcnow().isoformat(),
-                "turn": turn_count
-            })
-            
-            # Keep only last 10 exchanges
-            if len(session_data["conversation_state"]["context_history"]) > 10:
-                session_data["conversation_state"]["context_history"] = session_data["conversation_state"]["context_history"][-10:]
+                assistant_response = ROUTED_FALLBACK_RESPONSE
             
-            active_voice_sessions[request.session_id] = session_data
-            
-            return {
-                "status": "success",
-                "session_id": request.session_id,
-                "assistant_response": assistant_response,
-                "turn_count": turn_count,
-                "intent_status": "routed",
-                "detected_intent": session_data["conversation_state"]["detected_intent"]
-            }
+            return _record_routed_exchange(request, session_data, assistant_response, turn_count)
         
         else:
             # Intent not detected yet - send to intent detector
@@ -590,15 +712,7 @@ async def process_voice_message(request: VoiceMessageRequest):
                     assistant_response = f"I understand you need support with {detected_intent.replace('_', ' ')}. Let me connect you with our {specialist_name} who can help you better."
                 
                 # Update context
-                session_data["conversation_state"]["context_history"].append({
-                    "user": request.text,
-                    "assistant": assistant_response,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "turn": turn_count
-                })
-                
-                if len(session_data["conversation_state"]["context_history"]) > 10:
-                    session_data["conversation_state"]["context_history"] = session_data["conversation_state"]["context_history"][-10:]
+                _append_exchange(session_data, request.text, assistant_response, turn_count, request.turn_id)
                 
                 active_voice_sessions[request.session_id] = session_data
                 
@@ -618,12 +732,7 @@ async def process_voice_message(request: VoiceMessageRequest):
                 logger.warning("Intent detector unavailable, using fallback")
                 assistant_response = "I'm here to listen. Could you tell me more about what brings you here today?"
                 
-                session_data["conversation_state"]["context_history"].append({
-                    "user": request.text,
-                    "assistant": assistant_response,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "turn": turn_count
-                })
+                _append_exchange(session_data, request.text, assistant_response, turn_count, request.turn_id)
                 
                 active_voice_sessions[request.session_id] = session_data
                 
@@ -643,6 +752,88 @@ async def process_voice_message(request: VoiceMessageRequest):
             "assistant_response": "I'm having trouble processing that. Could you try again?"
         }
 
+@router.post("/voice-message/stream")
+async def stream_voice_message(request: VoiceMessageRequest):
+    """
+    Streaming variant of /voice-message (Server-Sent Events).
+
+    Emits a "sentence" event as soon as each sentence of the reply is complete,
+    so the voice agent can start TTS on the first sentence, then a "complete"
+    event carrying the same body /voice-message returns. Turns that do not go
+    to a specialist yet (greeting, intent detection) are answered in full and
+    split into sentences.
+    """
+    session_data = active_voice_sessions.get(request.session_id)
+    routed = (
+        request.text != "__INITIAL_GREETING__"
+        and session_data is not None
+        and session_data["conversation_state"]["intent_detected"]
+    )
+    events = _stream_routed_voice_turn(request, session_data) if routed else _stream_unrouted_voice_turn(request)
+    return StreamingResponse(events, media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+async def _stream_unrouted_voice_turn(request: VoiceMessageRequest):
+    result = await process_voice_message(request)
+    sentences, rest = split_sentences(result.get("assistant_response", ""))
+    for sentence in sentences + ([rest] if rest else []):
+        yield encode_event({"type": "sentence", "text": sentence})
+    yield encode_event({"type": "complete", **result})
+
+async def _stream_routed_voice_turn(request: VoiceMessageRequest, session_data: dict):
+    _start_turn_deadline()
+    try:
+        request.turn_id = request.turn_id or _new_turn_id()
+        turn_count = _start_turn(session_data, request.turn_id)
+        logger.info(f"=== Streaming voice turn {turn_count} for session: {request.session_id} ===")
+        
+        sentences = SentenceBuffer()
+        spoken = []
+        assistant_response = ""
+        started = time.perf_counter()
+        first_sentence_ms = None
+        
+        payload = _build_orchestrator_payload(request, session_data)
+        async for event in stream_from_orchestrator(payload):
+            event_type = event.get("type")
+            if event_type == "content":
+                for sentence in sentences.feed(event.get("data", "")):
+                    if first_sentence_ms is None:
+                        first_sentence_ms = (time.perf_counter() - started) * 1000
+                        logger.info(f"First sentence ready after {first_sentence_ms:.0f}ms")
+                        observe_stage("first_sentence", first_sentence_ms, payload["detected_agent"], payload["plan"])
+                    spoken.append(sentence)
+                    yield encode_event({"type": "sentence", "text": sentence})
+            elif event_type == "complete":
+                assistant_response = event.get("response", "")
+            elif event_type == "error":
+                logger.error(f"Orchestrator stream error: {event.get('data')}")
+                break
+        
+        rest = sentences.flush()
+        if rest:
+            spoken.append(rest)
+            yield encode_event({"type": "sentence", "text": rest})
+        if not spoken:
+            # Nothing came back from the orchestrator: speak the same fallback as /voice-message
+            assistant_response = ROUTED_FALLBACK_RESPONSE
+            yield encode_event({"type": "sentence", "text": assistant_response})
+        elif not assistant_response:
+            # Stream broke off before "complete": record what was actually spoken
+            assistant_response = " ".join(spoken)
+        
+        result = _record_routed_exchange(request, session_data, assistant_response, turn_count)
+        result["first_sentence_ms"] = first_sentence_ms
+        yield encode_event({"type": "complete", **result})
+    
+    except Exception as e:
+        logger.error(f"Error streaming voice message: {e}", exc_info=True)
+        yield encode_event({
+            "type": "error",
+            "status": "error",
+            "error": str(e),
+            "assistant_response": "I'm having trouble processing that. Could you try again?"
+        })
+
 @router.get("/voice-sessions/{session_id}")
 async def get_voice_session(session_id: str):
     """Get voice session details"""
@@ -767,11 +958,12 @@ async def voice_session_websocket(websocket: WebSocket, session_id: str):
                 user_text = data.get("text", "")
                 logger.info(f"Received via WebSocket: {user_text}")
                 
-                # Process the message
+                # Process the message; a client resending it after a timeout passes the same turn_id
                 response = await process_message_internal(
                     session_id=session_id,
                     text=user_text,
-                    session_data=session_data
+                    session_data=session_data,
+                    turn_id=data.get("turn_id")
                 )
                 
                 # Send response back
@@ -799,7 +991,7 @@ async def voice_session_websocket(websocket: WebSocket, session_id: str):
             del active_websockets[session_id]
         logger.info(f"WebSocket cleanup completed for session: {session_id}")
 
-async def process_message_internal(session_id: str, text: str, session_data: dict) -> dict:
+async def process_message_internal(session_id: str, text: str, session_data: dict, turn_id: Optional[str] = None) -> dict:
     """
     Internal message processing logic (extracted from /voice-message endpoint)
     """
@@ -812,9 +1004,12 @@ async def process_message_internal(session_id: str, text: str, session_data: dic
                 "intent_status": "greeting"
             }
         
+        # Each message on the socket is a new turn with its own budget
+        _start_turn_deadline()
+
         # Update turn count
-        session_data["conversation_state"]["turn_count"] += 1
-        turn_count = session_data["conversation_state"]["turn_count"]
+        turn_id = turn_id or _new_turn_id()
+        turn_count = _start_turn(session_data, turn_id)
         
         # Check if intent is already detected
         if session_data["conversation_state"]["intent_detected"]:
@@ -829,7 +1024,8 @@ async def process_message_internal(session_id: str, text: str, session_data: dic
                 "detected_agent": session_data["conversation_state"]["selected_agent"],
                 "agent_instance_id": session_data.get("agent_instance_id"),
                 "call_log_id": session_data.get("call_log_id"),
-                "channel": "livekit_agent"
+                "channel": VOICE_CHANNEL,
+                "turn_id": turn_id
             }
             
             orchestrator_response = await send_to_orchestrator(orchestrator_payload)
@@ -837,15 +1033,7 @@ async def process_message_internal(session_id: str, text: str, session_data: dic
             assistant_response = orchestrator_response.get("response", "I'm here to help.") if orchestrator_response else "I'm here to help. But right now having some internal problems."
             
             # Update context
-            session_data["conversation_state"]["context_history"].append({
-                "user": text,
-                "assistant": assistant_response,
-                "timestamp": datetime.utcnow().isoformat(),
-                "turn": turn_count
-            })
-            
-            if len(session_data["conversation_state"]["context_history"]) > 10:
-                session_data["conversation_state"]["context_history"] = session_data["conversation_state"]["context_history"][-10:]
+            _append_exchange(session_data, text, assistant_response, turn_count, turn_id)
             
             return {
                 "status": "success",
@@ -896,12 +1084,7 @@ async def process_message_internal(session_id: str, text: str, session_data: dic
                         session_data["goal_id"] = created_goal_id
                         session_data["agent_instance_id"] = created_goal_id
                 
-                session_data["conversation_state"]["context_history"].append({
-                    "user": text,
-                    "assistant": assistant_response,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "turn": turn_count
-                })
+                _append_exchange(session_data, text, assistant_response, turn_count, turn_id)
                 
                 return {
                     "status": "success",
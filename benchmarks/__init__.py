@@ -0,0 +1 @@
+# Benchmarks for hot paths; run each module with `python -m benchmarks.<name>`
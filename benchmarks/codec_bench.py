@@ -0,0 +1,105 @@
+"""
+Encode/decode time and size of a conversation state per serialization format.
+
+    python -m benchmarks.codec_bench [--messages 200] [--rounds 200]
+
+The state is shaped like ConversationState._to_dict() for a long conversation:
+a rolling and a complete context of N messages, a task with checkpoints and
+agent results carrying datetimes.
+"""
+
+import argparse
+import json
+import pickle
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from common import codec
+
+WORDS = (
+    "I have been feeling a bit overwhelmed lately with work and family and I am not sure "
+    "how to talk about it with anyone close to me but writing it down helps a little"
+).split()
+
+
+def build_state(messages: int) -> dict:
+    rng = random.Random(42)
+    now = datetime(2025, 1, 1, 9, 30)
+
+    def message(i: int) -> dict:
+        return {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 60))),
+        }
+
+    context = [message(i) for i in range(messages)]
+    checklist = [
+        {
+            "id": f"cp_{i}", "name": f"Checkpoint {i}: " + " ".join(rng.choice(WORDS) for _ in range(12)),
+            "label": f"Step {i + 1}", "type": "Main",
+            "status": "complete" if i < 3 else "pending",
+            "expected_inputs": ["emotional_state", "support_system"],
+            "collected_inputs": [context[i * 2]["content"]] if i < 3 else [],
+            "start_time": now + timedelta(minutes=i), "end_time": now + timedelta(minutes=i + 1) if i < 3 else None,
+        }
+        for i in range(6)
+    ]
+    return {
+        "conversation_id": "conv_bench",
+        "individual_id": "ind_1", "user_profile_id": "profile_1", "detected_agent": "emotional",
+        "task_stack": [{
+            "task_id": "task_1", "label": "Main", "source": "Main", "checklist": checklist,
+            "current_checkpoint_index": 3, "is_active": True, "created_at": now, "updated_at": now,
+        }],
+        "checkpoint_progress": {cp["id"]: cp["status"] == "complete" for cp in checklist},
+        "context": context[-200:],
+        "complete_context": context,
+        "sync_agent_results": {
+            "checklist": [{"agent_name": "checklist", "status": "success", "timestamp": now, "consumed": True,
+                           "result_payload": {"completed": True}}],
+        },
+        "is_paused": False, "patient_verified": False, "has_summary": False,
+        "summary": None, "key_points": [], "tags": [], "state_version": 42,
+    }
+
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def formats():
+    yield "pickle", pickle.dumps, pickle.loads
+    yield "json (current Redis)", lambda v: json.dumps(v, default=_json_default).encode(), json.loads
+    if codec.msgpack is not None:
+        yield "codec msgpack", lambda v: codec.encode(v, "msgpack"), codec.decode
+    yield "codec json" + (" (orjson)" if codec.orjson is not None else ""), lambda v: codec.encode(v, "json"), codec.decode
+
+
+def measure(fn, arg, rounds: int) -> float:
+    """Median time per call in microseconds"""
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    state = build_state(args.messages)
+    print(f"Conversation state with {args.messages} messages, median of {args.rounds} rounds\n")
+    print(f"{'format':<24}{'bytes':>10}{'encode us':>12}{'decode us':>12}")
+    for name, dumps, loads in formats():
+        data = dumps(state)
+        print(f"{name:<24}{len(data):>10}{measure(dumps, state, args.rounds):>12.1f}{measure(loads, data, args.rounds):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Specialist request size and parse time: inline context vs context handle.
+
+    python -m benchmarks.context_payload_bench [--messages 16 200 1000] [--rounds 200]
+
+"inline" is the loneliness payload with the stringified window, as the
+orchestrator sent it before context handles; "handle" is the same payload
+carrying a ContextHandle. Parse time is the specialist decoding the JSON
+body and validating its request model; resolving a handle is a local-tier
+hit after the first request for a state version (a Redis GET otherwise).
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Optional
+
+from pydantic import BaseModel
+
+from common.context_handle import ContextHandle
+from core.orchestrator.agent_profiles import get_agent_profile
+
+
+class _Query:
+    text = "I have been feeling a bit lonely since I moved"
+    conversation_id = "bench-conversation"
+    individual_id = "individual"
+    user_profile_id = "profile"
+    agent_instance_id = "instance"
+
+
+class _LonelinessRequest(BaseModel):
+    """Field-for-field copy of the specialist's LonelinessCompanionRequest"""
+    user_query: str
+    context: str
+    checkpoint: str
+    conversation_id: str
+    user_profile_id: str
+    agent_instance_id: str
+    user_id: str
+    context_handle: Optional[ContextHandle] = None
+
+
+def build_window(count: int) -> list:
+    return [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"Message {i}: " + "we talked about the week, the new flat and the neighbours " * 3,
+            "timestamp": f"2024-05-01T10:{i % 60:02d}:00",
+        }
+        for i in range(count)
+    ]
+
+
+def measure(fn, rounds: int) -> float:
+    """Median time per call in microseconds"""
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(samples)
+
+
+def run(count: int, rounds: int):
+    profile = get_agent_profile("loneliness")
+    window = build_window(count)
+    handle = ContextHandle(conversation_id=_Query.conversation_id, state_version=42, digest="9f2c4e1a7b3d5c60", messages=count)
+
+    results = []
+    for label, context in (("inline", window), ("handle", handle)):
+        body = json.dumps(profile.build_payload(_Query, None, context, None, False)).encode()
+        parse_us = measure(lambda: _LonelinessRequest.model_validate(json.loads(body)), rounds)
+        results.append((label, len(body), parse_us))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, nargs="+", default=[16, 200, 1000])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'messages':>8}  {'payload':<8}{'bytes':>10}{'parse us':>11}")
+    for count in args.messages:
+        for label, size, parse_us in run(count, args.rounds):
+            print(f"{count:>8}  {label:<8}{size:>10}{parse_us:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
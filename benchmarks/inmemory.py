@@ -0,0 +1,963 @@
+"""
+In-memory stand-ins for Redis, MongoDB, Gemini and the specialist services,
+so benchmarks can boot the core app without any of them.
+
+    with install_backends(BackendLatency.parse(llm="lognormal:350,0.4")):
+        from core.main import app       # imported after the patch
+        ...
+
+install_backends() swaps redis.asyncio.Redis / ConnectionPool and
+pymongo.MongoClient for the classes below *before* core is imported (the
+core modules bind them at import time) and gives every client of one URL the
+same keyspace, as a server would. The Gemini stub and the specialist
+transport are attached to the running app with attach_stubs().
+
+Only the commands and operators the core and common packages use are
+implemented. The repo's Lua scripts (leases, single-flight locks, the turn
+journal) run as Python equivalents registered in SCRIPTS; an unknown script
+raises, so a new script shows up here rather than being silently ignored.
+
+Latencies are drawn from LatencyModel distributions with a fixed seed, so two
+runs with the same arguments see the same sequence of delays. Redis and
+specialist calls sleep asynchronously; MongoDB calls block, as the sync
+pymongo driver the core uses does.
+"""
+
+import asyncio
+import copy
+import itertools
+import json
+import math
+import os
+import random
+import re
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from bson import ObjectId
+from redis.exceptions import ResponseError, WatchError
+
+# ---------------------------------------------------------------------------
+# Latency
+# ---------------------------------------------------------------------------
+
+class LatencyModel:
+    """
+    A latency distribution in milliseconds, from a spec string:
+
+        "0" / "fixed:5"        always 5ms
+        "uniform:2,8"          uniform between 2 and 8ms
+        "lognormal:350,0.4"    log-normal with a 350ms median and sigma 0.4
+    """
+
+    def __init__(self, spec: str = "0", seed: int = 0):
+        self.spec = spec
+        self._rng = random.Random(seed)
+        kind, _, params = spec.partition(":")
+        if not params:
+            kind, params = "fixed", kind
+        values = [float(p) for p in params.split(",")]
+        if kind == "fixed" and len(values) == 1:
+            self._sample = lambda: values[0]
+        elif kind == "uniform" and len(values) == 2:
+            self._sample = lambda: self._rng.uniform(values[0], values[1])
+        elif kind == "lognormal" and len(values) == 2:
+            mu = math.log(max(values[0], 1e-6))
+            self._sample = lambda: self._rng.lognormvariate(mu, values[1])
+        else:
+            raise ValueError(f"Unknown latency spec {spec!r}")
+
+    def sample_ms(self) -> float:
+        return max(self._sample(), 0.0)
+
+    def __repr__(self) -> str:
+        return f"LatencyModel({self.spec!r})"
+
+
+@dataclass
+class BackendLatency:
+    redis: LatencyModel = field(default_factory=LatencyModel)
+    mongo: LatencyModel = field(default_factory=LatencyModel)
+    llm: LatencyModel = field(default_factory=LatencyModel)
+    specialist: LatencyModel = field(default_factory=LatencyModel)
+
+    @classmethod
+    def parse(cls, redis: str = "0", mongo: str = "0", llm: str = "0", specialist: str = "0", seed: int = 0) -> "BackendLatency":
+        return cls(
+            redis=LatencyModel(redis, seed),
+            mongo=LatencyModel(mongo, seed + 1),
+            llm=LatencyModel(llm, seed + 2),
+            specialist=LatencyModel(specialist, seed + 3),
+        )
+
+    def describe(self) -> Dict[str, str]:
+        return {name: getattr(self, name).spec for name in ("redis", "mongo", "llm", "specialist")}
+
+
+# ---------------------------------------------------------------------------
+# Redis
+# ---------------------------------------------------------------------------
+
+def _to_bytes(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode()
+    if isinstance(value, (int, float)):
+        return repr(value).encode()
+    raise ResponseError(f"Invalid input of type {type(value).__name__}")
+
+
+def _to_key(key: Any) -> str:
+    return key.decode() if isinstance(key, bytes) else str(key)
+
+
+class _Keyspace:
+    """The data of one Redis "server": strings, sorted sets, streams and channels"""
+
+    def __init__(self):
+        self.data: Dict[str, Any] = {}
+        self.expires: Dict[str, float] = {}
+        self.versions: Dict[str, int] = {}           # bumped on every write, for WATCH
+        self.channels: Dict[str, List[asyncio.Queue]] = {}
+        self._stream_seq = itertools.count()
+
+    # -- bookkeeping -------------------------------------------------------
+    def _live(self, key: str) -> bool:
+        deadline = self.expires.get(key)
+        if deadline is not None and time.monotonic() >= deadline:
+            self._drop(key)
+        return key in self.data
+
+    def _drop(self, key: str) -> None:
+        self.data.pop(key, None)
+        self.expires.pop(key, None)
+        self._touch(key)
+
+    def _touch(self, key: str) -> None:
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def _typed(self, key: str, kind: type, create: bool = False):
+        if not self._live(key):
+            if not create:
+                return None
+            self.data[key] = kind()
+        value = self.data[key]
+        if not isinstance(value, kind):
+            raise ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def version(self, key: str) -> int:
+        self._live(key)
+        return self.versions.get(key, 0)
+
+    # -- strings -----------------------------------------------------------
+    def ping(self) -> bool:
+        return True
+
+    def get(self, key) -> Optional[bytes]:
+        return self._typed(_to_key(key), bytes)
+
+    def mget(self, keys, *args) -> List[Optional[bytes]]:
+        keys = [keys] if isinstance(keys, (str, bytes)) else list(keys)
+        return [self.get(key) for key in keys + list(args)]
+
+    def set(self, key, value, ex=None, px=None, nx: bool = False, xx: bool = False, keepttl: bool = False):
+        key = _to_key(key)
+        exists = self._live(key)
+        if (nx and exists) or (xx and not exists):
+            return None
+        self.data[key] = _to_bytes(value)
+        if ex is not None or px is not None:
+            self.expires[key] = time.monotonic() + (float(ex) if ex is not None else float(px) / 1000)
+        elif not keepttl:
+            self.expires.pop(key, None)
+        self._touch(key)
+        return True
+
+    def setex(self, key, time_seconds, value):
+        return self.set(key, value, ex=time_seconds)
+
+    def delete(self, *keys) -> int:
+        removed = 0
+        for key in map(_to_key, keys):
+            if self._live(key):
+                self._drop(key)
+                removed += 1
+        return removed
+
+    def exists(self, *keys) -> int:
+        return sum(self._live(_to_key(key)) for key in keys)
+
+    def pexpire(self, key, milliseconds) -> int:
+        key = _to_key(key)
+        if not self._live(key):
+            return 0
+        self.expires[key] = time.monotonic() + float(milliseconds) / 1000
+        return 1
+
+    def expire(self, key, seconds) -> int:
+        return self.pexpire(key, float(seconds) * 1000)
+
+    # -- pub/sub -----------------------------------------------------------
+    def publish(self, channel, message) -> int:
+        queues = self.channels.get(_to_key(channel), [])
+        for queue in queues:
+            queue.put_nowait({"type": "message", "channel": _to_bytes(channel), "data": _to_bytes(message)})
+        return len(queues)
+
+    # -- sorted sets -------------------------------------------------------
+    def zadd(self, key, mapping: Dict[Any, float], nx: bool = False) -> int:
+        key = _to_key(key)
+        zset = self._typed(key, dict, create=True)
+        added = 0
+        for member, score in mapping.items():
+            member = _to_bytes(member)
+            if member not in zset:
+                added += 1
+            elif nx:
+                continue
+            zset[member] = float(score)
+        self._touch(key)
+        return added
+
+    def zrange(self, key, start: int, end: int, withscores: bool = False):
+        zset = self._typed(_to_key(key), dict) or {}
+        ordered = sorted(zset.items(), key=lambda item: (item[1], item[0]))
+        end = len(ordered) + end if end < 0 else end
+        selected = ordered[start:end + 1]
+        return [(m, s) for m, s in selected] if withscores else [m for m, _ in selected]
+
+    def zrem(self, key, *members) -> int:
+        key = _to_key(key)
+        zset = self._typed(key, dict)
+        if not zset:
+            return 0
+        removed = sum(zset.pop(_to_bytes(m), None) is not None for m in members)
+        if not zset:
+            self._drop(key)
+        else:
+            self._touch(key)
+        return removed
+
+    def zcard(self, key) -> int:
+        return len(self._typed(_to_key(key), dict) or {})
+
+    # -- streams -----------------------------------------------------------
+    def xadd(self, key, fields: Dict[Any, Any], id: str = "*") -> bytes:
+        key = _to_key(key)
+        stream = self._typed(key, list, create=True)
+        entry_id = f"{int(time.time() * 1000)}-{next(self._stream_seq)}".encode()
+        stream.append((entry_id, {_to_bytes(k): _to_bytes(v) for k, v in fields.items()}))
+        self._touch(key)
+        return entry_id
+
+    def xrange(self, key, min: str = "-", max: str = "+", count: Optional[int] = None):
+        stream = self._typed(_to_key(key), list) or []
+        entries = [(entry_id, dict(fields)) for entry_id, fields in stream]
+        return entries[:count] if count is not None else entries
+
+    def xdel(self, key, *ids) -> int:
+        key = _to_key(key)
+        stream = self._typed(key, list)
+        if not stream:
+            return 0
+        drop = {_to_bytes(i) for i in ids}
+        kept = [entry for entry in stream if entry[0] not in drop]
+        self.data[key] = kept
+        self._touch(key)
+        return len(stream) - len(kept)
+
+    # -- scripting ---------------------------------------------------------
+    def eval(self, script: str, numkeys: int, *keys_and_args):
+        handler = SCRIPTS.get(script.strip())
+        if handler is None:
+            raise ResponseError("NOSCRIPT in-memory Redis has no Python equivalent of this script")
+        keys = [_to_key(k) for k in keys_and_args[:numkeys]]
+        args = [_to_bytes(a) for a in keys_and_args[numkeys:]]
+        return handler(self, keys, args)
+
+
+_COMMANDS = frozenset({
+    "ping", "get", "mget", "set", "setex", "delete", "exists", "pexpire", "expire", "publish",
+    "zadd", "zrange", "zrem", "zcard", "xadd", "xrange", "xdel", "eval",
+})
+
+# One keyspace per Redis URL, shared by every client of it
+_keyspaces: Dict[str, _Keyspace] = {}
+_redis_latency = LatencyModel()
+
+
+def _keyspace_for(url: str) -> _Keyspace:
+    return _keyspaces.setdefault(url or "redis://default", _Keyspace())
+
+
+class InMemoryConnectionPool:
+    def __init__(self, url: str = "", decode_responses: bool = False, **kwargs):
+        self.url = url
+        self.decode_responses = decode_responses
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "InMemoryConnectionPool":
+        return cls(url, decode_responses=kwargs.get("decode_responses", False))
+
+    async def disconnect(self, *args, **kwargs) -> None:
+        pass
+
+
+class InMemoryRedis:
+    """redis.asyncio.Redis over an in-process keyspace; every command is one (simulated) round trip"""
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, connection_pool=None,
+                 decode_responses: bool = False, url: Optional[str] = None, **kwargs):
+        if connection_pool is not None:
+            url, decode_responses = connection_pool.url, connection_pool.decode_responses
+        self._keyspace = _keyspace_for(url or f"redis://{host}:{port}/{db}")
+        self._decode = decode_responses
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "InMemoryRedis":
+        return cls(url=url, decode_responses=kwargs.get("decode_responses", False))
+
+    def _reply(self, value: Any) -> Any:
+        if not self._decode:
+            return value
+        if isinstance(value, bytes):
+            return value.decode()
+        if isinstance(value, list):
+            return [self._reply(v) for v in value]
+        if isinstance(value, tuple):
+            return tuple(self._reply(v) for v in value)
+        if isinstance(value, dict):
+            return {self._reply(k): self._reply(v) for k, v in value.items()}
+        return value
+
+    async def _round_trip(self) -> None:
+        delay = _redis_latency.sample_ms()
+        await asyncio.sleep(delay / 1000 if delay else 0)
+
+    def __getattr__(self, name: str):
+        if name not in _COMMANDS:
+            raise AttributeError(f"In-memory Redis does not implement {name!r}")
+
+        async def command(*args, **kwargs):
+            await self._round_trip()
+            return self._reply(getattr(self._keyspace, name)(*args, **kwargs))
+        return command
+
+    def pipeline(self, transaction: bool = True) -> "_Pipeline":
+        return _Pipeline(self, transaction)
+
+    def pubsub(self, **kwargs) -> "_PubSub":
+        return _PubSub(self)
+
+    async def close(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+
+class _Pipeline:
+    """Buffered commands sent in one round trip; WATCH/MULTI as in redis-py"""
+
+    def __init__(self, client: InMemoryRedis, transaction: bool):
+        self._client = client
+        self._transaction = transaction
+        self._queue: List[Tuple[str, tuple, dict]] = []
+        self._watched: Dict[str, int] = {}
+        self._immediate = False
+
+    async def __aenter__(self) -> "_Pipeline":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.reset()
+
+    async def watch(self, *keys) -> bool:
+        await self._client._round_trip()
+        for key in map(_to_key, keys):
+            self._watched[key] = self._client._keyspace.version(key)
+        self._immediate = True
+        return True
+
+    async def unwatch(self) -> bool:
+        self._watched.clear()
+        self._immediate = False
+        return True
+
+    def multi(self) -> None:
+        self._immediate = False
+
+    async def reset(self) -> None:
+        self._queue.clear()
+        self._watched.clear()
+        self._immediate = False
+
+    def __getattr__(self, name: str):
+        if name not in _COMMANDS:
+            raise AttributeError(f"In-memory Redis pipeline does not implement {name!r}")
+        if self._immediate:
+            return getattr(self._client, name)
+
+        def queue(*args, **kwargs) -> "_Pipeline":
+            self._queue.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self) -> List[Any]:
+        await self._client._round_trip()
+        keyspace = self._client._keyspace
+        try:
+            if any(keyspace.version(key) != version for key, version in self._watched.items()):
+                raise WatchError("Watched variable changed.")
+            return [self._client._reply(getattr(keyspace, name)(*args, **kwargs)) for name, args, kwargs in self._queue]
+        finally:
+            await self.reset()
+
+
+class _PubSub:
+    def __init__(self, client: InMemoryRedis):
+        self._client = client
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._channels: List[str] = []
+
+    async def subscribe(self, *channels) -> None:
+        for channel in map(_to_key, channels):
+            self._client._keyspace.channels.setdefault(channel, []).append(self._queue)
+            self._channels.append(channel)
+            self._queue.put_nowait({"type": "subscribe", "channel": channel.encode(), "data": len(self._channels)})
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0):
+        deadline = time.monotonic() + (timeout or 0)
+        while True:
+            try:
+                message = await asyncio.wait_for(self._queue.get(), timeout=max(deadline - time.monotonic(), 0) or None) \
+                    if timeout else self._queue.get_nowait()
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                return None
+            if ignore_subscribe_messages and message["type"] == "subscribe":
+                continue
+            return self._client._reply(message)
+
+    async def reset(self) -> None:
+        for channel in self._channels:
+            queues = self._client._keyspace.channels.get(channel, [])
+            if self._queue in queues:
+                queues.remove(self._queue)
+        self._channels.clear()
+
+    aclose = reset
+
+
+# Python equivalents of the repo's Lua scripts, keyed by the script text
+SCRIPTS: Dict[str, Callable[[_Keyspace, List[str], List[bytes]], Any]] = {}
+
+
+def _compare_and_delete(ks: _Keyspace, keys: List[str], args: List[bytes]) -> int:
+    return ks.delete(keys[0]) if ks.get(keys[0]) == args[0] else 0
+
+
+def _compare_and_pexpire(ks: _Keyspace, keys: List[str], args: List[bytes]) -> int:
+    return ks.pexpire(keys[0], int(args[1])) if ks.get(keys[0]) == args[0] else 0
+
+
+def _journal_append(ks: _Keyspace, keys: List[str], args: List[bytes]) -> int:
+    stream_key, head_key, dirty_key = keys
+    base, payload, score, conversation_id, ttl = args
+    head = ks.get(head_key)
+    if base and head is not None and head != base:
+        return -1
+    version = int(base) + 1 if base else int(head or 0) + 1
+    ks.xadd(stream_key, {"version": version, "changes": payload})
+    ks.set(head_key, version, ex=int(ttl))
+    ks.zadd(dirty_key, {conversation_id: float(score)}, nx=True)
+    return version
+
+
+def _journal_trim(ks: _Keyspace, keys: List[str], args: List[bytes]) -> int:
+    stream_key, dirty_key = keys
+    conversation_id, entry_ids = args[0], args[1:]
+    ks.xdel(stream_key, *entry_ids)
+    first = ks.xrange(stream_key, count=1)
+    if first:
+        ks.zadd(dirty_key, {conversation_id: float(re.match(rb"^(\d+)", first[0][0]).group(1))})
+    else:
+        ks.zrem(dirty_key, conversation_id)
+        ks.delete(stream_key)
+    return 0
+
+
+def _register_scripts() -> None:
+    from common import lease, single_flight
+    from core.memory import turn_journal
+
+    SCRIPTS[lease._RELEASE_SCRIPT.strip()] = _compare_and_delete
+    SCRIPTS[lease._RENEW_SCRIPT.strip()] = _compare_and_pexpire
+    SCRIPTS[single_flight._RELEASE_SCRIPT.strip()] = _compare_and_delete
+    SCRIPTS[turn_journal._APPEND_SCRIPT.strip()] = _journal_append
+    SCRIPTS[turn_journal._TRIM_SCRIPT.strip()] = _journal_trim
+
+
+# ---------------------------------------------------------------------------
+# MongoDB
+# ---------------------------------------------------------------------------
+
+_MISSING = object()
+_mongo_latency = LatencyModel()
+
+
+def _get_path(doc: Dict[str, Any], path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _MISSING
+    return value
+
+
+def _set_path(doc: Dict[str, Any], path: str, value: Any) -> None:
+    parts = path.split(".")
+    if "$" in parts:
+        raise NotImplementedError("Positional updates are not supported by the in-memory collection")
+    target: Any = doc
+    for part in parts[:-1]:
+        target = target[int(part)] if isinstance(target, list) else target.setdefault(part, {})
+    if isinstance(target, list):
+        index = int(parts[-1])
+        target.extend([None] * (index + 1 - len(target)))
+        target[index] = value
+    else:
+        target[parts[-1]] = value
+
+
+def _unset_path(doc: Dict[str, Any], path: str) -> None:
+    parts = path.split(".")
+    target: Any = doc
+    for part in parts[:-1]:
+        if isinstance(target, list) and part.isdigit() and int(part) < len(target):
+            target = target[int(part)]
+        elif isinstance(target, dict):
+            target = target.get(part)
+        else:
+            return
+    if isinstance(target, dict):
+        target.pop(parts[-1], None)
+    elif isinstance(target, list) and parts[-1].isdigit() and int(parts[-1]) < len(target):
+        target[int(parts[-1])] = None
+
+
+def _matches_condition(value: Any, condition: Any) -> bool:
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        for op, arg in condition.items():
+            present = value is not _MISSING
+            plain = None if value is _MISSING else value
+            if op == "$in":
+                ok = plain in arg
+            elif op == "$nin":
+                ok = plain not in arg
+            elif op == "$ne":
+                ok = plain != arg
+            elif op == "$exists":
+                ok = present == bool(arg)
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                ok = present and plain is not None and {
+                    "$gt": plain > arg if present else False,
+                    "$gte": plain >= arg if present else False,
+                    "$lt": plain < arg if present else False,
+                    "$lte": plain <= arg if present else False,
+                }[op]
+            else:
+                raise NotImplementedError(f"Query operator {op} is not supported by the in-memory collection")
+            if not ok:
+                return False
+        return True
+    if value is _MISSING:
+        return condition is None
+    return value == condition or (isinstance(value, list) and condition in value)
+
+
+def _matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(_matches(doc, q) for q in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(doc, q) for q in condition):
+                return False
+        elif not _matches_condition(_get_path(doc, key), condition):
+            return False
+    return True
+
+
+def _apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool) -> None:
+    if not any(k.startswith("$") for k in update):
+        _id = doc.get("_id")
+        doc.clear()
+        doc.update(copy.deepcopy(update))
+        if _id is not None:
+            doc["_id"] = _id
+        return
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                _set_path(doc, path, copy.deepcopy(value))
+            elif op == "$setOnInsert":
+                continue
+            elif op == "$unset":
+                _unset_path(doc, path)
+            elif op == "$inc":
+                current = _get_path(doc, path)
+                _set_path(doc, path, (0 if current is _MISSING or current is None else current) + value)
+            elif op in ("$push", "$addToSet"):
+                current = _get_path(doc, path)
+                items = list(current) if isinstance(current, list) else []
+                each = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                for item in copy.deepcopy(each):
+                    if op == "$push" or item not in items:
+                        items.append(item)
+                if isinstance(value, dict) and "$slice" in value:
+                    limit = value["$slice"]
+                    items = items[limit:] if limit < 0 else items[:limit]
+                _set_path(doc, path, items)
+            else:
+                raise NotImplementedError(f"Update operator {op} is not supported by the in-memory collection")
+
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        projected = {k: doc[k] for k in include if k in doc}
+        if projection.get("_id", True) and "_id" in doc:
+            projected["_id"] = doc["_id"]
+        return projected
+    for key, keep in projection.items():
+        if not keep:
+            doc.pop(key, None)
+    return doc
+
+
+class InMemoryCursor:
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self._docs = docs
+
+    def sort(self, key, direction: int = 1) -> "InMemoryCursor":
+        if isinstance(key, list):
+            key, direction = key[0]
+        self._docs.sort(key=lambda d: (_get_path(d, key) is _MISSING, _get_path(d, key)), reverse=direction < 0)
+        return self
+
+    def limit(self, count: int) -> "InMemoryCursor":
+        if count:
+            self._docs = self._docs[:count]
+        return self
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._docs)
+
+
+class InMemoryCollection:
+    """The pymongo Collection operations the core uses, blocking like the sync driver"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._docs: List[Dict[str, Any]] = []
+
+    @staticmethod
+    def _round_trip() -> None:
+        delay = _mongo_latency.sample_ms()
+        if delay:
+            time.sleep(delay / 1000)
+
+    def _find(self, query) -> Iterator[Dict[str, Any]]:
+        return (doc for doc in self._docs if _matches(doc, query))
+
+    def _upsert_doc(self, query: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+        doc = {"_id": ObjectId()}
+        for key, condition in (query or {}).items():
+            if not key.startswith("$") and not (isinstance(condition, dict) and any(k.startswith("$") for k in condition)):
+                _set_path(doc, key, copy.deepcopy(condition))
+        _apply_update(doc, update, inserting=True)
+        self._docs.append(doc)
+        return doc
+
+    def find_one(self, filter=None, projection=None, *args, **kwargs):
+        self._round_trip()
+        doc = next(self._find(filter), None)
+        return None if doc is None else _project(doc, projection)
+
+    def find(self, filter=None, projection=None, *args, **kwargs) -> InMemoryCursor:
+        self._round_trip()
+        return InMemoryCursor([_project(doc, projection) for doc in self._find(filter)])
+
+    def count_documents(self, filter=None, **kwargs) -> int:
+        self._round_trip()
+        return sum(1 for _ in self._find(filter))
+
+    def insert_one(self, document, **kwargs):
+        self._round_trip()
+        doc = copy.deepcopy(document)
+        doc.setdefault("_id", ObjectId())
+        document.setdefault("_id", doc["_id"])
+        self._docs.append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"], acknowledged=True)
+
+    def insert_many(self, documents, **kwargs):
+        ids = [self.insert_one(document).inserted_id for document in documents]
+        return SimpleNamespace(inserted_ids=ids, acknowledged=True)
+
+    def _update(self, filter, update, upsert: bool, many: bool):
+        matched = [doc for doc in self._find(filter)]
+        if not many:
+            matched = matched[:1]
+        for doc in matched:
+            _apply_update(doc, update, inserting=False)
+        upserted_id = None
+        if not matched and upsert:
+            upserted_id = self._upsert_doc(filter, update)["_id"]
+        return SimpleNamespace(matched_count=len(matched), modified_count=len(matched), upserted_id=upserted_id, acknowledged=True)
+
+    def update_one(self, filter, update, upsert: bool = False, **kwargs):
+        self._round_trip()
+        return self._update(filter, update, upsert, many=False)
+
+    def update_many(self, filter, update, upsert: bool = False, **kwargs):
+        self._round_trip()
+        return self._update(filter, update, upsert, many=True)
+
+    def replace_one(self, filter, replacement, upsert: bool = False, **kwargs):
+        self._round_trip()
+        return self._update(filter, replacement, upsert, many=False)
+
+    def find_one_and_update(self, filter, update, projection=None, upsert: bool = False, return_document=False, **kwargs):
+        self._round_trip()
+        doc = next(self._find(filter), None)
+        if doc is None:
+            if not upsert:
+                return None
+            doc = self._upsert_doc(filter, update)
+            return _project(doc, projection) if return_document else None
+        before = _project(doc, projection)
+        _apply_update(doc, update, inserting=False)
+        return _project(doc, projection) if return_document else before
+
+    def delete_one(self, filter, **kwargs):
+        self._round_trip()
+        doc = next(self._find(filter), None)
+        if doc is not None:
+            self._docs.remove(doc)
+        return SimpleNamespace(deleted_count=int(doc is not None), acknowledged=True)
+
+    def delete_many(self, filter, **kwargs):
+        self._round_trip()
+        before = len(self._docs)
+        self._docs = [doc for doc in self._docs if not _matches(doc, filter)]
+        return SimpleNamespace(deleted_count=before - len(self._docs), acknowledged=True)
+
+    def bulk_write(self, requests, ordered: bool = True, **kwargs):
+        self._round_trip()
+        matched = upserted = 0
+        for request in requests:
+            result = self._update(request._filter, request._doc, request._upsert, many=type(request).__name__ == "UpdateMany")
+            matched += result.matched_count
+            upserted += result.upserted_id is not None
+        return SimpleNamespace(matched_count=matched, modified_count=matched, upserted_count=upserted, acknowledged=True)
+
+    def create_index(self, *args, **kwargs) -> str:
+        return "in_memory"
+
+
+class InMemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, InMemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = InMemoryCollection(name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> InMemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    def command(self, *args, **kwargs) -> Dict[str, Any]:
+        return {"ok": 1.0}
+
+
+# One set of databases per MongoDB URI
+_databases: Dict[str, Dict[str, InMemoryDatabase]] = {}
+
+
+class InMemoryMongoClient:
+    """pymongo.MongoClient over in-process databases"""
+
+    def __init__(self, host: Optional[str] = None, *args, **kwargs):
+        self._databases = _databases.setdefault(host or "mongodb://default", {})
+        self.admin = InMemoryDatabase("admin")
+
+    def __getitem__(self, name: str) -> InMemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = InMemoryDatabase(name)
+        return self._databases[name]
+
+    def get_database(self, name: str, **kwargs) -> InMemoryDatabase:
+        return self[name]
+
+    def close(self) -> None:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Gemini and specialists
+# ---------------------------------------------------------------------------
+
+def _stable_fraction(text: str) -> float:
+    return zlib.crc32(text.encode()) / 0xFFFFFFFF
+
+
+class StubResponse:
+    """What callers read from a generate_content response: .text and usage_metadata"""
+
+    def __init__(self, text: str, prompt: str):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4
+        )
+
+
+class GeminiStub:
+    """
+    Deterministic stand-in for GenerativeModel.generate_content_async.
+
+    The reply depends only on the prompt: checklist prompts get a
+    "Complete/Confidence" verdict (complete for `complete_ratio` of distinct
+    prompts), checkpoint prompts a JSON list of checkpoints, anything else a
+    short assistant reply.
+    """
+
+    def __init__(self, latency: LatencyModel, complete_ratio: float = 0.6):
+        self.latency = latency
+        self.complete_ratio = complete_ratio
+        self.calls = 0
+
+    def respond(self, prompt: str) -> str:
+        if "Complete: [Yes/No]" in prompt:
+            complete = _stable_fraction(prompt) < self.complete_ratio
+            return f"Complete: {'Yes' if complete else 'No'}\nConfidence: {85 if complete else 40}"
+        if "expected_inputs" in prompt:
+            return json.dumps([
+                {"text": "How have you been feeling this week?", "expected_inputs": ["mood", "sleep"]},
+                {"text": "What would make the next few days easier?", "expected_inputs": ["needs"]},
+                {"text": "Who could you reach out to?", "expected_inputs": ["support system"]},
+            ])
+        return "I understand, thank you for sharing that with me. Could you tell me a bit more about how it has been affecting your days?"
+
+    async def generate_content_async(self, prompt, **kwargs) -> StubResponse:
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample_ms() / 1000)
+        prompt = prompt if isinstance(prompt, str) else str(prompt)
+        return StubResponse(self.respond(prompt), prompt)
+
+
+def specialist_transport(latency: LatencyModel) -> httpx.MockTransport:
+    """Answers every specialist/auxiliary agent request like a /process endpoint, after a sampled latency"""
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency.sample_ms() / 1000)
+        return httpx.Response(200, json={
+            "response": "That sounds like a lot to carry. What has helped you most on days like this?",
+            "requires_human": False,
+            "agent": request.url.path,
+        })
+
+    return httpx.MockTransport(handle)
+
+
+# ---------------------------------------------------------------------------
+# Installation
+# ---------------------------------------------------------------------------
+
+BENCH_ENV = {
+    "GEMINI_API_KEY": "bench",
+    "MONGODB_URI": "mongodb://bench",
+    "REDIS_URL": "redis://bench:6379/0",
+    "CHECKPOINT_URL": "http://core.bench/checkpoint",
+    "PRIMARY_SERVICE_URL": "http://core.bench/primary/process",
+    "CHECKLIST_SERVICE_URL": "http://core.bench/checklist/process",
+    "PRIVACY_SERVICE_URL": "http://agents.bench/privacy/process",
+    "NUTRITION_SERVICE_URL": "http://agents.bench/nutrition/process",
+    "FOLLOWUP_SERVICE_URL": "http://agents.bench/followup/process",
+    "HISTORY_SERVICE_URL": "http://agents.bench/history/process",
+    "HUMAN_INTERVENTION_SERVICE_URL": "http://agents.bench/human_intervention/process",
+    "MEDICATION_SERVICE_URL": "http://agents.bench/medication/process",
+    "LONELINESS_SERVICE_URL": "http://specialists.bench/loneliness/process",
+    "ACCOUNTABILITY_SERVICE_URL": "http://specialists.bench/accountability/process",
+    "THERAPY_SERVICE_URL": "http://specialists.bench/therapy/process",
+    "EMOTIONAL_SERVICE_URL": "http://specialists.bench/emotional/process",
+    "ANXIETY_SERVICE_URL": "http://specialists.bench/anxiety/process",
+    "HTTP_CONNECT_TIMEOUT": "5", "HTTP_READ_TIMEOUT": "30", "HTTP_WRITE_TIMEOUT": "10", "HTTP_POOL_TIMEOUT": "5",
+    "MAX_KEEPALIVE_CONNECTIONS": "100", "MAX_CONNECTIONS": "200",
+    "DEFAULT_SERVICE_TIMEOUT": "30", "CHECKPOINT_SERVICE_TIMEOUT": "30", "PRIMARY_SERVICE_TIMEOUT": "30",
+    "HUMAN_INTERVENTION_TIMEOUT": "30", "CHECKLIST_TIMEOUT": "30", "MEDICATION_TIMEOUT": "30", "PRIVACY_TIMEOUT": "30",
+    "CACHE_TTL": "3600", "TASK_STATE_CACHE_TTL": "3600", "MAX_SERVICE_RETRIES": "2", "LOG_LEVEL": "WARNING",
+    # The stub is not rate limited; keep the gateway's token bucket out of the measurement
+    "LLM_REQUESTS_PER_MINUTE": "1000000", "LLM_BURST": "10000",
+}
+
+
+@contextmanager
+def install_backends(latency: BackendLatency) -> Iterator[None]:
+    """
+    Point redis.asyncio and pymongo at the in-memory doubles, and fill in the
+    settings core needs without overriding the caller's environment. Import
+    the core app inside the block.
+    """
+    import pymongo
+    import redis.asyncio
+
+    global _redis_latency, _mongo_latency
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+    saved = (redis.asyncio.Redis, redis.asyncio.ConnectionPool, pymongo.MongoClient, _redis_latency, _mongo_latency)
+    redis.asyncio.Redis, redis.asyncio.ConnectionPool = InMemoryRedis, InMemoryConnectionPool
+    pymongo.MongoClient = InMemoryMongoClient
+    _redis_latency, _mongo_latency = latency.redis, latency.mongo
+    _keyspaces.clear()
+    _databases.clear()
+    try:
+        _register_scripts()
+        yield
+    finally:
+        redis.asyncio.Redis, redis.asyncio.ConnectionPool, pymongo.MongoClient, _redis_latency, _mongo_latency = saved
+
+
+def attach_stubs(latency: BackendLatency) -> GeminiStub:
+    """Route the core's Gemini calls to a GeminiStub and its HTTP calls to specialist_transport()"""
+    from common.gemini_client import get_gemini_client
+    from core.orchestrator import services
+    from core.orchestrator.agent_profiles import AGENT_PROFILES
+
+    stub = GeminiStub(latency.llm)
+    get_gemini_client().model.generate_content_async = stub.generate_content_async
+
+    transport = specialist_transport(latency.specialist)
+    services.http_client = httpx.AsyncClient(transport=transport)
+    for pool in {profile.pool for profile in AGENT_PROFILES.values() if profile.pool}:
+        services._pool_clients[pool] = httpx.AsyncClient(transport=transport)
+    return stub
@@ -0,0 +1,361 @@
+"""
+Turn latency of /orchestrator/orchestrate on the core app with in-memory backends.
+
+    python -m benchmarks.orchestrator_bench run [--concurrency 1 8 32] [--turns 200] [--agents primary loneliness]
+        [--conversations new existing] [--llm-latency lognormal:350,0.4] [--out results.json]
+    python -m benchmarks.orchestrator_bench compare baseline.json results.json [--threshold 0.10]
+
+Redis, MongoDB, Gemini and the specialist services are replaced by the doubles
+in benchmarks.inmemory, each with its own latency distribution, so the numbers
+measure the orchestrator itself plus whatever latency is dialled in. A turn is
+timed from the request to the last byte of the response, as a client sees it;
+background work (state commit, next-checkpoint generation) keeps running
+concurrently, as in production, and is drained between scenarios.
+
+Every scenario is one (conversation kind, detected_agent, concurrency)
+combination. "new" starts a fresh conversation on every turn; "existing"
+gives each worker one conversation, warmed up with a first turn, and keeps
+talking on it. Per-stage percentiles come from the response's timing_metrics.
+Allocations are measured in a separate sequential pass under tracemalloc so
+they don't slow the timed turns.
+
+compare exits with status 1 when a scenario's p50/p95/p99 latency or a
+stage's p95 grew, or its throughput dropped, by more than the threshold.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.inmemory import BackendLatency, attach_stubs, install_backends
+
+PATH = "/orchestrator/orchestrate"
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(samples: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of the samples"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def summarize(samples: List[float]) -> Dict[str, Optional[float]]:
+    summary = {f"p{p}": percentile(samples, p) for p in PERCENTILES}
+    summary["mean"] = sum(samples) / len(samples) if samples else None
+    summary["max"] = max(samples) if samples else None
+    return {k: None if v is None else round(v, 2) for k, v in summary.items()}
+
+
+def make_query(conversation_id: str, agent: str, turn: int) -> Dict[str, Any]:
+    return {
+        "text": f"I have been feeling a bit low this week, turn {turn}",
+        "conversation_id": conversation_id,
+        "plan": "pro",
+        "services": [],
+        "individual_id": "bench_individual",
+        "user_profile_id": "bench_profile",
+        "detected_agent": agent,
+        "agent_instance_id": f"bench_{agent}",
+        "call_log_id": f"call_{conversation_id}",
+        "channel": "chat",
+    }
+
+
+class Turn:
+    """One request through the ASGI app: response time at the last body byte, background work after it"""
+
+    def __init__(self, app, query: Dict[str, Any]):
+        self.app = app
+        self.body = json.dumps(query).encode()
+        self.status = 0
+        self.chunks: List[bytes] = []
+        self.responded = asyncio.get_running_loop().create_future()
+        self.started = time.perf_counter()
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+            "scheme": "http", "path": PATH, "raw_path": PATH.encode(), "root_path": "", "query_string": b"",
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(self.body)).encode())],
+            "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+        }
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": self.body, "more_body": False}
+            await self.responded
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                self.status = message["status"]
+            elif message["type"] == "http.response.body":
+                self.chunks.append(message.get("body", b""))
+                if not message.get("more_body", False) and not self.responded.done():
+                    self.responded.set_result(time.perf_counter())
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if not self.responded.done():
+                self.responded.set_result(time.perf_counter())
+
+    async def response(self) -> Tuple[float, Optional[Dict[str, Any]]]:
+        """Latency in ms and the parsed body (None on an error status)"""
+        finished = await self.responded
+        latency_ms = (finished - self.started) * 1000
+        if self.status != 200:
+            return latency_ms, None
+        try:
+            return latency_ms, json.loads(b"".join(self.chunks))
+        except ValueError:
+            return latency_ms, None
+
+
+async def drain(before: set, timeout: float = 30.0) -> None:
+    """Wait for the tasks started since `before` (background work); periodic loops are left running"""
+    pending = {task for task in asyncio.all_tasks() if task not in before and task is not asyncio.current_task()}
+    if pending:
+        await asyncio.wait(pending, timeout=timeout)
+
+
+async def run_scenario(app, kind: str, agent: str, concurrency: int, turns: int) -> Dict[str, Any]:
+    from core.orchestrator.timing import STAGES
+
+    before = asyncio.all_tasks()
+    conversations = [f"bench_{kind}_{agent}_{uuid.uuid4().hex[:8]}_{w}" for w in range(concurrency)]
+    if kind == "existing":
+        warmups = [Turn(app, make_query(cid, agent, 0)) for cid in conversations]
+        await asyncio.gather(*(turn.task for turn in warmups))
+        await drain(before)
+
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    errors = 0
+    counter = iter(range(turns))
+
+    async def worker(w: int) -> None:
+        nonlocal errors
+        for n in counter:
+            cid = conversations[w] if kind == "existing" else f"bench_new_{agent}_{uuid.uuid4().hex}"
+            latency_ms, body = await Turn(app, make_query(cid, agent, n + 1)).response()
+            if body is None:
+                errors += 1
+                continue
+            latencies.append(latency_ms)
+            for step, value in (body.get("timing_metrics") or {}).items():
+                if step in STAGES:
+                    stages.setdefault(STAGES[step], []).append(float(value))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await drain(before)
+
+    return {
+        "kind": kind, "agent": agent, "concurrency": concurrency,
+        "turns": len(latencies), "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_ms": summarize(latencies),
+        "stages": {stage: summarize(values) for stage, values in sorted(stages.items())},
+    }
+
+
+async def measure_allocations(app, kind: str, agent: str, turns: int) -> Dict[str, Any]:
+    """Sequential full turns (background work included) under tracemalloc"""
+    conversation = f"bench_alloc_{agent}_{uuid.uuid4().hex[:8]}"
+
+    async def one(n: int) -> None:
+        cid = conversation if kind == "existing" else f"bench_alloc_{agent}_{uuid.uuid4().hex}"
+        before = asyncio.all_tasks()
+        await Turn(app, make_query(cid, agent, n)).task
+        await drain(before)
+
+    await one(0)                    # warm up caches, lazy imports and the conversation
+    peaks, retained, blocks = [], [], []
+    tracemalloc.start()
+    try:
+        for n in range(1, turns + 1):
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            blocks_before = sys.getallocatedblocks()
+            await one(n)
+            after, peak = tracemalloc.get_traced_memory()
+            peaks.append((peak - current) / 1024)
+            retained.append((after - current) / 1024)
+            blocks.append(sys.getallocatedblocks() - blocks_before)
+    finally:
+        tracemalloc.stop()
+    return {
+        "turns": turns,
+        "peak_kib_per_turn": round(sum(peaks) / len(peaks), 1),
+        "retained_kib_per_turn": round(sum(retained) / len(retained), 1),
+        "retained_blocks_per_turn": round(sum(blocks) / len(blocks), 1),
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+async def bench(args: argparse.Namespace, latency: BackendLatency) -> Dict[str, Any]:
+    from core.main import app
+
+    scenarios: Dict[str, Any] = {}
+    async with app.router.lifespan_context(app):
+        stub = attach_stubs(latency)
+        for kind in args.conversations:
+            for agent in args.agents:
+                allocations = await measure_allocations(app, kind, agent, args.alloc_turns) if args.alloc_turns else None
+                for concurrency in args.concurrency:
+                    result = await run_scenario(app, kind, agent, concurrency, args.turns)
+                    result["alloc"] = allocations
+                    scenarios[f"{kind}/{agent}/c{concurrency}"] = result
+                    print(
+                        f"{kind:<9}{agent:<16}{concurrency:>4}{result['throughput_rps'] or 0:>9.1f}"
+                        f"{result['latency_ms']['p50'] or 0:>9.1f}{result['latency_ms']['p95'] or 0:>9.1f}"
+                        f"{result['latency_ms']['p99'] or 0:>9.1f}{result['errors']:>7}",
+                        file=sys.stderr,
+                    )
+        llm_calls = stub.calls
+    return {"llm_calls": llm_calls, "scenarios": scenarios}
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    latency = BackendLatency.parse(
+        redis=args.redis_latency, mongo=args.mongo_latency, llm=args.llm_latency,
+        specialist=args.specialist_latency, seed=args.seed,
+    )
+    with install_backends(latency), open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        # Core modules bind the Redis and MongoDB clients on import, so nothing is imported before this point
+        from core.orchestrator.agent_profiles import AGENT_PROFILES
+
+        unknown = set(args.agents or []) - set(AGENT_PROFILES)
+        if unknown:
+            print(f"Unknown agents: {', '.join(sorted(unknown))}", file=sys.stderr)
+            return 2
+        args.agents = args.agents or sorted(AGENT_PROFILES)
+        print(f"{'kind':<9}{'agent':<16}{'conc':>4}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>7}", file=sys.stderr)
+        logging.disable(logging.WARNING)
+        try:
+            results = asyncio.run(bench(args, latency))
+        finally:
+            logging.disable(logging.NOTSET)
+
+    results["meta"] = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "turns": args.turns,
+        "latency": latency.describe(),
+        "seed": args.seed,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Wrote {len(results['scenarios'])} scenarios to {args.out}", file=sys.stderr)
+    return 0
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float, min_delta_ms: float) -> Tuple[List[tuple], List[str]]:
+    """(metric rows, regressions); a latency regression must also exceed min_delta_ms to filter noise on tiny stages"""
+    rows, regressions = [], []
+
+    def check(scenario: str, metric: str, old, new, higher_is_worse: bool = True) -> None:
+        if old is None or new is None:
+            return
+        change = (new - old) / old if old else 0.0
+        worse = change > threshold and new - old > min_delta_ms if higher_is_worse else -change > threshold
+        rows.append((scenario, metric, old, new, change, worse))
+        if worse:
+            regressions.append(f"{scenario} {metric}: {old:.1f} -> {new:.1f} ({change:+.0%})")
+
+    for name, base in sorted(baseline["scenarios"].items()):
+        cur = current["scenarios"].get(name)
+        if cur is None:
+            continue
+        for p in PERCENTILES:
+            check(name, f"p{p}", base["latency_ms"][f"p{p}"], cur["latency_ms"][f"p{p}"])
+        for stage, values in sorted(base["stages"].items()):
+            check(name, f"{stage} p95", values["p95"], cur["stages"].get(stage, {}).get("p95"))
+        check(name, "throughput rps", base["throughput_rps"], cur["throughput_rps"], higher_is_worse=False)
+    return rows, regressions
+
+
+def cmd_compare(args: argparse.Namespace) -> int:
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    rows, regressions = compare(baseline, current, args.threshold, args.min_delta_ms)
+    print(f"{'scenario':<34}{'metric':<26}{'baseline':>10}{'current':>10}{'change':>9}")
+    for scenario, metric, old, new, change, worse in rows:
+        print(f"{scenario:<34}{metric:<26}{old:>10.1f}{new:>10.1f}{change:>+9.0%}{'  REGRESSION' if worse else ''}")
+    missing = sorted(set(baseline["scenarios"]) ^ set(current["scenarios"]))
+    if missing:
+        print(f"\nScenarios in only one file (not compared): {', '.join(missing)}")
+    if baseline.get("meta", {}).get("latency") != current.get("meta", {}).get("latency"):
+        print("\n⚠️ The runs used different backend latencies")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regressions beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Benchmark the orchestrator and write the results as JSON")
+    run.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    run.add_argument("--turns", type=int, default=200, help="Timed turns per scenario")
+    run.add_argument("--agents", nargs="+", help="detected_agent values (default: every agent profile)")
+    run.add_argument("--conversations", nargs="+", choices=["new", "existing"], default=["new", "existing"])
+    run.add_argument("--llm-latency", default="lognormal:350,0.4", help="Gemini latency, e.g. fixed:300, uniform:200,500")
+    run.add_argument("--specialist-latency", default="lognormal:400,0.4", help="Latency of specialist/auxiliary agents")
+    run.add_argument("--redis-latency", default="uniform:0.2,1", help="Latency of each Redis round trip")
+    run.add_argument("--mongo-latency", default="uniform:1,3", help="Latency of each MongoDB operation (blocks the loop)")
+    run.add_argument("--alloc-turns", type=int, default=20, help="Turns for the allocation pass per agent (0 to skip)")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--out", default="orchestrator_bench.json")
+    run.set_defaults(func=cmd_run)
+
+    cmp = commands.add_parser("compare", help="Fail if results.json regressed against baseline.json")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown (0.10 = 10%%)")
+    cmp.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore latency changes smaller than this")
+    cmp.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,446 @@
+"""
+Multi-day soak of the whole stack through the gateway, flagging memory that keeps growing.
+
+    python -m benchmarks.soak fixtures llm_fixtures.jsonl
+    python -m benchmarks.soak run [--users 2000] [--days 3] [--day-seconds 600] [--out soak.jsonl]
+    python -m benchmarks.soak analyze soak.jsonl [--warmup 0.2]
+
+Run the gateway, core and specialists (python run_dev.py) against local Redis
+and MongoDB with Gemini replayed, so nothing leaves the laptop:
+
+    LLM_REPLAY_MODE=replay LLM_FIXTURES=llm_fixtures.jsonl python run_dev.py
+
+`fixtures` writes pattern fixtures for that (common.llm_replay): the intent
+detector answers with each specialist's intent in turn, so synthetic users
+spread over every agent; checklist and checkpoint prompts get well-formed
+answers. Recorded fixtures (LLM_REPLAY_MODE=record) can be appended to the
+same file for more realistic replies.
+
+Every synthetic user keeps one conversation for the whole run and, on each
+simulated day (--day-seconds of wall time), opens a few voice sessions of a
+few turns each through POST /api/v1/voice/voice-message - the path that runs
+intent detection and then the orchestrator and the specialists.
+
+Meanwhile every service's /metrics is sampled: RSS, interpreter blocks, asyncio
+tasks, the size of each in-process cache (cache_entries, cache_owners) and
+the event-loop lag p99 of the interval. Samples are written as JSON lines.
+`analyze` (also run at the end) flags series that keep growing after the
+warm-up - a Mann-Kendall trend that holds into the last half of the run and
+a Theil-Sen growth above --min-growth - and exits with status 1 if any do.
+Bounded caches fill up and plateau, so they are not flagged.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import statistics
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+VOICE_MESSAGE_PATH = "/api/v1/voice/voice-message"
+DEFAULT_METRICS = (
+    "gateway=http://localhost:8000/metrics",
+    "core=http://localhost:8002/metrics",
+    "specialists=http://localhost:8015/metrics",
+)
+# Families sampled from /metrics; histogram buckets of the loop lag are reduced to an interval p99
+SAMPLED_FAMILIES = (
+    "cache_entries", "cache_owners", "process_resident_memory_bytes", "python_allocated_blocks", "asyncio_tasks",
+)
+LOOP_LAG_BUCKET = "event_loop_lag_seconds_bucket"
+LOOP_LAG_SERIES = "loop_lag_p99_ms"
+
+# What users talk about, by the intent the gateway should detect
+THEMES = {
+    "loneliness": [
+        "I have been feeling really lonely lately, nobody calls me anymore",
+        "Most evenings I sit alone and have no one to talk to",
+        "I moved to a new city and I don't have any friends here",
+    ],
+    "emotional": [
+        "My mother died last month and I can't stop thinking about her",
+        "Since the funeral everything feels empty",
+        "I am grieving and some days I can barely get out of bed",
+    ],
+    "accountability": [
+        "I want to quit smoking but I keep relapsing",
+        "I have been sober for two weeks and need help staying on track",
+        "I promised myself to exercise every day and I keep skipping it",
+    ],
+    "mental_therapy": [
+        "My anxiety has been getting worse and I get panic attacks at work",
+        "I think I might be depressed, nothing feels enjoyable",
+        "My therapist suggested I keep talking about how I feel between sessions",
+    ],
+    "social_anxiety": [
+        "I have a job interview on Friday and I am terrified",
+        "I need to give a presentation and public speaking makes me freeze",
+        "I have a first date this weekend and I'm so nervous about it",
+    ],
+}
+FOLLOW_UPS = [
+    "Yesterday was a bit better than the day before",
+    "I tried what you suggested and it helped a little",
+    "Honestly today has been hard again",
+    "I talked to my neighbour for a few minutes",
+    "I didn't sleep well last night",
+    "What else could I try this week?",
+    "Thanks, that makes sense",
+]
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def pattern_fixtures() -> List[Dict]:
+    """Pattern fixtures (common.llm_replay) for an offline soak"""
+    fixtures = []
+    for intent in THEMES:
+        fixtures.append({
+            "match": "determine the user's primary support need",
+            "text": json.dumps({"intent": intent, "confidence": 0.9, "reasoning": "synthetic", "keywords": [intent]}),
+            "chunks": [], "first_chunk_ms": 350, "total_ms": 450,
+        })
+    for verdict, confidence in (("Yes", 85), ("No", 40)):
+        fixtures.append({
+            "match": "Complete: [Yes/No]",
+            "text": f"Complete: {verdict}\nConfidence: {confidence}",
+            "chunks": [], "first_chunk_ms": 300, "total_ms": 350,
+        })
+    fixtures.append({
+        "match": "expected_inputs",
+        "text": json.dumps([
+            {"text": "How have you been feeling this week?", "expected_inputs": ["mood", "sleep"]},
+            {"text": "What would make the next few days easier?", "expected_inputs": ["needs"]},
+            {"text": "Who could you reach out to?", "expected_inputs": ["support system"]},
+        ]),
+        "chunks": [], "first_chunk_ms": 500, "total_ms": 900,
+    })
+    return fixtures
+
+
+def cmd_fixtures(args: argparse.Namespace) -> int:
+    with open(args.path, "a", encoding="utf-8") as f:
+        for fixture in pattern_fixtures():
+            f.write(json.dumps(fixture) + "\n")
+    print(f"Appended {len(pattern_fixtures())} pattern fixtures to {args.path}")
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Load
+# ---------------------------------------------------------------------------
+
+@dataclass
+class LoadStats:
+    turns: int = 0
+    errors: int = 0
+    inflight: int = 0
+    sessions: int = 0
+    latencies_ms: List[float] = field(default_factory=list)
+    agents: Dict[str, int] = field(default_factory=dict)
+
+    def interval(self) -> Dict:
+        """Counters since the last call; the latency list is reset"""
+        latencies, self.latencies_ms = self.latencies_ms, []
+        return {
+            "turns": self.turns, "errors": self.errors, "inflight": self.inflight, "sessions": self.sessions,
+            "p95_ms": round(statistics.quantiles(latencies, n=20)[-1], 1) if len(latencies) >= 2 else None,
+            "agents": dict(self.agents),
+        }
+
+
+@dataclass
+class SyntheticUser:
+    index: int
+    theme: str
+    conversation_id: str
+    user_profile_id: str
+    individual_id: str
+
+
+async def run_session(client: httpx.AsyncClient, user: SyntheticUser, day: int, turns: int,
+                      think: Tuple[float, float], rng: random.Random, gate: asyncio.Semaphore, stats: LoadStats) -> None:
+    session_id = f"soak_{user.index}_{day}_{uuid.uuid4().hex[:8]}"
+    stats.sessions += 1
+    for turn in range(turns):
+        text = rng.choice(THEMES[user.theme]) if turn == 0 else rng.choice(FOLLOW_UPS)
+        async with gate:
+            stats.inflight += 1
+            started = time.perf_counter()
+            try:
+                response = await client.post(VOICE_MESSAGE_PATH, json={
+                    "session_id": session_id, "text": text, "conversation_id": user.conversation_id,
+                    "individual_id": user.individual_id, "user_profile_id": user.user_profile_id,
+                })
+                body = response.json() if response.status_code == 200 else {}
+                if body.get("status") != "success":
+                    stats.errors += 1
+                else:
+                    stats.turns += 1
+                    stats.latencies_ms.append((time.perf_counter() - started) * 1000)
+                    agent = body.get("selected_agent") or ("routed" if body.get("intent_status") == "routed" else None)
+                    if agent:
+                        stats.agents[agent] = stats.agents.get(agent, 0) + 1
+            except (httpx.HTTPError, ValueError):
+                stats.errors += 1
+            finally:
+                stats.inflight -= 1
+        await asyncio.sleep(rng.lognormvariate(math.log(think[0]), think[1]))
+
+
+async def drive(args: argparse.Namespace, stats: LoadStats) -> None:
+    rng = random.Random(args.seed)
+    themes = list(THEMES)
+    users = [
+        SyntheticUser(i, themes[i % len(themes)], f"soak_conv_{i}", f"soak_profile_{i}", f"soak_individual_{i}")
+        for i in range(args.users)
+    ]
+    gate = asyncio.Semaphore(args.max_inflight)
+    limits = httpx.Limits(max_connections=args.max_inflight, max_keepalive_connections=args.max_inflight)
+    async with httpx.AsyncClient(base_url=args.gateway, timeout=args.timeout, limits=limits) as client:
+        for day in range(args.days):
+            day_started = time.monotonic()
+            sessions = []
+            for user in users:
+                for _ in range(rng.randint(1, args.sessions_per_day)):
+                    # Sessions start anywhere in the first 80% of the day so most finish within it
+                    delay = rng.uniform(0, args.day_seconds * 0.8)
+                    turns = rng.randint(max(1, args.turns_per_session // 2), args.turns_per_session)
+                    session_rng = random.Random(rng.random())
+
+                    async def session(user=user, delay=delay, turns=turns, session_rng=session_rng, day=day):
+                        await asyncio.sleep(delay)
+                        await run_session(client, user, day, turns, (args.think_seconds, 0.5), session_rng, gate, stats)
+                    sessions.append(asyncio.create_task(session()))
+            await asyncio.gather(*sessions)
+            await asyncio.sleep(max(0.0, args.day_seconds - (time.monotonic() - day_started)))
+            print(f"day {day + 1}/{args.days}: {stats.turns} turns, {stats.errors} errors", file=sys.stderr)
+
+
+# ---------------------------------------------------------------------------
+# Sampling
+# ---------------------------------------------------------------------------
+
+def parse_metrics(text: str, families: Iterable[str]) -> Dict[str, float]:
+    """Prometheus text lines of the given families as {"name{labels}": value}"""
+    families = tuple(families)
+    series = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#") or not line.startswith(families):
+            continue
+        name, _, value = line.rpartition(" ")
+        try:
+            series[name] = float(value)
+        except ValueError:
+            continue
+    return series
+
+
+def interval_p99_ms(previous: Dict[str, float], current: Dict[str, float]) -> Optional[float]:
+    """Upper bound of the loop-lag p99 between two scrapes, from cumulative bucket counts"""
+    deltas = []
+    for name, count in current.items():
+        le = name.split('le="', 1)[1].rstrip('"}')
+        deltas.append((math.inf if le == "+Inf" else float(le), count - previous.get(name, 0.0)))
+    deltas.sort()
+    total = deltas[-1][1] if deltas else 0
+    if total <= 0:
+        return None
+    for le, count in deltas:
+        if count >= 0.99 * total:
+            return None if math.isinf(le) else round(le * 1000, 1)
+    return None
+
+
+async def sample(targets: Dict[str, str], interval: float, out, stats: LoadStats, stop: asyncio.Event) -> None:
+    started = time.monotonic()
+    lag_buckets: Dict[str, Dict[str, float]] = {}
+    async with httpx.AsyncClient(timeout=10) as client:
+        while not stop.is_set():
+            elapsed = round(time.monotonic() - started, 1)
+            load = stats.interval()
+            for service, url in targets.items():
+                record = {"t": elapsed, "service": service, "load": load}
+                try:
+                    text = (await client.get(url)).text
+                except httpx.HTTPError as e:
+                    record["error"] = str(e)
+                else:
+                    record["series"] = parse_metrics(text, SAMPLED_FAMILIES)
+                    buckets = parse_metrics(text, (LOOP_LAG_BUCKET,))
+                    if service in lag_buckets:
+                        record["series"][LOOP_LAG_SERIES] = interval_p99_ms(lag_buckets[service], buckets)
+                    lag_buckets[service] = buckets
+                out.write(json.dumps(record) + "\n")
+            out.flush()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+# ---------------------------------------------------------------------------
+# Leak detection
+# ---------------------------------------------------------------------------
+
+def kendall_tau(values: List[float]) -> float:
+    """Mann-Kendall trend of a series in [-1, 1]: 1 when every later point is higher"""
+    n = len(values)
+    pairs = n * (n - 1) / 2
+    if not pairs:
+        return 0.0
+    s = sum((values[j] > values[i]) - (values[j] < values[i]) for i in range(n) for j in range(i + 1, n))
+    return s / pairs
+
+
+def theil_sen(times: List[float], values: List[float]) -> Tuple[float, float]:
+    """(slope, intercept) robust to outliers: medians of pairwise slopes and of residual intercepts"""
+    slopes = [
+        (values[j] - values[i]) / (times[j] - times[i])
+        for i in range(len(times)) for j in range(i + 1, len(times)) if times[j] > times[i]
+    ]
+    slope = statistics.median(slopes) if slopes else 0.0
+    return slope, statistics.median(v - slope * t for t, v in zip(times, values))
+
+
+@dataclass
+class Trend:
+    service: str
+    series: str
+    samples: int
+    tau: float
+    tau_late: float
+    first: float
+    last: float
+    growth: float               # fitted relative growth over the analysed window
+    per_hour: float             # fitted absolute growth per hour
+    leaking: bool
+
+
+def analyze(records: Iterable[Dict], warmup: float = 0.2, tau_threshold: float = 0.6,
+            min_growth: float = 0.1, min_samples: int = 8) -> List[Trend]:
+    """Trend of every sampled series after the warm-up; `leaking` when it keeps growing"""
+    points: Dict[Tuple[str, str], List[Tuple[float, float]]] = {}
+    for record in records:
+        for name, value in (record.get("series") or {}).items():
+            if value is not None:
+                points.setdefault((record["service"], name), []).append((record["t"], value))
+
+    trends = []
+    for (service, name), series in sorted(points.items()):
+        series = series[int(len(series) * warmup):]
+        if len(series) < min_samples:
+            continue
+        times, values = [t for t, _ in series], [v for _, v in series]
+        tau = kendall_tau(values)
+        tau_late = kendall_tau(values[len(values) // 2:])
+        slope, intercept = theil_sen(times, values)
+        first_fit, last_fit = intercept + slope * times[0], intercept + slope * times[-1]
+        growth = (last_fit - first_fit) / max(abs(first_fit), 1.0)
+        trends.append(Trend(
+            service, name, len(series), round(tau, 2), round(tau_late, 2), values[0], values[-1],
+            round(growth, 3), round(slope * 3600, 2),
+            leaking=tau >= tau_threshold and tau_late >= tau_threshold / 2 and growth >= min_growth,
+        ))
+    return trends
+
+
+def report(trends: List[Trend]) -> int:
+    print(f"{'service':<12}{'series':<72}{'tau':>6}{'late':>6}{'first':>14}{'last':>14}{'growth':>9}{'/hour':>12}")
+    for trend in sorted(trends, key=lambda t: (not t.leaking, -t.growth)):
+        print(
+            f"{trend.service:<12}{trend.series[:71]:<72}{trend.tau:>6.2f}{trend.tau_late:>6.2f}"
+            f"{trend.first:>14.0f}{trend.last:>14.0f}{trend.growth:>+9.0%}{trend.per_hour:>12.1f}"
+            f"{'  LEAK?' if trend.leaking else ''}"
+        )
+    leaks = [t for t in trends if t.leaking]
+    if leaks:
+        print(f"\n❌ {len(leaks)} series kept growing after the warm-up")
+        return 1
+    print(f"\n✅ No monotonic growth in {len(trends)} series")
+    return 0
+
+
+def load_records(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def cmd_analyze(args: argparse.Namespace) -> int:
+    trends = analyze(load_records(args.samples), args.warmup, args.tau, args.min_growth)
+    return report(trends)
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    targets = dict(target.split("=", 1) for target in args.metrics)
+    stats = LoadStats()
+
+    async def main() -> None:
+        stop = asyncio.Event()
+        with open(args.out, "w", encoding="utf-8") as out:
+            sampler = asyncio.create_task(sample(targets, args.sample_interval, out, stats, stop))
+            try:
+                await drive(args, stats)
+                # One more day of idle sampling: caches with a TTL should shrink back
+                await asyncio.sleep(args.cooldown_seconds)
+            finally:
+                stop.set()
+                await sampler
+
+    asyncio.run(main())
+    print(f"{stats.turns} turns, {stats.errors} errors, agents reached: {stats.agents}", file=sys.stderr)
+    missing = sorted(set(THEMES) - set(stats.agents))
+    if missing:
+        print(f"⚠️ Never routed to: {', '.join(missing)}", file=sys.stderr)
+    return report(analyze(load_records(args.out), args.warmup, args.tau, args.min_growth))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fixtures = commands.add_parser("fixtures", help="Append pattern fixtures for an offline (replayed) soak")
+    fixtures.add_argument("path", help="LLM_FIXTURES file of the services")
+    fixtures.set_defaults(func=cmd_fixtures)
+
+    run = commands.add_parser("run", help="Drive synthetic users through the gateway and sample /metrics")
+    run.add_argument("--gateway", default="http://localhost:8000")
+    run.add_argument("--metrics", nargs="+", default=list(DEFAULT_METRICS), help="service=url of each /metrics")
+    run.add_argument("--users", type=int, default=2000)
+    run.add_argument("--days", type=int, default=3)
+    run.add_argument("--day-seconds", type=float, default=600, help="Wall-clock length of a simulated day")
+    run.add_argument("--sessions-per-day", type=int, default=2, help="Up to this many sessions per user per day")
+    run.add_argument("--turns-per-session", type=int, default=6)
+    run.add_argument("--think-seconds", type=float, default=4.0, help="Median pause between a user's turns")
+    run.add_argument("--max-inflight", type=int, default=64, help="Concurrent requests to the gateway")
+    run.add_argument("--timeout", type=float, default=30.0)
+    run.add_argument("--sample-interval", type=float, default=15.0)
+    run.add_argument("--cooldown-seconds", type=float, default=60.0, help="Idle sampling after the last day")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--out", default="soak.jsonl")
+
+    analysis = commands.add_parser("analyze", help="Flag series that kept growing in a samples file")
+    analysis.add_argument("samples")
+    analysis.set_defaults(func=cmd_analyze)
+
+    for command in (run, analysis):
+        command.add_argument("--warmup", type=float, default=0.2, help="Fraction of samples ignored at the start")
+        command.add_argument("--tau", type=float, default=0.6, help="Mann-Kendall trend that counts as monotonic")
+        command.add_argument("--min-growth", type=float, default=0.1, help="Relative growth that counts as a leak")
+    run.set_defaults(func=cmd_run)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Per-turn task-stack operations on long stacks: list scans vs TaskStack.
+
+    python -m benchmarks.task_stack_bench [--sizes 100 1000 5000] [--rounds 50]
+
+Each task has a few checkpoints. The main task (at the bottom) is pending and
+every task pushed on top of it is finished, as in a long-running
+accountability conversation. "save diff" is the task part of
+computing a change set after one checkpoint completes.
+"""
+
+import argparse
+import copy
+import statistics
+import time
+
+from core.memory.change_set import StateSnapshot, diff_state
+from core.orchestrator.task_stack import TaskStack
+
+CHECKPOINTS_PER_TASK = 4
+
+
+def build_tasks(count: int) -> list:
+    tasks = []
+    for t in range(count):
+        done = t > 0
+        tasks.append({
+            "task_id": f"task_{t}", "label": "Main", "source": "Main",
+            "current_checkpoint_index": CHECKPOINTS_PER_TASK if done else 0,
+            "is_active": not done,
+            "checklist": [
+                {
+                    "id": f"cp_{t}_{i}", "name": f"Checkpoint {t}.{i}", "label": f"Step {i + 1}", "type": "Main",
+                    "status": "complete" if done else ("in_progress" if i == 0 else "pending"),
+                    "expected_inputs": ["goal", "progress"], "collected_inputs": ["done"] if done else [],
+                    "start_time": None, "end_time": None,
+                }
+                for i in range(CHECKPOINTS_PER_TASK)
+            ],
+        })
+    return tasks
+
+
+# Scans as ConversationState did them on a plain list
+def scan_current(tasks):
+    for task in reversed(tasks):
+        checklist = task.get("checklist", [])
+        index = task.get("current_checkpoint_index", 0)
+        if task.get("is_active") and checklist and index < len(checklist) and checklist[index].get("status") != "complete":
+            return task
+    return None
+
+
+def scan_get(tasks, task_id):
+    for task in tasks:
+        if task.get("task_id") == task_id:
+            return task
+    return None
+
+
+def scan_find_checkpoint(tasks, name):
+    for task in tasks:
+        for i, cp in enumerate(task.get("checklist") or []):
+            if cp["name"] == name:
+                return task, i
+    return None
+
+
+def measure(fn, rounds: int) -> float:
+    """Median time per call in microseconds"""
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(samples)
+
+
+def run(size: int, rounds: int) -> list:
+    tasks = build_tasks(size)
+    stack = TaskStack(tasks)
+    last = f"task_{size - 1}"
+    name = f"Checkpoint {size - 1}.0"           # a finished task's checkpoint
+    current = "Checkpoint 0.0"                  # the main task's current checkpoint
+
+    state = {"conversation_id": "bench", "task_stack": tasks}
+    snapshot = StateSnapshot.capture(state)
+    turned = copy.deepcopy(state)
+    turned_stack = TaskStack(turned["task_stack"])
+    turned_stack.complete_checkpoint(current, "answer", now="now")
+
+    return [
+        ("current task", measure(lambda: scan_current(tasks), rounds), measure(stack.current, rounds)),
+        ("get by id", measure(lambda: scan_get(tasks, last), rounds), measure(lambda: stack.get(last), rounds)),
+        ("find checkpoint", measure(lambda: scan_find_checkpoint(tasks, name), rounds),
+         measure(lambda: stack.find_checkpoint(name), rounds)),
+        ("save diff", measure(lambda: diff_state("bench", snapshot, turned, 1), rounds),
+         measure(lambda: diff_state("bench", snapshot, turned, 1, changed_tasks=turned_stack.changed_ids()), rounds)),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'tasks':>6}  {'operation':<16}{'list us':>12}{'TaskStack us':>14}{'speedup':>9}")
+    for size in args.sizes:
+        for operation, scan_us, stack_us in run(size, args.rounds):
+            print(f"{size:>6}  {operation:<16}{scan_us:>12.1f}{stack_us:>14.1f}{scan_us / max(stack_us, 1e-3):>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
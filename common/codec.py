@@ -0,0 +1,299 @@
+# common/codec.py
+"""
+Schema-versioned binary codec for cached and persisted state.
+
+Every value is written as a frame:
+
+    MAGIC (b"\\xc1N") | codec version (1 byte) | format (1 byte) | payload
+
+The payload is msgpack when the package is installed, otherwise JSON
+(orjson when available). Types JSON has no room for travel as explicit
+extensions, so they decode to the same type they were encoded from:
+
+    datetime, date        msgpack ext 1 / 2      {"$dt": iso} / {"$date": iso}
+    bson ObjectId         msgpack ext 3          {"$oid": hex}
+    registered Enum       msgpack ext 4          its value (JSON encoders
+                                                 write str/int enums natively)
+    registered type       msgpack ext 5          {"$type": [name, data]}
+
+Pydantic models are registered by name (Task, Checkpoint and AgentResult
+out of the box) and encode through model_dump, so nested models and
+datetimes keep their types without reflection at decode time.
+
+decode() also reads what was written before this codec existed - pickled
+values (CacheManager) and plain JSON (RedisMemory, the specialist caches) -
+so keys can be migrated by simply letting them expire.
+"""
+
+import json
+import pickle
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+try:
+    import msgpack
+except ImportError:  # JSON frames only
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # stdlib json
+    orjson = None
+
+try:
+    from bson import ObjectId
+except ImportError:
+    ObjectId = None
+
+MAGIC = b"\xc1N"          # 0xc1 is never emitted by msgpack, and starts neither JSON nor pickle
+CODEC_VERSION = 1
+FORMAT_MSGPACK = ord("m")
+FORMAT_JSON = ord("j")
+_HEADER_SIZE = len(MAGIC) + 2
+
+EXT_DATETIME = 1
+EXT_DATE = 2
+EXT_OBJECT_ID = 3
+EXT_ENUM = 4
+EXT_TYPE = 5
+
+
+class CodecError(ValueError):
+    """Raised for frames this codec cannot read"""
+
+
+@dataclass
+class CodecStats:
+    """Reads by format, to follow a rollout"""
+    encoded: int = 0
+    decoded: int = 0
+    legacy_pickle: int = 0
+    legacy_json: int = 0
+
+
+_stats = CodecStats()
+
+# name -> (type, to_data, from_data)
+_types: Dict[str, Tuple[type, Callable[[Any], Any], Callable[[Any], Any]]] = {}
+_type_names: Dict[type, str] = {}
+_enums: Dict[str, Type[Enum]] = {}
+
+
+def register_type(
+    cls: type,
+    name: Optional[str] = None,
+    to_data: Optional[Callable[[Any], Any]] = None,
+    from_data: Optional[Callable[[Any], Any]] = None,
+) -> type:
+    """
+    Let `cls` round-trip through the codec. Enums encode by value; pydantic
+    models default to model_dump / model_validate; anything else needs both
+    converters.
+    """
+    name = name or cls.__name__
+    if issubclass(cls, Enum):
+        _enums[name] = cls
+    else:
+        if to_data is None and hasattr(cls, "model_dump"):
+            to_data = lambda obj: obj.model_dump()
+            from_data = from_data or cls.model_validate
+        if to_data is None or from_data is None:
+            raise TypeError(f"{cls.__name__} needs to_data and from_data converters")
+        _types[name] = (cls, to_data, from_data)
+    _type_names[cls] = name
+    return cls
+
+
+def _registered_name(obj: Any) -> Optional[str]:
+    for cls in type(obj).__mro__:
+        name = _type_names.get(cls)
+        if name is not None:
+            return name
+    return None
+
+
+# ---------------------------------------------------------------------------
+# msgpack
+# ---------------------------------------------------------------------------
+def _msgpack_default(obj: Any):
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(EXT_DATETIME, obj.isoformat().encode())
+    if isinstance(obj, date):
+        return msgpack.ExtType(EXT_DATE, obj.isoformat().encode())
+    if ObjectId is not None and isinstance(obj, ObjectId):
+        return msgpack.ExtType(EXT_OBJECT_ID, obj.binary)
+    name = _registered_name(obj)
+    if isinstance(obj, Enum):
+        if name is None:
+            return obj.value
+        return msgpack.ExtType(EXT_ENUM, _pack([name, obj.value]))
+    if name is not None:
+        return msgpack.ExtType(EXT_TYPE, _pack([name, _types[name][1](obj)]))
+    # strict_types sends subclasses of builtins here (defaultdict, str enums, ...)
+    if isinstance(obj, dict):
+        return dict(obj)
+    if isinstance(obj, (list, set, frozenset, tuple)):
+        return list(obj)
+    for base in (str, bytes, bool, int, float):
+        if isinstance(obj, base):
+            return base(obj)
+    raise TypeError(f"Cannot encode {type(obj).__name__}")
+
+
+def _msgpack_ext_hook(code: int, data: bytes):
+    if code == EXT_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    if code == EXT_DATE:
+        return date.fromisoformat(data.decode())
+    if code == EXT_OBJECT_ID:
+        return ObjectId(data) if ObjectId is not None else data.hex()
+    if code == EXT_ENUM:
+        name, value = _unpack(data)
+        cls = _enums.get(name)
+        return cls(value) if cls is not None else value
+    if code == EXT_TYPE:
+        name, value = _unpack(data)
+        entry = _types.get(name)
+        return entry[2](value) if entry is not None else value
+    return msgpack.ExtType(code, data)
+
+
+def _pack(value: Any) -> bytes:
+    return msgpack.packb(value, default=_msgpack_default, use_bin_type=True, datetime=False, strict_types=True)
+
+
+def _unpack(payload: bytes) -> Any:
+    return msgpack.unpackb(payload, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+
+
+# ---------------------------------------------------------------------------
+# JSON
+# ---------------------------------------------------------------------------
+def _json_default(obj: Any):
+    if isinstance(obj, datetime):
+        return {"$dt": obj.isoformat()}
+    if isinstance(obj, date):
+        return {"$date": obj.isoformat()}
+    if ObjectId is not None and isinstance(obj, ObjectId):
+        return {"$oid": str(obj)}
+    name = _registered_name(obj)
+    if isinstance(obj, Enum):
+        return {"$enum": [name, obj.value]} if name is not None else obj.value
+    if name is not None:
+        return {"$type": [name, _types[name][1](obj)]}
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Cannot encode {type(obj).__name__}")
+
+
+def _json_object_hook(obj: Dict[str, Any]) -> Any:
+    if len(obj) != 1:
+        return obj
+    (tag, value), = obj.items()
+    if tag == "$dt":
+        return datetime.fromisoformat(value)
+    if tag == "$date":
+        return date.fromisoformat(value)
+    if tag == "$oid":
+        return ObjectId(value) if ObjectId is not None else value
+    if tag == "$enum":
+        cls = _enums.get(value[0])
+        return cls(value[1]) if cls is not None else value[1]
+    if tag == "$type":
+        entry = _types.get(value[0])
+        return entry[2](value[1]) if entry is not None else value[1]
+    return obj
+
+
+def _restore(value: Any) -> Any:
+    """Apply the JSON object hook bottom-up (orjson has no hook of its own)"""
+    if isinstance(value, dict):
+        return _json_object_hook({k: _restore(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_restore(v) for v in value]
+    return value
+
+
+def _json_dumps(value: Any) -> bytes:
+    if orjson is not None:
+        # Pass datetimes through to the default hook so they keep their type on decode
+        return orjson.dumps(
+            value, default=_json_default, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(value, default=_json_default, separators=(",", ":")).encode()
+
+
+def _json_loads(payload: bytes) -> Any:
+    if orjson is not None:
+        return _restore(orjson.loads(payload))
+    return json.loads(payload, object_hook=_json_object_hook)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+def encode(value: Any, fmt: Optional[str] = None) -> bytes:
+    """Encode a value as a versioned frame; `fmt` forces "msgpack" or "json" """
+    use_msgpack = msgpack is not None if fmt is None else fmt == "msgpack"
+    if use_msgpack:
+        if msgpack is None:
+            raise CodecError("msgpack is not installed")
+        header, payload = FORMAT_MSGPACK, _pack(value)
+    else:
+        header, payload = FORMAT_JSON, _json_dumps(value)
+    _stats.encoded += 1
+    return MAGIC + bytes((CODEC_VERSION, header)) + payload
+
+
+def decode(data: Any, allow_pickle: bool = False) -> Any:
+    """
+    Decode a frame, or a value written before the codec: plain JSON, and
+    pickle when `allow_pickle` is set (only for keys this service wrote itself).
+    """
+    if isinstance(data, str):
+        data = data.encode()
+    if data[:len(MAGIC)] != MAGIC:
+        return _decode_legacy(data, allow_pickle)
+
+    if len(data) < _HEADER_SIZE:
+        raise CodecError("Truncated frame")
+    version, fmt = data[len(MAGIC)], data[len(MAGIC) + 1]
+    if version > CODEC_VERSION:
+        raise CodecError(f"Frame written by codec version {version}, this is version {CODEC_VERSION}")
+    payload = data[_HEADER_SIZE:]
+    _stats.decoded += 1
+    if fmt == FORMAT_MSGPACK:
+        if msgpack is None:
+            raise CodecError("Frame is msgpack but msgpack is not installed")
+        return _unpack(payload)
+    if fmt == FORMAT_JSON:
+        return _json_loads(payload)
+    raise CodecError(f"Unknown frame format {fmt!r}")
+
+
+def _decode_legacy(data: bytes, allow_pickle: bool) -> Any:
+    if data[:1] == b"\x80":
+        if not allow_pickle:
+            raise CodecError("Refusing to unpickle a value from an untrusted key")
+        _stats.legacy_pickle += 1
+        return pickle.loads(data)
+    _stats.legacy_json += 1
+    return json.loads(data)
+
+
+def get_codec_stats() -> Dict[str, Any]:
+    data = asdict(_stats)
+    data["format"] = "msgpack" if msgpack is not None else ("orjson" if orjson is not None else "json")
+    data["version"] = CODEC_VERSION
+    return data
+
+
+def _register_models() -> None:
+    from .models import AgentResult, Checkpoint, Task
+    for model in (Task, Checkpoint, AgentResult):
+        register_type(model)
+
+
+_register_models()
@@ -40,6 +40,51 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = "development"
     GEMINI_API_KEY: str
 
+    # Gemini client: concurrent in-flight requests per process and per-call timeout (seconds)
+    GEMINI_MAX_CONCURRENCY: int = 32
+    GEMINI_TIMEOUT: float = 8.0
+
+    # LLM gateway: process-wide request quota shared by every Gemini caller
+    LLM_REQUESTS_PER_MINUTE: int = 1000
+    LLM_BURST: int = 20
+
+    # LLM response cache: shared Redis level (defaults to REDIS_URL) plus per-process near-cache
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_REDIS_URL: Optional[str] = None
+    LLM_CACHE_NEAR_SIZE: int = 2048
+
+    # Context handles: context windows the orchestrator publishes for specialists to
+    # resolve (defaults to REDIS_URL), kept for CONTEXT_STORE_TTL seconds
+    CONTEXT_STORE_REDIS_URL: Optional[str] = None
+    CONTEXT_STORE_TTL: int = 600
+    CONTEXT_STORE_LOCAL_BYTES: int = 16 * 1024 * 1024
+
+    # Request deadlines: end-to-end budget (ms) of a turn that arrives without an
+    # X-Deadline-Ms header, by channel
+    DEADLINE_VOICE_MS: int = 4000
+    DEADLINE_CHAT_MS: int = 15000
+
+    # Metrics: how often (seconds) each service samples its event-loop lag; 0 disables
+    METRICS_LOOP_LAG_INTERVAL: float = 0.5
+
+    # Tracing: where finished spans go ("none", "file" for OTLP-JSON lines in
+    # TRACING_FILE, "memory" for tests) and the fraction of new traces recorded
+    TRACING_EXPORTER: str = "none"
+    TRACING_FILE: str = "traces.jsonl"
+    TRACING_SAMPLE_RATE: float = 1.0
+
+    # LLM record/replay for offline load tests: "off", "record" (call Gemini and append
+    # each response with its chunk timing to LLM_FIXTURES) or "replay" (serve them, no Gemini)
+    LLM_REPLAY_MODE: str = "off"
+    LLM_FIXTURES: str = "llm_fixtures.jsonl"
+    # Replay: delay multiplier, fraction of calls failing with a 429 or hanging for
+    # LLM_REPLAY_TIMEOUT_S then failing with a deadline error, and the seed of those draws
+    LLM_REPLAY_SPEED: float = 1.0
+    LLM_REPLAY_429_RATE: float = 0.0
+    LLM_REPLAY_TIMEOUT_RATE: float = 0.0
+    LLM_REPLAY_TIMEOUT_S: float = 30.0
+    LLM_REPLAY_SEED: int = 0
+
     class Config:
         # env_file = ".env"
         case_sensitive = True
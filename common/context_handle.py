@@ -0,0 +1,199 @@
+# common/context_handle.py
+"""
+Conversation context passed to specialists by reference.
+
+Instead of embedding the context window in every specialist request (as a
+stringified list), the orchestrator publishes the window once per state
+version to a shared Redis store and sends a small typed ContextHandle:
+
+    {"conversation_id": "...", "state_version": 12, "digest": "9f2c...", "messages": 16}
+
+The specialist resolves the handle to the message list it would have been
+sent. A published slice never changes - the key includes the state version
+and a digest of the content - so both sides keep a byte-bounded local copy
+(common.tiered_cache.LocalTier) that needs no invalidation, and a
+speculative re-issue or retry of the same turn costs no Redis round trip.
+
+Like the other Redis helpers in common, the store fails open: publish()
+returns None when the slice could not be stored and the orchestrator then
+sends the context inline; resolve() returns None when the slice is gone and
+the specialist falls back to whatever inline context the request carried.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from common.codec import decode, encode
+from common.metrics import cache_samples, get_registry
+from common.tiered_cache import LocalTier
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ctx:v1"
+DEFAULT_TTL = 600
+DEFAULT_LOCAL_BYTES = 16 * 1024 * 1024
+REDIS_OP_TIMEOUT = 0.05
+REDIS_RETRY_AFTER = 30.0
+_NAMESPACE = "context_slices"
+
+
+class ContextHandle(BaseModel):
+    """Reference to a conversation's context window at one state version"""
+    conversation_id: str
+    state_version: int = 0
+    digest: str                      # content hash of the published window
+    messages: int = 0                # number of messages in the window
+
+    @property
+    def key(self) -> str:
+        return f"{KEY_PREFIX}:{self.conversation_id}:{self.state_version}:{self.digest}"
+
+
+@dataclass
+class ContextStoreStats:
+    """Counters for both sides of the protocol"""
+    published: int = 0
+    publish_skipped: int = 0         # already published by this process
+    publish_failures: int = 0
+    resolved_local: int = 0
+    resolved_redis: int = 0
+    resolve_misses: int = 0
+    redis_errors: int = 0
+
+
+class ContextStore:
+    """Versioned, content-addressed store of context windows"""
+
+    def __init__(self, redis_url: Optional[str] = None, ttl: int = DEFAULT_TTL, local_bytes: int = DEFAULT_LOCAL_BYTES):
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.local = LocalTier(default_quota=local_bytes)
+        self.stats = ContextStoreStats()
+
+        self._redis = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis_down_until = 0.0
+
+    def _get_redis(self):
+        """Redis client for the running loop, or None while Redis is unavailable"""
+        if not self.redis_url or time.monotonic() < self._redis_down_until:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._loop is not loop:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                logger.warning("⚠️ redis package not installed, context handles are disabled")
+                self.redis_url = None
+                return None
+            self._loop = loop
+            self._redis = redis.Redis.from_url(
+                self.redis_url,
+                socket_connect_timeout=REDIS_OP_TIMEOUT * 4,
+                socket_timeout=REDIS_OP_TIMEOUT * 4,
+            )
+        return self._redis
+
+    def _redis_failed(self, op: str, e: Exception) -> None:
+        self.stats.redis_errors += 1
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+        logger.warning(f"⚠️ Context store Redis {op} failed, sending context inline for {REDIS_RETRY_AFTER:.0f}s: {e}")
+
+    async def publish(self, conversation_id: str, state_version: int, messages: List[Dict[str, Any]]) -> Optional[ContextHandle]:
+        """Store a context window and return its handle, or None if it has to be sent inline"""
+        payload = encode(messages)
+        handle = ContextHandle(
+            conversation_id=conversation_id,
+            state_version=state_version or 0,
+            digest=hashlib.blake2b(payload, digest_size=8).hexdigest(),
+            messages=len(messages),
+        )
+        if self.local.get(handle.key, _NAMESPACE) is not None:
+            self.stats.publish_skipped += 1
+            return handle
+
+        client = self._get_redis()
+        if client is None:
+            self.stats.publish_failures += 1
+            return None
+        try:
+            await asyncio.wait_for(client.set(handle.key, payload, ex=self.ttl), REDIS_OP_TIMEOUT)
+        except Exception as e:
+            self._redis_failed("set", e)
+            self.stats.publish_failures += 1
+            return None
+
+        self.local.set(handle.key, messages, len(payload), _NAMESPACE, ttl=self.ttl)
+        self.stats.published += 1
+        return handle
+
+    async def resolve(self, handle: ContextHandle) -> Optional[List[Dict[str, Any]]]:
+        """The messages a handle refers to, or None when the slice is no longer available"""
+        messages = self.local.get(handle.key, _NAMESPACE)
+        if messages is not None:
+            self.stats.resolved_local += 1
+            return messages
+
+        client = self._get_redis()
+        payload = None
+        if client is not None:
+            try:
+                payload = await asyncio.wait_for(client.get(handle.key), REDIS_OP_TIMEOUT)
+            except Exception as e:
+                self._redis_failed("get", e)
+        if payload is None:
+            self.stats.resolve_misses += 1
+            return None
+
+        messages = decode(payload)
+        self.local.set(handle.key, messages, len(payload), _NAMESPACE, ttl=self.ttl)
+        self.stats.resolved_redis += 1
+        return messages
+
+    def get_stats(self) -> Dict[str, Any]:
+        data = asdict(self.stats)
+        data["redis"] = bool(self.redis_url) and time.monotonic() >= self._redis_down_until
+        data["local"] = self.local.get_stats().get(_NAMESPACE, {})
+        return data
+
+
+_store: Optional[ContextStore] = None
+
+
+def _load_store_settings() -> Tuple[Optional[str], int, int]:
+    """Read store settings from common settings, falling back to env/defaults when GEMINI_API_KEY is absent"""
+    try:
+        from common.config import get_settings
+        settings = get_settings()
+        return (
+            settings.CONTEXT_STORE_REDIS_URL or os.getenv("REDIS_URL"),
+            settings.CONTEXT_STORE_TTL,
+            settings.CONTEXT_STORE_LOCAL_BYTES,
+        )
+    except Exception:
+        return (
+            os.getenv("CONTEXT_STORE_REDIS_URL") or os.getenv("REDIS_URL"),
+            int(os.getenv("CONTEXT_STORE_TTL", DEFAULT_TTL)),
+            int(os.getenv("CONTEXT_STORE_LOCAL_BYTES", DEFAULT_LOCAL_BYTES)),
+        )
+
+
+def get_context_store() -> ContextStore:
+    """Get the process-wide context store - SINGLETON"""
+    global _store
+    if _store is None:
+        redis_url, ttl, local_bytes = _load_store_settings()
+        _store = ContextStore(redis_url=redis_url, ttl=ttl, local_bytes=local_bytes)
+        get_registry().register_collector("context_store", lambda: cache_samples(
+            "context_store", {_NAMESPACE: asdict(_store.stats)},
+            {"resolved_local": "local_hit", "resolved_redis": "redis_hit", "resolve_misses": "miss"}
+        ))
+        logger.info(f"Context store initialized: redis={'yes' if redis_url else 'no'}, ttl {ttl}s")
+    return _store
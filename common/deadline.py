@@ -0,0 +1,166 @@
+# common/deadline.py
+"""
+End-to-end request deadlines.
+
+The gateway gives each turn a budget for its channel (a voice turn gets far
+less than a chat turn) and every hop passes on what is left of it in the
+X-Deadline-Ms header, as milliseconds remaining - relative, so the services'
+clocks need not agree. The receiving service adopts the header as an absolute
+monotonic deadline for the request's task; from there each stage asks how
+much budget is left:
+
+    timeout = timeout_for(CHECKPOINT_TIMEOUT)   # min(own timeout, remaining)
+    check_deadline("specialist")                # raise once the deadline passed
+
+and either sizes its own timeout with it or, when too little is left, takes a
+degraded fast path instead of starting work that cannot finish in time.
+
+The deadline lives in a ContextVar, so tasks created while serving the request
+inherit it. Work that outlives the request (persistence, background LLM calls)
+must run under without_deadline().
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Dict, Iterator, Optional, Tuple, TypeVar
+
+from common.llm_gateway import VOICE_CHANNELS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEADLINE_HEADER = "X-Deadline-Ms"
+
+DEFAULT_VOICE_BUDGET_MS = 4000
+DEFAULT_CHAT_BUDGET_MS = 15000
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)   # time.monotonic() value
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline passed before a stage could start"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        super().__init__(f"Deadline exceeded before {stage}")
+
+
+def _load_budgets() -> Tuple[int, int]:
+    """Read channel budgets from common settings, falling back to env/defaults when GEMINI_API_KEY is absent"""
+    try:
+        from common.config import get_settings
+        settings = get_settings()
+        return settings.DEADLINE_VOICE_MS, settings.DEADLINE_CHAT_MS
+    except Exception:
+        return (
+            int(os.getenv("DEADLINE_VOICE_MS", DEFAULT_VOICE_BUDGET_MS)),
+            int(os.getenv("DEADLINE_CHAT_MS", DEFAULT_CHAT_BUDGET_MS)),
+        )
+
+
+_budgets: Optional[Tuple[int, int]] = None
+
+
+def budget_for_channel(channel: Optional[str]) -> int:
+    """Milliseconds a turn on this channel may take end to end"""
+    global _budgets
+    if _budgets is None:
+        _budgets = _load_budgets()
+    voice, chat = _budgets
+    return voice if channel and channel.lower() in VOICE_CHANNELS else chat
+
+
+def parse_deadline(value: Optional[str]) -> Optional[float]:
+    """Remaining milliseconds from a header value; None when missing or malformed"""
+    if not value:
+        return None
+    try:
+        remaining_ms = float(value)
+    except ValueError:
+        logger.warning(f"⚠️ Ignoring malformed {DEADLINE_HEADER} header: {value!r}")
+        return None
+    return max(remaining_ms, 0.0)
+
+
+def set_deadline(remaining_ms: Optional[float]):
+    """Set the deadline of the current task; returns a token for ContextVar.reset"""
+    deadline = None if remaining_ms is None else time.monotonic() + remaining_ms / 1000
+    return _deadline.set(deadline)
+
+
+def adopt_deadline(header_value: Optional[str], channel: Optional[str] = None):
+    """
+    Set the current task's deadline from an incoming X-Deadline-Ms header, or
+    from the channel's budget when the caller sent none. An upstream deadline
+    is never extended: the header wins over the channel budget.
+    """
+    remaining_ms = parse_deadline(header_value)
+    if remaining_ms is None:
+        if current_deadline() is not None:
+            return None
+        remaining_ms = budget_for_channel(channel)
+    return set_deadline(remaining_ms)
+
+
+@contextmanager
+def use_deadline(remaining_ms: Optional[float]) -> Iterator[None]:
+    """Run a block under a deadline `remaining_ms` from now (None: no deadline)"""
+    token = set_deadline(remaining_ms)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline (0 once passed), or None without a deadline"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check_deadline(stage: str) -> None:
+    """Raise DeadlineExceeded if the deadline has passed"""
+    if expired():
+        raise DeadlineExceeded(stage)
+
+
+def timeout_for(default: Optional[float], reserve: float = 0.0) -> Optional[float]:
+    """
+    Timeout (seconds) for a stage whose own timeout is `default`: the smaller of
+    that and the remaining budget less `reserve` (time later stages need).
+    Never negative; 0 means there is no budget left for the stage.
+    """
+    left = remaining()
+    if left is None:
+        return default
+    left = max(left - reserve, 0.0)
+    return left if default is None else min(default, left)
+
+
+def deadline_headers() -> Dict[str, str]:
+    """Headers passing the remaining budget to the next hop ({} without a deadline)"""
+    left = remaining()
+    if left is None:
+        return {}
+    return {DEADLINE_HEADER: str(int(left * 1000))}
+
+
+async def without_deadline(awaitable: Awaitable[T]) -> T:
+    """Work that outlives the request, free of its deadline; start it as its own task"""
+    _deadline.set(None)
+    return await awaitable
@@ -1,24 +1,54 @@
-
-
 # common/gemini_client.py
 import google.generativeai as genai
+import google.ai.generativelanguage as glm
+from google.generativeai.types import generation_types
 import asyncio
-from typing import Any
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional
 import logging
-from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from common.config import get_settings
+from common.deadline import DeadlineExceeded, timeout_for
+from common.llm_gateway import LLMPriority, get_llm_gateway
+from common.llm_cache import CachedResponse, get_llm_cache, make_cache_key
 
 logger = logging.getLogger(__name__)
 
-# Smaller thread pool for better resource management
-_EXECUTOR = ThreadPoolExecutor(max_workers=3, thread_name_prefix="gemini")
 _API_CONFIGURED = False
 
+DEFAULT_SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+]
+
+
+@dataclass
+class GeminiClientStats:
+    """Client-level counters; queue wait and latency live in the LLM gateway"""
+    requests: int = 0
+    errors: int = 0
+    timeouts: int = 0
+
+
 class AsyncGeminiClient:
-    """Optimized asynchronous client for Google's Gemini API"""
+    """
+    Asynchronous client for Google's Gemini API.
 
-    def __init__(self, api_key: str, model_name: str = "models/gemini-2.5-flash-lite"):
+    Calls go through the SDK's native grpc.aio transport, so requests are
+    multiplexed over one pooled HTTP/2 channel instead of occupying a thread
+    each. Admission (concurrency, rate limit, priority, 429 backoff) is handled
+    by the process-wide LLM gateway.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "models/gemini-2.5-flash-lite",
+        timeout: float = 8.0,
+        caller: str = "core",
+    ):
         if not api_key:
             raise ValueError("API key cannot be empty")
 
@@ -27,6 +57,10 @@ class AsyncGeminiClient:
             genai.configure(api_key=api_key)
             _API_CONFIGURED = True
 
+        self._api_key = api_key
+        self.timeout = timeout
+        self.caller = caller
+
         # Configure model with optimized settings
         generation_config = genai.types.GenerationConfig(
             temperature=0.3,  # Lower temperature for more consistent responses
@@ -40,47 +74,128 @@ class AsyncGeminiClient:
             model_name=model_name,
             generation_config=generation_config
         )
+        # Part of the response cache key, next to the per-call overrides
+        self._generation_config = generation_types.to_generation_config_dict(generation_config)
+
+        self.stats = GeminiClientStats()
+        # grpc.aio channels are bound to the loop that created them
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind_to_running_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            if not hasattr(self.model, "_async_client"):
+                # The SDK has no public hook for the async transport; the pin in the
+                # requirements keeps this attribute, anything else uses the SDK's own client
+                logger.warning("⚠️ GenerativeModel has no _async_client, using the SDK's default async client")
+                return
+            # One HTTP/2 channel per loop, shared by every request from this client
+            self.model._async_client = glm.GenerativeServiceAsyncClient(
+                transport="grpc_asyncio",
+                client_options={"api_key": self._api_key},
+            )
 
-    async def generate_content(self, prompt: str, **kwargs) -> Any:
+    async def _generate(
+        self,
+        prompt: str,
+        caller: str,
+        priority: Optional[LLMPriority],
+        cache_key: str,
+        cache_ttl: Optional[int],
+        **kwargs
+    ) -> Any:
+        self._bind_to_running_loop()
+        kwargs.setdefault("safety_settings", DEFAULT_SAFETY_SETTINGS)
+
+        async with get_llm_gateway().request(caller, priority, max_wait=timeout_for(self.timeout)) as call:
+            response = await self.model.generate_content_async(prompt, **kwargs)
+            call.record_response(prompt, response)
+
+        if cache_ttl:
+            try:
+                text = response.text
+            except ValueError:
+                # Blocked or empty candidates have no text; never cache those
+                text = None
+            if text:
+                await get_llm_cache().set(caller, cache_key, text, cache_ttl)
+        return response
+
+    async def generate_content(
+        self,
+        prompt: str,
+        caller: Optional[str] = None,
+        priority: Optional[LLMPriority] = None,
+        cache_ttl: Optional[int] = None,
+        **kwargs
+    ) -> Any:
         """
-        Async wrapper with timeout and optimized settings
+        Generate content without blocking the event loop.
+
+        The timeout covers queue wait plus the model call, as before, and is
+        shortened to what is left of the request's deadline; once the deadline
+        has passed DeadlineExceeded (a TimeoutError) is raised without calling
+        the model. caller and priority are optional and only affect gateway
+        accounting/ordering; the priority defaults to that of the current
+        request.
+
+        Identical concurrent calls (same caller, model, config and prompt) are
+        coalesced into one API request. Passing cache_ttl (seconds) also opts
+        the call into the exact-match response cache, namespaced by caller.
+        Only use it for deterministic prompts; a hit returns a CachedResponse
+        exposing just .text.
         """
+        caller = caller or self.caller
+        cache_key = make_cache_key(
+            self.model.model_name,
+            {
+                **self._generation_config,
+                **generation_types.to_generation_config_dict(kwargs.get("generation_config") or {}),
+            },
+            prompt,
+        )
+        if cache_ttl:
+            cached = await get_llm_cache().get(caller, cache_key, cache_ttl)
+            if cached is not None:
+                return CachedResponse(cached)
+
+        timeout = timeout_for(self.timeout)
+        if timeout <= 0:
+            self.stats.timeouts += 1
+            raise DeadlineExceeded(f"Gemini call from {caller}")
+
+        self.stats.requests += 1
         try:
-            # Set reasonable timeout and run in thread pool
-            loop = asyncio.get_running_loop()
-            
-            # Create a wrapper function that includes timeout
-            def _generate_with_timeout():
-                return self.model.generate_content(
-                    prompt, 
-                    safety_settings=[
-                        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-                        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-                        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-                        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-                    ],
-                    **kwargs
-                )
-            
-            # Run with timeout
-            response = await asyncio.wait_for(
-                loop.run_in_executor(_EXECUTOR, _generate_with_timeout),
-                timeout=8.0  # 8 second timeout
+            return await asyncio.wait_for(
+                get_llm_gateway().coalesce(
+                    caller,
+                    cache_key,
+                    lambda: self._generate(prompt, caller, priority, cache_key, cache_ttl, **kwargs),
+                ),
+                timeout=timeout
             )
-            
-            return response
 
         except asyncio.TimeoutError:
+            self.stats.timeouts += 1
             logger.error("Gemini API call timed out")
             raise
         except Exception as e:
+            self.stats.errors += 1
             logger.error(f"Error generating content: {str(e)}")
             raise
 
+    def get_stats(self) -> Dict[str, Any]:
+        """Return client counters plus the gateway's queue-wait/latency and response cache metrics."""
+        data = asdict(self.stats)
+        data["gateway"] = get_llm_gateway().get_stats()
+        data["cache"] = get_llm_cache().get_stats()
+        return data
+
 @lru_cache(maxsize=1)
 def get_gemini_client(model_name: str = "models/gemini-2.5-flash-lite") -> AsyncGeminiClient:
     """Get cached Gemini client instance"""
-    
+
     # Load from configuration using pydantic-settings
     try:
         settings = get_settings()
@@ -97,7 +212,11 @@ def get_gemini_client(model_name: str = "models/gemini-2.5-flash-lite") -> Async
         )
 
     try:
-        return AsyncGeminiClient(api_key, model_name)
+        return AsyncGeminiClient(
+            api_key,
+            model_name,
+            timeout=settings.GEMINI_TIMEOUT,
+        )
     except Exception as e:
         logger.error(f"Failed to create Gemini client: {str(e)}")
         raise
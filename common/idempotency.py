@@ -0,0 +1,369 @@
+# common/idempotency.py
+"""
+At-most-once processing of retried requests keyed by an idempotency key.
+
+Clients retry a request that timed out although the server may still be
+working on it - or already done. For work that must not happen twice (a turn
+appends to the conversation and advances its checkpoints), the caller tags
+each logical request with a key, e.g. a turn id, and runs it through an
+IdempotentRequests group:
+
+- the first submission runs the work and stores its result for `ttl`;
+- a duplicate arriving while the work runs attaches to it and gets the same
+  result (or exception);
+- a duplicate arriving later gets the stored result without running anything.
+
+Within a process duplicates attach to the running task. Across workers the
+first submission claims the key in Redis (SET NX PX) with a pending marker
+that it keeps renewing while the work runs - up to `max_pending` - so the
+marker lapses `pending_ttl` after its worker dies or overstays. A worker
+that finds the key claimed polls until the result is stored, then returns
+it, or until the claim lapses and it can take it. Failed work is not stored -
+the claim is dropped so that the next retry runs it again.
+
+Like the other Redis helpers in common, the Redis side fails open: while
+Redis is unreachable duplicates are only absorbed within the process, from
+a small local copy of recent results.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+from common.codec import decode, encode
+from common.deadline import DeadlineExceeded, check_deadline
+from common.metrics import Sample, get_registry, register_cache_sizes
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "idem:v1"
+DEFAULT_TTL = 600
+DEFAULT_PENDING_TTL = 30.0
+DEFAULT_MAX_PENDING = 300.0
+DEFAULT_LOCAL_ENTRIES = 1024
+REDIS_OP_TIMEOUT = 0.05
+REDIS_RETRY_AFTER = 30.0
+POLL_INTERVAL_MIN = 0.02
+POLL_INTERVAL_MAX = 0.2
+
+# Compare-and-delete so a worker never drops a claim that lapsed and was re-taken
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Extend the claim only while this worker still holds it
+_RENEW_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+@dataclass
+class IdempotencyStats:
+    """Counters for one group"""
+    requests: int = 0
+    executed: int = 0
+    attached: int = 0           # duplicates that joined work in flight in this process
+    waited: int = 0             # duplicates that waited for another worker's claim
+    replayed: int = 0           # duplicates answered from a stored result
+    failed: int = 0
+    claim_expired: int = 0      # claims of other workers still held after max_pending
+    claim_renewals: int = 0
+    claims_lost: int = 0        # own claims that lapsed or were re-taken while the work ran
+    redis_errors: int = 0
+
+    @property
+    def absorbed(self) -> int:
+        return self.attached + self.replayed
+
+
+class IdempotentRequests:
+    """A named group of requests processed at most once per key"""
+
+    def __init__(
+        self,
+        name: str,
+        redis_url: Optional[str] = None,
+        ttl: int = DEFAULT_TTL,
+        pending_ttl: float = DEFAULT_PENDING_TTL,
+        max_pending: float = DEFAULT_MAX_PENDING,
+        local_entries: int = DEFAULT_LOCAL_ENTRIES,
+    ):
+        self.name = name
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        self.max_pending = max_pending
+        self.local_entries = local_entries
+        self.stats = IdempotencyStats()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._results: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+        self._redis = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis_down_until = 0.0
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Result of fn() for this key, running it only if no submission with the
+        same key has run or is running; returns (result, replayed), where
+        replayed is True when this call did not run fn itself.
+
+        The work is shielded: a caller that is cancelled or times out does not
+        cancel it for the others, and its result is still stored.
+        """
+        self.stats.requests += 1
+        task = self._inflight.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.stats.attached += 1
+            result, _ = await asyncio.shield(task)
+            return result, True
+
+        task = asyncio.ensure_future(self._resolve(key, fn))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t, key=key: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.stats.failed += 1
+
+    async def _resolve(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        found, result = self._local_get(key)
+        if found:
+            self.stats.replayed += 1
+            return result, True
+
+        # The pending marker: this worker's claim, compared on release
+        token = encode({"claim": uuid.uuid4().hex})
+        found, result = await self._claim(key, token)
+        if found:
+            self._local_put(key, result)
+            self.stats.replayed += 1
+            return result, True
+
+        self.stats.executed += 1
+        renewer = asyncio.create_task(self._keep_claim(key, token))
+        try:
+            result = await fn()
+        except BaseException:
+            renewer.cancel()
+            await self._release(key, token)
+            raise
+        renewer.cancel()
+        await self.put(key, result)
+        return result, False
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        """(True, result) when a result is stored for this key, without waiting on claims"""
+        found, result = self._local_get(key)
+        if found:
+            return found, result
+        client = self._get_redis()
+        if client is None:
+            return False, None
+        try:
+            raw = await client.get(self._redis_key(key))
+        except Exception as e:
+            self._redis_failed("get", e)
+            return False, None
+        entry = decode(raw) if raw else None
+        if not isinstance(entry, dict) or "result" not in entry:
+            return False, None
+        self._local_put(key, entry["result"])
+        return True, entry["result"]
+
+    async def put(self, key: str, result: Any) -> None:
+        """Store the result for this key (for work run outside run(), e.g. streamed)"""
+        self._local_put(key, result)
+        client = self._get_redis()
+        if client is None:
+            return
+        try:
+            await client.set(self._redis_key(key), encode({"result": result}), ex=self.ttl)
+        except Exception as e:
+            self._redis_failed("store", e)
+
+    # ------------------------------------------------------------------
+    # Cross-worker claim
+    # ------------------------------------------------------------------
+    async def _claim(self, key: str, token: bytes) -> Tuple[bool, Any]:
+        """
+        Claim the key for this worker, or wait for the worker holding it.
+        (True, result) when a stored result was found instead; (False, None)
+        when this worker should run the work - claimed, or Redis unavailable.
+        """
+        client = self._get_redis()
+        if client is None:
+            return False, None
+
+        redis_key = self._redis_key(key)
+        # The holder renews its claim for at most max_pending, so it is gone by then
+        deadline = time.monotonic() + self.max_pending + self.pending_ttl
+        interval = POLL_INTERVAL_MIN
+        waited = False
+        try:
+            while True:
+                if await client.set(redis_key, token, nx=True, px=int(self.pending_ttl * 1000)):
+                    return False, None
+                raw = await client.get(redis_key)
+                entry = decode(raw) if raw else None
+                if isinstance(entry, dict) and "result" in entry:
+                    return True, entry["result"]
+                if not waited:
+                    waited = True
+                    self.stats.waited += 1
+                if time.monotonic() >= deadline:
+                    # The claim should have lapsed by now; run rather than wait on a stuck worker
+                    self.stats.claim_expired += 1
+                    logger.warning(
+                        f"⚠️ Idempotency '{self.name}' claim on {key} outlived {self.max_pending:.0f}s, running anyway"
+                    )
+                    return False, None
+                # Give up once the request's own deadline has passed
+                check_deadline(f"waiting for duplicate {self.name} request")
+                await asyncio.sleep(interval)
+                interval = min(interval * 2, POLL_INTERVAL_MAX)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            self._redis_failed("claim", e)
+            return False, None
+
+    async def _keep_claim(self, key: str, token: bytes) -> None:
+        """Renew this worker's claim while its work runs, for at most max_pending"""
+        interval = self.pending_ttl / 3
+        started = time.monotonic()
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                if time.monotonic() - started >= self.max_pending:
+                    logger.error(
+                        f"❌ Idempotency '{self.name}' work on {key} ran for more than {self.max_pending:.0f}s, "
+                        f"letting its claim lapse"
+                    )
+                    return
+                client = self._get_redis()
+                if client is None:
+                    return
+                try:
+                    renewed = await client.eval(
+                        _RENEW_SCRIPT, 1, self._redis_key(key), token, int(self.pending_ttl * 1000)
+                    )
+                except Exception as e:
+                    self._redis_failed("renew", e)
+                    return
+                if not renewed:
+                    self.stats.claims_lost += 1
+                    logger.warning(f"⚠️ Idempotency '{self.name}' claim on {key} was lost while its work ran")
+                    return
+                self.stats.claim_renewals += 1
+        except asyncio.CancelledError:
+            pass
+
+    async def _release(self, key: str, token: bytes) -> None:
+        client = self._get_redis()
+        if client is None:
+            return
+        try:
+            await client.eval(_RELEASE_SCRIPT, 1, self._redis_key(key), token)
+        except Exception as e:
+            self._redis_failed("release", e)
+
+    def _redis_key(self, key: str) -> str:
+        return f"{KEY_PREFIX}:{self.name}:{key}"
+
+    def _get_redis(self):
+        """Redis client for the running loop, or None while Redis is unavailable"""
+        if not self.redis_url or time.monotonic() < self._redis_down_until:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._loop is not loop:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                logger.warning(f"⚠️ redis package not installed, idempotency '{self.name}' is per-process only")
+                self.redis_url = None
+                return None
+            self._loop = loop
+            self._redis = redis.Redis.from_url(
+                self.redis_url,
+                socket_connect_timeout=REDIS_OP_TIMEOUT * 4,
+                socket_timeout=REDIS_OP_TIMEOUT * 4,
+            )
+        return self._redis
+
+    def _redis_failed(self, op: str, e: Exception) -> None:
+        self.stats.redis_errors += 1
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+        logger.warning(f"⚠️ Idempotency '{self.name}' Redis {op} failed, per-process only for {REDIS_RETRY_AFTER:.0f}s: {e}")
+
+    # ------------------------------------------------------------------
+    # Local copy of recent results
+    # ------------------------------------------------------------------
+    def _local_get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._results.get(key)
+        if entry is None:
+            return False, None
+        expires_at, result = entry
+        if time.monotonic() >= expires_at:
+            del self._results[key]
+            return False, None
+        self._results.move_to_end(key)
+        return True, result
+
+    def _local_put(self, key: str, result: Any) -> None:
+        self._results[key] = (time.monotonic() + self.ttl, result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.local_entries:
+            self._results.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        data = asdict(self.stats)
+        data["absorbed"] = self.stats.absorbed
+        data["in_flight"] = len(self._inflight)
+        data["local_results"] = len(self._results)
+        data["distributed"] = bool(self.redis_url)
+        return data
+
+
+_groups: Dict[str, IdempotentRequests] = {}
+
+
+def get_idempotent_requests(name: str, **options) -> IdempotentRequests:
+    """Get (or create) the process-wide group with this name"""
+    group = _groups.get(name)
+    if group is None:
+        group = _groups[name] = IdempotentRequests(name, **options)
+        register_cache_sizes("idempotency", lambda: {
+            f"{group_name}:{kind}": size for group_name, group in _groups.items()
+            for kind, size in (("in_flight", len(group._inflight)), ("results", len(group._results)))
+        })
+    return group
+
+
+_RESULTS = {"executed": "executed", "attached": "attached", "replayed": "replayed", "failed": "failed"}
+
+
+def _metric_samples() -> Iterator[Sample]:
+    for name, group in _groups.items():
+        for field, result in _RESULTS.items():
+            yield Sample("idempotent_requests_total", "counter", "Idempotency-keyed requests by outcome",
+                         (("name", name), ("result", result)), getattr(group.stats, field))
+        yield Sample("idempotent_duplicates_absorbed_total", "counter",
+                     "Duplicate submissions answered without running the work again",
+                     (("name", name),), group.stats.absorbed)
+
+
+get_registry().register_collector("idempotency", _metric_samples)
@@ -0,0 +1,298 @@
+# common/lease.py
+"""
+Keyed mutual exclusion across workers using renewable Redis leases.
+
+A LeaseMutex serializes work per key (e.g. per conversation) while different
+keys run fully in parallel. Within a process waiters queue on an asyncio.Lock
+per key, which is FIFO; across processes the holder owns a Redis key
+(SET NX PX) that a background task keeps renewing while the work runs.
+
+Expiry is what keeps this deadlock-free:
+- a holder that crashes stops renewing, so its lease lapses after `ttl`;
+- a holder that hangs stops renewing after `max_hold`, its lease lapses and
+  the local lock is handed to the next waiter;
+- waiters give up after `wait_timeout` with LeaseTimeout.
+
+Like the other Redis helpers in common, the Redis side fails open: while
+Redis is unreachable keys are only serialized within the process.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+LEASE_PREFIX = "lease"
+REDIS_RETRY_AFTER = 30.0
+POLL_INTERVAL_MIN = 0.02
+POLL_INTERVAL_MAX = 0.2
+
+# Compare-and-delete / compare-and-extend so a worker never touches a lease it no longer owns
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_RENEW_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class LeaseTimeout(Exception):
+    """Raised when a lease could not be acquired within the wait timeout"""
+
+
+@dataclass
+class LeaseStats:
+    """Counters for one mutex"""
+    acquired: int = 0
+    contended: int = 0
+    timeouts: int = 0
+    renewals: int = 0
+    lost: int = 0
+    expired: int = 0
+    redis_errors: int = 0
+
+
+class Lease:
+    """A held lease; release it (or let it expire) to let the next holder in"""
+
+    def __init__(self, mutex: "LeaseMutex", key: str, token: Optional[str], waited_ms: float):
+        self.mutex = mutex
+        self.key = key
+        self.token = token
+        self.waited_ms = waited_ms
+        self.acquired_at = time.monotonic()
+        self.lost = False
+        self._released = False
+        self._renewer: Optional[asyncio.Task] = None
+
+    @property
+    def distributed(self) -> bool:
+        """True when the lease is also held in Redis, not only in this process"""
+        return self.token is not None
+
+    async def release(self) -> None:
+        """Give the lease up; safe to call more than once"""
+        if self._released:
+            return
+        self._released = True
+        if self._renewer is not None and self._renewer is not asyncio.current_task():
+            self._renewer.cancel()
+        await self.mutex._release(self)
+
+
+class LeaseMutex:
+    """A named group of per-key leases"""
+
+    def __init__(
+        self,
+        name: str,
+        redis_url: Optional[str] = None,
+        ttl: float = 10.0,
+        wait_timeout: float = 30.0,
+        max_hold: float = 120.0,
+    ):
+        self.name = name
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.max_hold = max_hold
+        self.stats = LeaseStats()
+
+        # key -> [lock, number of holders and waiters]
+        self._local: Dict[str, list] = {}
+
+        self._redis = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis_down_until = 0.0
+
+    def held(self) -> int:
+        """Keys currently held or waited on in this process"""
+        return len(self._local)
+
+    @asynccontextmanager
+    async def hold(self, key: str, wait_timeout: Optional[float] = None) -> AsyncIterator[Lease]:
+        lease = await self.acquire(key, wait_timeout)
+        try:
+            yield lease
+        finally:
+            await lease.release()
+
+    async def acquire(self, key: str, wait_timeout: Optional[float] = None) -> Lease:
+        """
+        Wait for the lease on `key`.
+
+        Raises:
+            LeaseTimeout: if it is not free within the wait timeout
+        """
+        started = time.monotonic()
+        deadline = started + (self.wait_timeout if wait_timeout is None else wait_timeout)
+
+        entry = self._local.get(key)
+        if entry is None:
+            entry = self._local[key] = [asyncio.Lock(), 0]
+        if entry[1] > 0:
+            self.stats.contended += 1
+        entry[1] += 1
+        lock = entry[0]
+
+        try:
+            await asyncio.wait_for(lock.acquire(), max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            self._unref(key)
+            self.stats.timeouts += 1
+            raise LeaseTimeout(f"Lease '{self.name}:{key}' busy for more than {deadline - started:.1f}s")
+        except BaseException:
+            self._unref(key)
+            raise
+
+        try:
+            token = await self._acquire_redis(key, deadline)
+        except BaseException:
+            lock.release()
+            self._unref(key)
+            raise
+
+        lease = Lease(self, key, token, (time.monotonic() - started) * 1000)
+        lease._renewer = asyncio.create_task(self._keep_alive(lease))
+        self.stats.acquired += 1
+        return lease
+
+    def _unref(self, key: str) -> None:
+        entry = self._local.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._local[key]
+
+    async def _release(self, lease: Lease) -> None:
+        try:
+            if lease.token is not None:
+                client = self._get_redis()
+                if client is not None:
+                    try:
+                        await client.eval(_RELEASE_SCRIPT, 1, self._redis_key(lease.key), lease.token)
+                    except Exception as e:
+                        self._redis_failed("release", e)
+        finally:
+            entry = self._local.get(lease.key)
+            if entry is not None and entry[0].locked():
+                entry[0].release()
+            self._unref(lease.key)
+
+    async def _keep_alive(self, lease: Lease) -> None:
+        """Renew the Redis lease until released; expire it if the holder overstays max_hold"""
+        interval = self.ttl / 3
+        try:
+            while True:
+                remaining = self.max_hold - (time.monotonic() - lease.acquired_at)
+                if remaining <= 0:
+                    self.stats.expired += 1
+                    logger.error(
+                        f"❌ Lease '{self.name}:{lease.key}' held for more than {self.max_hold:.0f}s, expiring it"
+                    )
+                    lease.lost = True
+                    await lease.release()
+                    return
+                await asyncio.sleep(min(interval, remaining))
+                if lease.token is None or lease.lost or lease._released:
+                    continue
+                if not await self._renew(lease):
+                    # Keep looping so max_hold still frees the local lock
+                    self.stats.lost += 1
+                    lease.lost = True
+                    logger.error(f"❌ Lease '{self.name}:{lease.key}' was lost before it was released")
+                    continue
+                self.stats.renewals += 1
+        except asyncio.CancelledError:
+            pass
+
+    async def _renew(self, lease: Lease) -> bool:
+        client = self._get_redis()
+        if client is None:
+            # Redis went away after we took the lease: keep the local lock and carry on
+            return True
+        try:
+            renewed = await client.eval(
+                _RENEW_SCRIPT, 1, self._redis_key(lease.key), lease.token, int(self.ttl * 1000)
+            )
+        except Exception as e:
+            self._redis_failed("renew", e)
+            return True
+        return bool(renewed)
+
+    # ------------------------------------------------------------------
+    # Redis side
+    # ------------------------------------------------------------------
+    def _redis_key(self, key: str) -> str:
+        return f"{LEASE_PREFIX}:{self.name}:{key}"
+
+    def _get_redis(self):
+        if not self.redis_url or time.monotonic() < self._redis_down_until:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._loop is not loop:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                logger.warning(f"⚠️ redis package not installed, lease '{self.name}' is per-process only")
+                self.redis_url = None
+                return None
+            self._loop = loop
+            self._redis = redis.Redis.from_url(
+                self.redis_url,
+                socket_connect_timeout=0.2,
+                socket_timeout=0.2,
+                decode_responses=True,
+            )
+        return self._redis
+
+    def _redis_failed(self, op: str, e: Exception) -> None:
+        self.stats.redis_errors += 1
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+        logger.warning(f"⚠️ Lease '{self.name}' Redis {op} failed, per-process only for {REDIS_RETRY_AFTER:.0f}s: {e}")
+
+    async def _acquire_redis(self, key: str, deadline: float) -> Optional[str]:
+        """Take the Redis lease, polling with backoff until the deadline; None when Redis is unavailable"""
+        client = self._get_redis()
+        if client is None:
+            return None
+
+        token = uuid.uuid4().hex
+        poll = POLL_INTERVAL_MIN
+        contended = False
+        try:
+            while True:
+                if await client.set(self._redis_key(key), token, nx=True, px=int(self.ttl * 1000)):
+                    return token
+                if not contended:
+                    contended = True
+                    self.stats.contended += 1
+                if time.monotonic() + poll > deadline:
+                    self.stats.timeouts += 1
+                    raise LeaseTimeout(f"Lease '{self.name}:{key}' held by another worker")
+                await asyncio.sleep(poll)
+                poll = min(poll * 2, POLL_INTERVAL_MAX)
+        except LeaseTimeout:
+            raise
+        except Exception as e:
+            self._redis_failed("acquire", e)
+            return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        data = asdict(self.stats)
+        data["held"] = self.held()
+        data["distributed"] = bool(self.redis_url) and time.monotonic() >= self._redis_down_until
+        return data
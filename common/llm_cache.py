@@ -0,0 +1,274 @@
+# common/llm_cache.py
+"""
+Exact-match response cache for deterministic LLM prompts.
+
+Low-temperature prompts (checkpoint evaluation, intent detection, checkpoint
+generation) repeat heavily across users. Responses are keyed on a normalized
+hash of (model, generation config, prompt) and kept in Redis, shared by every
+process, with a small size-bounded near-cache in front of it. Redis is
+optional: when it is not configured or not reachable the near-cache keeps
+working on its own and lookups never raise.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from common.metrics import cache_samples, get_registry
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "llm:v1"
+DEFAULT_NEAR_CACHE_SIZE = 2048
+# Near-cache entries never outlive this, even if the call site asked for longer,
+# so a Redis-side flush is picked up reasonably quickly
+NEAR_CACHE_MAX_TTL = 300
+REDIS_OP_TIMEOUT = 0.05
+REDIS_RETRY_AFTER = 30.0
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace runs so formatting-only differences share an entry"""
+    return _WHITESPACE.sub(" ", prompt).strip()
+
+
+def _normalize_config(config: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    if not config:
+        return {}
+    if not isinstance(config, Mapping):
+        # genai.types.GenerationConfig and similar dataclass-style objects
+        config = {k: v for k, v in vars(config).items() if not k.startswith("_")}
+    normalized = {}
+    for name, value in config.items():
+        if value is None:
+            continue
+        if isinstance(value, float):
+            value = round(value, 6)
+        elif isinstance(value, (list, tuple)):
+            value = list(value)
+        normalized[name] = value
+    return normalized
+
+
+def make_cache_key(model: str, generation_config: Optional[Mapping[str, Any]], prompt: str) -> str:
+    """Stable (process-independent) key for a model/config/prompt triple"""
+    payload = json.dumps(
+        {
+            "model": model,
+            "config": _normalize_config(generation_config),
+            "prompt": normalize_prompt(prompt),
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedResponse:
+    """Minimal stand-in for a Gemini response served from the cache"""
+
+    cached = True
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+@dataclass
+class NamespaceStats:
+    """Per-call-site counters"""
+    near_hits: int = 0
+    redis_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = asdict(self)
+        lookups = self.near_hits + self.redis_hits + self.misses
+        data["hit_rate"] = round((self.near_hits + self.redis_hits) / lookups, 3) if lookups else 0.0
+        return data
+
+
+class NearCache:
+    """Size-bounded LRU with per-entry expiry"""
+
+    def __init__(self, max_size: int = DEFAULT_NEAR_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if (now if now is not None else time.monotonic()) >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl: float, now: Optional[float] = None) -> None:
+        if self.max_size <= 0:
+            return
+        expires_at = (now if now is not None else time.monotonic()) + ttl
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class LLMResponseCache:
+    """Two-level (near-cache + Redis) exact-match cache of LLM response text"""
+
+    def __init__(self, redis_url: Optional[str] = None, near_cache_size: int = DEFAULT_NEAR_CACHE_SIZE, enabled: bool = True):
+        self.redis_url = redis_url
+        self.enabled = enabled
+        self.near = NearCache(near_cache_size)
+        self._namespaces: Dict[str, NamespaceStats] = {}
+        self.redis_errors = 0
+
+        self._redis = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis_down_until = 0.0
+
+    def _stats(self, namespace: str) -> NamespaceStats:
+        stats = self._namespaces.get(namespace)
+        if stats is None:
+            stats = self._namespaces[namespace] = NamespaceStats()
+        return stats
+
+    @staticmethod
+    def _redis_key(namespace: str, key: str) -> str:
+        return f"{KEY_PREFIX}:{namespace}:{key}"
+
+    def _get_redis(self):
+        """Redis client for the running loop, or None while Redis is unavailable"""
+        if not self.redis_url or time.monotonic() < self._redis_down_until:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._loop is not loop:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                logger.warning("⚠️ redis package not installed, LLM cache is local only")
+                self.redis_url = None
+                return None
+            self._loop = loop
+            self._redis = redis.Redis.from_url(
+                self.redis_url,
+                socket_connect_timeout=REDIS_OP_TIMEOUT * 4,
+                socket_timeout=REDIS_OP_TIMEOUT * 4,
+                decode_responses=True,
+            )
+        return self._redis
+
+    def _redis_failed(self, op: str, e: Exception) -> None:
+        self.redis_errors += 1
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+        logger.warning(f"⚠️ LLM cache Redis {op} failed, using near-cache only for {REDIS_RETRY_AFTER:.0f}s: {e}")
+
+    async def get(self, namespace: str, key: str, ttl: int) -> Optional[str]:
+        """Look a response up; a Redis hit is promoted into the near-cache"""
+        if not self.enabled:
+            return None
+        stats = self._stats(namespace)
+
+        value = self.near.get(self._redis_key(namespace, key))
+        if value is not None:
+            stats.near_hits += 1
+            return value
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                value = await asyncio.wait_for(client.get(self._redis_key(namespace, key)), REDIS_OP_TIMEOUT)
+            except Exception as e:
+                self._redis_failed("get", e)
+                value = None
+            if value is not None:
+                stats.redis_hits += 1
+                self.near.set(self._redis_key(namespace, key), value, min(ttl, NEAR_CACHE_MAX_TTL))
+                return value
+
+        stats.misses += 1
+        return None
+
+    async def set(self, namespace: str, key: str, value: str, ttl: int) -> None:
+        """Store a response in both levels"""
+        if not self.enabled or not value:
+            return
+        self._stats(namespace).stores += 1
+        redis_key = self._redis_key(namespace, key)
+        self.near.set(redis_key, value, min(ttl, NEAR_CACHE_MAX_TTL))
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                await asyncio.wait_for(client.set(redis_key, value, ex=int(ttl)), REDIS_OP_TIMEOUT)
+            except Exception as e:
+                self._redis_failed("set", e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per call site for health endpoints"""
+        return {
+            "enabled": self.enabled,
+            "redis": bool(self.redis_url) and time.monotonic() >= self._redis_down_until,
+            "redis_errors": self.redis_errors,
+            "near_cache_entries": len(self.near),
+            "near_cache_evictions": self.near.evictions,
+            "namespaces": {name: stats.snapshot() for name, stats in self._namespaces.items()},
+        }
+
+
+_cache: Optional[LLMResponseCache] = None
+
+
+def _load_cache_settings() -> Tuple[bool, Optional[str], int]:
+    """Read cache settings from common settings, falling back to env/defaults when GEMINI_API_KEY is absent"""
+    try:
+        from common.config import get_settings
+        settings = get_settings()
+        return (
+            settings.LLM_CACHE_ENABLED,
+            settings.LLM_CACHE_REDIS_URL or os.getenv("REDIS_URL"),
+            settings.LLM_CACHE_NEAR_SIZE,
+        )
+    except Exception:
+        return (
+            os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("0", "false", "no"),
+            os.getenv("LLM_CACHE_REDIS_URL") or os.getenv("REDIS_URL"),
+            int(os.getenv("LLM_CACHE_NEAR_SIZE", DEFAULT_NEAR_CACHE_SIZE)),
+        )
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Get the process-wide LLM response cache - SINGLETON"""
+    global _cache
+    if _cache is None:
+        enabled, redis_url, near_size = _load_cache_settings()
+        _cache = LLMResponseCache(redis_url=redis_url, near_cache_size=near_size, enabled=enabled)
+        get_registry().register_collector("llm_cache", lambda: cache_samples(
+            "llm", _cache.get_stats()["namespaces"], {"near_hits": "local_hit", "redis_hits": "redis_hit", "misses": "miss"}
+        ))
+        logger.info(
+            f"LLM response cache initialized: enabled={enabled}, "
+            f"redis={'yes' if redis_url else 'no'}, near-cache {near_size} entries"
+        )
+    return _cache
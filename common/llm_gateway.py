@@ -0,0 +1,544 @@
+# common/llm_gateway.py
+"""
+Process-wide gateway for LLM calls.
+
+Every Gemini caller in the process (core gemini client, specialist streaming
+clients, intent detector, entry chatbot) acquires a slot here before talking
+to the API. The gateway owns:
+
+- a token bucket sized to our request quota
+- priority ordering: live voice turn > chat turn > background work
+- shared 429 backoff, so one caller tripping quota slows everyone down
+- per-caller latency, queue-time and token accounting
+- single-flight coalescing of identical in-flight prompts (see coalesce)
+
+Usage:
+    gateway = get_llm_gateway()
+    async with gateway.request("checklist", LLMPriority.CHAT) as call:
+        response = await model.generate_content_async(prompt)
+        call.record_text(prompt, response.text)
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import re
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from enum import IntEnum
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from common.single_flight import get_single_flight
+from common.tracing import CLIENT, detached_span
+from common.utils import iterate_in_executor
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Header used to carry the caller's priority across service hops
+PRIORITY_HEADER = "X-LLM-Priority"
+
+DEFAULT_REQUESTS_PER_MINUTE = 1000
+DEFAULT_BURST = 20
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_QUOTA_COOLDOWN = 60.0
+
+
+class LLMPriority(IntEnum):
+    """Lower value is served first"""
+    VOICE = 0
+    CHAT = 1
+    BACKGROUND = 2
+
+
+class LLMQuotaExceeded(Exception):
+    """Raised when the shared quota cooldown is active and the caller cannot wait it out"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"LLM quota cooldown active, retry after {retry_after:.1f}s")
+
+
+# Channels that carry a live voice turn
+VOICE_CHANNELS = {"voice", "livekit", "livekit_agent", "phone", "call"}
+
+_current_priority: ContextVar[LLMPriority] = ContextVar("llm_priority", default=LLMPriority.CHAT)
+
+
+def current_priority() -> LLMPriority:
+    """Priority of the request being served in the current task"""
+    return _current_priority.get()
+
+
+def set_priority(priority: LLMPriority):
+    """Set the priority for the current task; returns a token for ContextVar.reset"""
+    return _current_priority.set(priority)
+
+
+@contextmanager
+def use_priority(priority: LLMPriority) -> Iterator[None]:
+    """Temporarily run LLM calls at the given priority"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def priority_for_channel(channel: Optional[str]) -> LLMPriority:
+    """Map an orchestrator channel to an LLM priority"""
+    if channel and channel.lower() in VOICE_CHANNELS:
+        return LLMPriority.VOICE
+    return LLMPriority.CHAT
+
+
+def parse_priority(value: Optional[str], default: LLMPriority = LLMPriority.CHAT) -> LLMPriority:
+    """Parse a priority from a header value ("voice", "chat", "background" or 0-2)"""
+    if not value:
+        return default
+    value = value.strip()
+    try:
+        if value.isdigit():
+            return LLMPriority(int(value))
+        return LLMPriority[value.upper()]
+    except (KeyError, ValueError):
+        return default
+
+
+def is_quota_error(error: BaseException) -> bool:
+    """True for 429 / RESOURCE_EXHAUSTED style errors"""
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests"):
+        return True
+    message = str(error).lower()
+    return "429" in message or "quota" in message or "resource exhausted" in message or "rate limit" in message
+
+
+def parse_retry_delay(error_msg: str, default: float = DEFAULT_QUOTA_COOLDOWN) -> float:
+    """Pull the server-suggested retry delay out of a quota error, plus a small buffer"""
+    match = re.search(r"retry_delay\s*\{\s*seconds:\s*(\d+)", error_msg)
+    if not match:
+        match = re.search(r"retry (?:in|after)\s+(\d+(?:\.\d+)?)\s*s", error_msg, re.IGNORECASE)
+    if match:
+        return float(match.group(1)) + 5.0
+    return default
+
+
+class TokenBucket:
+    """Classic token bucket; one token per LLM request"""
+
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate = max(rate_per_second, 1e-9)
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def time_until_available(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def take(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+@dataclass
+class CallerStats:
+    """Per-caller accounting"""
+    requests: int = 0
+    completed: int = 0
+    errors: int = 0
+    quota_errors: int = 0
+    rejected: int = 0
+    timeouts: int = 0
+    coalesced: int = 0
+    total_queue_ms: float = 0.0
+    max_queue_ms: float = 0.0
+    total_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    by_priority: Dict[str, int] = field(default_factory=dict)
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = asdict(self)
+        started = max(self.completed + self.errors + self.quota_errors, 1)
+        data["avg_queue_ms"] = round(self.total_queue_ms / started, 2)
+        data["avg_latency_ms"] = round(self.total_latency_ms / started, 2)
+        data["total_queue_ms"] = round(self.total_queue_ms, 2)
+        data["total_latency_ms"] = round(self.total_latency_ms, 2)
+        data["max_queue_ms"] = round(self.max_queue_ms, 2)
+        data["max_latency_ms"] = round(self.max_latency_ms, 2)
+        return data
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Rough token estimate (~4 characters per token) when the API gives no usage data"""
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
+
+
+class LLMCall:
+    """Handle yielded by LLMGateway.request for recording usage"""
+
+    def __init__(self, caller: str, priority: LLMPriority, queue_ms: float):
+        self.caller = caller
+        self.priority = priority
+        self.queue_ms = queue_ms
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+
+    def record_tokens(self, prompt_tokens: int = 0, output_tokens: int = 0) -> None:
+        self.prompt_tokens += prompt_tokens
+        self.output_tokens += output_tokens
+
+    def record_text(self, prompt: Optional[str], output: Optional[str]) -> None:
+        self.record_tokens(estimate_tokens(prompt), estimate_tokens(output))
+
+    def record_response(self, prompt: Optional[str], response: Any) -> None:
+        """Use usage_metadata when the SDK provides it, else estimate from text"""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None and getattr(usage, "prompt_token_count", None) is not None:
+            self.record_tokens(
+                int(getattr(usage, "prompt_token_count", 0) or 0),
+                int(getattr(usage, "candidates_token_count", 0) or 0),
+            )
+            return
+        try:
+            text = response.text
+        except Exception:
+            text = None
+        self.record_text(prompt, text)
+
+
+class LLMGateway:
+    """Admission control and accounting for every LLM call in the process"""
+
+    def __init__(
+        self,
+        requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+        burst: int = DEFAULT_BURST,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.max_concurrency = max(1, max_concurrency)
+        self._bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._cooldown_until = 0.0
+        self._quota_events = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._callers: Dict[str, CallerStats] = {}
+        self._single_flight = get_single_flight("llm")
+
+    # ------------------------------------------------------------------
+    # Shared quota state
+    # ------------------------------------------------------------------
+    def cooldown_remaining(self) -> float:
+        return max(0.0, self._cooldown_until - time.monotonic())
+
+    def in_cooldown(self) -> bool:
+        return self.cooldown_remaining() > 0
+
+    def report_quota_error(self, error_msg: str = "") -> float:
+        """Start (or extend) the shared cooldown after a 429"""
+        delay = parse_retry_delay(error_msg)
+        self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+        self._quota_events += 1
+        logger.warning(f"⚠️ LLM quota exceeded - all callers backing off for {delay:.0f}s")
+        return delay
+
+    def reset_cooldown(self) -> None:
+        self._cooldown_until = 0.0
+        self._pump()
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Futures and timers from a previous loop are unusable
+            self._loop = loop
+            self._waiters = []
+            self._wakeup = None
+            self._in_flight = 0
+        return loop
+
+    def _schedule_wakeup(self, delay: float) -> None:
+        if self._wakeup is not None or self._loop is None:
+            return
+        self._wakeup = self._loop.call_later(delay, self._on_wakeup)
+
+    def _on_wakeup(self) -> None:
+        self._wakeup = None
+        self._pump()
+
+    def _pump(self) -> None:
+        """Grant slots to waiters in priority order while quota and concurrency allow"""
+        while self._waiters:
+            _, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self._in_flight >= self.max_concurrency:
+                return  # _release will pump again
+
+            now = time.monotonic()
+            delay = self._cooldown_until - now
+            if delay <= 0:
+                delay = self._bucket.time_until_available(now)
+            if delay > 0:
+                self._schedule_wakeup(delay)
+                return
+
+            self._bucket.take(now)
+            heapq.heappop(self._waiters)
+            self._in_flight += 1
+            future.set_result(None)
+
+    def _release(self) -> None:
+        self._in_flight = max(0, self._in_flight - 1)
+        self._pump()
+
+    async def _acquire(self, priority: LLMPriority, max_wait: Optional[float]) -> None:
+        loop = self._bind_loop()
+
+        # Fail fast during a cooldown unless the caller can afford to wait it out,
+        # so foreground turns fall back immediately instead of hanging
+        remaining = self.cooldown_remaining()
+        if remaining > 0 and (
+            priority == LLMPriority.BACKGROUND or max_wait is None or remaining > max_wait
+        ):
+            raise LLMQuotaExceeded(remaining)
+
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), future))
+        self._pump()
+
+        try:
+            if max_wait is None:
+                await future
+            else:
+                await asyncio.wait_for(future, timeout=max_wait)
+        except BaseException:
+            # Slot may have been granted just before we were cancelled
+            if future.done() and not future.cancelled():
+                self._release()
+            else:
+                future.cancel()
+            raise
+
+    def _stats_for(self, caller: str) -> CallerStats:
+        stats = self._callers.get(caller)
+        if stats is None:
+            stats = self._callers[caller] = CallerStats()
+        return stats
+
+    @asynccontextmanager
+    async def request(
+        self,
+        caller: str,
+        priority: Optional[LLMPriority] = None,
+        max_wait: Optional[float] = None,
+    ):
+        """
+        Hold one LLM slot for the duration of the block.
+
+        Args:
+            caller: Name used for accounting (e.g. "checklist", "loneliness")
+            priority: Defaults to the priority of the current request context
+            max_wait: Max seconds to wait for a slot. During a quota cooldown
+                LLMQuotaExceeded is raised immediately unless max_wait covers it
+
+        Raises:
+            LLMQuotaExceeded: Cooldown active and the caller cannot wait
+            asyncio.TimeoutError: No slot within max_wait
+        """
+        priority = current_priority() if priority is None else LLMPriority(priority)
+        stats = self._stats_for(caller)
+        stats.requests += 1
+        stats.by_priority[priority.name.lower()] = stats.by_priority.get(priority.name.lower(), 0) + 1
+
+        # The span covers queue wait and the call. Not made current: streaming callers yield inside the block
+        with detached_span(f"llm {caller}", CLIENT, {"llm.caller": caller, "llm.priority": priority.name.lower()}) as span:
+            queued_at = time.perf_counter()
+            try:
+                await self._acquire(priority, max_wait)
+            except LLMQuotaExceeded:
+                stats.rejected += 1
+                raise
+            except asyncio.TimeoutError:
+                stats.timeouts += 1
+                raise
+
+            queue_ms = (time.perf_counter() - queued_at) * 1000
+            stats.total_queue_ms += queue_ms
+            stats.max_queue_ms = max(stats.max_queue_ms, queue_ms)
+
+            span.set_attribute("llm.queue_ms", round(queue_ms, 2))
+            call = LLMCall(caller, priority, queue_ms)
+            started = time.perf_counter()
+            try:
+                yield call
+                stats.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                stats.timeouts += 1
+                raise
+            except Exception as e:
+                if is_quota_error(e):
+                    stats.quota_errors += 1
+                    self.report_quota_error(str(e))
+                else:
+                    stats.errors += 1
+                raise
+            finally:
+                latency_ms = (time.perf_counter() - started) * 1000
+                stats.total_latency_ms += latency_ms
+                stats.max_latency_ms = max(stats.max_latency_ms, latency_ms)
+                stats.prompt_tokens += call.prompt_tokens
+                stats.output_tokens += call.output_tokens
+                span.set_attribute("llm.prompt_tokens", call.prompt_tokens)
+                span.set_attribute("llm.output_tokens", call.output_tokens)
+                self._release()
+
+    async def stream(
+        self,
+        caller: str,
+        prompt: Optional[str],
+        open_stream: Callable[[], Iterable[Any]],
+        start_timeout: Optional[float] = None,
+        priority: Optional[LLMPriority] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Texts of a blocking SDK stream, e.g. open_stream=lambda:
+        model.generate_content(prompt, stream=True).
+
+        The slot is held while the stream is read into a queue, not while the
+        caller consumes it, so a slow or abandoned HTTP client does not pin
+        gateway concurrency. Closing the iterator early stops the read. Errors
+        opening the stream (asyncio.TimeoutError after start_timeout) or
+        reading it are raised from the iteration, after the texts before them.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def pump() -> None:
+            try:
+                async with self.request(caller, priority) as call:
+                    opening = asyncio.get_running_loop().run_in_executor(None, open_stream)
+                    stream = await (asyncio.wait_for(opening, start_timeout) if start_timeout else opening)
+                    full = ""
+                    async for chunk in iterate_in_executor(stream):
+                        text = chunk.text if hasattr(chunk, "text") else None
+                        if text:
+                            full += text
+                            queue.put_nowait(text)
+                    call.record_text(prompt, full)
+                queue.put_nowait(done)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                queue.put_nowait(e)
+
+        reader = asyncio.ensure_future(pump())
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            if not reader.done():
+                reader.cancel()
+
+    async def coalesce(self, caller: str, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn() (which should itself use request()) unless the same caller
+        already has an identical call in flight, in which case share its result.
+
+        Use for deterministic, non-streaming calls where a retried or
+        double-posted turn would otherwise pay for the same prompt twice.
+        key is typically the prompt, or a hash of model/config/prompt.
+        """
+        flight_key = f"{caller}:{key}"
+        if self._single_flight.is_in_flight(flight_key):
+            self._stats_for(caller).coalesced += 1
+        return await self._single_flight.do(flight_key, fn)
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    def get_caller_stats(self, caller: str) -> Dict[str, Any]:
+        return self._stats_for(caller).snapshot()
+
+    def get_stats(self) -> Dict[str, Any]:
+        queued: Dict[str, int] = {}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                name = LLMPriority(priority).name.lower()
+                queued[name] = queued.get(name, 0) + 1
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "queued": queued,
+            "tokens_available": round(self._bucket.tokens, 2),
+            "cooldown_remaining": round(self.cooldown_remaining(), 2),
+            "quota_events": self._quota_events,
+            "coalesced": self._single_flight.stats.coalesced,
+            "callers": {name: stats.snapshot() for name, stats in self._callers.items()},
+        }
+
+
+_gateway: Optional[LLMGateway] = None
+
+
+def _load_limits() -> Tuple[int, int, int]:
+    """Read limits from common settings, falling back to env/defaults when GEMINI_API_KEY is absent"""
+    try:
+        from common.config import get_settings
+        settings = get_settings()
+        return settings.LLM_REQUESTS_PER_MINUTE, settings.LLM_BURST, settings.GEMINI_MAX_CONCURRENCY
+    except Exception:
+        return (
+            int(os.getenv("LLM_REQUESTS_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE)),
+            int(os.getenv("LLM_BURST", DEFAULT_BURST)),
+            int(os.getenv("GEMINI_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+        )
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Get the process-wide LLM gateway - SINGLETON"""
+    global _gateway
+    if _gateway is None:
+        requests_per_minute, burst, max_concurrency = _load_limits()
+        _gateway = LLMGateway(requests_per_minute, burst, max_concurrency)
+        logger.info(
+            f"LLM gateway initialized: {requests_per_minute} rpm, burst {burst}, "
+            f"{max_concurrency} concurrent"
+        )
+    return _gateway
@@ -0,0 +1,451 @@
+# common/llm_replay.py
+"""
+Record/replay of Gemini calls, so the whole stack can be load- and soak-tested
+offline.
+
+    LLM_REPLAY_MODE=record LLM_FIXTURES=llm_fixtures.jsonl   # call Gemini, keep what it said
+    LLM_REPLAY_MODE=replay LLM_FIXTURES=llm_fixtures.jsonl   # serve it back without Gemini
+
+The layer sits on google.generativeai.GenerativeModel itself, so every caller
+goes through it without changes: the core's AsyncGeminiClient, the
+specialists' GeminiStreamingClients (sync streaming in executors), the
+gateway's IntentDetector and entry chatbot.
+
+Record mode appends one JSON line per successful call: the prompt hash, the
+response text and when each streamed chunk arrived. Replay mode serves the
+recording for the same model and prompt with the recorded timing - time to
+first chunk, then the gaps between chunks - scaled by LLM_REPLAY_SPEED.
+Prompts that were never recorded (they often embed timestamps or ids) get a
+recorded response picked deterministically from the hash, or a canned reply
+when the store is empty, so replay never calls out. Hand-written pattern
+fixtures - entries with a "match" substring instead of a key - answer any
+unrecorded prompt containing it, e.g. intent-detection JSON for a synthetic
+load test that has no recordings.
+
+Replay can also inject the failures load tests need: LLM_REPLAY_429_RATE of
+calls fail with ResourceExhausted (what the SDK raises on a 429), and
+LLM_REPLAY_TIMEOUT_RATE hang for LLM_REPLAY_TIMEOUT_S and then fail with
+DeadlineExceeded. Draws come from a generator seeded with LLM_REPLAY_SEED.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "record", "replay")
+
+# Replay of a prompt that was never recorded and an empty store
+_FALLBACK_TEXT = "Thank you for sharing that with me. Could you tell me a little more about how you have been feeling?"
+_FALLBACK_FIRST_CHUNK_MS = 400.0
+_FALLBACK_WORD_MS = 25.0
+_WORDS_PER_CHUNK = 4
+
+
+@dataclass
+class ReplayStats:
+    """Counters for the record/replay layer"""
+    recorded: int = 0
+    replayed: int = 0
+    misses: int = 0                # replayed without a recording of that prompt
+    injected_429s: int = 0
+    injected_timeouts: int = 0
+
+
+def prompt_text(contents: Any) -> str:
+    """Canonical text of generate_content's `contents` for hashing"""
+    if isinstance(contents, str):
+        return contents
+    return json.dumps(contents, default=str, sort_keys=True)
+
+
+def fixture_key(model_name: str, contents: Any) -> str:
+    return hashlib.sha256(f"{model_name}\n{prompt_text(contents)}".encode()).hexdigest()[:32]
+
+
+class FixtureStore:
+    """
+    Recorded calls as JSON lines, indexed by fixture key. A prompt recorded
+    several times is replayed round-robin over its recordings. Pattern
+    fixtures ("match" instead of "key") are kept apart and only answer
+    prompts without a recording.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, List[Dict[str, Any]]] = {}
+        self.patterns: Dict[str, List[Dict[str, Any]]] = {}
+        self._all: List[Dict[str, Any]] = []
+        self._turns: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, entry: Dict[str, Any]) -> None:
+        if entry.get("match"):
+            self.patterns.setdefault(entry["match"], []).append(entry)
+        else:
+            self.entries.setdefault(entry["key"], []).append(entry)
+            self._all.append(entry)
+
+    def load(self) -> int:
+        self.entries.clear()
+        self.patterns.clear()
+        self._all.clear()
+        if not os.path.exists(self.path):
+            return 0
+        loaded = 0
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    self._index(json.loads(line))
+                except (ValueError, KeyError):
+                    continue
+                loaded += 1
+        return loaded
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._index(entry)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def lookup(self, key: str, prompt: str = "") -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        (entry, exact): the recording of this prompt, else a stand-in picked
+        by the hash - among the first pattern the prompt contains, or among
+        all recordings
+        """
+        with self._lock:
+            recordings = self.entries.get(key)
+            if recordings:
+                turn = self._turns.get(key, 0)
+                self._turns[key] = turn + 1
+                return recordings[turn % len(recordings)], True
+            pool = next((entries for match, entries in self.patterns.items() if match in prompt), None) or self._all
+            if pool:
+                return pool[int(key, 16) % len(pool)], False
+        return None, False
+
+
+def _fallback_entry(key: str) -> Dict[str, Any]:
+    return {"key": key, "text": _FALLBACK_TEXT, "chunks": [], "first_chunk_ms": _FALLBACK_FIRST_CHUNK_MS,
+            "total_ms": _FALLBACK_FIRST_CHUNK_MS + _FALLBACK_WORD_MS * len(_FALLBACK_TEXT.split())}
+
+
+def replay_chunks(entry: Dict[str, Any]) -> List[Tuple[float, str]]:
+    """
+    (delay before the chunk in ms, text) pairs. Recordings of streamed calls
+    keep their chunks; others are split into a few words per chunk spread
+    evenly between the first chunk and the end of the call.
+    """
+    if entry.get("chunks"):
+        return [(float(delay), text) for delay, text in entry["chunks"]]
+    words = entry["text"].split(" ")
+    pieces = [" ".join(words[i:i + _WORDS_PER_CHUNK]) + " " for i in range(0, len(words), _WORDS_PER_CHUNK)]
+    pieces[-1] = pieces[-1][:-1]
+    first = float(entry.get("first_chunk_ms") or entry.get("total_ms") or 0)
+    gap = max(float(entry.get("total_ms") or first) - first, 0.0) / max(len(pieces) - 1, 1)
+    return [(first if i == 0 else gap, piece) for i, piece in enumerate(pieces)]
+
+
+class ReplayChunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class ReplayResponse:
+    """
+    Stand-in for (Async)GenerateContentResponse: .text and usage_metadata, and
+    chunk iteration - sync or async - with the recorded gaps when streamed.
+    """
+
+    def __init__(self, chunks: List[Tuple[float, str]], prompt_tokens: int, speed: float):
+        self._chunks = chunks
+        self._speed = speed
+        self.text = "".join(text for _, text in chunks)
+        self.prompt_feedback = None
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_tokens, candidates_token_count=max(len(self.text) // 4, 1)
+        )
+
+    def _gaps(self) -> Iterator[Tuple[float, ReplayChunk]]:
+        # The call itself waited for the first chunk
+        for i, (delay, text) in enumerate(self._chunks):
+            yield (0.0 if i == 0 else delay * self._speed / 1000), ReplayChunk(text)
+
+    def __iter__(self) -> Iterator[ReplayChunk]:
+        for gap, chunk in self._gaps():
+            if gap:
+                time.sleep(gap)
+            yield chunk
+
+    async def __aiter__(self):
+        for gap, chunk in self._gaps():
+            if gap:
+                await asyncio.sleep(gap)
+            yield chunk
+
+    def resolve(self) -> None:
+        pass
+
+
+class _RecordingStream:
+    """Passes a streamed response through, noting when each chunk arrives; saved once it is exhausted"""
+
+    def __init__(self, response: Any, started: float, on_done):
+        self._response = response
+        self._started = started
+        self._on_done = on_done
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._response, name)
+
+    def _note(self, chunks: List[List[Any]], last: List[float], chunk: Any) -> None:
+        now = time.perf_counter()
+        try:
+            text = chunk.text
+        except ValueError:
+            text = ""
+        chunks.append([round((now - last[0]) * 1000, 1), text])
+        last[0] = now
+
+    def __iter__(self):
+        chunks, last = [], [self._started]
+        for chunk in self._response:
+            self._note(chunks, last, chunk)
+            yield chunk
+        self._on_done(chunks, self._response)
+
+    async def __aiter__(self):
+        chunks, last = [], [self._started]
+        async for chunk in self._response:
+            self._note(chunks, last, chunk)
+            yield chunk
+        self._on_done(chunks, self._response)
+
+
+class LLMReplay:
+    """Wraps GenerativeModel.generate_content(_async) to record calls or serve recordings"""
+
+    def __init__(
+        self,
+        mode: str,
+        store: FixtureStore,
+        speed: float = 1.0,
+        rate_429: float = 0.0,
+        timeout_rate: float = 0.0,
+        timeout_s: float = 30.0,
+        seed: int = 0,
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"LLM replay mode must be 'record' or 'replay', not {mode!r}")
+        self.mode = mode
+        self.store = store
+        self.speed = speed
+        self.rate_429 = rate_429
+        self.timeout_rate = timeout_rate
+        self.timeout_s = timeout_s
+        self.stats = ReplayStats()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # -- record --------------------------------------------------------------
+    def _save(self, model: Any, contents: Any, stream: bool, started: float,
+              chunks: List[List[Any]], response: Any) -> None:
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        text = "".join(text for _, text in chunks)
+        usage = getattr(response, "usage_metadata", None)
+        self.store.append({
+            "key": fixture_key(model.model_name, contents),
+            "model": model.model_name,
+            "stream": stream,
+            "text": text,
+            "chunks": chunks if stream else [],
+            "first_chunk_ms": chunks[0][0] if stream and chunks else total_ms,
+            "total_ms": total_ms,
+            "prompt_tokens": getattr(usage, "prompt_token_count", None) or len(prompt_text(contents)) // 4,
+            "recorded_at": time.time(),
+        })
+        self.stats.recorded += 1
+
+    def _recorded(self, model: Any, contents: Any, stream: bool, started: float, response: Any) -> Any:
+        if stream:
+            return _RecordingStream(response, started, lambda chunks, resolved: self._save(
+                model, contents, True, started, chunks, resolved
+            ))
+        try:
+            text = response.text
+        except ValueError:
+            return response       # blocked or empty; nothing worth replaying
+        self._save(model, contents, False, started, [[0.0, text]], response)
+        return response
+
+    # -- replay --------------------------------------------------------------
+    def _fault(self) -> Optional[str]:
+        with self._lock:
+            draw = self._rng.random()
+        if draw < self.rate_429:
+            self.stats.injected_429s += 1
+            return "429"
+        if draw < self.rate_429 + self.timeout_rate:
+            self.stats.injected_timeouts += 1
+            return "timeout"
+        return None
+
+    def _replay(self, model: Any, contents: Any, stream: bool) -> Tuple[Optional[str], ReplayResponse, float]:
+        """(injected fault, response, seconds the call itself takes: until the first chunk when streamed)"""
+        key = fixture_key(model.model_name, contents)
+        entry, exact = self.store.lookup(key, prompt_text(contents))
+        if not exact:
+            self.stats.misses += 1
+        entry = entry or _fallback_entry(key)
+        self.stats.replayed += 1
+        chunks = replay_chunks(entry)
+        wait_ms = chunks[0][0] if stream else sum(delay for delay, _ in chunks)
+        response = ReplayResponse(chunks, len(prompt_text(contents)) // 4, self.speed if stream else 0.0)
+        return self._fault(), response, wait_ms * self.speed / 1000
+
+    @staticmethod
+    def _raise(fault: str) -> None:
+        from google.api_core import exceptions
+
+        if fault == "429":
+            raise exceptions.ResourceExhausted("429 Resource has been exhausted (e.g. check quota). [replayed]")
+        raise exceptions.DeadlineExceeded("504 Deadline Exceeded [replayed]")
+
+    def generate_content(self, original, model: Any, contents: Any, stream: bool, **kwargs) -> Any:
+        if self.mode == "record":
+            started = time.perf_counter()
+            return self._recorded(model, contents, stream, started, original(model, contents, stream=stream, **kwargs))
+        fault, response, wait = self._replay(model, contents, stream)
+        if fault:
+            time.sleep(self.timeout_s if fault == "timeout" else 0.05 * self.speed)
+            self._raise(fault)
+        time.sleep(wait)
+        return response
+
+    async def generate_content_async(self, original, model: Any, contents: Any, stream: bool, **kwargs) -> Any:
+        if self.mode == "record":
+            started = time.perf_counter()
+            response = await original(model, contents, stream=stream, **kwargs)
+            return self._recorded(model, contents, stream, started, response)
+        fault, response, wait = self._replay(model, contents, stream)
+        if fault:
+            await asyncio.sleep(self.timeout_s if fault == "timeout" else 0.05 * self.speed)
+            self._raise(fault)
+        await asyncio.sleep(wait)
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        data = asdict(self.stats)
+        data.update(mode=self.mode, fixtures=self.store.path)
+        return data
+
+
+_replay: Optional[LLMReplay] = None
+_originals: Dict[str, Any] = {}
+
+
+def _install(replay: LLMReplay) -> None:
+    from google.generativeai import GenerativeModel
+
+    if not _originals:
+        _originals["sync"] = GenerativeModel.generate_content
+        _originals["async"] = GenerativeModel.generate_content_async
+    sync_original, async_original = _originals["sync"], _originals["async"]
+
+    def generate_content(self, contents, *, stream: bool = False, **kwargs):
+        return replay.generate_content(sync_original, self, contents, stream, **kwargs)
+
+    async def generate_content_async(self, contents, *, stream: bool = False, **kwargs):
+        return await replay.generate_content_async(async_original, self, contents, stream, **kwargs)
+
+    GenerativeModel.generate_content = generate_content
+    GenerativeModel.generate_content_async = generate_content_async
+
+
+def _uninstall() -> None:
+    if _originals:
+        from google.generativeai import GenerativeModel
+
+        GenerativeModel.generate_content = _originals.pop("sync")
+        GenerativeModel.generate_content_async = _originals.pop("async")
+
+
+def _settings_from_env() -> Dict[str, Any]:
+    try:
+        from common.config import get_settings
+        settings = get_settings()
+        return {name: getattr(settings, name) for name in (
+            "LLM_REPLAY_MODE", "LLM_FIXTURES", "LLM_REPLAY_SPEED", "LLM_REPLAY_429_RATE",
+            "LLM_REPLAY_TIMEOUT_RATE", "LLM_REPLAY_TIMEOUT_S", "LLM_REPLAY_SEED",
+        )}
+    except Exception:
+        return {
+            "LLM_REPLAY_MODE": os.getenv("LLM_REPLAY_MODE", "off"),
+            "LLM_FIXTURES": os.getenv("LLM_FIXTURES", "llm_fixtures.jsonl"),
+            "LLM_REPLAY_SPEED": float(os.getenv("LLM_REPLAY_SPEED", 1.0)),
+            "LLM_REPLAY_429_RATE": float(os.getenv("LLM_REPLAY_429_RATE", 0.0)),
+            "LLM_REPLAY_TIMEOUT_RATE": float(os.getenv("LLM_REPLAY_TIMEOUT_RATE", 0.0)),
+            "LLM_REPLAY_TIMEOUT_S": float(os.getenv("LLM_REPLAY_TIMEOUT_S", 30.0)),
+            "LLM_REPLAY_SEED": int(os.getenv("LLM_REPLAY_SEED", 0)),
+        }
+
+
+def configure_llm_replay(mode: Optional[str] = None, fixtures: Optional[str] = None, **options) -> Optional[LLMReplay]:
+    """
+    Install record/replay as configured (LLM_REPLAY_* settings), or with the
+    given mode and fixture file. "off" restores the real SDK. Call once at
+    startup; options (speed, rate_429, timeout_rate, timeout_s, seed)
+    override the settings.
+    """
+    global _replay
+    settings = _settings_from_env()
+    mode = (mode or settings["LLM_REPLAY_MODE"] or "off").lower()
+    if mode not in MODES:
+        raise ValueError(f"LLM_REPLAY_MODE must be one of {', '.join(MODES)}, not {mode!r}")
+
+    _uninstall()
+    _replay = None
+    if mode == "off":
+        return None
+
+    store = FixtureStore(fixtures or settings["LLM_FIXTURES"])
+    loaded = store.load()
+    config = {
+        "speed": settings["LLM_REPLAY_SPEED"],
+        "rate_429": settings["LLM_REPLAY_429_RATE"],
+        "timeout_rate": settings["LLM_REPLAY_TIMEOUT_RATE"],
+        "timeout_s": settings["LLM_REPLAY_TIMEOUT_S"],
+        "seed": settings["LLM_REPLAY_SEED"],
+    }
+    config.update(options)
+    _replay = LLMReplay(mode, store, **config)
+    _install(_replay)
+    if mode == "record":
+        logger.warning(f"⚠️ Recording Gemini calls to {store.path} ({loaded} already recorded)")
+    else:
+        if not loaded:
+            logger.warning(f"⚠️ No recorded Gemini calls in {store.path}; replaying a canned response")
+        logger.warning(f"⚠️ Replaying Gemini from {store.path} ({loaded} calls) - no requests reach Gemini")
+    return _replay
+
+
+def get_llm_replay() -> Optional[LLMReplay]:
+    return _replay
+
+
+def get_llm_replay_stats() -> Optional[Dict[str, Any]]:
+    return _replay.get_stats() if _replay else None
@@ -0,0 +1,519 @@
+# common/metrics.py
+"""
+Process-wide latency histograms and counters in the Prometheus text format.
+
+Durations are recorded in milliseconds, like TimingMetrics and the stats on
+/health, into HDR-style histograms: log-spaced buckets with a constant
+relative error (PRECISION), so p99 and p999 stay accurate from sub-millisecond
+Redis reads to multi-second LLM calls in a few hundred sparse counters.
+/metrics renders each histogram twice:
+
+- as a Prometheus histogram (`<name>` in seconds, on the BUCKETS_MS ladder)
+  for histogram_quantile() across the fleet;
+- as a summary (`<name>_hdr`) with this process's quantiles at full precision.
+
+Counters kept elsewhere (cache hit/miss, breaker state) are not duplicated
+on the hot path; collectors read them when /metrics is scraped.
+
+Families the services share:
+
+    turn_stage_seconds{stage, agent, plan}      pipeline stages of a turn
+    datastore_operation_seconds{store, op}      Redis / MongoDB operations
+    datastore_errors_total{store, op}
+    cache_requests_total{cache, namespace, result}
+    event_loop_lag_seconds                      scheduling delay of the loop
+    cache_entries{cache, name}                  size of in-process caches (leak hunting)
+    process_resident_memory_bytes, python_allocated_blocks, asyncio_tasks
+
+Datastore latency is recorded by wrapping clients in TimedRedis /
+TimedMongoDatabase (the breaker-guarded clients of common.resilience record
+it too). Like every in-process stat here, metrics are per worker process.
+"""
+
+import asyncio
+import inspect
+import logging
+import math
+import os
+import sys
+import time
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from common.tracing import CLIENT, detached_span
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+PRECISION = 0.02                   # relative width of a histogram bucket
+LOWEST_MS = 0.01                   # values below share the first bucket
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+QUANTILES = (0.5, 0.9, 0.95, 0.99, 0.999)
+DEFAULT_LOOP_LAG_INTERVAL = 0.5
+
+_LOG_BASE = math.log1p(PRECISION)
+
+
+class Histogram:
+    """Log-bucketed histogram of milliseconds with a constant relative error"""
+    __slots__ = ("_counts", "count", "sum", "min", "max")
+
+    def __init__(self):
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    @staticmethod
+    def _index(value: float) -> int:
+        if value <= LOWEST_MS:
+            return 0
+        return math.ceil(math.log(value / LOWEST_MS) / _LOG_BASE)
+
+    @staticmethod
+    def _upper(index: int) -> float:
+        return LOWEST_MS * (1 + PRECISION) ** index
+
+    def observe(self, value: float) -> None:
+        value = max(value, 0.0)
+        index = self._index(value)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Value at percentile p (0-100), within PRECISION; None when empty"""
+        if not self.count:
+            return None
+        rank = max(math.ceil(self.count * p / 100), 1)
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= rank:
+                return min(self._upper(index), self.max)
+        return self.max
+
+    def cumulative(self, bounds: Iterable[float]) -> List[int]:
+        """Number of values at or below each bound (ascending), at bucket resolution"""
+        indexes = sorted(self._counts)
+        counts, seen, i = [], 0, 0
+        for bound in bounds:
+            # A bucket straddling the bound counts as below it (overcounts by < PRECISION)
+            while i < len(indexes) and self._upper(indexes[i] - 1) < bound:
+                seen += self._counts[indexes[i]]
+                i += 1
+            counts.append(seen)
+        return counts
+
+    def snapshot(self) -> Dict[str, float]:
+        data = {"count": self.count, "avg_ms": round(self.sum / self.count, 2) if self.count else 0.0}
+        for p in (50, 95, 99):
+            value = self.percentile(p)
+            data[f"p{p}_ms"] = round(value, 2) if value is not None else None
+        data["max_ms"] = round(self.max, 2)
+        return data
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+@dataclass(frozen=True)
+class Sample:
+    """One series produced by a collector at scrape time"""
+    name: str
+    kind: str                      # "counter" or "gauge"
+    help: str
+    labels: Tuple[Tuple[str, str], ...]
+    value: float
+
+
+class Family:
+    """A metric and its labelled children"""
+
+    def __init__(self, name: str, kind: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.label_names = labels
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs.get(name, "") for name in self.label_names)
+        key = tuple("" if v is None else str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = Histogram() if self.kind == "histogram" else _Value()
+        return child
+
+    def children(self) -> Iterator[Tuple[Tuple[Tuple[str, str], ...], object]]:
+        for key, child in self._children.items():
+            yield tuple(zip(self.label_names, key)), child
+
+
+Collector = Callable[[], Iterable[Sample]]
+
+
+class MetricsRegistry:
+    """Metric families of this process plus scrape-time collectors"""
+
+    def __init__(self):
+        self._families: Dict[str, Family] = {}
+        self._collectors: Dict[str, Collector] = {}
+
+    def _family(self, name: str, kind: str, help: str, labels: Iterable[str]) -> Family:
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = Family(name, kind, help, tuple(labels))
+        elif family.kind != kind:
+            raise ValueError(f"Metric {name} is a {family.kind}, not a {kind}")
+        return family
+
+    def histogram(self, name: str, help: str, labels: Iterable[str] = ()) -> Family:
+        """Durations in ms, exposed in seconds (name them *_seconds)"""
+        return self._family(name, "histogram", help, labels)
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Family:
+        return self._family(name, "counter", help, labels)
+
+    def gauge(self, name: str, help: str, labels: Iterable[str] = ()) -> Family:
+        return self._family(name, "gauge", help, labels)
+
+    def register_collector(self, name: str, collector: Collector) -> None:
+        """Add (or replace) a named collector called on every scrape"""
+        self._collectors[name] = collector
+
+    def get_histogram_stats(self, name: str) -> Dict[str, Dict[str, float]]:
+        """Percentiles of every child of a histogram family, keyed by its label values"""
+        family = self._families.get(name)
+        if family is None:
+            return {}
+        return {"/".join(v for _, v in labels) or "all": child.snapshot() for labels, child in family.children()}
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self._families.values():
+            if family.kind == "histogram":
+                _render_histogram(family, lines)
+            else:
+                lines.append(f"# HELP {family.name} {family.help}")
+                lines.append(f"# TYPE {family.name} {family.kind}")
+                for labels, child in family.children():
+                    lines.append(f"{family.name}{_labels(labels)} {_number(child.value)}")
+
+        samples: Dict[str, List[Sample]] = {}
+        for name, collector in list(self._collectors.items()):
+            try:
+                for sample in collector():
+                    samples.setdefault(sample.name, []).append(sample)
+            except Exception as e:
+                logger.warning(f"⚠️ Metrics collector {name} failed: {e}")
+        for name, group in samples.items():
+            lines.append(f"# HELP {name} {group[0].help}")
+            lines.append(f"# TYPE {name} {group[0].kind}")
+            for sample in group:
+                lines.append(f"{name}{_labels(sample.labels)} {_number(sample.value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Iterable[Tuple[str, str]]) -> str:
+    inner = ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return f"{{{inner}}}" if inner else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _render_histogram(family: Family, lines: List[str]) -> None:
+    name = family.name
+    lines.append(f"# HELP {name} {family.help}")
+    lines.append(f"# TYPE {name} histogram")
+    children = list(family.children())
+    for labels, hist in children:
+        for bound, count in zip(BUCKETS_MS, hist.cumulative(BUCKETS_MS)):
+            lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound / 1000)),))} {count}")
+        lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {hist.count}")
+        lines.append(f"{name}_sum{_labels(labels)} {_number(hist.sum / 1000)}")
+        lines.append(f"{name}_count{_labels(labels)} {hist.count}")
+
+    lines.append(f"# HELP {name}_hdr {family.help} (quantiles of this process)")
+    lines.append(f"# TYPE {name}_hdr summary")
+    for labels, hist in children:
+        for q in QUANTILES:
+            value = hist.percentile(q * 100)
+            if value is not None:
+                lines.append(f"{name}_hdr{_labels(labels + (('quantile', str(q)),))} {_number(value / 1000)}")
+        lines.append(f"{name}_hdr_sum{_labels(labels)} {_number(hist.sum / 1000)}")
+        lines.append(f"{name}_hdr_count{_labels(labels)} {hist.count}")
+
+
+# ---------------------------------------------------------------------------
+# Shared families
+# ---------------------------------------------------------------------------
+_registry = MetricsRegistry()
+
+TURN_STAGES = _registry.histogram(
+    "turn_stage_seconds", "Duration of each pipeline stage of a turn", ("stage", "agent", "plan")
+)
+DATASTORE_OPS = _registry.histogram(
+    "datastore_operation_seconds", "Latency of Redis and MongoDB operations", ("store", "op")
+)
+DATASTORE_ERRORS = _registry.counter(
+    "datastore_errors_total", "Failed Redis and MongoDB operations", ("store", "op")
+)
+LOOP_LAG = _registry.histogram("event_loop_lag_seconds", "How late the event loop ran a timer")
+
+
+def get_registry() -> MetricsRegistry:
+    """Get the process-wide metrics registry - SINGLETON"""
+    return _registry
+
+
+def render_metrics() -> str:
+    """The registry in the Prometheus text format, for /metrics"""
+    return _registry.render()
+
+
+def observe_stage(stage: str, duration_ms: float, agent: Optional[str] = None, plan: Optional[str] = None) -> None:
+    TURN_STAGES.labels(stage, agent or "unknown", plan or "unknown").observe(duration_ms)
+
+
+def observe_datastore(store: str, op: str, duration_ms: float, failed: bool = False) -> None:
+    DATASTORE_OPS.labels(store, op).observe(duration_ms)
+    if failed:
+        DATASTORE_ERRORS.labels(store, op).inc()
+
+
+@contextmanager
+def track_datastore(store: str, op: str) -> Iterator[None]:
+    """Time a Redis/MongoDB operation: `with track_datastore("redis", "get"): await ...`; also a span of the current trace"""
+    started = time.perf_counter()
+    failed = False
+    system = "mongodb" if "mongo" in store else "redis"
+    try:
+        with detached_span(f"{store} {op}", CLIENT, {"db.system": system, "db.operation": op}):
+            yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        observe_datastore(store, op, (time.perf_counter() - started) * 1000, failed)
+
+
+async def timed(awaitable: Awaitable[T], store: str, op: str) -> T:
+    with track_datastore(store, op):
+        return await awaitable
+
+
+MONGO_OPERATIONS = frozenset({
+    "find_one", "find", "count_documents", "aggregate", "insert_one", "insert_many",
+    "update_one", "update_many", "replace_one", "delete_one", "delete_many", "bulk_write",
+    "find_one_and_update",
+})
+
+
+class TimedRedis:
+    """redis.asyncio client recording the latency of every command under `store`"""
+    __slots__ = ("_redis", "_store")
+
+    def __init__(self, redis, store: str = "redis"):
+        self._redis = redis
+        self._store = store
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._redis, name)
+        if not callable(attr):
+            return attr
+        store = self._store
+
+        def command(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if not inspect.isawaitable(result):
+                return result   # pipelines, pubsub, locks
+            return timed(result, store, name)
+        return command
+
+
+class _TimedCollection:
+    __slots__ = ("_collection", "_store")
+
+    def __init__(self, collection, store: str):
+        self._collection = collection
+        self._store = store
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._collection, name)
+        if name not in MONGO_OPERATIONS:
+            return attr
+
+        def operation(*args, **kwargs):
+            # find() and aggregate() return lazy cursors: only issuing the query is timed
+            with track_datastore(self._store, name):
+                return attr(*args, **kwargs)
+        return operation
+
+
+class TimedMongoDatabase:
+    """pymongo Database whose collection operations record their latency under `store`"""
+    __slots__ = ("_db", "_store")
+
+    def __init__(self, db, store: str = "mongo"):
+        self._db = db
+        self._store = store
+
+    def __getitem__(self, name: str) -> _TimedCollection:
+        return _TimedCollection(self._db[name], self._store)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._db, name)
+        # Attribute access yields collections, but also the database's own methods
+        return _TimedCollection(attr, self._store) if hasattr(attr, "find_one") else attr
+
+
+def cache_samples(cache: str, stats: Dict[str, Dict[str, float]], results: Dict[str, str]) -> Iterator[Sample]:
+    """
+    cache_requests_total samples from per-namespace stats dicts, e.g. a
+    LocalTier's get_stats(); `results` maps a stats field to a result label
+    """
+    for namespace, counters in stats.items():
+        for field, result in results.items():
+            if field in counters:
+                yield Sample(
+                    "cache_requests_total",
+                    "counter",
+                    "Cache lookups by result",
+                    (("cache", cache), ("namespace", namespace), ("result", result)),
+                    counters[field],
+                )
+
+
+# ---------------------------------------------------------------------------
+# Cache sizes and process memory
+# ---------------------------------------------------------------------------
+_owners: Dict[str, Tuple["weakref.WeakSet", Tuple[str, ...]]] = {}
+
+
+def register_cache_sizes(cache: str, sizes: Callable[[], Dict[str, int]]) -> None:
+    """Expose the entry counts returned by `sizes` as cache_entries{cache, name} on every scrape"""
+    _registry.register_collector(f"cache_entries:{cache}", lambda: (
+        Sample("cache_entries", "gauge", "Entries held by in-process caches", (("cache", cache), ("name", name)), size)
+        for name, size in sizes().items()
+    ))
+
+
+def track_cache_sizes(cache: str, owner: Any, attrs: Iterable[str]) -> None:
+    """
+    Count the sized attributes of every live `owner` registered under
+    `cache` - for caches held per instance (data managers, agents), which are
+    summed - and how many owners are alive (cache_owners{cache})
+    """
+    owners, _ = _owners.get(cache) or (weakref.WeakSet(), ())
+    owners.add(owner)
+    _owners[cache] = (owners, tuple(attrs))
+    register_cache_sizes(cache, lambda: {
+        attr: sum(len(getattr(o, attr, ())) for o in list(owners)) for attr in _owners[cache][1]
+    })
+
+
+def _process_samples() -> Iterator[Sample]:
+    for cache, (owners, _) in list(_owners.items()):
+        yield Sample("cache_owners", "gauge", "Live objects holding a tracked cache", (("cache", cache),), len(owners))
+    try:
+        with open("/proc/self/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        yield Sample("process_resident_memory_bytes", "gauge", "Resident set size", (), rss)
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # No /proc (macOS): only the peak is available, in bytes there (KiB on Linux)
+        yield Sample("process_max_resident_memory_bytes", "gauge", "Peak resident set size", (), peak)
+    yield Sample("python_allocated_blocks", "gauge", "Memory blocks allocated by the interpreter", (), sys.getallocatedblocks())
+    try:
+        tasks = len(asyncio.all_tasks())
+    except RuntimeError:
+        return
+    yield Sample("asyncio_tasks", "gauge", "Pending asyncio tasks on the loop serving the scrape", (), tasks)
+
+
+_registry.register_collector("process", _process_samples)
+
+
+# ---------------------------------------------------------------------------
+# Event-loop lag
+# ---------------------------------------------------------------------------
+_lag_monitors: Dict[int, asyncio.Task] = {}
+
+
+async def _monitor_loop_lag(interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    lag = LOOP_LAG.labels()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag.observe(max(loop.time() - started - interval, 0.0) * 1000)
+
+
+def _load_loop_lag_interval() -> float:
+    """Read the sampling interval from common settings, falling back to env/defaults when GEMINI_API_KEY is absent"""
+    try:
+        from common.config import get_settings
+        return get_settings().METRICS_LOOP_LAG_INTERVAL
+    except Exception:
+        return float(os.getenv("METRICS_LOOP_LAG_INTERVAL", DEFAULT_LOOP_LAG_INTERVAL))
+
+
+def start_loop_lag_monitor(interval: Optional[float] = None) -> Optional[asyncio.Task]:
+    """Sample the running loop's lag every `interval` seconds (once per loop; 0 disables)"""
+    interval = _load_loop_lag_interval() if interval is None else interval
+    if interval <= 0:
+        return None
+    loop = asyncio.get_running_loop()
+    task = _lag_monitors.get(id(loop))
+    if task is None or task.done():
+        task = _lag_monitors[id(loop)] = loop.create_task(_monitor_loop_lag(interval))
+    return task
+
+
+def stop_loop_lag_monitor() -> None:
+    task = _lag_monitors.pop(id(asyncio.get_running_loop()), None)
+    if task is not None:
+        task.cancel()
+
+
+# ---------------------------------------------------------------------------
+# Server-Timing
+# ---------------------------------------------------------------------------
+def server_timing(durations: Dict[str, float], total: Optional[str] = None) -> str:
+    """
+    Server-Timing header value with one entry per measured step (ms), e.g.
+    "total;dur=412.5, state_initialization;dur=3.1, primary_service;dur=380.2";
+    the step named `total` comes first, reported as "total"
+    """
+    entries = [("total", durations[total])] if total in durations else []
+    entries += [(name, duration) for name, duration in durations.items() if name != total]
+    return ", ".join(f"{name};dur={duration:.1f}" for name, duration in entries)
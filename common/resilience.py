@@ -0,0 +1,433 @@
+# common/resilience.py
+"""
+Failure handling for calls between services and to their stores.
+
+- CircuitBreaker: per-endpoint breaker over a rolling window of calls. It
+  opens when the failure rate or the slow-call rate crosses its threshold,
+  rejects calls while open (CircuitOpenError, raised before any I/O), lets a
+  few probes through once `open_for` has elapsed (half-open) and closes again
+  when they succeed. Every transition is logged, counted and passed to the
+  listeners registered with on_transition().
+- RetryBudget: retries are paid for with tokens earned by first attempts
+  (`ratio` per request, plus a small floor per second), so retries add at
+  most ~ratio extra load however many callers see the same outage.
+- hedged(): for idempotent reads, start a second attempt when the first has
+  not answered after `delay` (typically the endpoint's p95) and take whichever
+  answers first.
+- GuardedRedis / GuardedMongoDatabase: proxies that route a client's calls
+  through a breaker, for code that talks to the stores directly. They record
+  each operation's latency in common.metrics under the breaker's name.
+
+Breakers and budgets are process-wide, keyed by name (get_breaker,
+get_retry_budget). Like the other helpers in common they take no locks:
+every operation runs to completion between two awaits.
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from common.metrics import MONGO_OPERATIONS, Sample, get_registry, timed, track_datastore
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_WINDOW = 20
+DEFAULT_MIN_CALLS = 5
+DEFAULT_FAILURE_RATE = 0.5
+DEFAULT_SLOW_CALL_RATE = 0.8
+DEFAULT_OPEN_FOR = 10.0
+DEFAULT_HALF_OPEN_CALLS = 2
+LATENCY_SAMPLES = 200
+
+
+class CircuitOpenError(Exception):
+    """The breaker is open; the call was not attempted"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit {name} is open, retry in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+@dataclass
+class BreakerStats:
+    """Counters for one breaker"""
+    calls: int = 0
+    failures: int = 0
+    slow_calls: int = 0
+    rejected: int = 0
+    opened: int = 0
+    half_opened: int = 0
+    closed: int = 0
+
+
+# (breaker name, old state, new state) -> None
+TransitionListener = Callable[[str, str, str], None]
+_transition_listeners: List[TransitionListener] = []
+
+
+def on_transition(listener: TransitionListener) -> None:
+    """Call `listener` on every state change of every breaker"""
+    _transition_listeners.append(listener)
+
+
+class CircuitBreaker:
+    """Failure-rate and latency based circuit breaker for one endpoint"""
+
+    def __init__(
+        self,
+        name: str,
+        window: int = DEFAULT_WINDOW,
+        min_calls: int = DEFAULT_MIN_CALLS,
+        failure_rate: float = DEFAULT_FAILURE_RATE,
+        slow_call_ms: Optional[float] = None,
+        slow_call_rate: float = DEFAULT_SLOW_CALL_RATE,
+        open_for: float = DEFAULT_OPEN_FOR,
+        half_open_calls: int = DEFAULT_HALF_OPEN_CALLS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_ms = slow_call_ms
+        self.slow_call_rate = slow_call_rate
+        self.open_for = open_for
+        self.half_open_calls = half_open_calls
+        self.stats = BreakerStats()
+
+        self._clock = clock
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._outcomes: deque = deque(maxlen=window)          # (failed, slow) of recent calls
+        self._latencies: deque = deque(maxlen=LATENCY_SAMPLES)  # ms of recent successful calls
+        self._probes = 0              # half-open calls in flight
+        self._probe_successes = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_for:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now; counts it as a probe when half-open"""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and self._probes < self.half_open_calls:
+            self._probes += 1
+            return True
+        self.stats.rejected += 1
+        return False
+
+    def retry_in(self) -> float:
+        return max(self.open_for - (self._clock() - self._opened_at), 0.0) if self._state == OPEN else 0.0
+
+    def record_success(self, latency_ms: float) -> None:
+        self.stats.calls += 1
+        slow = self.slow_call_ms is not None and latency_ms >= self.slow_call_ms
+        if slow:
+            self.stats.slow_calls += 1
+        self._latencies.append(latency_ms)
+        self._record(False, slow)
+
+    def record_failure(self) -> None:
+        self.stats.calls += 1
+        self.stats.failures += 1
+        self._record(True, False)
+
+    def _record(self, failed: bool, slow: bool) -> None:
+        if self._state == HALF_OPEN:
+            self._probes = max(self._probes - 1, 0)
+            if failed or slow:
+                self._open()
+            else:
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    self._transition(CLOSED)
+            return
+        if self._state == OPEN:
+            return   # a call admitted before the breaker opened
+
+        self._outcomes.append((failed, slow))
+        if len(self._outcomes) < self.min_calls:
+            return
+        failures = sum(1 for f, _ in self._outcomes if f)
+        slow_calls = sum(1 for _, s in self._outcomes if s)
+        if failures / len(self._outcomes) >= self.failure_rate or slow_calls / len(self._outcomes) >= self.slow_call_rate:
+            self._open()
+
+    def _open(self) -> None:
+        self._opened_at = self._clock()
+        self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        old, self._state = self._state, state
+        self._probes = 0
+        self._probe_successes = 0
+        if state == OPEN:
+            self.stats.opened += 1
+            logger.warning(f"⚠️ Circuit {self.name} opened for {self.open_for:.0f}s")
+        elif state == HALF_OPEN:
+            self.stats.half_opened += 1
+            logger.info(f"Circuit {self.name} half-open, probing")
+        else:
+            self.stats.closed += 1
+            self._outcomes.clear()
+            logger.info(f"✅ Circuit {self.name} closed")
+        for listener in _transition_listeners:
+            try:
+                listener(self.name, old, state)
+            except Exception as e:
+                logger.error(f"❌ Circuit transition listener failed: {e}")
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Latency (ms) of recent successful calls at `percentile`, or None before there are enough"""
+        if len(self._latencies) < self.min_calls:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(int(len(ordered) * percentile / 100), len(ordered) - 1)]
+
+    @contextmanager
+    def guard(self, is_failure: Callable[[BaseException], bool] = lambda e: True) -> Iterator[None]:
+        """Run the enclosed call under the breaker; raises CircuitOpenError instead of calling"""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_in())
+        started = time.perf_counter()
+        try:
+            yield
+        except asyncio.CancelledError:
+            if self._state == HALF_OPEN:
+                self._probes = max(self._probes - 1, 0)
+            raise
+        except Exception as e:
+            if is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success((time.perf_counter() - started) * 1000)
+            raise
+        self.record_success((time.perf_counter() - started) * 1000)
+
+    async def call(self, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        with self.guard():
+            return await fn(*args, **kwargs)
+
+    def call_sync(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        with self.guard():
+            return fn(*args, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        data = asdict(self.stats)
+        data["state"] = self.state
+        p95 = self.latency_percentile(95)
+        data["p95_ms"] = round(p95, 1) if p95 is not None else None
+        return data
+
+
+@dataclass
+class RetryBudgetStats:
+    requests: int = 0
+    retries: int = 0
+    exhausted: int = 0              # retries refused for lack of budget
+
+
+class RetryBudget:
+    """Token bucket that retries draw from and first attempts refill"""
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, max_tokens: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.stats = RetryBudgetStats()
+        self._clock = clock
+        self._tokens = max_tokens
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def record_request(self) -> None:
+        self.stats.requests += 1
+        self._refill()
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_retry(self) -> bool:
+        """Take a token for one retry; False when the budget is spent"""
+        self._refill()
+        if self._tokens < 1.0:
+            self.stats.exhausted += 1
+            return False
+        self._tokens -= 1.0
+        self.stats.retries += 1
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        self._refill()
+        data = asdict(self.stats)
+        data["tokens"] = round(self._tokens, 2)
+        return data
+
+
+async def hedged(fn: Callable[[], Awaitable[T]], delay: Optional[float]) -> T:
+    """
+    Await fn(); if it has not finished after `delay` seconds, start a second
+    fn() and return whichever succeeds first. Only for idempotent reads.
+    """
+    first = asyncio.ensure_future(fn())
+    if delay is None:
+        return await first
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result()
+
+    second = asyncio.ensure_future(fn())
+    pending = {first, second}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+# ---------------------------------------------------------------------------
+# Guarded store clients
+# ---------------------------------------------------------------------------
+REDIS_READS = frozenset({"get", "mget", "exists", "ttl", "hget", "hgetall", "smembers", "lrange", "xrange"})
+
+
+class GuardedRedis:
+    """redis.asyncio client whose commands go through a breaker; reads are hedged after the p95"""
+    __slots__ = ("_redis", "_breaker")
+
+    def __init__(self, redis, breaker: CircuitBreaker):
+        self._redis = redis
+        self._breaker = breaker
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._redis, name)
+        if not callable(attr):
+            return attr
+        breaker = self._breaker
+
+        def command(*args, **kwargs):
+            if name in REDIS_READS:
+                p95 = breaker.latency_percentile(95)
+                return breaker.call(hedged, lambda: timed(attr(*args, **kwargs), breaker.name, name), p95 / 1000 if p95 else None)
+            result = attr(*args, **kwargs)
+            if not inspect.isawaitable(result):
+                return result   # pipelines, pubsub, locks
+            return breaker.call(lambda: timed(result, breaker.name, name))
+        return command
+
+
+class _GuardedCollection:
+    __slots__ = ("_collection", "_breaker")
+
+    def __init__(self, collection, breaker: CircuitBreaker):
+        self._collection = collection
+        self._breaker = breaker
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._collection, name)
+        if name not in MONGO_OPERATIONS:
+            return attr
+        store = self._breaker.name
+
+        def operation(*args, **kwargs):
+            with track_datastore(store, name):
+                return attr(*args, **kwargs)
+        return lambda *args, **kwargs: self._breaker.call_sync(operation, *args, **kwargs)
+
+
+class GuardedMongoDatabase:
+    """pymongo Database whose collection operations go through a breaker"""
+    __slots__ = ("_db", "_breaker")
+
+    def __init__(self, db, breaker: CircuitBreaker):
+        self._db = db
+        self._breaker = breaker
+
+    def __getitem__(self, name: str) -> _GuardedCollection:
+        return _GuardedCollection(self._db[name], self._breaker)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._db, name)
+        # Attribute access yields collections, but also the database's own methods
+        return _GuardedCollection(attr, self._breaker) if hasattr(attr, "find_one") else attr
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+_breakers: Dict[str, CircuitBreaker] = {}
+_budgets: Dict[str, RetryBudget] = {}
+
+
+def get_breaker(name: str, **options) -> CircuitBreaker:
+    """Get or create the named breaker; `options` only apply on creation"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name, **options)
+    return breaker
+
+
+def get_retry_budget(name: str, **options) -> RetryBudget:
+    """Get or create the named retry budget; `options` only apply on creation"""
+    budget = _budgets.get(name)
+    if budget is None:
+        budget = _budgets[name] = RetryBudget(**options)
+    return budget
+
+
+def guard_redis(redis, name: str = "redis") -> Optional[GuardedRedis]:
+    return GuardedRedis(redis, get_breaker(name)) if redis is not None else None
+
+
+def guard_mongo(db, name: str = "mongo") -> Optional[GuardedMongoDatabase]:
+    return GuardedMongoDatabase(db, get_breaker(name)) if db is not None else None
+
+
+def get_resilience_stats() -> Dict[str, Any]:
+    return {
+        "breakers": {name: breaker.get_stats() for name, breaker in _breakers.items()},
+        "retry_budgets": {name: budget.get_stats() for name, budget in _budgets.items()},
+    }
+
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def _metric_samples() -> Iterator[Sample]:
+    for name, breaker in _breakers.items():
+        labels = (("name", name),)
+        yield Sample("circuit_breaker_state", "gauge", "Breaker state (0 closed, 1 half-open, 2 open)",
+                     labels, _STATE_VALUES[breaker.state])
+        yield Sample("circuit_breaker_rejected_total", "counter", "Calls rejected by an open breaker",
+                     labels, breaker.stats.rejected)
+    for name, budget in _budgets.items():
+        yield Sample("retry_budget_exhausted_total", "counter", "Retries refused for lack of budget",
+                     (("name", name),), budget.stats.exhausted)
+
+
+get_registry().register_collector("resilience", _metric_samples)
@@ -0,0 +1,199 @@
+# common/single_flight.py
+"""
+Single-flight coalescing of identical in-flight work.
+
+When a client retries or a turn is double-posted, the same prompt or the same
+state load runs twice concurrently. A SingleFlight group lets concurrent
+callers with the same key await one underlying coroutine: the first caller
+starts it, later callers attach to it, and everyone gets the same result or
+exception.
+
+Coalescing is per process. With a Redis URL, a group can additionally take a
+short Redis lock per key so that only one worker runs the work at a time;
+workers that lose the race wait for the lock to clear and then run the work
+themselves (by which time it is typically served from a cache the winner
+populated). The lock fails open: if Redis is unreachable or the lock is not
+released in time the work simply runs.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+LOCK_PREFIX = "singleflight"
+DEFAULT_LOCK_TTL = 5.0
+LOCK_POLL_INTERVAL = 0.02
+REDIS_RETRY_AFTER = 30.0
+
+# Compare-and-delete so a worker never releases a lock that expired and was re-taken
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass
+class SingleFlightStats:
+    """Counters for one group"""
+    calls: int = 0
+    executions: int = 0
+    coalesced: int = 0
+    errors: int = 0
+    lock_waits: int = 0
+    lock_errors: int = 0
+
+
+class SingleFlight:
+    """A named group of keyed in-flight coroutines"""
+
+    def __init__(self, name: str, redis_url: Optional[str] = None, lock_ttl: float = DEFAULT_LOCK_TTL):
+        self.name = name
+        self.redis_url = redis_url
+        self.lock_ttl = lock_ttl
+        self.stats = SingleFlightStats()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self._redis = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis_down_until = 0.0
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def is_in_flight(self, key: str) -> bool:
+        """True when a call to do(key, ...) would attach to existing work"""
+        task = self._inflight.get(key)
+        return task is not None and task.get_loop() is asyncio.get_running_loop()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn() unless an identical call (same key) is already in flight, in
+        which case wait for that one instead.
+
+        The shared task is shielded: a caller that is cancelled or times out
+        does not cancel the work for the others.
+        """
+        self.stats.calls += 1
+        if self.is_in_flight(key):
+            self.stats.coalesced += 1
+            return await asyncio.shield(self._inflight[key])
+
+        self.stats.executions += 1
+        task = asyncio.ensure_future(self._run(key, fn))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t, key=key: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.stats.errors += 1
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        if not self.redis_url:
+            return await fn()
+
+        token = await self._acquire_lock(key)
+        try:
+            return await fn()
+        finally:
+            if token is not None:
+                await self._release_lock(key, token)
+
+    # ------------------------------------------------------------------
+    # Optional cross-worker lock
+    # ------------------------------------------------------------------
+    def _lock_key(self, key: str) -> str:
+        return f"{LOCK_PREFIX}:{self.name}:{key}"
+
+    def _get_redis(self):
+        if not self.redis_url or time.monotonic() < self._redis_down_until:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._loop is not loop:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                logger.warning(f"⚠️ redis package not installed, single-flight '{self.name}' is per-process only")
+                self.redis_url = None
+                return None
+            self._loop = loop
+            self._redis = redis.Redis.from_url(
+                self.redis_url,
+                socket_connect_timeout=0.2,
+                socket_timeout=0.2,
+                decode_responses=True,
+            )
+        return self._redis
+
+    def _lock_failed(self, op: str, e: Exception) -> None:
+        self.stats.lock_errors += 1
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+        logger.warning(f"⚠️ Single-flight '{self.name}' Redis {op} failed, per-process only for {REDIS_RETRY_AFTER:.0f}s: {e}")
+
+    async def _acquire_lock(self, key: str) -> Optional[str]:
+        """Take the worker lock, waiting up to lock_ttl for another worker to finish"""
+        client = self._get_redis()
+        if client is None:
+            return None
+
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_ttl
+        waited = False
+        try:
+            while True:
+                if await client.set(self._lock_key(key), token, nx=True, px=int(self.lock_ttl * 1000)):
+                    return token
+                if not waited:
+                    waited = True
+                    self.stats.lock_waits += 1
+                if time.monotonic() >= deadline:
+                    logger.warning(f"⚠️ Single-flight '{self.name}' lock wait exceeded {self.lock_ttl}s, running anyway")
+                    return None
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+        except Exception as e:
+            self._lock_failed("lock", e)
+            return None
+
+    async def _release_lock(self, key: str, token: str) -> None:
+        client = self._get_redis()
+        if client is None:
+            return
+        try:
+            await client.eval(_RELEASE_SCRIPT, 1, self._lock_key(key), token)
+        except Exception as e:
+            self._lock_failed("unlock", e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        data = asdict(self.stats)
+        data["in_flight"] = self.in_flight()
+        data["distributed"] = bool(self.redis_url)
+        return data
+
+
+_groups: Dict[str, SingleFlight] = {}
+
+
+def get_single_flight(name: str, redis_url: Optional[str] = None, lock_ttl: float = DEFAULT_LOCK_TTL) -> SingleFlight:
+    """Get (or create) the process-wide group with this name"""
+    group = _groups.get(name)
+    if group is None:
+        group = _groups[name] = SingleFlight(name, redis_url=redis_url, lock_ttl=lock_ttl)
+    return group
+
+
+def get_single_flight_stats() -> Dict[str, Any]:
+    """Counters for every group, for health endpoints"""
+    return {name: group.get_stats() for name, group in _groups.items()}
@@ -0,0 +1,83 @@
+# common/sse.py
+"""
+Server-Sent Events helpers shared by the streaming endpoints.
+
+Every event is one JSON object on a single `data:` line. Producers use
+encode_event; consumers feed raw response lines to parse_event_line.
+The `type` field follows the specialist streaming clients: "start",
+"content" (incremental text in `data`), "done" (full text in `data`),
+"complete" and "error".
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# Keep proxies (nginx, Cloud Run) from buffering the stream
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def encode_event(event: Dict[str, Any]) -> str:
+    """Serialize one event as an SSE frame"""
+    return f"data: {json.dumps(event, default=str)}\n\n"
+
+
+def parse_event_line(line: str) -> Optional[Dict[str, Any]]:
+    """Decode a `data:` line into an event; comments, blank lines and junk yield None"""
+    if not line.startswith("data:"):
+        return None
+    payload = line[5:].strip()
+    if not payload:
+        return None
+    try:
+        event = json.loads(payload)
+    except ValueError:
+        return None
+    return event if isinstance(event, dict) else None
+
+
+# A sentence ends at . ! ? (optionally followed by closing quotes/brackets) plus whitespace
+_SENTENCE_END = re.compile(r"""[.!?]+["')\]]*\s+""")
+
+
+class SentenceBuffer:
+    """
+    Accumulates streamed text and releases it a sentence at a time, so
+    text-to-speech can start on the first sentence instead of the full reply.
+    """
+
+    def __init__(self, min_chars: int = 12):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text; return any sentences that are now complete"""
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            # Avoid emitting fragments like "Hi." or "Dr." on their own
+            if len(candidate) < self.min_chars:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Return whatever is left once the stream ends"""
+        rest, self._buffer = self._buffer.strip(), ""
+        return rest or None
+
+
+def split_sentences(text: str, min_chars: int = 12) -> Tuple[List[str], Optional[str]]:
+    """Split a complete reply the same way SentenceBuffer would"""
+    buffer = SentenceBuffer(min_chars)
+    sentences = buffer.feed(text)
+    return sentences, buffer.flush()
@@ -0,0 +1,53 @@
+import json
+import pickle
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from common import codec
+from common.models import Task
+
+
+def _state():
+    return {
+        "conversation_id": "conv-1",
+        "created_at": datetime(2025, 1, 1, 9, 30),
+        "owner": ObjectId("65a1b2c3d4e5f60718293a4b"),
+        "task_stack": [Task(task_id="t1", label="Main", source="Main", checklist=[])],
+        "context": [{"role": "user", "content": "hello"}],
+        "state_version": 3,
+    }
+
+
+@pytest.mark.parametrize("fmt", ["json", "msgpack"])
+def test_round_trip_keeps_types(fmt):
+    if fmt == "msgpack":
+        pytest.importorskip("msgpack")
+    data = codec.encode(_state(), fmt)
+
+    assert data.startswith(codec.MAGIC)
+    decoded = codec.decode(data)
+    assert decoded["created_at"] == datetime(2025, 1, 1, 9, 30)
+    assert decoded["owner"] == ObjectId("65a1b2c3d4e5f60718293a4b")
+    assert isinstance(decoded["task_stack"][0], Task)
+    assert decoded["task_stack"][0].task_id == "t1"
+    assert decoded["context"] == [{"role": "user", "content": "hello"}]
+
+
+def test_reads_values_written_before_the_codec():
+    legacy = {"conversation_id": "conv-1", "context": []}
+
+    assert codec.decode(json.dumps(legacy)) == legacy
+    assert codec.decode(json.dumps(legacy).encode()) == legacy
+    assert codec.decode(pickle.dumps(legacy), allow_pickle=True) == legacy
+    with pytest.raises(codec.CodecError):
+        codec.decode(pickle.dumps(legacy))
+
+
+def test_rejects_frames_from_a_newer_codec():
+    data = codec.encode({"a": 1}, "json")
+    newer = codec.MAGIC + bytes((codec.CODEC_VERSION + 1,)) + data[len(codec.MAGIC) + 1:]
+
+    with pytest.raises(codec.CodecError):
+        codec.decode(newer)
@@ -0,0 +1,56 @@
+import asyncio
+
+from common.context_handle import ContextHandle, ContextStore
+
+
+class _DictRedis:
+    """Just enough of redis.asyncio.Redis for the store"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def get(self, key):
+        return self.data.get(key)
+
+
+def _store(backend) -> ContextStore:
+    store = ContextStore(redis_url="redis://shared")
+    store._get_redis = lambda: backend
+    return store
+
+
+MESSAGES = [{"role": "user", "content": "hello"}, {"role": "assistant", "content": "hi there"}]
+
+
+def test_handle_is_content_addressed_and_resolves_across_processes():
+    backend = _DictRedis()
+    orchestrator, specialist = _store(backend), _store(backend)
+
+    async def scenario():
+        handle = await orchestrator.publish("conv-1", 7, MESSAGES)
+        again = await orchestrator.publish("conv-1", 7, MESSAGES)
+        changed = await orchestrator.publish("conv-1", 7, MESSAGES + [{"role": "user", "content": "more"}])
+        wire = ContextHandle.model_validate(handle.model_dump())
+        return handle, again, changed, await specialist.resolve(wire), await specialist.resolve(wire)
+
+    handle, again, changed, first, second = asyncio.run(scenario())
+
+    assert handle == again and handle.key != changed.key
+    assert handle.messages == 2 and handle.state_version == 7
+    assert first == MESSAGES and second == MESSAGES
+    assert orchestrator.stats.published == 2 and orchestrator.stats.publish_skipped == 1
+    assert specialist.stats.resolved_redis == 1 and specialist.stats.resolved_local == 1
+
+
+def test_store_without_redis_falls_back_to_inline_context():
+    store = ContextStore(redis_url=None)
+    handle = ContextHandle(conversation_id="conv-1", state_version=1, digest="0" * 16, messages=1)
+
+    async def scenario():
+        return await store.publish("conv-1", 1, MESSAGES), await store.resolve(handle)
+
+    assert asyncio.run(scenario()) == (None, None)
+    assert store.stats.publish_failures == 1 and store.stats.resolve_misses == 1
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from common.deadline import (
+    DEADLINE_HEADER,
+    DeadlineExceeded,
+    adopt_deadline,
+    budget_for_channel,
+    check_deadline,
+    deadline_headers,
+    parse_deadline,
+    remaining,
+    timeout_for,
+    use_deadline,
+    without_deadline,
+)
+
+
+def test_no_deadline_keeps_own_timeouts():
+    assert remaining() is None
+    assert timeout_for(1.5) == 1.5
+    assert deadline_headers() == {}
+    check_deadline("stage")
+
+
+def test_timeout_is_capped_by_remaining_budget():
+    with use_deadline(200):
+        assert 0 < timeout_for(1.5) <= 0.2
+        assert timeout_for(0.05) == 0.05
+        assert timeout_for(1.5, reserve=0.5) == 0.0
+        assert 0 < int(deadline_headers()[DEADLINE_HEADER]) <= 200
+    assert remaining() is None
+
+
+def test_passed_deadline_raises():
+    with use_deadline(0):
+        assert timeout_for(1.5) == 0.0
+        with pytest.raises(DeadlineExceeded) as e:
+            check_deadline("specialist")
+    assert isinstance(e.value, TimeoutError) and e.value.stage == "specialist"
+
+
+def test_header_wins_over_channel_budget_and_is_never_extended():
+    assert parse_deadline("250") == 250.0
+    assert parse_deadline("-5") == 0.0
+    assert parse_deadline("soon") is None
+    assert budget_for_channel("livekit_agent") < budget_for_channel("chat")
+
+    async def handler(header, channel):
+        adopt_deadline(header, channel)
+        return remaining()
+
+    assert asyncio.run(handler("250", "chat")) <= 0.25
+    assert asyncio.run(handler(None, "voice")) <= budget_for_channel("voice") / 1000
+
+    async def nested():
+        adopt_deadline("100", "chat")
+        adopt_deadline(None, "chat")    # e.g. a mounted app after a middleware adopted the header
+        return remaining()
+
+    assert asyncio.run(nested()) <= 0.1
+
+
+def test_background_work_is_free_of_the_deadline():
+    async def main():
+        with use_deadline(100):
+            task = asyncio.create_task(without_deadline(asyncio.sleep(0, result="ok")))
+            inner = asyncio.create_task(without_deadline(_remaining_later()))
+            assert remaining() is not None
+            return await task, await inner
+
+    async def _remaining_later():
+        return remaining()
+
+    assert asyncio.run(main()) == ("ok", None)
@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import pytest
+
+from common.idempotency import IdempotentRequests
+
+
+class _DictRedis:
+    """Just enough of redis.asyncio.Redis for the claims, shared by two 'workers'"""
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+
+    def _live(self, key):
+        if key in self.expires and time.monotonic() >= self.expires[key]:
+            self.data.pop(key, None)
+            self.expires.pop(key)
+        return key in self.data
+
+    async def set(self, key, value, nx=False, px=None, ex=None):
+        if nx and self._live(key):
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        if px is not None:
+            self.expires[key] = time.monotonic() + px / 1000
+        return True
+
+    async def get(self, key):
+        return self.data.get(key) if self._live(key) else None
+
+    async def eval(self, script, numkeys, key, token, *args):
+        if not self._live(key) or self.data[key] != token:
+            return 0
+        if "pexpire" in script:
+            self.expires[key] = time.monotonic() + args[0] / 1000
+        else:
+            del self.data[key]
+            self.expires.pop(key, None)
+        return 1
+
+
+def _group(backend=None, pending_ttl=1.0) -> IdempotentRequests:
+    group = IdempotentRequests("test", redis_url="redis://shared" if backend else None, pending_ttl=pending_ttl)
+    if backend is not None:
+        group._get_redis = lambda: backend
+    return group
+
+
+def test_duplicates_attach_to_the_running_call_then_replay_its_result():
+    group = _group()
+    runs = []
+
+    async def turn():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return {"response": "hello"}
+
+    async def scenario():
+        concurrent = await asyncio.gather(group.run("t1", turn), group.run("t1", turn))
+        return concurrent, await group.run("t1", turn)
+
+    (first, second), later = asyncio.run(scenario())
+    assert first == ({"response": "hello"}, False)
+    assert second == later == ({"response": "hello"}, True)
+    assert len(runs) == 1
+    assert group.stats.attached == 1 and group.stats.replayed == 1 and group.stats.absorbed == 2
+
+
+def test_failed_calls_are_not_stored_and_run_again():
+    backend = _DictRedis()
+    group = _group(backend)
+    attempts = []
+
+    async def turn():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("specialist down")
+        return "ok"
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await group.run("t1", turn)
+        assert not backend.data
+        return await group.run("t1", turn)
+
+    assert asyncio.run(scenario()) == ("ok", False)
+    assert group.stats.failed == 1 and group.stats.executed == 2
+
+
+def test_another_worker_waits_for_the_claim_and_gets_the_stored_result():
+    backend = _DictRedis()
+    first, second = _group(backend), _group(backend)
+    runs = []
+
+    async def turn():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "reply"
+
+    async def scenario():
+        running = asyncio.create_task(first.run("t1", turn))
+        await asyncio.sleep(0.01)
+        return await asyncio.gather(running, second.run("t1", turn))
+
+    assert asyncio.run(scenario()) == [("reply", False), ("reply", True)]
+    assert len(runs) == 1
+    assert second.stats.waited == 1 and second.stats.replayed == 1
+
+
+def test_the_claim_is_renewed_while_work_outlasts_the_pending_ttl():
+    backend = _DictRedis()
+    first, second = _group(backend, pending_ttl=0.03), _group(backend, pending_ttl=0.03)
+    runs = []
+
+    async def turn():
+        runs.append(1)
+        await asyncio.sleep(0.15)
+        return "reply"
+
+    async def scenario():
+        running = asyncio.create_task(first.run("t1", turn))
+        await asyncio.sleep(0.01)
+        return await asyncio.gather(running, second.run("t1", turn))
+
+    assert asyncio.run(scenario()) == [("reply", False), ("reply", True)]
+    assert len(runs) == 1
+    assert first.stats.claim_renewals >= 3 and second.stats.claim_expired == 0
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from common.lease import LeaseMutex, LeaseTimeout
+
+
+def test_same_key_is_serialized_in_order_and_other_keys_run_in_parallel():
+    mutex = LeaseMutex("test")
+    events = []
+
+    async def turn(key, name):
+        async with mutex.hold(key):
+            events.append(f"start {name}")
+            await asyncio.sleep(0.01)
+            events.append(f"end {name}")
+
+    async def main():
+        await asyncio.gather(turn("conv-1", "a"), turn("conv-1", "b"), turn("conv-2", "c"))
+
+    asyncio.run(main())
+    assert events.index("end a") < events.index("start b")
+    assert events.index("start c") < events.index("end a")
+    assert mutex.held() == 0
+    assert mutex.stats.contended == 1
+
+
+def test_waiter_times_out_while_key_is_held():
+    mutex = LeaseMutex("test", wait_timeout=0.02)
+
+    async def main():
+        lease = await mutex.acquire("conv-1")
+        with pytest.raises(LeaseTimeout):
+            await mutex.acquire("conv-1")
+        await lease.release()
+        await lease.release()
+        async with mutex.hold("conv-1"):
+            pass
+
+    asyncio.run(main())
+    assert mutex.stats.timeouts == 1
+    assert mutex.held() == 0
+
+
+def test_holder_that_overstays_max_hold_is_expired():
+    mutex = LeaseMutex("test", ttl=0.03, max_hold=0.02, wait_timeout=1.0)
+
+    async def main():
+        stuck = await mutex.acquire("conv-1")
+        nxt = await mutex.acquire("conv-1")
+        assert stuck.lost
+        await nxt.release()
+        await stuck.release()
+
+    asyncio.run(main())
+    assert mutex.stats.expired == 1
+    assert mutex.held() == 0
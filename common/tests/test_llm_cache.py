@@ -0,0 +1,41 @@
+import asyncio
+
+from common.llm_cache import LLMResponseCache, NearCache, make_cache_key
+
+
+def test_cache_key_is_normalized_and_config_sensitive():
+    base = make_cache_key("models/flash", {"temperature": 0.2, "top_k": None}, "Evaluate:\n  hello   world ")
+
+    assert base == make_cache_key("models/flash", {"temperature": 0.2}, "Evaluate: hello world")
+    assert base != make_cache_key("models/flash", {"temperature": 0.3}, "Evaluate: hello world")
+    assert base != make_cache_key("models/pro", {"temperature": 0.2}, "Evaluate: hello world")
+    assert base != make_cache_key("models/flash", {"temperature": 0.2}, "Evaluate: hello there")
+
+
+def test_near_cache_is_size_bounded_and_expires():
+    near = NearCache(max_size=2)
+    near.set("a", "1", ttl=10, now=0)
+    near.set("b", "2", ttl=10, now=0)
+    assert near.get("a", now=1) == "1"
+    near.set("c", "3", ttl=10, now=1)
+
+    assert near.get("b", now=1) is None
+    assert near.get("a", now=1) == "1"
+    assert near.evictions == 1
+    assert near.get("c", now=11) is None
+
+
+def test_local_only_cache_counts_hits_and_misses():
+    cache = LLMResponseCache(redis_url=None, near_cache_size=8)
+    key = make_cache_key("models/flash", {}, "prompt")
+
+    async def main():
+        assert await cache.get("checklist", key, ttl=60) is None
+        await cache.set("checklist", key, "Complete: Yes", ttl=60)
+        assert await cache.get("checklist", key, ttl=60) == "Complete: Yes"
+        assert await cache.get("intent_detector", key, ttl=60) is None
+
+    asyncio.run(main())
+    stats = cache.get_stats()["namespaces"]
+    assert stats["checklist"] == {"near_hits": 1, "redis_hits": 0, "misses": 1, "stores": 1, "hit_rate": 0.5}
+    assert stats["intent_detector"]["misses"] == 1
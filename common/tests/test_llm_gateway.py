@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from common.llm_gateway import (
+    LLMGateway,
+    LLMPriority,
+    LLMQuotaExceeded,
+    TokenBucket,
+    parse_priority,
+    parse_retry_delay,
+    priority_for_channel,
+)
+
+
+def test_higher_priority_waiters_are_served_first():
+    gateway = LLMGateway(requests_per_minute=60000, burst=100, max_concurrency=1)
+    order = []
+
+    async def worker(name, priority, hold):
+        async with gateway.request(name, priority):
+            order.append(name)
+            await hold.wait()
+
+    async def main():
+        first_done = asyncio.Event()
+        release = asyncio.Event()
+        release.set()
+
+        first = asyncio.create_task(worker("first", LLMPriority.CHAT, first_done))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.create_task(worker("background", LLMPriority.BACKGROUND, release)),
+            asyncio.create_task(worker("chat", LLMPriority.CHAT, release)),
+            asyncio.create_task(worker("voice", LLMPriority.VOICE, release)),
+        ]
+        await asyncio.sleep(0)
+        first_done.set()
+        await asyncio.gather(first, *waiters)
+
+    asyncio.run(main())
+    assert order == ["first", "voice", "chat", "background"]
+
+
+def test_quota_error_puts_every_caller_into_cooldown():
+    gateway = LLMGateway(requests_per_minute=60000, burst=100, max_concurrency=4)
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            async with gateway.request("therapy"):
+                raise RuntimeError("429 Resource has been exhausted (e.g. check quota).")
+
+        assert gateway.in_cooldown()
+        with pytest.raises(LLMQuotaExceeded):
+            async with gateway.request("loneliness"):
+                pass
+
+    asyncio.run(main())
+    stats = gateway.get_stats()
+    assert stats["callers"]["therapy"]["quota_errors"] == 1
+    assert stats["callers"]["loneliness"]["rejected"] == 1
+
+
+def test_token_accounting_and_slot_release():
+    gateway = LLMGateway(requests_per_minute=60000, burst=100, max_concurrency=2)
+
+    async def main():
+        async with gateway.request("checklist", LLMPriority.CHAT) as call:
+            call.record_text("x" * 400, "y" * 40)
+
+    asyncio.run(main())
+    stats = gateway.get_stats()
+    assert stats["in_flight"] == 0
+    assert stats["callers"]["checklist"]["prompt_tokens"] == 100
+    assert stats["callers"]["checklist"]["output_tokens"] == 10
+    assert stats["callers"]["checklist"]["by_priority"] == {"chat": 1}
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(rate_per_second=10, capacity=1)
+    start = bucket.updated
+    assert bucket.take(now=start)
+    assert not bucket.take(now=start)
+    assert bucket.time_until_available(now=start) == pytest.approx(0.1)
+    assert bucket.take(now=start + 0.11)
+
+
+def test_priority_helpers():
+    assert priority_for_channel("livekit_agent") == LLMPriority.VOICE
+    assert priority_for_channel(None) == LLMPriority.CHAT
+    assert parse_priority("background") == LLMPriority.BACKGROUND
+    assert parse_priority("0") == LLMPriority.VOICE
+    assert parse_priority("nonsense") == LLMPriority.CHAT
+    assert parse_retry_delay("retry_delay { seconds: 30 }") == 35.0
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+def test_stream_releases_the_slot_before_a_slow_consumer_is_done():
+    gateway = LLMGateway(requests_per_minute=60000, burst=100, max_concurrency=1)
+
+    def broken_stream():
+        yield _Chunk("Hello ")
+        yield _Chunk("there")
+        raise RuntimeError("stream reset")
+
+    async def scenario():
+        stream = gateway.stream("test", "hi", broken_stream)
+        first = await stream.__anext__()
+        # The consumer stalls; another caller still gets the only slot
+        async def other():
+            async with gateway.request("other"):
+                pass
+        await asyncio.wait_for(other(), timeout=1.0)
+        rest = []
+        with pytest.raises(RuntimeError):
+            async for text in stream:
+                rest.append(text)
+        return [first] + rest
+
+    assert asyncio.run(scenario()) == ["Hello ", "there"]
+    assert gateway.get_caller_stats("test")["errors"] == 1
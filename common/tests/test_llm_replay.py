@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+import google.generativeai as genai
+import pytest
+from google.api_core import exceptions
+
+from common.llm_replay import FixtureStore, configure_llm_replay, fixture_key, replay_chunks
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeResponse:
+    def __init__(self, texts):
+        self._texts = texts
+        self.text = "".join(texts)
+
+    def __iter__(self):
+        return iter(FakeChunk(t) for t in self._texts)
+
+
+@pytest.fixture
+def live_gemini(monkeypatch):
+    """GenerativeModel whose 'real' calls answer from a script instead of the API"""
+    calls = []
+
+    def generate_content(self, contents, *, stream=False, **kwargs):
+        calls.append(contents)
+        return FakeResponse(["Hello ", "there, ", "friend."] if stream else ["Complete: Yes"])
+
+    async def generate_content_async(self, contents, *, stream=False, **kwargs):
+        return generate_content(self, contents, stream=stream, **kwargs)
+
+    monkeypatch.setattr(genai.GenerativeModel, "generate_content", generate_content)
+    monkeypatch.setattr(genai.GenerativeModel, "generate_content_async", generate_content_async)
+    yield calls
+    configure_llm_replay("off")
+
+
+def test_record_then_replay_streamed_and_async_calls(tmp_path, live_gemini):
+    fixtures = str(tmp_path / "llm.jsonl")
+    model = genai.GenerativeModel("models/test")
+
+    configure_llm_replay("record", fixtures)
+    assert [c.text for c in model.generate_content("hi", stream=True)] == ["Hello ", "there, ", "friend."]
+    assert asyncio.run(model.generate_content_async("is it done?")).text == "Complete: Yes"
+    lines = [json.loads(line) for line in open(fixtures)]
+    assert [entry["stream"] for entry in lines] == [True, False]
+    assert lines[0]["key"] == fixture_key("models/test", "hi") and len(lines[0]["chunks"]) == 3
+
+    replay = configure_llm_replay("replay", fixtures, speed=0)
+    assert [c.text for c in model.generate_content("hi", stream=True)] == ["Hello ", "there, ", "friend."]
+
+    async def consume():
+        streamed = await model.generate_content_async("is it done?", stream=True)
+        return [chunk.text async for chunk in streamed]
+    assert "".join(asyncio.run(consume())) == "Complete: Yes"
+
+    # Never recorded: a recording picked by the hash, not a live call
+    assert model.generate_content("something new").text in {"Hello there, friend.", "Complete: Yes"}
+    assert len(live_gemini) == 2
+    assert replay.get_stats()["replayed"] == 3 and replay.get_stats()["misses"] == 1
+
+
+def test_replay_injects_429s_and_timeouts(tmp_path, live_gemini):
+    model = genai.GenerativeModel("models/test")
+    replay = configure_llm_replay("replay", str(tmp_path / "empty.jsonl"), speed=0, rate_429=1.0)
+    with pytest.raises(exceptions.ResourceExhausted):
+        model.generate_content("hi")
+
+    replay = configure_llm_replay("replay", str(tmp_path / "empty.jsonl"), speed=0, timeout_rate=1.0, timeout_s=0)
+    with pytest.raises(exceptions.DeadlineExceeded):
+        asyncio.run(model.generate_content_async("hi"))
+    assert replay.stats.injected_timeouts == 1 and not live_gemini
+
+
+def test_unstreamed_recordings_are_split_into_timed_chunks():
+    chunks = replay_chunks({"text": "one two three four five six", "chunks": [], "first_chunk_ms": 300, "total_ms": 500})
+    assert chunks == [(300.0, "one two three four "), (200.0, "five six")]
+    assert FixtureStore("/nonexistent/llm.jsonl").load() == 0
+
+
+def test_pattern_fixtures_answer_prompts_containing_their_match(tmp_path, live_gemini):
+    fixtures = tmp_path / "llm.jsonl"
+    fixtures.write_text("\n".join(json.dumps(entry) for entry in [
+        {"match": "primary support need", "text": '{"intent": "loneliness"}', "chunks": [], "total_ms": 0},
+        {"match": "Complete: [Yes/No]", "text": "Complete: No", "chunks": [], "total_ms": 0},
+    ]))
+    model = genai.GenerativeModel("models/test")
+    configure_llm_replay("replay", str(fixtures), speed=0)
+    assert model.generate_content("Please determine the user's primary support need").text == '{"intent": "loneliness"}'
+    assert model.generate_content("Answer with Complete: [Yes/No]").text == "Complete: No"
+    assert not live_gemini
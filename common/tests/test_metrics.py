@@ -0,0 +1,117 @@
+import asyncio
+import gc
+import time
+
+import pytest
+
+from common.metrics import (
+    Histogram,
+    MetricsRegistry,
+    Sample,
+    TimedRedis,
+    get_registry,
+    observe_datastore,
+    register_cache_sizes,
+    render_metrics,
+    server_timing,
+    start_loop_lag_monitor,
+    stop_loop_lag_monitor,
+    track_cache_sizes,
+)
+
+
+def test_histogram_percentiles_within_precision():
+    hist = Histogram()
+    for value in range(1, 1001):           # 1..1000 ms
+        hist.observe(float(value))
+
+    assert hist.percentile(50) == pytest.approx(500, rel=0.02)
+    assert hist.percentile(99) == pytest.approx(990, rel=0.02)
+    assert hist.percentile(100) == 1000
+    assert hist.cumulative([10, 100, 1000]) == [pytest.approx(10, abs=1), pytest.approx(100, abs=2), 1000]
+    assert Histogram().percentile(99) is None
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    stages = registry.histogram("turn_stage_seconds", "Stage duration", ("stage", "agent"))
+    stages.labels("specialist", "loneliness").observe(120.0)
+    registry.counter("turns_total", "Turns").labels().inc(3)
+    registry.register_collector("cache", lambda: [
+        Sample("cache_requests_total", "counter", "Lookups", (("result", "hit"),), 7)
+    ])
+
+    text = registry.render()
+    assert "# TYPE turn_stage_seconds histogram" in text
+    assert 'turn_stage_seconds_bucket{stage="specialist",agent="loneliness",le="0.1"} 0' in text
+    assert 'turn_stage_seconds_bucket{stage="specialist",agent="loneliness",le="0.25"} 1' in text
+    assert 'turn_stage_seconds_count{stage="specialist",agent="loneliness"} 1' in text
+    assert 'turn_stage_seconds_hdr{stage="specialist",agent="loneliness",quantile="0.99"}' in text
+    assert "turns_total 3" in text
+    assert 'cache_requests_total{result="hit"} 7' in text
+
+
+def test_server_timing_puts_total_first():
+    header = server_timing({"state_initialization": 3.14, "total_orchestration": 412.0}, total="total_orchestration")
+    assert header == "total;dur=412.0, state_initialization;dur=3.1"
+
+
+def test_timed_redis_records_commands_and_errors():
+    class FakeRedis:
+        async def get(self, key):
+            return b"v"
+
+        async def set(self, key, value):
+            raise ConnectionError("down")
+
+        def pipeline(self):
+            return "pipeline"
+
+    redis = TimedRedis(FakeRedis(), "test_redis")
+
+    async def main():
+        assert await redis.get("k") == b"v"
+        with pytest.raises(ConnectionError):
+            await redis.set("k", "v")
+        assert redis.pipeline() == "pipeline"
+
+    asyncio.run(main())
+    observe_datastore("test_mongo", "find_one", 2.0)
+    text = render_metrics()
+    assert 'datastore_operation_seconds_count{store="test_redis",op="get"} 1' in text
+    assert 'datastore_errors_total{store="test_redis",op="set"} 1' in text
+    assert 'datastore_operation_seconds_count{store="test_mongo",op="find_one"} 1' in text
+
+
+def test_loop_lag_monitor_samples_blocked_loop():
+    async def main():
+        start_loop_lag_monitor(0.01)
+        await asyncio.sleep(0.02)
+        time.sleep(0.05)      # block the loop
+        await asyncio.sleep(0.03)
+        stop_loop_lag_monitor()
+
+    asyncio.run(main())
+    assert get_registry().get_histogram_stats("event_loop_lag_seconds")["all"]["max_ms"] >= 40
+
+
+def test_cache_sizes_follow_live_owners():
+    class Manager:
+        def __init__(self, entries):
+            self._session_cache = dict.fromkeys(range(entries))
+
+    register_cache_sizes("test_shared", lambda: {"sessions": 3})
+    first, second = Manager(2), Manager(5)
+    track_cache_sizes("test_managers", first, ("_session_cache",))
+    track_cache_sizes("test_managers", second, ("_session_cache",))
+    text = render_metrics()
+    assert 'cache_entries{cache="test_shared",name="sessions"} 3' in text
+    assert 'cache_entries{cache="test_managers",name="_session_cache"} 7' in text
+    assert 'cache_owners{cache="test_managers"} 2' in text
+    assert "python_allocated_blocks " in text
+
+    del second
+    gc.collect()
+    text = render_metrics()
+    assert 'cache_entries{cache="test_managers",name="_session_cache"} 2' in text
+    assert 'cache_owners{cache="test_managers"} 1' in text
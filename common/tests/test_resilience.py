@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from common.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, RetryBudget, hedged, on_transition
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_on_failure_rate_and_recovers_through_half_open():
+    clock = _Clock()
+    breaker = CircuitBreaker("svc", window=4, min_calls=4, failure_rate=0.5, open_for=10, half_open_calls=1, clock=clock)
+    transitions = []
+    on_transition(lambda name, old, new: transitions.append((old, new)) if name == "svc" else None)
+
+    for failed in (False, True, False, True):
+        breaker.record_failure() if failed else breaker.record_success(5)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        with breaker.guard():
+            pass
+
+    clock.now = 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() and not breaker.allow()   # one probe at a time
+    breaker.record_success(5)
+
+    assert breaker.state == CLOSED
+    assert transitions == [(CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)]
+    assert breaker.stats.rejected == 2
+
+
+def test_breaker_opens_on_slow_calls():
+    breaker = CircuitBreaker("slow", window=5, min_calls=5, slow_call_ms=100, slow_call_rate=0.6)
+    for latency in (150, 20, 150, 20, 150):
+        breaker.record_success(latency)
+    assert breaker.state == OPEN
+
+
+def test_retry_budget_limits_retries_to_a_share_of_requests():
+    clock = _Clock()
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=2, clock=clock)
+    assert budget.try_retry() and budget.try_retry()
+    assert not budget.try_retry()
+
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_retry()
+    assert budget.stats.exhausted == 1
+
+
+def test_hedged_read_returns_the_faster_attempt():
+    delays = [0.5, 0.0]
+
+    async def read():
+        await asyncio.sleep(delays.pop(0))
+        return "value"
+
+    async def scenario():
+        started = asyncio.get_running_loop().time()
+        result = await hedged(read, delay=0.01)
+        return result, asyncio.get_running_loop().time() - started
+
+    result, elapsed = asyncio.run(scenario())
+    assert result == "value" and elapsed < 0.3
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from common.llm_gateway import LLMGateway
+from common.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    group = SingleFlight("test")
+    runs = []
+
+    async def load():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return {"state": "loaded"}
+
+    async def main():
+        return await asyncio.gather(*(group.do("conv-1", load) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(runs) == 1
+    assert all(result is results[0] for result in results)
+    assert group.stats.coalesced == 4
+    assert group.in_flight() == 0
+
+
+def test_errors_propagate_to_every_waiter_and_are_not_remembered():
+    group = SingleFlight("test")
+
+    async def boom():
+        await asyncio.sleep(0)
+        raise RuntimeError("mongo down")
+
+    async def main():
+        results = await asyncio.gather(group.do("k", boom), group.do("k", boom), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        # Nothing cached after completion: the next call runs again
+        with pytest.raises(RuntimeError):
+            await group.do("k", boom)
+
+    asyncio.run(main())
+    assert group.stats.executions == 2
+    assert group.stats.errors == 2
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    group = SingleFlight("test")
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def main():
+        first = asyncio.create_task(group.do("k", slow))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(group.do("k", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_gateway_coalesce_counts_per_caller():
+    gateway = LLMGateway(requests_per_minute=60000, burst=100, max_concurrency=4)
+    calls = []
+
+    async def generate():
+        async with gateway.request("checklist"):
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "Complete: Yes"
+
+    async def main():
+        return await asyncio.gather(*(gateway.coalesce("checklist", "same prompt", generate) for _ in range(3)))
+
+    assert asyncio.run(main()) == ["Complete: Yes"] * 3
+    assert len(calls) == 1
+    assert gateway.get_caller_stats("checklist")["coalesced"] == 2
@@ -0,0 +1,28 @@
+from common.sse import SentenceBuffer, encode_event, parse_event_line, split_sentences
+
+
+def test_event_round_trip():
+    frame = encode_event({"type": "content", "data": "Hello"})
+
+    assert frame.endswith("\n\n")
+    assert parse_event_line(frame.strip()) == {"type": "content", "data": "Hello"}
+    assert parse_event_line(": keep-alive") is None
+    assert parse_event_line("data: not json") is None
+
+
+def test_sentence_buffer_releases_complete_sentences_across_chunks():
+    buffer = SentenceBuffer()
+
+    assert buffer.feed("I hear you. That sounds re") == []
+    assert buffer.feed("ally hard! What happened ") == ["I hear you. That sounds really hard!"]
+    assert buffer.feed("next? ") == ["What happened next?"]
+    assert buffer.feed("Take your time") == []
+    assert buffer.flush() == "Take your time"
+    assert buffer.flush() is None
+
+
+def test_split_sentences_returns_trailing_text():
+    sentences, rest = split_sentences("Thanks for sharing that with me. Tell me more")
+
+    assert sentences == ["Thanks for sharing that with me."]
+    assert rest == "Tell me more"
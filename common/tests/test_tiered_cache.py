@@ -0,0 +1,34 @@
+from common.tiered_cache import LocalTier
+
+
+def test_namespaces_evict_lru_within_their_own_byte_quota():
+    tier = LocalTier(quotas={"conversation": 100}, default_quota=50)
+    tier.set("c1", "a", size=40, namespace="conversation", now=0)
+    tier.set("c2", "b", size=40, namespace="conversation", now=0)
+    tier.set("x1", "c", size=30, namespace="context", now=0)
+    assert tier.get("c1", "conversation", now=1) == "a"
+
+    tier.set("c3", "d", size=40, namespace="conversation", now=1)
+
+    assert tier.get("c2", "conversation", now=1) is None
+    assert tier.get("c1", "conversation", now=1) == "a"
+    assert tier.get("x1", "context", now=1) == "c"
+    stats = tier.get_stats()
+    assert stats["conversation"]["evictions"] == 1
+    assert stats["conversation"]["resident_bytes"] == 80
+    assert stats["context"]["quota_bytes"] == 50
+    assert tier.resident_bytes == 110
+
+
+def test_oversize_entries_expiry_and_invalidation():
+    tier = LocalTier(default_quota=50)
+    assert not tier.set("big", "x", size=51)
+    tier.set("k", "v", size=10, ttl=5, now=0)
+    tier.set("j", "w", size=10, now=0)
+
+    assert tier.get("k", now=5) is None
+    assert tier.invalidate("j")
+    assert not tier.invalidate("j")
+    assert len(tier) == 0 and tier.resident_bytes == 0
+    stats = tier.get_stats()["default"]
+    assert (stats["oversize"], stats["expirations"], stats["invalidations"]) == (1, 1, 1)
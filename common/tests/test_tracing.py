@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from common.metrics import track_datastore
+from common.trace_waterfall import critical_path, build_tree, load_spans, render_waterfall, select_trace
+from common.tracing import (
+    STATUS_ERROR,
+    TRACEPARENT_HEADER,
+    FileExporter,
+    InMemoryExporter,
+    TracingMiddleware,
+    get_tracer,
+    inject_headers,
+    parse_traceparent,
+    start_span,
+    traced_background,
+)
+
+
+@pytest.fixture
+def exporter():
+    tracer = get_tracer()
+    previous = tracer.exporter
+    tracer.exporter = InMemoryExporter()
+    yield tracer.exporter
+    tracer.exporter = previous
+
+
+def test_traceparent_round_trip_and_invalid_values():
+    ctx = parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01")
+    assert ctx.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736" and ctx.sampled
+    assert ctx.traceparent() == "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    assert parse_traceparent("00-00000000000000000000000000000000-00f067aa0ba902b7-01") is None
+    assert parse_traceparent("00-abc-def-01") is None
+    assert parse_traceparent(None) is None
+    assert inject_headers() == {}
+
+
+def test_nested_spans_share_the_trace_and_record_errors(exporter):
+    with start_span("turn") as turn:
+        with track_datastore("test_redis", "get"):
+            pass
+        with pytest.raises(ValueError):
+            with start_span("checklist"):
+                raise ValueError("bad")
+        header = inject_headers()[TRACEPARENT_HEADER]
+
+    redis_span, = exporter.find("test_redis get")
+    checklist, = exporter.find("checklist")
+    assert redis_span.parent_id == checklist.parent_id == turn.span_id
+    assert {redis_span.trace_id, checklist.trace_id} == {turn.trace_id}
+    assert checklist.status == STATUS_ERROR
+    assert header == turn.context.traceparent()
+
+
+def test_middleware_continues_incoming_trace(exporter):
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.post("/agents/{name}")
+    async def handler(name: str):
+        with start_span("work"):
+            return {"trace": inject_headers()[TRACEPARENT_HEADER]}
+
+    incoming = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    response = TestClient(app).post("/agents/loneliness", headers={TRACEPARENT_HEADER: incoming})
+
+    server, = exporter.find("POST /agents/{name}")
+    work, = exporter.find("work")
+    assert server.trace_id == work.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert server.parent_id == "00f067aa0ba902b7" and work.parent_id == server.span_id
+    assert server.attributes["http.status_code"] == 200
+    assert response.json()["trace"].startswith("00-4bf92f3577b34da6a3ce929d0e0e4736-")
+
+
+def test_background_work_gets_a_linked_trace(exporter):
+    async def main():
+        with start_span("turn") as turn:
+            task = asyncio.create_task(traced_background("turn_commit", asyncio.sleep(0)))
+        await task
+        return turn
+
+    turn = asyncio.run(main())
+    commit, = exporter.find("turn_commit")
+    assert commit.trace_id != turn.trace_id and commit.parent_id is None
+    assert commit.links == [turn.context]
+
+
+def test_file_export_renders_waterfall_with_critical_path(tmp_path):
+    tracer = get_tracer()
+    previous = tracer.exporter
+    tracer.exporter = FileExporter(str(tmp_path / "traces.jsonl"))
+    try:
+        with start_span("POST /orchestrate", attributes={"conversation.id": "c1"}):
+            with start_span("state_load"):
+                pass
+            with start_span("specialist"):
+                with start_span("llm loneliness"):
+                    pass
+    finally:
+        tracer.flush()
+        tracer.exporter = previous
+
+    lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+    assert len(lines) == 1 and json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    spans = load_spans(lines)
+    assert select_trace(spans, conversation_id="c1") == spans[0].trace_id
+
+    root, = build_tree(spans)
+    names = {span.span_id: span.name for span in spans}
+    assert {names[i] for i in critical_path(root)} >= {"POST /orchestrate", "specialist", "llm loneliness"}
+    text = render_waterfall(spans)
+    assert "POST /orchestrate" in text and "    llm loneliness" in text
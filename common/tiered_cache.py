@@ -0,0 +1,159 @@
+# common/tiered_cache.py
+"""
+In-process tier of a two-tier (local + Redis) cache.
+
+Entries are bounded by approximate size rather than count: each namespace
+(e.g. "conversation", "context") has its own byte quota and evicts its own
+least recently used entries, so one busy namespace cannot push the others
+out. The size of an entry is the length of its encoded form, which the
+caller already has in hand when it writes or reads the Redis tier.
+
+The tier is meant for asyncio code and takes no locks: every operation
+runs to completion between two awaits.
+
+Keeping workers coherent is the caller's job: every write to the shared
+tier publishes the key on INVALIDATION_CHANNEL and every worker drops its
+local copy on receipt (see CacheManager in the orchestrator).
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_NAMESPACE = "default"
+DEFAULT_QUOTA_BYTES = 8 * 1024 * 1024
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+@dataclass
+class TierStats:
+    """Per-namespace counters; redis_hits and misses are recorded by the caller"""
+    local_hits: int = 0
+    redis_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    oversize: int = 0                # entries larger than the whole quota, not kept locally
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = asdict(self)
+        lookups = self.local_hits + self.redis_hits + self.misses
+        data["hit_rate"] = round((self.local_hits + self.redis_hits) / lookups, 3) if lookups else 0.0
+        data["local_hit_rate"] = round(self.local_hits / lookups, 3) if lookups else 0.0
+        return data
+
+
+class _Namespace:
+    def __init__(self, quota: int):
+        self.quota = quota
+        self.entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()   # key -> (expires_at, size, value)
+        self.resident = 0
+        self.stats = TierStats()
+
+    def pop(self, key: str) -> bool:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        self.resident -= entry[1]
+        return True
+
+
+class LocalTier:
+    """LRU cache bounded by approximate bytes per namespace, with per-entry expiry"""
+
+    def __init__(self, quotas: Optional[Dict[str, int]] = None, default_quota: int = DEFAULT_QUOTA_BYTES):
+        self.quotas = dict(quotas or {})
+        self.default_quota = default_quota
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._key_namespace: Dict[str, str] = {}
+
+    def _namespace(self, name: str) -> _Namespace:
+        namespace = self._namespaces.get(name)
+        if namespace is None:
+            namespace = self._namespaces[name] = _Namespace(self.quotas.get(name, self.default_quota))
+        return namespace
+
+    def stats(self, namespace: str = DEFAULT_NAMESPACE) -> TierStats:
+        return self._namespace(namespace).stats
+
+    def get(self, key: str, namespace: str = DEFAULT_NAMESPACE, now: Optional[float] = None) -> Optional[Any]:
+        """The local value, or None; only counts local hits (the caller records Redis hits and misses)"""
+        space = self._namespace(namespace)
+        entry = space.entries.get(key)
+        if entry is None:
+            return None
+        if (now if now is not None else time.monotonic()) >= entry[0]:
+            space.pop(key)
+            self._key_namespace.pop(key, None)
+            space.stats.expirations += 1
+            return None
+        space.entries.move_to_end(key)
+        space.stats.local_hits += 1
+        return entry[2]
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        size: int,
+        namespace: str = DEFAULT_NAMESPACE,
+        ttl: float = float("inf"),
+        now: Optional[float] = None,
+    ) -> bool:
+        """Keep a value of `size` bytes, evicting the namespace's LRU entries to fit; False if it can never fit"""
+        self.delete(key)
+        space = self._namespace(namespace)
+        space.stats.stores += 1
+        if size > space.quota:
+            space.stats.oversize += 1
+            return False
+
+        while space.entries and space.resident + size > space.quota:
+            evicted, (_, evicted_size, _) = space.entries.popitem(last=False)
+            space.resident -= evicted_size
+            self._key_namespace.pop(evicted, None)
+            space.stats.evictions += 1
+
+        space.entries[key] = ((now if now is not None else time.monotonic()) + ttl, size, value)
+        space.resident += size
+        self._key_namespace[key] = namespace
+        return True
+
+    def delete(self, key: str) -> bool:
+        namespace = self._key_namespace.pop(key, None)
+        return namespace is not None and self._namespaces[namespace].pop(key)
+
+    def invalidate(self, key: str) -> bool:
+        """Drop a key another worker overwrote"""
+        namespace = self._key_namespace.get(key)
+        if namespace is None or not self.delete(key):
+            return False
+        self._namespaces[namespace].stats.invalidations += 1
+        return True
+
+    def clear(self) -> None:
+        for space in self._namespaces.values():
+            space.entries.clear()
+            space.resident = 0
+        self._key_namespace.clear()
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(space.resident for space in self._namespaces.values())
+
+    def __len__(self) -> int:
+        return len(self._key_namespace)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                **space.stats.snapshot(),
+                "entries": len(space.entries),
+                "resident_bytes": space.resident,
+                "quota_bytes": space.quota,
+            }
+            for name, space in self._namespaces.items()
+        }
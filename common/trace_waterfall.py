@@ -0,0 +1,183 @@
+# common/trace_waterfall.py
+"""
+Render a turn's trace from an OTLP-JSON span file as a waterfall.
+
+    python -m common.trace_waterfall traces.jsonl                      # latest trace
+    python -m common.trace_waterfall traces.jsonl --trace <trace id>
+    python -m common.trace_waterfall traces.jsonl --conversation <id>  # latest turn of a conversation
+
+Every service of a deployment may append to the same file (or cat several
+files together). Spans on the critical path - the chain of work the turn
+actually waited on - are marked with "*"; traces of background work linked to
+the turn (state commit, next-checkpoint generation) are listed below it.
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+
+@dataclass
+class WaterfallSpan:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    service: str
+    start_ns: int
+    end_ns: int
+    attributes: Dict[str, object] = field(default_factory=dict)
+    links: List[str] = field(default_factory=list)      # linked trace ids
+    error: bool = False
+    children: List["WaterfallSpan"] = field(default_factory=list)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+
+def _attribute_value(value: Dict[str, object]) -> object:
+    for key in ("stringValue", "boolValue", "doubleValue"):
+        if key in value:
+            return value[key]
+    if "intValue" in value:
+        return int(value["intValue"])
+    return None
+
+
+def _attributes(items: Iterable[Dict[str, object]]) -> Dict[str, object]:
+    return {item["key"]: _attribute_value(item.get("value", {})) for item in items}
+
+
+def load_spans(lines: Iterable[str]) -> List[WaterfallSpan]:
+    """Spans of every ExportTraceServiceRequest line; blank or malformed lines are skipped"""
+    spans = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            continue
+        for resource_spans in request.get("resourceSpans", []):
+            service = _attributes(resource_spans.get("resource", {}).get("attributes", [])).get("service.name", "")
+            for scope_spans in resource_spans.get("scopeSpans", []):
+                for span in scope_spans.get("spans", []):
+                    spans.append(WaterfallSpan(
+                        trace_id=span["traceId"],
+                        span_id=span["spanId"],
+                        parent_id=span.get("parentSpanId") or None,
+                        name=span.get("name", ""),
+                        service=str(service),
+                        start_ns=int(span["startTimeUnixNano"]),
+                        end_ns=int(span["endTimeUnixNano"]),
+                        attributes=_attributes(span.get("attributes", [])),
+                        links=[link["traceId"] for link in span.get("links", [])],
+                        error=span.get("status", {}).get("code") == 2,
+                    ))
+    return spans
+
+
+def select_trace(spans: List[WaterfallSpan], trace_id: Optional[str] = None, conversation_id: Optional[str] = None) -> Optional[str]:
+    """The requested trace, the latest one of a conversation, or the latest one not started as background work"""
+    if trace_id:
+        return trace_id if any(span.trace_id == trace_id for span in spans) else None
+    candidates = [
+        span for span in spans
+        if (conversation_id is None or span.attributes.get("conversation.id") == conversation_id)
+        and not (span.parent_id is None and span.links)
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda span: span.start_ns).trace_id
+
+
+def build_tree(spans: List[WaterfallSpan]) -> List[WaterfallSpan]:
+    """Roots of one trace with children attached; spans whose parent is missing become roots"""
+    by_id = {span.span_id: span for span in spans}
+    for span in spans:
+        span.children = []
+    roots = []
+    for span in sorted(spans, key=lambda s: s.start_ns):
+        parent = by_id.get(span.parent_id) if span.parent_id else None
+        if parent is None:
+            roots.append(span)
+        else:
+            parent.children.append(span)
+    return roots
+
+
+def critical_path(root: WaterfallSpan) -> Set[str]:
+    """
+    Span ids the root waited on: walking back from its end, the child that
+    finished last, then whichever finished last before that child started,
+    and so on, recursively.
+    """
+    path = {root.span_id}
+    cursor = root.end_ns
+    for child in sorted(root.children, key=lambda c: c.end_ns, reverse=True):
+        if child.end_ns <= cursor:
+            path |= critical_path(child)
+            cursor = child.start_ns
+    return path
+
+
+def render_waterfall(spans: List[WaterfallSpan], width: int = 48) -> str:
+    """Text waterfall of one trace: offset, duration, critical-path marker, tree and bar"""
+    roots = build_tree(spans)
+    if not roots:
+        return ""
+    start = min(span.start_ns for span in spans)
+    end = max(span.end_ns for span in spans)
+    scale = width / max(end - start, 1)
+    on_path: Set[str] = set()
+    for root in roots:
+        on_path |= critical_path(root)
+
+    lines = [f"trace {spans[0].trace_id}  {(end - start) / 1e6:.1f}ms"]
+
+    def walk(span: WaterfallSpan, depth: int) -> None:
+        begin = int((span.start_ns - start) * scale)
+        length = max(int((span.end_ns - start) * scale) - begin, 1)
+        bar = " " * begin + "█" * length
+        marker = "*" if span.span_id in on_path else " "
+        label = f"{'  ' * depth}{span.name}{' !' if span.error else ''} [{span.service}]"
+        lines.append(
+            f"{(span.start_ns - start) / 1e6:8.1f} {span.duration_ms:8.1f}ms {marker} {label:<56} |{bar:<{width}}|"
+        )
+        for child in span.children:
+            walk(child, depth + 1)
+
+    for root in roots:
+        walk(root, 0)
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Render a trace from an OTLP-JSON span file as a waterfall")
+    parser.add_argument("file", help="OTLP-JSON lines written by the file exporter (TRACING_EXPORTER=file)")
+    parser.add_argument("--trace", help="Trace id to render (default: the latest trace)")
+    parser.add_argument("--conversation", help="Render the latest turn of this conversation")
+    parser.add_argument("--width", type=int, default=48, help="Width of the bars in characters")
+    args = parser.parse_args(argv)
+
+    with open(args.file, encoding="utf-8") as f:
+        spans = load_spans(f)
+    trace_id = select_trace(spans, args.trace, args.conversation)
+    if trace_id is None:
+        print("No matching trace", file=sys.stderr)
+        return 1
+
+    print(render_waterfall([span for span in spans if span.trace_id == trace_id], args.width))
+    linked = sorted({span.trace_id for span in spans if trace_id in span.links})
+    for linked_id in linked:
+        print("\nlinked background work:")
+        print(render_waterfall([span for span in spans if span.trace_id == linked_id], args.width))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,503 @@
+# common/tracing.py
+"""
+Distributed tracing across gateway -> core -> specialists -> Gemini.
+
+A small in-house tracer speaking W3C trace-context, so a turn can be followed
+across services and any OTLP-aware tool can read what we write:
+
+- incoming requests carry `traceparent: 00-<trace id>-<parent span id>-<flags>`;
+  TracingMiddleware opens a server span continuing that trace
+- outgoing calls add the header of the current span (inject_headers), so the
+  next hop's spans become children of ours
+- Redis/MongoDB operations (common.metrics.track_datastore), LLM calls
+  (LLMGateway.request) and the orchestrator's pipeline stages open child spans
+- work that outlives the request starts a new trace linked to the turn that
+  spawned it (traced_background), so it never stretches the turn's waterfall
+
+The current span lives in a ContextVar like the request deadline and priority,
+so tasks created while serving a request inherit it. Finished spans go to the
+configured exporter: OTLP-JSON lines in a local file (TRACING_EXPORTER="file")
+or an in-memory collector for tests. With no exporter spans are still created
+and propagated, just never serialised. Render a file with:
+
+    python -m common.trace_waterfall traces.jsonl [--trace <id>] [--conversation <id>]
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Dict, Iterator, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TRACEPARENT_HEADER = "traceparent"
+
+# OTLP SpanKind values
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+SCOPE_NAME = "noyco.tracing"
+
+# Spans buffered by FileExporter before a write, unless a local root ends first
+FILE_BATCH_SIZE = 64
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    """The part of a span that crosses process boundaries"""
+    trace_id: str           # 32 lowercase hex chars
+    span_id: str            # 16 lowercase hex chars
+    sampled: bool = True
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+@dataclass
+class Span:
+    name: str
+    context: SpanContext
+    parent_id: Optional[str] = None
+    kind: int = INTERNAL
+    service: str = ""
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    links: List[SpanContext] = field(default_factory=list)
+    status: int = STATUS_UNSET
+    status_message: str = ""
+    remote_parent: bool = False
+
+    @property
+    def trace_id(self) -> str:
+        return self.context.trace_id
+
+    @property
+    def span_id(self) -> str:
+        return self.context.span_id
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"[:300]
+
+    def end(self) -> None:
+        """Finish the span and hand it to the exporter; later calls are no-ops"""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        get_tracer().on_end(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        data = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status},
+        }
+        if self.parent_id:
+            data["parentSpanId"] = self.parent_id
+        if self.status_message:
+            data["status"]["message"] = self.status_message
+        if self.links:
+            data["links"] = [{"traceId": link.trace_id, "spanId": link.span_id} for link in self.links]
+        return data
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def export_request(spans: List[Span]) -> Dict[str, Any]:
+    """OTLP-JSON ExportTraceServiceRequest for a batch of spans, grouped by service"""
+    by_service: Dict[str, List[Dict[str, Any]]] = {}
+    for span in spans:
+        by_service.setdefault(span.service, []).append(span.to_otlp())
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _otlp_attributes({"service.name": service})},
+                "scopeSpans": [{"scope": {"name": SCOPE_NAME}, "spans": otlp_spans}],
+            }
+            for service, otlp_spans in by_service.items()
+        ]
+    }
+
+
+# ---------------------------------------------------------------------------
+# Exporters
+# ---------------------------------------------------------------------------
+
+class InMemoryExporter:
+    """Keeps finished spans in a list; for tests"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span]) -> None:
+        self.spans.extend(spans)
+
+    def flush(self) -> None:
+        pass
+
+    def find(self, name: str) -> List[Span]:
+        return [span for span in self.spans if span.name == name]
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+class FileExporter:
+    """
+    Appends OTLP-JSON to a local file, one ExportTraceServiceRequest per line.
+
+    Spans are buffered and written when a batch fills up or a local root span
+    (the server span of a request, a background job) ends, so a request costs
+    at most one small append.
+    """
+
+    def __init__(self, path: str, batch_size: int = FILE_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        with self._lock:
+            self._buffer.extend(spans)
+            if len(self._buffer) < self.batch_size and not any(_is_local_root(s) for s in spans):
+                return
+            batch, self._buffer = self._buffer, []
+        self._write(batch)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: List[Span]) -> None:
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(export_request(batch), separators=(",", ":")) + "\n")
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write {len(batch)} spans to {self.path}: {e}")
+
+
+def _is_local_root(span: Span) -> bool:
+    return span.parent_id is None or span.remote_parent
+
+
+# ---------------------------------------------------------------------------
+# Tracer
+# ---------------------------------------------------------------------------
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    def __init__(self, service: str = "noyco", exporter=None, sample_rate: float = 1.0):
+        self.service = service
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def _sample(self) -> bool:
+        return self.exporter is not None and (self.sample_rate >= 1.0 or random.random() < self.sample_rate)
+
+    def new_span(
+        self,
+        name: str,
+        parent: Optional[SpanContext] = None,
+        kind: int = INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        links: Optional[List[SpanContext]] = None,
+        remote_parent: bool = False,
+    ) -> Span:
+        if parent is None:
+            context = SpanContext(_random_id(16), _random_id(8), self._sample())
+        else:
+            context = SpanContext(parent.trace_id, _random_id(8), parent.sampled)
+        return Span(
+            name=name,
+            context=context,
+            parent_id=parent.span_id if parent else None,
+            kind=kind,
+            service=self.service,
+            attributes=dict(attributes or {}),
+            links=list(links or []),
+            remote_parent=remote_parent,
+        )
+
+    def on_end(self, span: Span) -> None:
+        if self.exporter is None or not span.context.sampled:
+            return
+        try:
+            self.exporter.export([span])
+        except Exception as e:
+            logger.warning(f"⚠️ Span export failed: {e}")
+
+    def flush(self) -> None:
+        if self.exporter is not None:
+            self.exporter.flush()
+
+
+def _random_id(n_bytes: int) -> str:
+    value = random.getrandbits(n_bytes * 8)
+    while value == 0:           # all-zero ids are invalid
+        value = random.getrandbits(n_bytes * 8)
+    return f"{value:0{n_bytes * 2}x}"
+
+
+def _exporter_from_settings():
+    try:
+        from common.config import get_settings
+        settings = get_settings()
+        kind, path, rate = settings.TRACING_EXPORTER, settings.TRACING_FILE, settings.TRACING_SAMPLE_RATE
+    except Exception:
+        kind = os.getenv("TRACING_EXPORTER", "none")
+        path = os.getenv("TRACING_FILE", "traces.jsonl")
+        rate = float(os.getenv("TRACING_SAMPLE_RATE", 1.0))
+    kind = (kind or "none").lower()
+    if kind == "file":
+        return FileExporter(path), rate
+    if kind == "memory":
+        return InMemoryExporter(), rate
+    return None, rate
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        exporter, rate = _exporter_from_settings()
+        _tracer = Tracer(exporter=exporter, sample_rate=rate)
+    return _tracer
+
+
+def configure_tracing(service: Optional[str] = None, exporter=None, sample_rate: Optional[float] = None) -> Tracer:
+    """
+    Name the process's service and, optionally, replace the exporter from
+    settings (e.g. with an InMemoryExporter in tests). Call once at startup.
+    """
+    tracer = get_tracer()
+    if service:
+        tracer.service = service
+    if exporter is not None:
+        tracer.exporter = exporter
+    if sample_rate is not None:
+        tracer.sample_rate = sample_rate
+    if tracer.exporter is not None:
+        logger.info(f"✅ Tracing {tracer.service} with {type(tracer.exporter).__name__}")
+    return tracer
+
+
+# ---------------------------------------------------------------------------
+# Context propagation
+# ---------------------------------------------------------------------------
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """SpanContext from a W3C traceparent header; None when missing or invalid"""
+    if not value:
+        return None
+    parts = value.strip().lower().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff":
+        return None
+    _, trace_id, span_id, flags = parts[:4]
+    if len(trace_id) != 32 or len(span_id) != 16 or len(flags) != 2:
+        return None
+    try:
+        if int(trace_id, 16) == 0 or int(span_id, 16) == 0:
+            return None
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    return SpanContext(trace_id, span_id, sampled)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def inject_headers(headers: Optional[Dict[str, str]] = None, span: Optional[Span] = None) -> Dict[str, str]:
+    """Add the traceparent of `span` (default: the current span) to `headers`; returned, {} outside a span"""
+    headers = {} if headers is None else headers
+    span = span or _current_span.get()
+    if span is not None:
+        headers[TRACEPARENT_HEADER] = span.context.traceparent()
+    return headers
+
+
+def set_attribute(key: str, value: Any) -> None:
+    """Set an attribute on the current span, if any"""
+    span = _current_span.get()
+    if span is not None:
+        span.set_attribute(key, value)
+
+
+@contextmanager
+def start_span(
+    name: str,
+    kind: int = INTERNAL,
+    attributes: Optional[Dict[str, Any]] = None,
+    parent: Optional[SpanContext] = None,
+    links: Optional[List[SpanContext]] = None,
+    root: bool = False,
+) -> Iterator[Span]:
+    """
+    Run a block inside a span, a child of the current span unless `parent`
+    (a remote context) is given or `root` starts a new trace. Exceptions mark
+    the span as failed and propagate.
+    """
+    remote = parent is not None
+    if parent is None and not root:
+        current = _current_span.get()
+        parent = current.context if current is not None else None
+    span = get_tracer().new_span(name, parent, kind, attributes, links, remote_parent=remote)
+    previous = _current_span.get()
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Exited in another context, e.g. an async generator finalised by the loop
+            _current_span.set(previous)
+        span.end()
+
+
+def start_detached_span(name: str, kind: int = INTERNAL, attributes: Optional[Dict[str, Any]] = None) -> Span:
+    """
+    A child of the current span that is not made current: for stages that
+    start and end in different places (TimingMetrics, streams consumed by
+    the caller) and may overlap.
+    The caller must end() it.
+    """
+    current = _current_span.get()
+    return get_tracer().new_span(name, current.context if current else None, kind, attributes)
+
+
+@contextmanager
+def detached_span(name: str, kind: int = INTERNAL, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Span]:
+    """
+    start_detached_span() for a block: ended (and failed on an exception) when
+    the block exits. For blocks that may yield to a consumer, such as an LLM
+    slot held by a streaming generator.
+    """
+    span = start_detached_span(name, kind, attributes)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        span.end()
+
+
+async def traced_background(name: str, awaitable: Awaitable[T], attributes: Optional[Dict[str, Any]] = None) -> T:
+    """
+    Run work that outlives the request in a new trace linked to the span that
+    spawned it; start it as its own task, like without_deadline().
+    """
+    origin = _current_span.get()
+    links = [origin.context] if origin is not None else None
+    with start_span(name, attributes=attributes, links=links, root=True):
+        return await awaitable
+
+
+# ---------------------------------------------------------------------------
+# ASGI middleware
+# ---------------------------------------------------------------------------
+
+class TracingMiddleware:
+    """
+    Opens a server span per HTTP request, continuing the caller's trace from
+    its traceparent header. A plain ASGI middleware rather than
+    BaseHTTPMiddleware so the span is current inside the endpoint; the span
+    ends when the last body chunk is sent, before any background tasks run.
+    """
+
+    def __init__(self, app, service: Optional[str] = None, exclude_paths=("/metrics", "/health")):
+        self.app = app
+        self.exclude_paths = tuple(exclude_paths)
+        if service:
+            configure_tracing(service)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path", "").endswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        parent = parse_traceparent(headers.get(TRACEPARENT_HEADER))
+        method = scope.get("method", "GET")
+        path = scope.get("path", "")
+
+        span = get_tracer().new_span(
+            f"{method} {path}",
+            parent,
+            SERVER,
+            {"http.method": method, "http.target": path},
+            remote_parent=parent is not None,
+        )
+        token = _current_span.set(span)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.status = STATUS_ERROR
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                _finish()
+
+        def _finish():
+            route = scope.get("route")
+            if route is not None and getattr(route, "path", None):
+                span.name = f"{method} {scope.get('root_path', '')}{route.path}"
+            span.end()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            _finish()
@@ -1,7 +1,8 @@
 # File: common/utils.py
+import asyncio
 import json
 import uuid
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, Iterable, List, Optional
 
 def generate_id() -> str:
     """Generate a unique ID"""
@@ -39,3 +40,17 @@ def parse_key_value_response(response_text: str) -> Dict[str, Any]:
             result[current_key] += " " + line
 
     return result
+
+async def iterate_in_executor(iterable: Iterable[Any]) -> AsyncIterator[Any]:
+    """
+    Consume a blocking iterator (e.g. a Gemini stream=True response) from a
+    worker thread, so waiting for each chunk does not stall the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = iter(iterable)
+    done = object()
+    while True:
+        item = await loop.run_in_executor(None, next, iterator, done)
+        if item is done:
+            return
+        yield item
@@ -206,12 +206,33 @@ from common.gemini_client import get_gemini_client
 from common.models import Checkpoint
 import logging
 import asyncio
+from common.deadline import timeout_for
 from orchestrator.timing import TimingMetrics
 
 _logger = logging.getLogger(__name__)
 
-# Simple in-memory cache
-_simple_cache = {}
+# Evaluation prompts are deterministic, so identical (checkpoint, context, message)
+# triples are served from the shared LLM response cache
+EVALUATION_CACHE_TTL = 1800
+
+# Model call timeout, shortened to the request's remaining deadline; with less
+# than MIN_EVALUATION_BUDGET seconds left the fast fallback is used instead
+EVALUATION_TIMEOUT = 1.5
+MIN_EVALUATION_BUDGET = 0.3
+
+def _fast_fallback(text: str, timing: TimingMetrics) -> Dict[str, Any]:
+    """Quick keyword/length evaluation used when the model cannot answer in time"""
+    has_content = len(text.strip()) > 5
+    has_keywords = any(word in text.lower() for word in ['yes', 'no', 'mg', 'daily', 'morning'])
+    fallback_complete = has_content and (has_keywords or len(text.strip()) > 15)
+
+    return {
+        "checkpoint_complete": fallback_complete,
+        "progress_percentage": 90.0 if fallback_complete else 40.0,
+        "next_checkpoint": None,
+        "confidence": 0.75 if fallback_complete else 0.45,
+        "timing_metrics": timing.get_metrics()
+    }
 
 async def track_checkpoint_progress(text: str, checkpoint: Optional[Checkpoint], context: List[Dict[str, str]]) -> Dict[str, Any]:
     """
@@ -240,16 +261,12 @@ async def track_checkpoint_progress(text: str, checkpoint: Optional[Checkpoint],
             "timing_metrics": timing.get_metrics()
         }
 
-    # Simple cache check (much faster than complex hashing)
-    timing.start("cache_check")
-    simple_key = f"{text[:50]}:{checkpoint.name[:30]}"
-    if simple_key in _simple_cache:
-        timing.end("cache_check")
+    # Not enough of the request's deadline left for a model call
+    timeout = timeout_for(EVALUATION_TIMEOUT)
+    if timeout < MIN_EVALUATION_BUDGET:
         timing.end("total_processing")
-        cached_result = _simple_cache[simple_key].copy()
-        cached_result["timing_metrics"] = {"total_processing": 1.0, "cache_hit": 1.0}
-        return cached_result
-    timing.end("cache_check")
+        _logger.warning(f"Only {timeout:.2f}s left before the deadline - using fast fallback")
+        return _fast_fallback(text, timing)
 
     # Streamlined context formatting (only last 2 turns)
     timing.start("context_formatting")
@@ -291,8 +308,8 @@ Confidence: [0-100]"""
         
         # Add timeout to the API call
         response = await asyncio.wait_for(
-            client.generate_content(prompt),
-            timeout=1.5  # Aggressive but realistic timeout
+            client.generate_content(prompt, caller="checklist", cache_ttl=EVALUATION_CACHE_TTL),
+            timeout=timeout  # Aggressive but realistic timeout
         )
         
         timing.end("gemini_api_call")
@@ -302,19 +319,7 @@ Confidence: [0-100]"""
         timing.end("gemini_api_call")
         timing.end("total_processing")
         _logger.warning("Gemini API timeout - using fast fallback")
-        
-        # Quick fallback evaluation
-        has_content = len(text.strip()) > 5
-        has_keywords = any(word in text.lower() for word in ['yes', 'no', 'mg', 'daily', 'morning'])
-        fallback_complete = has_content and (has_keywords or len(text.strip()) > 15)
-        
-        return {
-            "checkpoint_complete": fallback_complete,
-            "progress_percentage": 90.0 if fallback_complete else 40.0,
-            "next_checkpoint": None,
-            "confidence": 0.75 if fallback_complete else 0.45,
-            "timing_metrics": timing.get_metrics()
-        }
+        return _fast_fallback(text, timing)
         
     except Exception as e:
         timing.end("gemini_api_call")
@@ -359,23 +364,6 @@ Confidence: [0-100]"""
         final_checkpoint_complete = False
     timing.end("evaluation_logic")
 
-    # Simple caching (limit size)
-    timing.start("cache_store")
-    _simple_cache[simple_key] = {
-        "checkpoint_complete": final_checkpoint_complete,
-        "progress_percentage": progress_percentage,
-        "next_checkpoint": None,
-        "confidence": confidence
-    }
-    
-    # Keep cache small for speed
-    if len(_simple_cache) > 50:
-        # Remove first 10 entries
-        keys_to_remove = list(_simple_cache.keys())[:10]
-        for key in keys_to_remove:
-            del _simple_cache[key]
-    timing.end("cache_store")
-
     timing.end("total_processing")
 
     # Get timing metrics
@@ -5,6 +5,10 @@ import re
 from common.gemini_client import get_gemini_client
 from common.models import CheckpointType
 
+# Checkpoint prompts only vary by intent/agent/context, so first-turn prompts repeat
+# across users and are served from the shared LLM response cache
+CHECKPOINT_CACHE_TTL = 3600
+
 def get_agent_specific_prompt(
     query: str,
     context_str: str,
@@ -234,7 +238,7 @@ async def generate_checkpoints(
         print(f"  - Has Context: {bool(context_to_use)}")
         print(f"  - Query: {query[:100]}...")
         
-        response = await client.generate_content(prompt)
+        response = await client.generate_content(prompt, caller="checkpoint", cache_ttl=CHECKPOINT_CACHE_TTL)
         response_text = response.text.strip()
 
         print(f"Enhanced checkpoint generation completed successfully")
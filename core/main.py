@@ -6,9 +6,14 @@ with sub-mounted applications accessible via different paths.
 
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from .config import get_core_config
+from common.deadline import DEADLINE_HEADER, parse_deadline, set_deadline
+from common.metrics import CONTENT_TYPE, render_metrics, start_loop_lag_monitor, stop_loop_lag_monitor
+from common.single_flight import get_single_flight_stats
+from common.llm_replay import configure_llm_replay
+from common.tracing import TracingMiddleware, get_tracer
 
 # Get the config instance
 config = get_core_config()
@@ -61,6 +66,11 @@ async def lifespan(app: FastAPI):
         logger.info("✅ Memory Manager initialized")
     except Exception as e:
         logger.error(f"❌ Failed to initialize Memory Manager: {e}")
+
+    # Mounted sub-app lifespans don't run, so the orchestrator's cache is started here
+    from .orchestrator.state_manager import cache_manager
+    await cache_manager.initialize()
+    start_loop_lag_monitor()
     
     yield
     
@@ -72,6 +82,9 @@ async def lifespan(app: FastAPI):
             logger.info("✅ Memory Manager closed")
     except Exception as e:
         logger.error(f"❌ Error closing Memory Manager: {e}")
+    await cache_manager.close()
+    stop_loop_lag_monitor()
+    get_tracer().flush()
 
 # Create the main FastAPI application
 app = FastAPI(
@@ -90,12 +103,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def deadline_middleware(request: Request, call_next):
+    """Adopt the caller's remaining deadline (X-Deadline-Ms) for requests to every mounted service"""
+    set_deadline(parse_deadline(request.headers.get(DEADLINE_HEADER)))
+    return await call_next(request)
+
+# Outermost: one server span per request, continuing the caller's trace (traceparent)
+app.add_middleware(TracingMiddleware, service="core")
+
+# Serve Gemini from recorded fixtures when LLM_REPLAY_MODE is set (offline load tests)
+configure_llm_replay()
+
 # Mount the sub-applications
 app.mount("/orchestrator", orchestrator_app)
 app.mount("/primary", primary_app) 
 app.mount("/checkpoint", checkpoint_app)
 app.mount("/checklist", checklist_app)
 
+# Let the orchestrator call the co-mounted services in-process instead of over loopback HTTP
+try:
+    if import_mode == "standalone":
+        from orchestrator import service_bus
+        from orchestrator.config import get_settings as get_orchestrator_settings
+    else:
+        from .orchestrator import service_bus
+        from .orchestrator.config import get_settings as get_orchestrator_settings
+
+    _orchestrator_settings = get_orchestrator_settings()
+    service_bus.set_enabled(_orchestrator_settings.IN_PROCESS_DISPATCH)
+    for _prefix, _sub_app, _base_url in (
+        ("/primary", primary_app, _orchestrator_settings.PRIMARY_SERVICE_URL),
+        ("/checkpoint", checkpoint_app, _orchestrator_settings.CHECKPOINT_URL),
+        ("/checklist", checklist_app, _orchestrator_settings.CHECKLIST_SERVICE_URL),
+    ):
+        service_bus.register_mounted_app(_prefix, _sub_app, _base_url)
+    logger.info(f"✅ In-process dispatch registered for: {sorted(service_bus.get_bus_stats()['routes'])}")
+except Exception as e:
+    logger.error(f"❌ Failed to register in-process routes, falling back to HTTP: {e}")
+
+# Metrics of every service in this process (orchestrator, primary, checkpoint, checklist)
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
 # Root health check endpoint
 @app.get("/health")
 async def health_check():
@@ -107,10 +159,24 @@ async def health_check():
     except Exception as e:
         memory_health = {"error": str(e)}
     
+    try:
+        bus_stats = service_bus.get_bus_stats()
+    except Exception as e:
+        bus_stats = {"error": str(e)}
+
+    try:
+        from common.gemini_client import get_gemini_client
+        llm_stats = get_gemini_client().get_stats()
+    except Exception as e:
+        llm_stats = {"error": str(e)}
+
     return {
         "status": "ok", 
         "service": "core",
         "memory": memory_health,
+        "in_process_dispatch": bus_stats,
+        "llm": llm_stats,
+        "single_flight": get_single_flight_stats(),
         "services": {
             "orchestrator": "mounted at /orchestrator",
             "primary": "mounted at /primary",
@@ -0,0 +1,278 @@
+"""
+Change-set persistence for conversation state.
+
+Instead of rewriting the whole conversation document on every save, the
+orchestrator diffs the state against a snapshot of what was last persisted
+and writes only the difference:
+
+- messages appended to `context` / `complete_context` become `$push` (with
+  `$slice` for the rolling context window);
+- changed tasks become positional `$set`s (`task_stack.<i>`), or one `$set`
+  of the whole stack when tasks were added, removed or reordered;
+- other fields are `$set` only when their content changed.
+
+Every write bumps `state_version`. A change set only applies to the version
+it was computed against, so a writer holding a stale copy falls back to a
+full write instead of pushing onto a document it has not seen. The same
+change set is applied to the Redis mirror (`ChangeSet.apply`).
+"""
+
+import copy
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+VERSION_FIELD = "state_version"
+TASK_FIELD = "task_stack"
+# Only ever appended to between saves
+APPEND_FIELDS = ("context", "complete_context")
+# Identity and version are never diffed
+UNTRACKED_FIELDS = ("conversation_id", VERSION_FIELD)
+
+
+def fingerprint(value: Any) -> str:
+    """Stable content hash of a JSON-like value"""
+    encoded = json.dumps(value, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+@dataclass
+class StateSnapshot:
+    """What the store holds for a conversation, reduced to what diffing needs"""
+    lengths: Dict[str, int]                     # append-only field -> persisted length
+    tails: Dict[str, Optional[str]]             # append-only field -> fingerprint of its last item
+    tasks: List[Tuple[Optional[str], str]]      # (task_id, fingerprint) in stack order
+    fields: Dict[str, str]                      # every other field -> fingerprint
+
+    @classmethod
+    def capture(
+        cls,
+        state: Dict[str, Any],
+        previous: Optional["StateSnapshot"] = None,
+        changed_tasks: Optional[Set[Any]] = None,
+    ) -> "StateSnapshot":
+        """
+        Snapshot `state`. With a `previous` snapshot and the ids of the tasks
+        changed since (`changed_tasks`), other tasks keep their fingerprint.
+        """
+        lengths, tails = {}, {}
+        for name in APPEND_FIELDS:
+            items = state.get(name) or []
+            lengths[name] = len(items)
+            tails[name] = fingerprint(items[-1]) if items else None
+        known = {}
+        if previous is not None and changed_tasks is not None:
+            known = {task_id: task_print for task_id, task_print in previous.tasks if task_id is not None}
+        tasks = []
+        for task in state.get(TASK_FIELD) or []:
+            task_id = task.get("task_id")
+            task_print = known.get(task_id) if task_id in known and task_id not in changed_tasks else None
+            tasks.append((task_id, task_print or fingerprint(task)))
+        fields = {
+            name: fingerprint(value) for name, value in state.items()
+            if name not in APPEND_FIELDS and name != TASK_FIELD and name not in UNTRACKED_FIELDS
+        }
+        return cls(lengths=lengths, tails=tails, tasks=tasks, fields=fields)
+
+
+@dataclass
+class ChangeSet:
+    """The writes that bring the stored conversation up to date"""
+    conversation_id: str
+    base_version: Optional[int] = None          # None for a full write
+    set: Dict[str, Any] = field(default_factory=dict)
+    push: Dict[str, List[Any]] = field(default_factory=dict)
+    slice: Dict[str, int] = field(default_factory=dict)
+    tasks: List[Dict[str, Any]] = field(default_factory=list)   # tasks to upsert in the tasks collection
+
+    @property
+    def full(self) -> bool:
+        return self.base_version is None
+
+    def is_empty(self) -> bool:
+        return not (self.full or self.set or self.push)
+
+    def mongo_update(self, version: Optional[int] = None) -> Dict[str, Any]:
+        """The update document; bumps state_version, or sets it when `version` is given"""
+        update: Dict[str, Any] = {}
+        if version is None:
+            update["$inc"] = {VERSION_FIELD: 1}
+            if self.set:
+                update["$set"] = self.set
+        else:
+            update["$set"] = {**self.set, VERSION_FIELD: version}
+        if self.push:
+            update["$push"] = {
+                name: {"$each": items, "$slice": -self.slice[name]} if name in self.slice else {"$each": items}
+                for name, items in self.push.items()
+            }
+        return update
+
+    def apply(self, doc: Dict[str, Any], version: int) -> Dict[str, Any]:
+        """Apply the change set to an in-memory copy of the document, as Mongo would"""
+        for path, value in self.set.items():
+            _set_path(doc, path, value)
+        for name, items in self.push.items():
+            current = doc.setdefault(name, [])
+            current.extend(items)
+            limit = self.slice.get(name)
+            if limit is not None and len(current) > limit:
+                del current[:-limit]
+        doc[VERSION_FIELD] = version
+        return doc
+
+    def merge(self, later: "ChangeSet") -> "ChangeSet":
+        """
+        Fold a change set computed after this one into it, so both can be
+        written as one update. Neither input is modified.
+        """
+        if later.full:
+            return copy.deepcopy(later)
+
+        merged = copy.deepcopy(self)
+        for path, value in later.set.items():
+            # A later write to a path replaces earlier writes to it and below it
+            for existing in [p for p in merged.set if p == path or p.startswith(path + ".")]:
+                del merged.set[existing]
+            merged.push.pop(path, None)
+            merged.slice.pop(path, None)
+            if any(path.startswith(p + ".") for p in merged.set):
+                # Inside a value written earlier in the batch, e.g. task_stack.1 after task_stack
+                _set_path(merged.set, path, copy.deepcopy(value))
+            else:
+                merged.set[path] = copy.deepcopy(value)
+
+        for name, items in later.push.items():
+            limit = later.slice.get(name)
+            if name in merged.set:
+                # Pushing onto a list written earlier in the same batch
+                current = merged.set[name] = list(merged.set[name]) + list(items)
+                if limit is not None and len(current) > limit:
+                    del current[:-limit]
+                continue
+            merged.push[name] = merged.push.get(name, []) + list(items)
+            if limit is not None:
+                merged.slice[name] = limit
+
+        tasks = {task.get("task_id"): task for task in merged.tasks}
+        for task in later.tasks:
+            tasks[task.get("task_id")] = task
+        merged.tasks = list(tasks.values())
+        return merged
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "conversation_id": self.conversation_id,
+            "base_version": self.base_version,
+            "set": self.set,
+            "push": self.push,
+            "slice": self.slice,
+            "tasks": self.tasks,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ChangeSet":
+        return cls(
+            conversation_id=data["conversation_id"],
+            base_version=data.get("base_version"),
+            set=data.get("set") or {},
+            push=data.get("push") or {},
+            slice=data.get("slice") or {},
+            tasks=data.get("tasks") or [],
+        )
+
+    def describe(self) -> str:
+        if self.full:
+            return "full"
+        parts = [f"set {', '.join(sorted(self.set))}"] if self.set else []
+        parts += [f"push {len(items)} to {name}" for name, items in self.push.items()]
+        return "; ".join(parts)
+
+
+def _set_path(doc: Dict[str, Any], path: str, value: Any) -> None:
+    parts = path.split(".")
+    target: Any = doc
+    for part in parts[:-1]:
+        target = target[int(part)] if isinstance(target, list) else target.setdefault(part, {})
+    last = parts[-1]
+    if isinstance(target, list):
+        target[int(last)] = value
+    else:
+        target[last] = value
+
+
+def full_change_set(conversation_id: str, state: Dict[str, Any],
+                    limits: Optional[Dict[str, int]] = None) -> ChangeSet:
+    """A change set that rewrites the whole document"""
+    limits = limits or {}
+    values = {name: value for name, value in state.items() if name != VERSION_FIELD}
+    for name, limit in limits.items():
+        if isinstance(values.get(name), list) and len(values[name]) > limit:
+            values[name] = values[name][-limit:]
+    return ChangeSet(conversation_id, set=values, tasks=list(state.get(TASK_FIELD) or []))
+
+
+def diff_state(
+    conversation_id: str,
+    snapshot: Optional[StateSnapshot],
+    state: Dict[str, Any],
+    base_version: int,
+    dirty: Optional[Set[str]] = None,
+    limits: Optional[Dict[str, int]] = None,
+    changed_tasks: Optional[Set[Any]] = None,
+) -> ChangeSet:
+    """
+    Compute the change set from `snapshot` (the persisted state at
+    `base_version`) to `state`. Without a snapshot the whole state is written.
+
+    Fields in `dirty` are rewritten even if their content looks unchanged.
+    `limits` caps append-only fields to their last N items.
+    `changed_tasks`, when given, are the ids of the only tasks that may have
+    changed since the snapshot; the others are not fingerprinted.
+    """
+    if snapshot is None:
+        return full_change_set(conversation_id, state, limits)
+
+    dirty = dirty or set()
+    limits = limits or {}
+    changes = ChangeSet(conversation_id, base_version=base_version)
+
+    for name in APPEND_FIELDS:
+        items = state.get(name) or []
+        persisted = snapshot.lengths.get(name, 0)
+        tail = snapshot.tails.get(name)
+        appended_only = len(items) >= persisted and (
+            persisted == 0 or fingerprint(items[persisted - 1]) == tail
+        )
+        if not appended_only:
+            # Rewritten or truncated locally: replace the whole list
+            limit = limits.get(name)
+            changes.set[name] = items[-limit:] if limit else items
+        elif len(items) > persisted:
+            changes.push[name] = items[persisted:]
+            if name in limits:
+                changes.slice[name] = limits[name]
+
+    tasks = state.get(TASK_FIELD) or []
+    known = dict(snapshot.tasks)
+    same_shape = [task.get("task_id") for task in tasks] == [task_id for task_id, _ in snapshot.tasks]
+    for i, task in enumerate(tasks):
+        task_id = task.get("task_id")
+        if changed_tasks is not None and task_id is not None and task_id not in changed_tasks and task_id in known:
+            continue
+        if known.get(task_id) == fingerprint(task):
+            continue
+        changes.tasks.append(task)
+        if same_shape:
+            changes.set[f"{TASK_FIELD}.{i}"] = task
+    if not same_shape:
+        changes.set[TASK_FIELD] = tasks
+
+    for name, value in state.items():
+        if name in APPEND_FIELDS or name == TASK_FIELD or name in UNTRACKED_FIELDS:
+            continue
+        if name in dirty or snapshot.fields.get(name) != fingerprint(value):
+            changes.set[name] = value
+
+    return changes
@@ -11,10 +11,12 @@ import asyncio
 if __name__ == "__main__" and __package__ is None:
     from memory.redis_client import RedisMemory
     from memory.mongo_client import MongoMemory
+    from memory.turn_journal import JournalConflict, TurnJournal
     from orchestrator.config import get_settings
 else:
     from .redis_client import RedisMemory
     from .mongo_client import MongoMemory
+    from .turn_journal import JournalConflict, TurnJournal
     from ..orchestrator.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -38,6 +40,7 @@ class MemoryManager:
         if not hasattr(self, 'initialized'):
             self.redis_memory: Optional[RedisMemory] = None
             self.mongo_memory: Optional[MongoMemory] = None
+            self.journal: Optional[TurnJournal] = None
             self.settings = get_settings()
             self.initialized = False
     
@@ -63,6 +66,18 @@ class MemoryManager:
                 )
                 await self.mongo_memory.initialize()
                 logger.info("✅ MongoDB memory initialized")
+
+                # Write-behind journal for conversation state
+                if self.settings.TURN_JOURNAL:
+                    self.journal = TurnJournal(
+                        self.redis_memory.redis,
+                        self.mongo_memory,
+                        redis_url=self.settings.REDIS_URL,
+                        flush_interval=self.settings.JOURNAL_FLUSH_INTERVAL,
+                        flush_batch=self.settings.JOURNAL_FLUSH_BATCH
+                    )
+                    self.journal.start()
+                    logger.info("✅ Turn journal flusher started")
                 
                 self.initialized = True
                 logger.info("✅ Memory Manager fully initialized")
@@ -88,8 +103,10 @@ class MemoryManager:
             if state:
                 return state
             
-            # Fallback to MongoDB (persistent storage)
+            # Fallback to MongoDB (persistent storage) plus turns not flushed to it yet
             state = await self.mongo_memory.get_conversation_state(conversation_id)
+            if self.journal:
+                state = await self.journal.merge_pending(conversation_id, state)
             if state:
                 # Cache in Redis for future requests
                 await self.redis_memory.set_conversation_state(conversation_id, state)
@@ -124,6 +141,43 @@ class MemoryManager:
             logger.error(f"❌ Error saving conversation state: {e}")
             return False
     
+    async def apply_conversation_changes(self, changes) -> Optional[int]:
+        """
+        Commit a ChangeSet (to the turn journal, or straight to MongoDB), then
+        mirror it in Redis.
+
+        Returns the new state_version, or None when a partial change set was
+        rejected because the conversation moved on since it was computed.
+        """
+        await self.ensure_initialized()
+
+        # Committed to the journal and flushed to MongoDB in the background,
+        # or written to MongoDB directly when the journal is off or unavailable
+        version = None
+        if self.journal:
+            try:
+                version = await self.journal.append(changes)
+            except JournalConflict as e:
+                logger.warning(f"⚠️ {e}")
+                return None
+        if version is None:
+            # MongoDB is the source of truth; Redis only follows a successful write
+            version = await self.mongo_memory.apply_conversation_changes(changes)
+            if version is None:
+                return None
+
+        try:
+            if changes.full:
+                await self.redis_memory.set_conversation_state(
+                    changes.conversation_id, {**changes.set, "state_version": version}
+                )
+            else:
+                await self.redis_memory.apply_conversation_changes(changes, version)
+        except Exception as e:
+            logger.warning(f"⚠️ Redis mirror not updated for {changes.conversation_id}: {e}")
+
+        return version
+
     # ============= Context Operations =============
     
     async def update_conversation_context(
@@ -300,8 +354,16 @@ class MemoryManager:
         
         return health
     
+    async def get_journal_stats(self) -> Dict[str, Any]:
+        """Turn journal durability and flush lag"""
+        if not self.journal:
+            return {"enabled": False}
+        return {"enabled": True, **await self.journal.get_stats()}
+
     async def close(self):
         """Close all connections"""
+        if self.journal:
+            await self.journal.stop()
         if self.redis_memory:
             await self.redis_memory.redis.close()
         if self.mongo_memory:
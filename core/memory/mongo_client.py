@@ -1,9 +1,11 @@
 import logging
 import datetime
-from pymongo import MongoClient
+import asyncio
+from pymongo import MongoClient, ReturnDocument, UpdateOne
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 from typing import Dict, List, Optional, Any
 from datetime import datetime
+from common.metrics import TimedMongoDatabase
 class MongoMemory:
     def __init__(self, uri: str = None, db_name: str = None):
         # Import from core orchestrator config instead
@@ -30,7 +32,8 @@ class MongoMemory:
             self.client = MongoClient(self.uri)
             # Try to connect to trigger errors early
             self.client.admin.command('ping')
-            self.db = self.client[self.db_name]
+            # Collection operations record their latency in common.metrics
+            self.db = TimedMongoDatabase(self.client[self.db_name], "mongo")
             self.collection = self.db["conversations"]
             # Initialize collections for new functionalities
             self.conversations = self.db["conversations"]
@@ -216,6 +219,110 @@ class MongoMemory:
         except Exception as e:
             logging.error(f"❌ Error saving conversation state: {e}")
 
+    async def apply_conversation_changes(self, changes) -> Optional[int]:
+        """
+        Apply a ChangeSet to the conversation document.
+
+        A partial change set only matches the state_version it was computed
+        against. Returns the new state_version, or None when the document has
+        moved on (or the write failed) and the caller should write in full.
+        """
+        try:
+            query: Dict[str, Any] = {"conversation_id": changes.conversation_id}
+            if not changes.full:
+                # Documents written before versioning have no state_version
+                query["state_version"] = changes.base_version or {"$in": [0, None]}
+
+            document = self.conversations.find_one_and_update(
+                query,
+                changes.mongo_update(),
+                projection={"state_version": True, "_id": False},
+                upsert=changes.full,
+                return_document=ReturnDocument.AFTER
+            )
+            if document is None:
+                logging.warning(f"⚠️ Conversation {changes.conversation_id} changed since version {changes.base_version}")
+                return None
+
+            # Only the tasks that changed
+            for task in changes.tasks:
+                self.tasks.update_one(
+                    {"task_id": task["task_id"]},
+                    {"$set": {"conversation_id": changes.conversation_id, **task}},
+                    upsert=True
+                )
+
+            logging.info(f"✅ Applied conversation changes for {changes.conversation_id} ({changes.describe()})")
+            return document["state_version"]
+        except Exception as e:
+            logging.error(f"❌ Error applying conversation changes: {e}")
+            return None
+
+    async def apply_journal_batch(self, batch: List[Any]) -> Dict[str, int]:
+        """
+        Apply flushed journal entries: (merged ChangeSet, state_version) per conversation.
+
+        Each update only matches the version it was computed against: a merged
+        partial set its base, a full set any older version. A conversation
+        written straight to MongoDB while the journal was unavailable may have
+        moved past its pending entries; those are not applied, and are returned
+        as {conversation_id: state_version in MongoDB} for the caller to drop.
+
+        One ordered bulk_write per collection; it runs in a worker thread since
+        a batch can be large and this is called off the request path.
+        """
+        return await asyncio.to_thread(self._apply_journal_batch, batch)
+
+    def _apply_journal_batch(self, batch: List[Any]) -> Dict[str, int]:
+        conversation_ops = []
+        for changes, version in batch:
+            query: Dict[str, Any] = {"conversation_id": changes.conversation_id}
+            if changes.full:
+                query["state_version"] = {"$not": {"$gte": version}}
+            else:
+                query["state_version"] = changes.base_version or {"$in": [0, None]}
+            conversation_ops.append(UpdateOne(query, changes.mongo_update(version)))
+        if conversation_ops:
+            self.conversations.bulk_write(conversation_ops, ordered=True)
+
+        # Read back which updates matched; a full set of a new conversation is inserted
+        current = {
+            doc["conversation_id"]: doc.get("state_version") or 0
+            for doc in self.conversations.find(
+                {"conversation_id": {"$in": [changes.conversation_id for changes, _ in batch]}},
+                projection={"conversation_id": True, "state_version": True, "_id": False}
+            )
+        }
+        inserts = [
+            UpdateOne({"conversation_id": changes.conversation_id}, changes.mongo_update(version), upsert=True)
+            for changes, version in batch if changes.full and changes.conversation_id not in current
+        ]
+        if inserts:
+            self.conversations.bulk_write(inserts, ordered=True)
+
+        stale = {
+            changes.conversation_id: current[changes.conversation_id]
+            for changes, version in batch
+            if changes.conversation_id in current and current[changes.conversation_id] != version
+        }
+        task_ops = [
+            UpdateOne(
+                {"task_id": task["task_id"]},
+                {"$set": {"conversation_id": changes.conversation_id, **task}},
+                upsert=True
+            )
+            for changes, _ in batch if changes.conversation_id not in stale
+            for task in changes.tasks
+        ]
+        if task_ops:
+            self.tasks.bulk_write(task_ops, ordered=True)
+
+        logging.info(
+            f"✅ Applied {len(batch) - len(stale)} conversation updates from the turn journal"
+            + (f", {len(stale)} behind MongoDB not applied" if stale else "")
+        )
+        return stale
+
     async def get_conversation_state(self, conversation_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve conversation state from MongoDB"""
         if self.conversations is None:
@@ -1,19 +1,14 @@
 from redis.asyncio import Redis
-from redis.exceptions import RedisError
+from redis.exceptions import RedisError, WatchError
 from typing import Dict, List, Optional, Any, Literal
-import json
 import logging
 import asyncio
 from datetime import datetime
 
 # Import new types from models
 from common.models import AgentResponseStatus, CheckpointType, CheckpointStatus
-
-class DateTimeEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()  # Convert datetime to ISO format string
-        return super().default(obj)
+from common.codec import decode, encode
+from common.metrics import TimedRedis
 
 class RedisMemory:
     def __init__(self, redis_url: str = "redis://localhost:6379"):
@@ -23,14 +18,14 @@ class RedisMemory:
         # This handles authentication, SSL, and other Redis URL parameters automatically
         try:
             # Use low socket timeouts so failing Redis doesn't block API
-            self.redis = Redis.from_url(
+            self.redis = TimedRedis(Redis.from_url(
                 redis_url,
                 socket_connect_timeout=1,  # seconds
                 socket_timeout=2,
                 retry_on_timeout=True,
                 health_check_interval=30,  # Health check every 30 seconds
                 decode_responses=False  # Keep as bytes for JSON compatibility
-            )
+            ), "redis")
             logging.info(f"✅ Redis client initialized successfully")
         except Exception as e:
             logging.error(f"❌ Failed to initialize Redis client: {e}")
@@ -38,13 +33,13 @@ class RedisMemory:
             from urllib.parse import urlparse
             parsed = urlparse(redis_url)
             
-            self.redis = Redis(
+            self.redis = TimedRedis(Redis(
                 host=parsed.hostname or '127.0.0.1',
                 port=parsed.port or 6379,
                 db=0,
                 socket_connect_timeout=1,
                 socket_timeout=2
-            )
+            ), "redis")
 
     async def check_connection(self):
         try:
@@ -71,19 +66,51 @@ class RedisMemory:
                     state[k] = await v
 
         # Use the custom encoder
-            await self.redis.set(key, json.dumps(state, cls=DateTimeEncoder), ex=600)
+            await self.redis.set(key, encode(state), ex=600)
             logging.info(f"✅ Saved conversation state in Redis for ID: {conversation_id}")
         except Exception as e:
             logging.error(f"❌ Error setting conversation state: {str(e)}")
             raise
 
+    async def apply_conversation_changes(self, changes, version: int) -> bool:
+        """
+        Apply a partial ChangeSet to the cached state, moving it to `version`.
+
+        The cached copy must be at the change set's base version; a missing,
+        stale or concurrently modified copy is dropped instead, so the next
+        read falls back to MongoDB.
+        """
+        key = f"conversation:{changes.conversation_id}:state"
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(key)
+                data = await pipe.get(key)
+                state = decode(data) if data else None
+                if not state or state.get("state_version", 0) != changes.base_version:
+                    await pipe.unwatch()
+                    await self.redis.delete(key)
+                    return False
+
+                changes.apply(state, version)
+                pipe.multi()
+                pipe.set(key, encode(state), ex=600)
+                await pipe.execute()
+            logging.info(f"✅ Applied conversation changes in Redis for ID: {changes.conversation_id}")
+            return True
+        except WatchError:
+            await self.redis.delete(key)
+            return False
+        except Exception as e:
+            logging.error(f"❌ Error applying conversation changes: {str(e)}")
+            raise
+
     async def get_conversation_state(self, conversation_id: str) -> Optional[Dict[str, Any]]:
         try:
             key = f"conversation:{conversation_id}:state"
             data = await self.redis.get(key)
             if data:
                 logging.info(f"✅ Retrieved conversation state from Redis for ID: {conversation_id}")
-                return json.loads(data)
+                return decode(data)
             return None
         except Exception as e:
             logging.error(f"❌ Error getting conversation state redis: {str(e)}")
@@ -92,7 +119,7 @@ class RedisMemory:
     async def set_conversation_context(self, conversation_id: str, context: List[Dict[str, str]]) -> None:
         try:
             key = f"conversation:{conversation_id}:context"
-            await self.redis.set(key, json.dumps(context), ex=3600)
+            await self.redis.set(key, encode(context), ex=3600)
             logging.info(f"✅ Saved conversation context in Redis for ID: {conversation_id}")
         except Exception as e:
             logging.error(f"❌ Error setting conversation context: {str(e)}")
@@ -105,7 +132,7 @@ class RedisMemory:
         """
         try:
             key = f"conversation:{conversation_id}:patient_verified"
-            await self.redis.set(key, json.dumps(verified_status), ex=3600)
+            await self.redis.set(key, encode(verified_status), ex=3600)
             logging.info(f"✅ Updated patient verification status in Redis for ID: {conversation_id}")
         except Exception as e:
             logging.error(f"❌ Error updating patient verification status in Redis: {str(e)}")
@@ -117,7 +144,7 @@ class RedisMemory:
             data = await self.redis.get(key)
             if data:
                 logging.info(f"✅ Retrieved conversation context from Redis for ID: {conversation_id}")
-                return json.loads(data)
+                return decode(data)
             return None
         except Exception as e:
             logging.error(f"❌ Error getting conversation context: {str(e)}")
@@ -157,7 +184,7 @@ class RedisMemory:
 
             # Also store agent result separately for quicker access
             key = f"conversation:{conversation_id}:agent:{agent_name}"
-            await self.redis.set(key, json.dumps(result), ex=3600)
+            await self.redis.set(key, encode(result), ex=3600)
 
             logging.info(f"✅ Saved agent result in Redis for ID: {conversation_id}, agent: {agent_name}")
         except Exception as e:
@@ -197,7 +224,7 @@ class RedisMemory:
 
         # Also store agent result separately for quicker access
             key = f"conversation:{conversation_id}:sync_agent:{agent_name}"
-            await self.redis.set(key, json.dumps(result), ex=3600)
+            await self.redis.set(key, encode(result), ex=3600)
 
             logging.info(f"✅ Saved sync agent result in Redis for ID: {conversation_id}, agent: {agent_name}")
         except Exception as e:
@@ -211,7 +238,7 @@ class RedisMemory:
             data = await self.redis.get(key)
             if data:
                 logging.info(f"✅ Retrieved agent result from Redis for ID: {conversation_id}, agent: {agent_name}")
-                return json.loads(data)
+                return decode(data)
             return None
         except Exception as e:
             logging.error(f"❌ Error getting agent result: {str(e)}")
@@ -222,7 +249,7 @@ class RedisMemory:
         """Store a task in Redis"""
         try:
             key = f"conversation:{conversation_id}:task:{task_id}"
-            await self.redis.set(key, json.dumps(task_data), ex=3600)
+            await self.redis.set(key, encode(task_data), ex=3600)
             logging.info(f"✅ Saved task in Redis for ID: {conversation_id}, task: {task_id}")
         except Exception as e:
             logging.error(f"❌ Error setting task: {str(e)}")
@@ -235,7 +262,7 @@ class RedisMemory:
             data = await self.redis.get(key)
             if data:
                 logging.info(f"✅ Retrieved task from Redis for ID: {conversation_id}, task: {task_id}")
-                return json.loads(data)
+                return decode(data)
             return None
         except Exception as e:
             logging.error(f"❌ Error getting task: {str(e)}")
@@ -324,7 +351,7 @@ class RedisMemory:
         """Store the complete conversation context in Redis"""
         try:
             key = f"conversation:{conversation_id}:complete_context"
-            await self.redis.set(key, json.dumps(complete_context), ex=3600 * 24)  # Longer expiry for complete logs
+            await self.redis.set(key, encode(complete_context), ex=3600 * 24)  # Longer expiry for complete logs
             logging.info(f"✅ Saved complete conversation context in Redis for ID: {conversation_id}")
         except Exception as e:
             logging.error(f"❌ Error setting complete conversation context: {str(e)}")
@@ -337,7 +364,7 @@ class RedisMemory:
             data = await self.redis.get(key)
             if data:
                 logging.info(f"✅ Retrieved complete conversation context from Redis for ID: {conversation_id}")
-                return json.loads(data)
+                return decode(data)
             return None
         except Exception as e:
             logging.error(f"❌ Error getting complete conversation context: {str(e)}")
@@ -0,0 +1,97 @@
+import copy
+
+from core.memory.change_set import StateSnapshot, diff_state
+
+
+def _state():
+    return {
+        "conversation_id": "c1",
+        "context": [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}],
+        "complete_context": [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}],
+        "task_stack": [
+            {"task_id": "t1", "checklist": [{"id": "cp_0", "status": "in_progress"}]},
+            {"task_id": "t2", "checklist": []},
+        ],
+        "is_paused": False,
+        "tags": [],
+        "state_version": 3,
+    }
+
+
+def test_appends_and_changed_tasks_become_partial_writes():
+    persisted = _state()
+    snapshot = StateSnapshot.capture(persisted)
+    state = copy.deepcopy(persisted)
+    turn = [{"role": "user", "content": "again"}, {"role": "assistant", "content": "sure"}]
+    state["context"] += turn
+    state["complete_context"] += turn
+    state["task_stack"][1]["checklist"].append({"id": "cp_1", "status": "pending"})
+
+    changes = diff_state("c1", snapshot, state, 3, limits={"context": 3})
+
+    update = changes.mongo_update()
+    assert update["$push"]["context"] == {"$each": turn, "$slice": -3}
+    assert update["$push"]["complete_context"] == {"$each": turn}
+    assert update["$set"] == {"task_stack.1": state["task_stack"][1]}
+    assert [task["task_id"] for task in changes.tasks] == ["t2"]
+
+    # The same change set brings a mirrored copy to the same document
+    mirrored = changes.apply(copy.deepcopy(persisted), 4)
+    assert mirrored["context"] == state["context"][-3:]
+    assert mirrored["complete_context"] == state["complete_context"]
+    assert mirrored["task_stack"] == state["task_stack"]
+    assert mirrored["state_version"] == 4
+
+
+def test_untouched_state_writes_nothing_and_rewrites_fall_back_to_set():
+    persisted = _state()
+    snapshot = StateSnapshot.capture(persisted)
+    assert diff_state("c1", snapshot, copy.deepcopy(persisted), 3).is_empty()
+
+    state = copy.deepcopy(persisted)
+    state["context"] = [{"role": "user", "content": "replaced"}]
+    state["task_stack"].reverse()
+    state["is_paused"] = True
+    changes = diff_state("c1", snapshot, state, 3, dirty={"tags"})
+    assert set(changes.set) == {"context", "task_stack", "is_paused", "tags"}
+    assert not changes.push
+
+    assert diff_state("c1", None, state, 0).full
+
+
+def test_merged_change_sets_write_the_same_document():
+    persisted = _state()
+    turns = []
+    snapshot, version, state = StateSnapshot.capture(persisted), 3, copy.deepcopy(persisted)
+    for i in range(3):
+        state = copy.deepcopy(state)
+        state["context"].append({"role": "user", "content": str(i)})
+        state["task_stack"][0]["checklist"][0]["status"] = f"step {i}"
+        if i == 1:
+            state["task_stack"].append({"task_id": "t3", "checklist": []})
+        turns.append(diff_state("c1", snapshot, state, version, limits={"context": 4}))
+        snapshot, version = StateSnapshot.capture(state), version + 1
+
+    merged = turns[0].merge(turns[1]).merge(turns[2])
+    expected = copy.deepcopy(persisted)
+    for i, changes in enumerate(turns):
+        changes.apply(expected, 4 + i)
+
+    assert merged.apply(copy.deepcopy(persisted), 6) == expected
+    assert merged.push["context"] == [{"role": "user", "content": "0"}, {"role": "user", "content": "1"}, {"role": "user", "content": "2"}]
+    assert merged.base_version == 3
+
+
+def test_only_changed_tasks_are_compared_when_known():
+    persisted = _state()
+    snapshot = StateSnapshot.capture(persisted)
+    state = copy.deepcopy(persisted)
+    state["task_stack"][0]["checklist"][0]["status"] = "complete"
+    state["task_stack"][1]["checklist"].append({"id": "cp_1", "status": "pending"})
+
+    changes = diff_state("c1", snapshot, state, 3, changed_tasks={"t2"})
+    assert set(changes.set) == {"task_stack.1"}
+
+    recaptured = StateSnapshot.capture(state, previous=snapshot, changed_tasks={"t2"})
+    assert recaptured.tasks[0] == snapshot.tasks[0]
+    assert recaptured.tasks[1] == StateSnapshot.capture(state).tasks[1]
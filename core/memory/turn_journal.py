@@ -0,0 +1,328 @@
+"""
+Write-behind journal for conversation state.
+
+A turn's save is committed by appending its change set to a per-conversation
+Redis Stream instead of writing MongoDB on the request path. A background
+flusher drains the journal: it merges each conversation's pending entries
+into one update and applies a batch of conversations with one ordered
+`bulk_write`. Reads merge the unflushed tail, so they see every committed turn.
+
+Keys:
+- journal:conversation:<id>  stream of {version, changes} entries
+- journal:head:<id>          latest committed state_version
+- journal:dirty              sorted set of conversations with unflushed
+                             entries, scored by the oldest entry's time (ms)
+
+Appends are version-checked against the head: a change set computed against
+a stale copy is rejected and the writer falls back to a full write. Only
+one flusher runs at a time across workers (a LeaseMutex), so entries reach
+MongoDB in order. While Redis is unreachable, saves go straight to MongoDB;
+entries still pending when Redis went away are flushed once it is back -
+unless a direct save moved the document past them meanwhile. Those entries
+are dropped rather than replayed over the newer document, and the head is
+re-based on MongoDB's version so the next save conflicts and is written in
+full.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from common.codec import decode, encode
+from common.lease import LeaseMutex, LeaseTimeout
+
+if __name__ == "__main__" and __package__ is None:
+    from memory.change_set import VERSION_FIELD, ChangeSet
+else:
+    from .change_set import VERSION_FIELD, ChangeSet
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_PREFIX = "journal"
+DIRTY_KEY = f"{JOURNAL_PREFIX}:dirty"
+# The head only has to outlive the gap between two turns of a conversation
+HEAD_TTL = 24 * 3600
+REDIS_RETRY_AFTER = 30.0
+
+# Reject a change set whose base is not the committed head, then append it
+_APPEND_SCRIPT = """
+local head = redis.call("get", KEYS[2])
+if ARGV[1] ~= "" and head and head ~= ARGV[1] then
+    return -1
+end
+local version
+if ARGV[1] ~= "" then
+    version = tonumber(ARGV[1]) + 1
+else
+    version = (tonumber(head) or 0) + 1
+end
+redis.call("xadd", KEYS[1], "*", "version", version, "changes", ARGV[2])
+redis.call("set", KEYS[2], version, "EX", ARGV[5])
+redis.call("zadd", KEYS[3], "NX", ARGV[3], ARGV[4])
+return version
+"""
+
+# Drop flushed entries; forget the conversation once its stream is empty,
+# otherwise re-score it by its oldest remaining entry
+_TRIM_SCRIPT = """
+redis.call("xdel", KEYS[1], unpack(ARGV, 2))
+local first = redis.call("xrange", KEYS[1], "-", "+", "COUNT", 1)[1]
+if first then
+    redis.call("zadd", KEYS[2], tonumber(string.match(first[1], "^(%d+)")), ARGV[1])
+else
+    redis.call("zrem", KEYS[2], ARGV[1])
+    redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class JournalConflict(Exception):
+    """The change set was computed against a version that is no longer the head"""
+
+
+@dataclass
+class JournalStats:
+    """Counters for the journal and its flusher"""
+    appended: int = 0
+    conflicts: int = 0
+    bypassed: int = 0              # saves written straight to MongoDB while Redis was down
+    flushed_entries: int = 0
+    flushed_conversations: int = 0
+    flush_batches: int = 0
+    flush_errors: int = 0
+    dropped_entries: int = 0       # entries MongoDB had moved past when they were flushed
+    last_flush_ms: float = 0.0
+    redis_errors: int = 0
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+class TurnJournal:
+    """Per-conversation append-only journal plus its background flusher"""
+
+    def __init__(
+        self,
+        redis_client,
+        mongo_memory,
+        redis_url: Optional[str] = None,
+        flush_interval: float = 0.5,
+        flush_batch: int = 100,
+    ):
+        self.redis = redis_client
+        self.mongo = mongo_memory
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.stats = JournalStats()
+
+        # One flusher at a time across workers keeps entries in order; the others
+        # give up almost immediately and retry on their next tick
+        self._flush_lane = LeaseMutex("turn_journal_flush", redis_url=redis_url, ttl=10.0, wait_timeout=0.1)
+        self._flusher: Optional[asyncio.Task] = None
+        self._redis_down_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, op: str, e: Exception) -> None:
+        self.stats.redis_errors += 1
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+        logger.warning(f"⚠️ Turn journal {op} failed, writing through to MongoDB for {REDIS_RETRY_AFTER:.0f}s: {e}")
+
+    @staticmethod
+    def _stream_key(conversation_id: str) -> str:
+        return f"{JOURNAL_PREFIX}:conversation:{conversation_id}"
+
+    @staticmethod
+    def _head_key(conversation_id: str) -> str:
+        return f"{JOURNAL_PREFIX}:head:{conversation_id}"
+
+    # ------------------------------------------------------------------
+    # Commit and read
+    # ------------------------------------------------------------------
+    async def append(self, changes: ChangeSet) -> Optional[int]:
+        """
+        Commit a change set. Returns its state_version, or None when Redis is
+        unavailable and the caller should write to MongoDB directly.
+
+        Raises:
+            JournalConflict: if the change set's base is not the committed head
+        """
+        if not self.available:
+            self.stats.bypassed += 1
+            return None
+
+        payload = encode(changes.to_dict())
+        base = "" if changes.full else str(changes.base_version or 0)
+        try:
+            version = await self.redis.eval(
+                _APPEND_SCRIPT, 3,
+                self._stream_key(changes.conversation_id),
+                self._head_key(changes.conversation_id),
+                DIRTY_KEY,
+                base, payload, int(time.time() * 1000), changes.conversation_id, HEAD_TTL,
+            )
+        except Exception as e:
+            self._redis_failed("append", e)
+            self.stats.bypassed += 1
+            return None
+
+        if int(version) < 0:
+            self.stats.conflicts += 1
+            raise JournalConflict(f"Conversation {changes.conversation_id} moved past version {changes.base_version}")
+        self.stats.appended += 1
+        return int(version)
+
+    async def pending(self, conversation_id: str, count: Optional[int] = None) -> List[Tuple[str, int, ChangeSet]]:
+        """Unflushed entries of a conversation, oldest first: (entry id, version, change set)"""
+        if count is None:
+            entries = await self.redis.xrange(self._stream_key(conversation_id))
+        else:
+            entries = await self.redis.xrange(self._stream_key(conversation_id), count=count)
+        result = []
+        for entry_id, fields in entries:
+            fields = {_text(k): v for k, v in fields.items()}
+            result.append((
+                _text(entry_id),
+                int(_text(fields["version"])),
+                ChangeSet.from_dict(decode(fields["changes"])),
+            ))
+        return result
+
+    async def merge_pending(self, conversation_id: str, state: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Bring a state read from MongoDB up to date with the unflushed journal tail"""
+        if not self.available:
+            return state
+        try:
+            entries = await self.pending(conversation_id)
+        except Exception as e:
+            self._redis_failed("read", e)
+            return state
+
+        for _, version, changes in entries:
+            if changes.full:
+                state = {**changes.set, VERSION_FIELD: version}
+            elif state is not None and version > (state.get(VERSION_FIELD) or 0):
+                changes.apply(state, version)
+        return state
+
+    # ------------------------------------------------------------------
+    # Flusher
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher after one last drain"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        try:
+            await self.flush_once()
+        except Exception as e:
+            logger.error(f"❌ Final turn journal flush failed: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            flushed = 0
+            try:
+                flushed = await self.flush_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats.flush_errors += 1
+                logger.error(f"❌ Turn journal flush failed: {e}")
+            # Keep draining while there is a backlog
+            if flushed < self.flush_batch:
+                await asyncio.sleep(self.flush_interval)
+
+    async def flush_once(self) -> int:
+        """Apply one batch of pending conversations to MongoDB; returns the number of entries flushed"""
+        if not self.available:
+            return 0
+        try:
+            lease = await self._flush_lane.acquire("flusher")
+        except LeaseTimeout:
+            return 0   # another worker is flushing
+
+        try:
+            started = time.monotonic()
+            conversation_ids = [_text(c) for c in await self.redis.zrange(DIRTY_KEY, 0, self.flush_batch - 1)]
+            if not conversation_ids:
+                return 0
+
+            batch: List[Tuple[ChangeSet, int]] = []
+            flushed_ids: Dict[str, List[str]] = {}
+            stale: Dict[str, int] = {}
+            for conversation_id in conversation_ids:
+                entries = await self.pending(conversation_id, count=self.flush_batch)
+                if not entries:
+                    flushed_ids[conversation_id] = []
+                    continue
+                merged = entries[0][2]
+                for _, _, changes in entries[1:]:
+                    merged = merged.merge(changes)
+                batch.append((merged, entries[-1][1]))
+                flushed_ids[conversation_id] = [entry_id for entry_id, _, _ in entries]
+
+            if batch:
+                stale = await self.mongo.apply_journal_batch(batch)
+
+            for merged, version in batch:
+                if merged.conversation_id in stale:
+                    # Saved straight to MongoDB while Redis was down; replaying these would go backwards
+                    self.stats.dropped_entries += len(flushed_ids[merged.conversation_id])
+                    logger.warning(
+                        f"⚠️ Dropped journal entries up to version {version} of {merged.conversation_id}: "
+                        f"MongoDB is at version {stale[merged.conversation_id]}"
+                    )
+                    await self.redis.eval(
+                        _REBASE_SCRIPT, 1, self._head_key(merged.conversation_id),
+                        version, stale[merged.conversation_id], HEAD_TTL,
+                    )
+
+            for conversation_id, entry_ids in flushed_ids.items():
+                if entry_ids:
+                    await self.redis.eval(
+                        _TRIM_SCRIPT, 2, self._stream_key(conversation_id), DIRTY_KEY, conversation_id, *entry_ids
+                    )
+                else:
+                    await self.redis.zrem(DIRTY_KEY, conversation_id)
+
+            entries_flushed = sum(len(ids) for ids in flushed_ids.values())
+            self.stats.flushed_entries += entries_flushed
+            self.stats.flushed_conversations += len(batch) - len(stale)
+            self.stats.flush_batches += 1
+            self.stats.last_flush_ms = round((time.monotonic() - started) * 1000, 2)
+            logger.info(
+                f"✅ Flushed {entries_flushed} journal entries for {len(batch)} conversations "
+                f"in {self.stats.last_flush_ms:.0f}ms"
+            )
+            return entries_flushed
+        finally:
+            await lease.release()
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Counters plus the current backlog and flush lag"""
+        data = asdict(self.stats)
+        data["available"] = self.available
+        data["flusher_running"] = self._flusher is not None and not self._flusher.done()
+        if not self.available:
+            return data
+        try:
+            data["pending_conversations"] = await self.redis.zcard(DIRTY_KEY)
+            oldest = await self.redis.zrange(DIRTY_KEY, 0, 0, withscores=True)
+            data["flush_lag_ms"] = max(time.time() * 1000 - oldest[0][1], 0) if oldest else 0
+        except Exception as e:
+            self._redis_failed("stats", e)
+        return data
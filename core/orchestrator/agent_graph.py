@@ -0,0 +1,173 @@
+# orchestrator/agent_graph.py
+"""
+Dependency-aware execution of the agents serving one turn.
+
+A turn is a small DAG: the node producing the user-facing reply (the
+"primary" node - the turn's specialist call) plus auxiliary agents, e.g. a
+risk screen, that run alongside it. Auxiliary nodes come from AGENT_CONFIG
+(see agents.auxiliary_agents) and can depend on one another; every node
+starts as soon as its dependencies have finished and is handed their results.
+
+run() returns the primary node's result as soon as that node finishes. The
+auxiliary nodes still running are collected by a task the caller awaits off
+the request path, to merge their results into state. Each auxiliary node has
+a deadline; one that misses it, or fails, yields an error result instead of
+failing the turn. Only the primary node's own exception is raised.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+_logger = logging.getLogger(__name__)
+
+# Not a valid AGENT_CONFIG name, so no auxiliary agent (e.g. "primary") can collide with it
+PRIMARY_NODE = "__turn__"
+
+# Called with the results of the node's dependencies, by name
+NodeRunner = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class AgentGraphError(ValueError):
+    """The nodes do not form a DAG with one primary node"""
+
+
+@dataclass(frozen=True)
+class AgentNode:
+    name: str
+    run: NodeRunner
+    dependencies: Tuple[str, ...] = ()
+    deadline: Optional[float] = None   # seconds; None: no deadline beyond the node's own timeouts
+
+
+@dataclass
+class AgentGraphStats:
+    """Counters over auxiliary nodes"""
+    turns: int = 0
+    nodes: int = 0
+    completed: int = 0
+    timeouts: int = 0
+    errors: int = 0
+    late: int = 0                      # finished after the primary response was returned
+
+
+def topological_order(nodes: Iterable[AgentNode]) -> List[AgentNode]:
+    """Nodes ordered so that every node comes after its dependencies"""
+    by_name: Dict[str, AgentNode] = {}
+    for node in nodes:
+        if node.name in by_name:
+            raise AgentGraphError(f"Duplicate node {node.name!r}")
+        by_name[node.name] = node
+
+    ordered: List[AgentNode] = []
+    state: Dict[str, int] = {}         # 1: visiting, 2: done
+
+    def visit(name: str, path: Tuple[str, ...]) -> None:
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise AgentGraphError(f"Dependency cycle: {' -> '.join(path + (name,))}")
+        node = by_name.get(name)
+        if node is None:
+            raise AgentGraphError(f"{path[-1]!r} depends on unknown node {name!r}")
+        state[name] = 1
+        for dependency in node.dependencies:
+            visit(dependency, path + (name,))
+        state[name] = 2
+        ordered.append(node)
+
+    for name in by_name:
+        visit(name, ())
+    return ordered
+
+
+class AgentGraphExecutor:
+    """Runs a turn's agent DAG and hands back the primary result early"""
+
+    def __init__(self, default_deadline: Optional[float] = None):
+        self.default_deadline = default_deadline
+        self.stats = AgentGraphStats()
+
+    async def run(
+        self,
+        nodes: Iterable[AgentNode],
+        primary: str = PRIMARY_NODE
+    ) -> Tuple[Any, Optional[asyncio.Task]]:
+        """
+        Start every node and wait for the primary one.
+
+        Returns:
+            (primary result, task resolving to {auxiliary node: result}, or None
+            when the turn has no auxiliary nodes)
+        """
+        ordered = topological_order(nodes)
+        if primary not in {node.name for node in ordered}:
+            raise AgentGraphError(f"No primary node {primary!r}")
+
+        tasks: Dict[str, asyncio.Task] = {}
+        for node in ordered:
+            tasks[node.name] = asyncio.create_task(
+                self._run_node(node, {d: tasks[d] for d in node.dependencies}, node.name == primary)
+            )
+        auxiliary = {name: task for name, task in tasks.items() if name != primary}
+        if auxiliary:
+            self.stats.turns += 1
+            self.stats.nodes += len(auxiliary)
+
+        try:
+            result = await tasks[primary]
+        except BaseException:
+            for task in auxiliary.values():
+                task.cancel()
+            raise
+
+        if not auxiliary:
+            return result, None
+        self.stats.late += sum(1 for task in auxiliary.values() if not task.done())
+        return result, asyncio.create_task(self._collect(auxiliary))
+
+    async def _run_node(self, node: AgentNode, dependencies: Dict[str, asyncio.Task], is_primary: bool) -> Any:
+        dependency_results = {}
+        for name, task in dependencies.items():
+            try:
+                dependency_results[name] = await task
+            except Exception as e:
+                dependency_results[name] = {"error": str(e), "status": "error"}
+
+        if is_primary:
+            return await node.run(dependency_results)
+
+        deadline = node.deadline if node.deadline is not None else self.default_deadline
+        started = time.monotonic()
+        try:
+            if deadline is None:
+                result = await node.run(dependency_results)
+            else:
+                result = await asyncio.wait_for(node.run(dependency_results), deadline)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            _logger.warning(f"⚠️ Auxiliary agent {node.name} missed its {deadline}s deadline")
+            return {"error": f"Deadline of {deadline}s exceeded", "status": "timeout"}
+        except Exception as e:
+            self.stats.errors += 1
+            _logger.error(f"❌ Auxiliary agent {node.name} failed: {e}")
+            return {"error": str(e), "status": "error"}
+
+        self.stats.completed += 1
+        _logger.info(f"✅ Auxiliary agent {node.name} finished in {(time.monotonic() - started) * 1000:.0f}ms")
+        return result
+
+    @staticmethod
+    async def _collect(tasks: Dict[str, asyncio.Task]) -> Dict[str, Any]:
+        try:
+            results = await asyncio.gather(*tasks.values())
+        except asyncio.CancelledError:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        return dict(zip(tasks, results))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return asdict(self.stats)
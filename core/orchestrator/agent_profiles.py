@@ -0,0 +1,202 @@
+# orchestrator/agent_profiles.py
+"""
+Per-agent pipeline profiles.
+
+Each agent that the orchestrator can route a turn to is described by an
+AgentProfile: which orchestration stages it needs, how to shape its request
+payload, where it lives, its timeout and which downstream connection pool
+its calls use. The orchestrator looks the profile up by `detected_agent`
+and skips the stages the agent does not use - e.g. checkpoint generation and
+checklist evaluation (both LLM calls) for agents that never read the
+checkpoint. Unknown agents fall back to the primary service profile.
+
+Agents with `context_handles` set can be sent a ContextHandle (see
+common.context_handle) in place of the context window: the payload then
+carries `context_handle` and an empty inline context, and the specialist
+resolves the window from the shared context store.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from common.context_handle import ContextHandle
+
+# Builds the request body: (query, state, context, checkpoint, checkpoint_complete) -> payload,
+# where context is the message list or, for profiles with context_handles, a ContextHandle
+PayloadBuilder = Callable[[Any, Any, Any, Any, bool], Dict[str, Any]]
+
+DEFAULT_PROFILE = "primary"
+
+
+@dataclass(frozen=True)
+class AgentProfile:
+    """Declarative description of one agent's orchestration pipeline"""
+    name: str                         # detected_agent value
+    service_name: str                 # name used for timing and logs
+    url_setting: str                  # OrchestratorSettings attribute holding the /process URL
+    build_payload: PayloadBuilder
+    uses_checkpoints: bool = True     # checkpoint generation, checklist evaluation and prefetch
+    uses_context: bool = True         # conversation context fetch
+    context_handles: bool = False     # accepts a ContextHandle instead of the inline context
+    streaming: bool = False           # exposes /stream next to /process
+    timeout: Optional[float] = None   # seconds; None means PRIMARY_SERVICE_TIMEOUT
+    pool: Optional[str] = None        # dedicated downstream connection pool; None shares the default client
+
+    def service_url(self, settings) -> str:
+        return getattr(settings, self.url_setting)
+
+
+# ---------------------------------------------------------------------------
+# Payload adapters
+# ---------------------------------------------------------------------------
+def checkpoint_text(checkpoint) -> Optional[str]:
+    """Checkpoint as the plain string the specialists take"""
+    if not checkpoint:
+        return None
+    if isinstance(checkpoint, dict):
+        return checkpoint.get('name') or checkpoint.get('id', '')
+    return str(checkpoint)
+
+
+def context_dict(context) -> Dict[str, Any]:
+    """First context entry as a dict, the shape the dict-context specialists expect"""
+    if not context:
+        return {}
+    if isinstance(context, list):
+        return context[0] if context else {}
+    if isinstance(context, dict):
+        return context
+    return {"context": str(context)}
+
+
+def _with_handle(payload: Dict[str, Any], context) -> Dict[str, Any]:
+    """Attach the context handle, if the context was published"""
+    if isinstance(context, ContextHandle):
+        payload["context_handle"] = context.model_dump()
+    return payload
+
+
+def _dict_context_payload(query, state, context, checkpoint, checkpoint_complete) -> Dict[str, Any]:
+    """Emotional, therapy and anxiety specialists share one request shape"""
+    return _with_handle({
+        "user_query": query.text,
+        "conversation_id": query.conversation_id,
+        "checkpoint": checkpoint_text(checkpoint),
+        "context": {} if isinstance(context, ContextHandle) else context_dict(context),
+        "individual_id": query.individual_id,
+        "user_profile_id": query.user_profile_id,
+        "agent_instance_id": query.agent_instance_id
+    }, context)
+
+
+def _loneliness_payload(query, state, context, checkpoint, checkpoint_complete) -> Dict[str, Any]:
+    return _with_handle({
+        "user_query": query.text,
+        "context": "" if isinstance(context, ContextHandle) else str(context),
+        "checkpoint": str(checkpoint) if checkpoint else "",
+        "conversation_id": query.conversation_id,
+        "user_profile_id": query.user_profile_id,
+        "agent_instance_id": query.agent_instance_id,
+        "user_id": query.user_profile_id
+    }, context)
+
+
+def _accountability_payload(query, state, context, checkpoint, checkpoint_complete) -> Dict[str, Any]:
+    return {
+        "user_query": query.text,
+        "conversation_id": query.conversation_id,
+        "checkpoint": checkpoint_text(checkpoint) or "",
+        "context": "",
+        "user_id": query.individual_id,
+        "user_profile_id": query.user_profile_id,
+        "agent_instance_id": query.agent_instance_id
+    }
+
+
+def _primary_payload(query, state, context, checkpoint, checkpoint_complete) -> Dict[str, Any]:
+    return {
+        "text": query.text,
+        "conversation_id": query.conversation_id,
+        "checkpoint": checkpoint,
+        "context": context,
+        "checkpoint_complete": bool(checkpoint_complete),
+        "specialist_responses": {},      # Dict - empty since no agents
+        "async_agent_results": {},       # Dict - from previous interactions
+        "sync_agent_results": [],        # List - empty since no agents
+        "task_stack": list(getattr(state, "task_stack", [])),
+        "patient_verified": bool(getattr(state, "patient_verified", False)),
+        "is_paused": bool(getattr(state, "is_paused", False)),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+AGENT_PROFILES: Dict[str, AgentProfile] = {}
+
+
+def register_profile(profile: AgentProfile) -> AgentProfile:
+    AGENT_PROFILES[profile.name] = profile
+    return profile
+
+
+def get_agent_profile(agent: Optional[str]) -> AgentProfile:
+    """Profile for a detected agent, or the primary profile for anything unknown"""
+    return AGENT_PROFILES.get(agent or "", AGENT_PROFILES[DEFAULT_PROFILE])
+
+
+register_profile(AgentProfile(
+    name="primary",
+    service_name="primary",
+    url_setting="PRIMARY_SERVICE_URL",
+    build_payload=_primary_payload,
+))
+
+# The loneliness and accountability agents never read the checkpoint, so the
+# checkpoint LLM stages are skipped for them; accountability ignores context too
+register_profile(AgentProfile(
+    name="loneliness",
+    service_name="loneliness",
+    url_setting="LONELINESS_SERVICE_URL",
+    build_payload=_loneliness_payload,
+    uses_checkpoints=False,
+    context_handles=True,
+    pool="specialists",
+))
+register_profile(AgentProfile(
+    name="accountability",
+    service_name="accountability_companion",
+    url_setting="ACCOUNTABILITY_SERVICE_URL",
+    build_payload=_accountability_payload,
+    uses_checkpoints=False,
+    uses_context=False,
+    streaming=True,
+    pool="specialists",
+))
+register_profile(AgentProfile(
+    name="emotional",
+    service_name="emotional_companion",
+    url_setting="EMOTIONAL_SERVICE_URL",
+    build_payload=_dict_context_payload,
+    streaming=True,
+    context_handles=True,
+    pool="specialists",
+))
+register_profile(AgentProfile(
+    name="mental_therapy",
+    service_name="therapy_checkin",
+    url_setting="THERAPY_SERVICE_URL",
+    build_payload=_dict_context_payload,
+    streaming=True,
+    context_handles=True,
+    pool="specialists",
+))
+register_profile(AgentProfile(
+    name="social_anxiety",
+    service_name="anxiety_support",
+    url_setting="ANXIETY_SERVICE_URL",
+    build_payload=_dict_context_payload,
+    streaming=True,
+    context_handles=True,
+    pool="specialists",
+))
@@ -15,6 +15,9 @@ _logger = logging.getLogger(__name__)
 
 # Updated agent configuration with detailed type classification
 # Only active agents are uncommented. Inactive agents are commented out to prevent connection errors.
+# Auxiliary agents also list the turn agents they run alongside ("run_with", detected_agent
+# values or "*") and may set a "deadline" in seconds (default AUXILIARY_AGENT_DEADLINE);
+# see agent_graph.py
 AGENT_CONFIG = {
     "primary": {"port": 8002, "path": "/primary/process", "type": "core", "dependencies": []},
     "checklist": {"port": 8002, "path": "/checklist/process", "type": "sync","dependencies": []},
@@ -25,6 +28,8 @@ AGENT_CONFIG = {
     # "history": {"port": 8009, "path": "/process", "type": "async","dependencies": []},
     # "human_intervention": {"port": 8006, "path": "/process", "type": "sync","dependencies": []},
     # "medication": {"port": 8012, "path": "/process", "type": "sync","dependencies": []},
+    # "risk_screen": {"port": 8013, "path": "/process", "type": "sync", "dependencies": [],
+    #                 "run_with": ["emotional", "mental_therapy", "social_anxiety", "loneliness"], "deadline": 2.0},
 }
 
 # Map from detector agent names to system agent names
@@ -181,6 +186,28 @@ def resolve_dependencies(agents: List[str]) -> List[str]:
 
     return resolved
 
+def auxiliary_agents(agent: str) -> List[str]:
+    """
+    Auxiliary agents that run alongside a turn routed to `agent`, with their
+    dependencies ahead of them. Only auxiliary agents (those with "run_with")
+    become nodes; a dependency on a turn agent such as checklist is ignored.
+
+    Args:
+        agent: detected_agent of the turn
+
+    Returns:
+        List of AGENT_CONFIG agent names
+    """
+    selected = [
+        name for name, config in AGENT_CONFIG.items()
+        if agent in config.get("run_with", ()) or "*" in config.get("run_with", ())
+    ]
+    return [name for name in resolve_dependencies(selected) if is_auxiliary_agent(name)]
+
+def is_auxiliary_agent(agent: str) -> bool:
+    """Whether the agent runs as an auxiliary node (it lists the turns it runs with)"""
+    return "run_with" in AGENT_CONFIG.get(agent, {})
+
 def get_agent_checklists(agents: List[str]) -> Dict[str, Any]:
     """
     Get checklists for the given agents.
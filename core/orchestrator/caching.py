@@ -3,12 +3,15 @@
 """
 Caching utilities for the orchestrator service.
 Provides caching mechanisms for service responses to reduce latency.
+LLM responses (e.g. checkpoint evaluations) are cached by common.llm_cache.
 """
 
 import logging
 import aiocache
 from typing import Dict, Optional, Any
 
+from common.metrics import register_cache_sizes
+
 if __name__ == "__main__" and __package__ is None:
     from orchestrator.config import get_settings
 else:
@@ -19,57 +22,13 @@ _logger = logging.getLogger(__name__)
 # Get settings
 settings = get_settings()
 
-# Cache for recently completed checkpoint evaluations
-checkpoint_cache = aiocache.Cache(
-    cache_class=aiocache.SimpleMemoryCache,
-    namespace="checkpoint_evaluations",
-    ttl=settings.CHECKPOINT_EVALUATION_CACHE_TTL
-)
-
-# Additional cache for task state
+# Cache for task state
 task_cache = aiocache.Cache(
     cache_class=aiocache.SimpleMemoryCache,
     namespace="task_state",
     ttl=settings.TASK_STATE_CACHE_TTL
 )
-
-async def get_cached_checkpoint_evaluation(
-    conversation_id: str,
-    checkpoint: str,
-    text_hash: int
-) -> Optional[Dict[str, Any]]:
-    """
-    Get a cached checkpoint evaluation result.
-
-    Args:
-        conversation_id: The conversation ID
-        checkpoint: The checkpoint being evaluated
-        text_hash: A hash of the text content
-
-    Returns:
-        The cached result dict or None if not found
-    """
-    cache_key = f"{conversation_id}:{checkpoint}:{text_hash}"
-    return await checkpoint_cache.get(cache_key)
-
-async def cache_checkpoint_evaluation(
-    conversation_id: str,
-    checkpoint: str,
-    text_hash: int,
-    result: Dict[str, Any]
-):
-    """
-    Cache a checkpoint evaluation result.
-
-    Args:
-        conversation_id: The conversation ID
-        checkpoint: The checkpoint being evaluated
-        text_hash: A hash of the text content
-        result: The evaluation result to cache
-    """
-    cache_key = f"{conversation_id}:{checkpoint}:{text_hash}"
-    await checkpoint_cache.set(cache_key, result)
-    _logger.debug(f"Cached checkpoint evaluation: {checkpoint}")
+register_cache_sizes("task_state", lambda: {"task_state": len(getattr(task_cache, "_cache", ()))})
 
 async def get_cached_task_state(
     conversation_id: str,
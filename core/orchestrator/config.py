@@ -1,7 +1,7 @@
 import os
 import logging
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
 # Set up logging
@@ -70,6 +70,35 @@ class OrchestratorSettings(BaseSettings):
     ORCHESTRATOR_PORT: int = 8002
     ORCHESTRATOR_WORKERS: int = 1
     ORCHESTRATOR_CONCURRENCY_LIMIT: int = 100
+    # Call co-mounted core services (checkpoint, checklist, primary) in-process
+    IN_PROCESS_DISPATCH: bool = True
+    # Also serialize concurrent conversation-state loads across workers with a Redis lock
+    # (loads are always coalesced within a process)
+    CONVERSATION_LOAD_LOCK: bool = False
+    # Serialize turns of one conversation across workers with a renewable Redis lease
+    # (turns are always serialized within a process). A holder that stops renewing
+    # loses the lease after TURN_LEASE_TTL; none keeps it longer than TURN_LEASE_MAX_HOLD
+    CONVERSATION_TURN_LOCK: bool = True
+    TURN_LEASE_TTL: float = 10.0
+    TURN_LEASE_WAIT_TIMEOUT: float = 30.0
+    TURN_LEASE_MAX_HOLD: float = 120.0
+    # A turn carrying a turn_id is processed once: a retried or duplicate submission
+    # attaches to the turn in flight or gets its stored response for TURN_IDEMPOTENCY_TTL
+    # seconds. The claim is renewed while the turn runs, including its wait for the turn lease;
+    # the claim of a worker that dies mid-turn lapses after TURN_IDEMPOTENCY_PENDING_TTL
+    TURN_IDEMPOTENCY: bool = True
+    TURN_IDEMPOTENCY_TTL: int = 600
+    TURN_IDEMPOTENCY_PENDING_TTL: float = 10.0
+    # Call the specialist with the turn's starting checkpoint while the checklist
+    # evaluation runs, instead of waiting for the evaluation first
+    SPECULATIVE_CHECKLIST: bool = False
+    # Agents whose reply is re-requested when the evaluation advances the checkpoint;
+    # for every other agent the new checkpoint applies from the next turn
+    SPECULATIVE_REISSUE_AGENTS: List[str] = ["primary"]
+    # Generate a new conversation's checkpoints in the background instead of
+    # before the first reply, seeding the agent's default set meanwhile
+    BACKGROUND_INITIAL_CHECKPOINTS: bool = True
+    SEED_DEFAULT_CHECKPOINTS: bool = True
     
     # HTTP Client Configuration
     HTTP_CONNECT_TIMEOUT: float 
@@ -90,13 +119,47 @@ class OrchestratorSettings(BaseSettings):
     
     # Cache Configuration
     REDIS_URL: str 
-    LOCAL_CACHE_SIZE: int 
     CACHE_TTL: int 
-    CHECKPOINT_EVALUATION_CACHE_TTL: int 
-    TASK_STATE_CACHE_TTL: int 
-    
+    # In-process cache tier in front of Redis, bounded by approximate (encoded) size.
+    # Each namespace evicts within its own quota; unlisted namespaces get the default
+    LOCAL_CACHE_QUOTA_BYTES: Dict[str, int] = {"conversation": 64 * 1024 * 1024, "context": 16 * 1024 * 1024}
+    LOCAL_CACHE_DEFAULT_QUOTA_BYTES: int = 8 * 1024 * 1024
+    # Publish every cache write on Redis so other workers drop their local copy.
+    # While the channel is down, local copies live at most LOCAL_CACHE_UNSYNCED_TTL seconds
+    CACHE_INVALIDATION: bool = True
+    LOCAL_CACHE_UNSYNCED_TTL: float = 5.0
+    TASK_STATE_CACHE_TTL: int
+    # Messages kept in the rolling `context` window (complete_context keeps every message)
+    CONTEXT_WINDOW_MESSAGES: int = 200
+    # Send specialists a handle to the context window in the shared context store
+    # instead of the stringified window (inline again while the store is unreachable)
+    CONTEXT_HANDLES: bool = True
+    # Commit conversation saves to a Redis Stream journal that a background flusher
+    # applies to MongoDB in batches (saves write through while Redis is unreachable)
+    TURN_JOURNAL: bool = True
+    JOURNAL_FLUSH_INTERVAL: float = 0.5
+    JOURNAL_FLUSH_BATCH: int = 100
+
     # Agent Configuration
     MAX_SERVICE_RETRIES: int
+    # Run the auxiliary agents AGENT_CONFIG pairs with the turn's agent (see agent_graph.py).
+    # The reply does not wait for them; results arriving within their deadline are merged into state
+    AUXILIARY_AGENTS: bool = True
+    AUXILIARY_AGENT_DEADLINE: float = 2.0
+    # Inter-service calls: a circuit breaker per endpoint (opens on the failure rate or the
+    # rate of calls slower than CIRCUIT_SLOW_CALL_MS), retries paid from a budget of
+    # RETRY_BUDGET_RATIO retries per request, and hedging of idempotent calls after the p95
+    CIRCUIT_FAILURE_RATE: float = 0.5
+    CIRCUIT_SLOW_CALL_MS: float = 10000.0
+    CIRCUIT_OPEN_SECONDS: float = 10.0
+    RETRY_BUDGET_RATIO: float = 0.2
+    HEDGE_IDEMPOTENT_CALLS: bool = True
+    # Request deadlines (X-Deadline-Ms; channel budgets are in common settings): a new
+    # conversation's checkpoints are generated before the reply only with at least
+    # INLINE_CHECKPOINT_MIN_BUDGET seconds left, and a speculative reply is re-issued
+    # only with at least REISSUE_MIN_BUDGET seconds left
+    INLINE_CHECKPOINT_MIN_BUDGET: float = 3.0
+    REISSUE_MIN_BUDGET: float = 1.5
     
     # Logging
     LOG_LEVEL: str
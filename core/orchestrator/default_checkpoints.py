@@ -0,0 +1,108 @@
+# orchestrator/default_checkpoints.py
+"""
+Precomputed starter checkpoints per agent.
+
+A new conversation is seeded with these so the first turns have a checkpoint
+to work towards while the tailored set is generated in the background. They
+mirror the focus areas the checkpoint generator uses for each agent.
+"""
+
+import copy
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Task ids of seeded tasks start with this, so the tailored set can replace them
+DEFAULT_TASK_PREFIX = "default_"
+
+DEFAULT_CHECKPOINTS: Dict[str, List[Dict[str, Any]]] = {
+    "emotional": [
+        {
+            "name": "How have you been feeling since this happened, and what has been the hardest part for you?",
+            "expected_inputs": ["emotional_state", "concerns", "grief_stage"],
+        },
+        {
+            "name": "Who or what has been helping you get through this so far?",
+            "expected_inputs": ["support_system", "coping_mechanisms"],
+        },
+    ],
+    "accountability": [
+        {
+            "name": "What goal or habit would you like us to work on together?",
+            "expected_inputs": ["goals", "habits", "commitment_level"],
+        },
+        {
+            "name": "What usually gets in the way when you try to stick with it?",
+            "expected_inputs": ["triggers", "challenges"],
+        },
+    ],
+    "loneliness": [
+        {
+            "name": "Who do you usually spend time with or talk to during the week?",
+            "expected_inputs": ["social_circle", "barriers"],
+        },
+        {
+            "name": "What kinds of activities or interests do you enjoy, or would like to share with others?",
+            "expected_inputs": ["interests", "preferred_activities", "social_goals"],
+        },
+    ],
+    "mental_therapy": [
+        {
+            "name": "Can you tell me more about what you've been experiencing lately and how often it happens?",
+            "expected_inputs": ["symptoms", "triggers"],
+        },
+        {
+            "name": "What have you tried so far to cope with it, and how has that worked for you?",
+            "expected_inputs": ["coping_strategies", "therapy_history", "goals"],
+        },
+    ],
+    "social_anxiety": [
+        {
+            "name": "Which social situations make you feel most anxious right now?",
+            "expected_inputs": ["anxiety_triggers", "specific_event"],
+        },
+        {
+            "name": "What do you notice in your body or thoughts when the anxiety starts?",
+            "expected_inputs": ["physical_symptoms", "confidence_level"],
+        },
+    ],
+}
+
+# Used for agents without a specialist set (the primary service)
+GENERAL_CHECKPOINTS: List[Dict[str, Any]] = [
+    {
+        "name": "Could you tell me a bit more about what's on your mind and what you'd like help with?",
+        "expected_inputs": ["concerns", "immediate_needs"],
+    },
+    {
+        "name": "Is there anything else I should know about your situation so I can support you better?",
+        "expected_inputs": ["medical_history", "symptoms"],
+    },
+]
+
+
+def get_default_checkpoints(agent: Optional[str]) -> List[Dict[str, Any]]:
+    """Starter checkpoints for an agent (a copy, safe to attach to state)"""
+    checkpoints = DEFAULT_CHECKPOINTS.get((agent or "").lower(), GENERAL_CHECKPOINTS)
+    # Distinct ids so completed defaults can sit next to generated checkpoints
+    return [
+        {"id": f"{DEFAULT_TASK_PREFIX}cp_{i}", **copy.deepcopy(checkpoint)}
+        for i, checkpoint in enumerate(checkpoints)
+    ]
+
+
+def build_default_task(conversation_id: str) -> Dict[str, Any]:
+    """Task wrapper for a seeded default checkpoint set"""
+    now = datetime.now().isoformat()
+    return {
+        "task_id": f"{DEFAULT_TASK_PREFIX}{conversation_id}",
+        "label": "Default checkpoints",
+        "source": "Main",
+        "current_checkpoint_index": 0,
+        "is_active": True,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def is_default_task(task: Dict[str, Any]) -> bool:
+    return str(task.get("task_id", "")).startswith(DEFAULT_TASK_PREFIX)
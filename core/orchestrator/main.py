@@ -4,13 +4,16 @@ This module sets up the FastAPI application and defines the main orchestration e
 """
 
 import asyncio
+import functools
 import logging
 import json
-from typing import Dict, List, Optional, Any
+import time
+from typing import Dict, List, Optional, Any, Tuple, Union
 from datetime import datetime
 import httpx
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Response, BackgroundTasks, status, Depends, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Header, Response, status, Depends, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 # from pydantic import BaseModel
 # from .auth.validateAPI import get_current_user, JWTClaims
 # import websockets
@@ -25,11 +28,19 @@ try:
     from .services import (
         call_checklist_service,
         call_service, 
+        stream_service,
         http_client, 
-        ensure_http_client
+        ensure_http_client,
+        close_pool_clients
     )
     from .utils import get_conversation_state
     from .state_manager import cache_manager
+    from ..memory.memory_manager import get_memory_manager
+    from .speculation import SpeculationTracker
+    from .default_checkpoints import build_default_task, get_default_checkpoints
+    from .agent_profiles import AgentProfile, checkpoint_text, get_agent_profile
+    from .agent_graph import PRIMARY_NODE, AgentGraphExecutor, AgentNode
+    from .agents import AGENT_CONFIG, auxiliary_agents, get_agent_type, get_service_url, is_auxiliary_agent
     import_mode = "relative"
 except ImportError:
     # Fallback to absolute imports (when run standalone)
@@ -44,11 +55,19 @@ except ImportError:
         from orchestrator.services import (
             call_checklist_service,
             call_service, 
+            stream_service,
             http_client, 
-            ensure_http_client
+            ensure_http_client,
+            close_pool_clients
         )
         from orchestrator.utils import get_conversation_state
         from orchestrator.state_manager import cache_manager
+        from memory.memory_manager import get_memory_manager
+        from orchestrator.speculation import SpeculationTracker
+        from orchestrator.default_checkpoints import build_default_task, get_default_checkpoints
+        from orchestrator.agent_profiles import AgentProfile, checkpoint_text, get_agent_profile
+        from orchestrator.agent_graph import PRIMARY_NODE, AgentGraphExecutor, AgentNode
+        from orchestrator.agents import AGENT_CONFIG, auxiliary_agents, get_agent_type, get_service_url, is_auxiliary_agent
         import orchestrator.services
         import_mode = "standalone"
     else:
@@ -58,15 +77,33 @@ except ImportError:
         from .services import (
             call_checklist_service,
             call_service, 
+            stream_service,
             http_client, 
-            ensure_http_client
+            ensure_http_client,
+            close_pool_clients
         )
         from .utils import get_conversation_state
         from .state_manager import cache_manager
+        from ..memory.memory_manager import get_memory_manager
+        from .speculation import SpeculationTracker
+        from .default_checkpoints import build_default_task, get_default_checkpoints
+        from .agent_profiles import AgentProfile, checkpoint_text, get_agent_profile
+        from .agent_graph import PRIMARY_NODE, AgentGraphExecutor, AgentNode
+        from .agents import AGENT_CONFIG, auxiliary_agents, get_agent_type, get_service_url, is_auxiliary_agent
         import_mode = "module"
 
 # Import common models - this is always at root level
+from common.context_handle import ContextHandle, get_context_store
+from common.deadline import DEADLINE_HEADER, DeadlineExceeded, adopt_deadline, remaining, set_deadline, without_deadline
 from common.models import Task
+from common.single_flight import get_single_flight
+from common.tracing import set_attribute as set_trace_attribute, traced_background
+from common.lease import Lease, LeaseMutex, LeaseTimeout
+from common.idempotency import get_idempotent_requests
+from common.resilience import get_resilience_stats
+from common.metrics import CONTENT_TYPE, observe_stage, render_metrics, start_loop_lag_monitor, stop_loop_lag_monitor
+from common.llm_gateway import LLMPriority, priority_for_channel, set_priority, use_priority
+from common.sse import SSE_HEADERS, SSE_MEDIA_TYPE, encode_event
 
 import uvicorn
 
@@ -88,6 +125,62 @@ HTTP_TIMEOUT = httpx.Timeout(
 CHECKPOINT_TIMEOUT = httpx.Timeout(settings.CHECKPOINT_SERVICE_TIMEOUT)
 PRIMARY_TIMEOUT = httpx.Timeout(settings.PRIMARY_SERVICE_TIMEOUT)
 
+# Re-issue policy and invalidation counters for speculative checklist evaluation
+speculation = SpeculationTracker(settings.SPECULATIVE_REISSUE_AGENTS)
+
+# Runs auxiliary agents alongside the turn's agent; the reply does not wait for them
+agent_graph = AgentGraphExecutor(default_deadline=settings.AUXILIARY_AGENT_DEADLINE)
+
+# Turns of one conversation run one at a time (across workers when the Redis lease is on);
+# different conversations run in parallel
+turn_lanes = LeaseMutex(
+    "conversation_turn",
+    redis_url=settings.REDIS_URL if settings.CONVERSATION_TURN_LOCK else None,
+    ttl=settings.TURN_LEASE_TTL,
+    wait_timeout=settings.TURN_LEASE_WAIT_TIMEOUT,
+    max_hold=settings.TURN_LEASE_MAX_HOLD
+)
+
+# A retried turn (same turn_id) runs once; duplicates get the first submission's response
+turn_results = get_idempotent_requests(
+    "turn",
+    redis_url=settings.REDIS_URL,
+    ttl=settings.TURN_IDEMPOTENCY_TTL,
+    pending_ttl=settings.TURN_IDEMPOTENCY_PENDING_TTL,
+    # A turn may wait for the lease, then hold it
+    max_pending=settings.TURN_LEASE_WAIT_TIMEOUT + settings.TURN_LEASE_MAX_HOLD
+) if settings.TURN_IDEMPOTENCY else None
+
+# Set on responses to duplicate submissions that were not processed again
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+async def _acquire_turn(query: OrchestratorQuery, timing: TimingMetrics) -> Lease:
+    """Wait for this conversation's turn lease; 409 if the previous turn does not finish in time."""
+    timing.start("turn_lease_wait")
+    try:
+        return await turn_lanes.acquire(query.conversation_id)
+    except LeaseTimeout as e:
+        _logger.warning(f"⚠️ {e}")
+        raise HTTPException(
+            status_code=409,
+            detail="Another turn of this conversation is still being processed. Please retry."
+        )
+    finally:
+        timing.end("turn_lease_wait")
+
+# One background initial-checkpoint generation per conversation at a time
+_initial_checkpoint_jobs = get_single_flight("initial_checkpoints")
+
+# Strong references to fire-and-forget tasks (turn commits, checkpoint generation)
+_background_tasks: set = set()
+
+def _spawn_background(coro) -> None:
+    # Background work outlives the request and is not bound by its deadline; it is
+    # traced on its own, linked to the turn that started it
+    task = asyncio.create_task(without_deadline(traced_background(coro.__qualname__, coro)))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager with optimized HTTP client setup."""
@@ -96,6 +189,7 @@ async def lifespan(app: FastAPI):
     # Initialize cache manager first
     await cache_manager.initialize()
     _logger.debug("Cache manager initialized")
+    start_loop_lag_monitor()
     
     limits = httpx.Limits(
         max_keepalive_connections=settings.MAX_KEEPALIVE_CONNECTIONS,
@@ -124,6 +218,9 @@ async def lifespan(app: FastAPI):
 
     # Clean up resources
     await http_client.aclose()
+    await close_pool_clients()
+    await cache_manager.close()
+    stop_loop_lag_monitor()
     _logger.info("HTTP client closed")
 
 app = FastAPI(title="Conversation Orchestrator", lifespan=lifespan)
@@ -159,6 +256,10 @@ class SimplifiedOrchestrator:
 
     async def prepare_checkpoint_data(self, query: OrchestratorQuery, state, timing: TimingMetrics) -> tuple[Optional[str], bool, Optional[Dict]]:
         """Prepare checkpoint-related data efficiently."""
+        if not get_agent_profile(query.detected_agent).uses_checkpoints:
+            # Agent never reads the checkpoint: skip generation and evaluation (both LLM calls)
+            return None, False, None
+
         timing.start("checkpoint_preparation")
 
         current_checkpoint = state.get_current_checkpoint()
@@ -197,7 +298,11 @@ class SimplifiedOrchestrator:
         
         # Handle new conversation checkpoint generation
         checkpoints_task = None
-        if state.is_new_conversation():
+        seeded_checkpoints = False
+        if state.is_new_conversation() and (settings.BACKGROUND_INITIAL_CHECKPOINTS or self._short_on_time()):
+            # Answer now; tailored checkpoints are attached to state when they land
+            seeded_checkpoints = self._start_initial_checkpoints(query, state)
+        elif state.is_new_conversation():
             _logger.info("Starting new conversation - generating initial checkpoints")
 
             timing.start("checkpoint_generation")
@@ -261,6 +366,8 @@ class SimplifiedOrchestrator:
                 _logger.info(f"Generated {len(checkpoints)} initial checkpoints")
 
             timing.end("checkpoint_generation")
+        elif seeded_checkpoints:
+            current_checkpoint = state.get_current_checkpoint()
 
         # Process checklist evaluation results
         if checklist_task:
@@ -276,6 +383,81 @@ class SimplifiedOrchestrator:
         timing.end("checkpoint_preparation")
         return current_checkpoint, checkpoint_complete, checklist_result
         
+    @staticmethod
+    def _short_on_time() -> bool:
+        """Too little of the request's deadline left to generate checkpoints before replying"""
+        left = remaining()
+        if left is not None and left < settings.INLINE_CHECKPOINT_MIN_BUDGET:
+            _logger.info(f"Only {left:.2f}s left, seeding default checkpoints instead of generating them inline")
+            return True
+        return False
+
+    def _start_initial_checkpoints(self, query: OrchestratorQuery, state) -> bool:
+        """
+        Kick off initial checkpoint generation for a new conversation without
+        waiting for it, seeding the agent's default checkpoints meanwhile.
+
+        Returns:
+            True when default checkpoints were seeded
+        """
+        conversation_id = query.conversation_id
+        if not _initial_checkpoint_jobs.is_in_flight(conversation_id):
+            _logger.info("Starting new conversation - generating initial checkpoints in the background")
+            _spawn_background(_initial_checkpoint_jobs.do(
+                conversation_id,
+                lambda: self._generate_initial_checkpoints(query, state)
+            ))
+
+        if not settings.SEED_DEFAULT_CHECKPOINTS or state.task_stack:
+            return False
+        state.set_Tasks(get_default_checkpoints(query.detected_agent), build_default_task(conversation_id))
+        _logger.info(f"Seeded default checkpoints for agent '{query.detected_agent}'")
+        return True
+
+    async def _generate_initial_checkpoints(self, query: OrchestratorQuery, state) -> None:
+        """Generate a new conversation's tailored checkpoints and attach them to its state."""
+        timing = TimingMetrics()
+        timing.start("checkpoint_generation")
+        try:
+            # Get conversation context for better checkpoint generation
+            conversation_context = await state.get_context(plan="lite")
+
+            result = await call_service(
+                f"{settings.CHECKPOINT_URL}/generate",
+                {
+                    "text": query.text,
+                    "conversation_id": query.conversation_id,
+                    "limit": 2,  # Initial generation limited to 2 checkpoints
+                    "detected_intent": query.detected_agent,  # Pass the detected agent as intent
+                    "agent_type": query.detected_agent,       # Also pass as agent_type for clarity
+                    "conversation_context": conversation_context  # Pass full conversation context
+                },
+                timing,
+                "checkpoint_generator",
+                timeout=CHECKPOINT_TIMEOUT
+            )
+
+            checkpoints = result.get("checkpoints", [])
+            task = result.get("task")
+            if not (checkpoints and task):
+                return
+
+            # Attach to the latest saved state, between turns of this conversation
+            async with turn_lanes.hold(query.conversation_id):
+                state = await get_conversation_state(query.conversation_id, query.individual_id)
+                if state.attach_generated_checkpoints(checkpoints, task):
+                    await state.save(force=True)
+                    timing.end("checkpoint_generation")
+                    _logger.info(
+                        f"Attached {len(checkpoints)} generated checkpoints to {query.conversation_id} "
+                        f"after {timing.get_metrics().get('checkpoint_generation', 0):.2f}ms"
+                    )
+
+        except LeaseTimeout as e:
+            _logger.warning(f"⚠️ Dropping generated initial checkpoints: {e}")
+        except Exception as e:
+            _logger.error(f"Error generating initial checkpoints: {e}")
+
     async def _generate_next_checkpoint(
         self, 
         conversation_id: str, 
@@ -292,23 +474,24 @@ class SimplifiedOrchestrator:
             # Get conversation context for enhanced checkpoint generation
             conversation_context = await state.get_context(plan="lite")
             
-            # Call checkpoint service to generate a single new checkpoint
-            result = await call_service(
-                f"{settings.CHECKPOINT_URL}/generate",
-                {
-                    "text": text,
-                    "conversation_id": conversation_id,
-                    "context": context,
-                    "limit": 1,  # Just generate 1 additional checkpoint
-                    "existing_task_id": existing_task_id,
-                    "detected_intent": detected_agent,
-                    "agent_type": detected_agent,
-                    "conversation_context": conversation_context
-                },
-                TimingMetrics(),
-                "background_checkpoint_generator",
-                timeout=CHECKPOINT_TIMEOUT
-            )
+            # Call checkpoint service to generate a single new checkpoint (prefetch, lowest LLM priority)
+            with use_priority(LLMPriority.BACKGROUND):
+                result = await call_service(
+                    f"{settings.CHECKPOINT_URL}/generate",
+                    {
+                        "text": text,
+                        "conversation_id": conversation_id,
+                        "context": context,
+                        "limit": 1,  # Just generate 1 additional checkpoint
+                        "existing_task_id": existing_task_id,
+                        "detected_intent": detected_agent,
+                        "agent_type": detected_agent,
+                        "conversation_context": conversation_context
+                    },
+                    TimingMetrics(),
+                    "background_checkpoint_generator",
+                    timeout=CHECKPOINT_TIMEOUT
+                )
             
             # Process the new checkpoint
             if result and not result.get("is_new_task", True):
@@ -316,356 +499,616 @@ class SimplifiedOrchestrator:
                 task = result.get("task")
                 
                 if checkpoints and task:
-                    # Append the new checkpoint to the existing task
-                    for task_item in state.task_stack:
-                        if task_item.get('task_id') == existing_task_id:
-                            # Get the existing checklist
-                            checklist = task_item.get('checklist', [])
-                            
-                            # Append the new checkpoints
-                            for checkpoint in checkpoints:
-                                checklist.append({
-                                    "id": checkpoint.get('name', f"cp_{len(checklist)}"),
-                                    "name": checkpoint.get('name', f"cp_{len(checklist)}"),
-                                    "label": f"Step {len(checklist) + 1}",
-                                    "type": "Main",
-                                    "status": "pending",
-                                    "expected_inputs": checkpoint.get('expected_inputs', []),
-                                    "collected_inputs": [],
-                                    "start_time": None, "end_time": None
-                                })
-                            
-                            task_item['checklist'] = checklist
-                            _logger.info(f"Added {len(checkpoints)} new checkpoints to task {existing_task_id}")
-                            
-                            # Save the state
-                            await state.save(force=True)
-                            break
+                    # Append to the latest saved state, between turns of this conversation
+                    async with turn_lanes.hold(conversation_id):
+                        state = await get_conversation_state(conversation_id, state.individual_id)
+                        self._append_checkpoints(state, existing_task_id, checkpoints)
+                        await state.save(force=True)
             
+        except LeaseTimeout as e:
+            _logger.warning(f"⚠️ Dropping generated next checkpoint: {e}")
         except Exception as e:
             _logger.error(f"Error generating next checkpoint: {e}")
 
+    def _append_checkpoints(self, state, existing_task_id: str, checkpoints: List[Dict]) -> None:
+        """Append generated checkpoints to an existing task's checklist."""
+        task_item = state.task_stack.get(existing_task_id)
+        if task_item is None:
+            return
+
+        # Get the existing checklist
+        checklist = task_item.get('checklist', [])
+
+        # Append the new checkpoints
+        for checkpoint in checkpoints:
+            checklist.append({
+                "id": checkpoint.get('name', f"cp_{len(checklist)}"),
+                "name": checkpoint.get('name', f"cp_{len(checklist)}"),
+                "label": f"Step {len(checklist) + 1}",
+                "type": "Main",
+                "status": "pending",
+                "expected_inputs": checkpoint.get('expected_inputs', []),
+                "collected_inputs": [],
+                "start_time": None, "end_time": None
+            })
+
+        task_item['checklist'] = checklist
+        # Edited in place: re-index the task and mark it for the next save
+        state.task_stack.touch(existing_task_id)
+        _logger.info(f"Added {len(checkpoints)} new checkpoints to task {existing_task_id}")
+
 # Global orchestrator instance
 _orchestrator = SimplifiedOrchestrator()
 
+def _build_specialist_request(
+    profile: AgentProfile,
+    query: OrchestratorQuery,
+    state,
+    context: Union[List[Dict], ContextHandle],
+    current_checkpoint,
+    checkpoint_complete: bool
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the call for an agent from its pipeline profile.
+
+    Returns:
+        (service URL, payload in the shape that agent expects)
+    """
+    payload = profile.build_payload(query, state, context, current_checkpoint, checkpoint_complete)
+    return profile.service_url(settings), payload
+
+async def _call_agent(profile: AgentProfile, url: str, payload: Dict[str, Any], timing: TimingMetrics) -> Dict[str, Any]:
+    return await call_service(
+        url,
+        payload,
+        timing,
+        profile.service_name,
+        timeout=_agent_timeout(profile),
+        pool=profile.pool
+    )
+
+def _agent_timeout(profile: AgentProfile) -> httpx.Timeout:
+    return httpx.Timeout(profile.timeout) if profile.timeout else PRIMARY_TIMEOUT
+
+async def _agent_context(profile: AgentProfile, query: OrchestratorQuery, state) -> Union[List[Dict], ContextHandle]:
+    """
+    Conversation context for the agent call, skipped for agents that ignore it.
+
+    Agents that take context handles get a ContextHandle to the window published
+    in the shared context store, or the window itself if it could not be published.
+    """
+    if not profile.uses_context:
+        return []
+    context = await _orchestrator.get_cached_context(state, query.plan, query.text)
+    if not (profile.context_handles and settings.CONTEXT_HANDLES and context):
+        return context
+    handle = await get_context_store().publish(query.conversation_id, state.state_version, context)
+    return handle or context
+
+def _auxiliary_nodes(profile: AgentProfile, query: OrchestratorQuery, state, timing: TimingMetrics) -> List[AgentNode]:
+    """Graph nodes for the auxiliary agents AGENT_CONFIG runs alongside this agent."""
+    if not settings.AUXILIARY_AGENTS:
+        return []
+    nodes = []
+    for name in auxiliary_agents(profile.name):
+        config = AGENT_CONFIG[name]
+        nodes.append(AgentNode(
+            name=name,
+            run=functools.partial(_call_auxiliary_agent, name, query, state, timing),
+            dependencies=tuple(d for d in config["dependencies"] if is_auxiliary_agent(d)),
+            deadline=config.get("deadline"),
+        ))
+    return nodes
+
+async def _call_auxiliary_agent(
+    name: str,
+    query: OrchestratorQuery,
+    state,
+    timing: TimingMetrics,
+    dependency_results: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    One auxiliary agent call; the node deadline bounds it, so it is not retried.
+    Auxiliary agents only read the turn, so the call may be hedged.
+    """
+    context = await _orchestrator.get_cached_context(state, query.plan, query.text)
+    return await call_service(
+        get_service_url(name),
+        {
+            "text": query.text,
+            "conversation_id": query.conversation_id,
+            "checkpoint": checkpoint_text(state.get_current_checkpoint()),
+            "context": context,
+            "specialist_responses": dependency_results,
+        },
+        timing,
+        f"auxiliary_{name}",
+        max_retries=0,
+        pool="specialists",
+        idempotent=True
+    )
+
+async def _merge_auxiliary_results(state, auxiliary: asyncio.Task) -> None:
+    """Record the auxiliary agents' results on the conversation state."""
+    try:
+        results = await auxiliary
+    except Exception as e:
+        _logger.error(f"❌ Auxiliary agents failed: {e}")
+        return
+    for name, result in results.items():
+        if not isinstance(result, dict) or result.get("status") in ("error", "timeout"):
+            continue
+        if get_agent_type(name) == "async":
+            await state.set_async_agent_result(name, result)
+        else:
+            await state.set_sync_agent_result(name, result)
+
+async def _load_conversation_state(query: OrchestratorQuery, timing: TimingMetrics):
+    """Fetch the conversation state and stamp this turn's identifiers on it."""
+    timing.start("state_initialization")
+    state = await get_conversation_state(query.conversation_id, query.individual_id)
+    
+    # Set the new identifier fields from the query
+    state.individual_id = query.individual_id
+    state.user_profile_id = query.user_profile_id
+    state.detected_agent = query.detected_agent
+    state.agent_instance_id = query.agent_instance_id
+    state.call_log_id = query.call_log_id
+
+    timing.end("state_initialization")
+    return state
+
+async def _next_checkpoint_job(query: OrchestratorQuery, state) -> Optional[tuple]:
+    """
+    Arguments for _generate_next_checkpoint when the active task is on its
+    second-to-last checkpoint, otherwise None.
+    """
+    if not state.task_stack or not get_agent_profile(query.detected_agent).uses_checkpoints:
+        return None
+    for task in reversed(state.task_stack):
+        if task.get('is_active', False):
+            # Check if we're on second-to-last checkpoint
+            checklist = task.get('checklist', [])
+            current_index = task.get('current_checkpoint_index', 0)
+            if len(checklist) > 1 and current_index == len(checklist) - 2:
+                _logger.info("Adding background task to generate next checkpoint")
+                
+                # Get context for background generation
+                context = await _orchestrator.get_cached_context(state, query.plan, query.text)
+                return (
+                    query.conversation_id,
+                    query.text,
+                    context,
+                    task.get('task_id'),
+                    state,
+                    query.detected_agent
+                )
+            break
+    return None
+
+def _build_orchestrator_response(
+    query: OrchestratorQuery,
+    state,
+    primary_result: Dict[str, Any],
+    metrics: Dict[str, float]
+) -> OrchestratorResponse:
+    return OrchestratorResponse(
+        response=primary_result["response"],
+        conversation_id=query.conversation_id,
+        checkpoints=[],
+        checkpoint_progress=getattr(state, "checkpoint_progress", {}),
+        task_stack=list(getattr(state, "task_stack", [])),
+        has_summary=getattr(state, "has_summary", False),
+        summary=getattr(state, "summary", None),
+        key_points=getattr(state, "key_points", []),
+        tags=getattr(state, "tags", []),
+        requires_human=primary_result.get("requires_human", False),
+        risk_level=primary_result.get("risk_level"),
+        is_paused=getattr(state, "is_paused", False),
+        patient_verified=getattr(state, "patient_verified", False),
+        async_agent_results=getattr(state, "async_agent_results", {}),
+        sync_agent_results=getattr(state, "sync_agent_results", {}),
+        timing_metrics=metrics,
+        is_enriched=False
+    )
+
 @app.post("/orchestrate", response_model=OrchestratorResponse)
 async def orchestrate_endpoint(
     query: OrchestratorQuery,
     response: Response,
-    background_tasks: BackgroundTasks,
+    x_deadline_ms: Optional[str] = Header(None, alias=DEADLINE_HEADER),
     # user: JWTClaims = Depends(get_current_user)
 ):
     """
     Simplified main orchestration endpoint - direct conversation flow.
+
+    A turn with a turn_id is processed once: a retry or duplicate submission
+    attaches to the turn in flight or gets its stored response.
     """
-    timing = TimingMetrics()
-    timing.start("total_orchestration")
+    # Voice turns jump the LLM queue ahead of chat and background work, and get
+    # the shorter budget when the gateway did not pass a deadline on
+    set_priority(priority_for_channel(query.channel))
+    adopt_deadline(x_deadline_ms, query.channel)
+    set_trace_attribute("conversation.id", query.conversation_id)
 
+    if not query.turn_id or turn_results is None:
+        return await _orchestrate(query, response)
     try:
-        _logger.info(f"⟳ Orchestration start for conversation {query.conversation_id}")
-
-        # 1) Get conversation state
-        timing.start("state_initialization")
-        state = await get_conversation_state(query.conversation_id, query.individual_id)
-        
-        # Set the new identifier fields from the query
-        state.individual_id = query.individual_id
-        state.user_profile_id = query.user_profile_id
-        state.detected_agent = query.detected_agent
-        state.agent_instance_id = query.agent_instance_id
-        state.call_log_id = query.call_log_id
+        result, replayed = await turn_results.run(
+            _turn_key(query), lambda: _orchestrate(query, response)
+        )
+    except DeadlineExceeded as e:
+        _logger.warning(f"⚠️ {e} for conversation {query.conversation_id}")
+        raise HTTPException(status_code=504, detail=str(e))
+    if replayed:
+        _logger.info(f"Turn {query.turn_id} of conversation {query.conversation_id} already processed, replaying its response")
+        response.headers[REPLAYED_HEADER] = "true"
+    return result
 
-        timing.end("state_initialization")
+def _turn_key(query: OrchestratorQuery) -> str:
+    return f"{query.conversation_id}:{query.turn_id}"
 
-        # 2) Prepare checkpoint data efficiently (handles both new conversations and evaluations)
-        current_checkpoint, checkpoint_complete, checklist_result = await _orchestrator.prepare_checkpoint_data(
-            query, state, timing
-        )
-        
-        # Handle dynamic checkpoint generation in the background if needed
-        if state.task_stack:
-            for task in reversed(state.task_stack):
-                if task.get('is_active', False):
-                    # Check if we're on second-to-last checkpoint
-                    checklist = task.get('checklist', [])
-                    current_index = task.get('current_checkpoint_index', 0)
-                    if len(checklist) > 1 and current_index == len(checklist) - 2:
-                        _logger.info("Adding background task to generate next checkpoint")
-                        
-                        # Get context for background generation
-                        context = await _orchestrator.get_cached_context(state, query.plan, query.text)
-                        
-                        # Add the background task
-                        background_tasks.add_task(
-                            _orchestrator._generate_next_checkpoint,
-                            query.conversation_id,
-                            query.text,
-                            context,
-                            task.get('task_id'),
-                            state,
-                            query.detected_agent
-                        )
-                    break
+async def _orchestrate(query: OrchestratorQuery, response: Response) -> Dict[str, Any]:
+    """Process one turn; the response is returned as a dict so it can be stored for duplicates."""
+    timing = TimingMetrics()
+    timing.start("total_orchestration")
+    lease = None
 
-        # 3) Prepare data for primary service call
-        timing.start("primary_service_preparation")
-        
-        # Get context with caching
-        context = await _orchestrator.get_cached_context(state, query.plan, query.text)
-        
-        
-        timing.end("primary_service_preparation")
+    try:
+        _logger.info(f"⟳ Orchestration start for conversation {query.conversation_id}")
 
-        # 4) Call primary service directly
-        timing.start("primary_service")
+        # 1) Wait for the previous turn of this conversation to be saved, then get its state
+        lease = await _acquire_turn(query, timing)
+        state = await _load_conversation_state(query, timing)
+        profile = get_agent_profile(query.detected_agent)
 
-        # Check detected_agent and call appropriate service
-        if query.detected_agent == "loneliness":
-            # Call loneliness companion service
-            loneliness_payload = {
-                "user_query": query.text,
-                "context": str(context),
-                "checkpoint": str(current_checkpoint) if current_checkpoint else "",
-                "conversation_id": query.conversation_id,
-                "user_profile_id": query.user_profile_id,
-                "agent_instance_id": query.agent_instance_id,
-                "user_id": query.user_profile_id
-            }
-
-            primary_result = await call_service(
-                settings.LONELINESS_SERVICE_URL,
-                loneliness_payload,
-                timing,
-                "loneliness",
-                timeout=PRIMARY_TIMEOUT
-            )
-        elif query.detected_agent == "accountability":
-            # Convert checkpoint object to string if it exists
-            checkpoint_str = None
-            if current_checkpoint:
-                if isinstance(current_checkpoint, dict):
-                    checkpoint_str = current_checkpoint.get('name') or current_checkpoint.get('id', '')
-                else:
-                    checkpoint_str = str(current_checkpoint)
-            
-            # Convert context to string format expected by accountability agent
-            context_str = ""
-            if context:
-                if isinstance(context, list) and context:
-                    # Take first context item if it's a list
-                    context_item = context[0] if context else {}
-                    if isinstance(context_item, dict):
-                        context_str = str(context_item.get('day', 'monday'))
-                    else:
-                        context_str = str(context_item)
-                elif isinstance(context, dict):
-                    context_str = str(context.get('day', 'monday'))
-                else:
-                    context_str = str(context)
-            
-            accountability_payload = {
-                "user_query": query.text,                     # Changed from "text" to "user_query"
-                "conversation_id": query.conversation_id,
-                "checkpoint": checkpoint_str or "",           # Ensure string
-                "context": context_str,                       # Changed from dict to string
-                "user_id": query.individual_id,               # Changed from "individual_id" to "user_id" 
-                "user_profile_id": query.user_profile_id,
-                "agent_instance_id": query.agent_instance_id
-            }
-
-            primary_result = await call_service(
-                settings.ACCOUNTABILITY_SERVICE_URL,
-                accountability_payload,
-                timing,
-                "accountability_companion",
-                timeout=PRIMARY_TIMEOUT
-            )
-        elif query.detected_agent == "emotional":
-            # Convert checkpoint object to string if it exists
-            checkpoint_str = None
-            if current_checkpoint:
-                if isinstance(current_checkpoint, dict):
-                    checkpoint_str = current_checkpoint.get('name') or current_checkpoint.get('id', '')
-                else:
-                    checkpoint_str = str(current_checkpoint)
-            
-            # Convert context to dict format expected by emotional agent
-            context_dict = {}
-            if context:
-                if isinstance(context, list) and context:
-                    context_dict = context[0] if context else {}
-                elif isinstance(context, dict):
-                    context_dict = context
-                else:
-                    context_dict = {"context": str(context)}
-            
-            emotional_payload = {
-                "user_query": query.text,
-                "conversation_id": query.conversation_id,
-                "checkpoint": checkpoint_str,
-                "context": context_dict,
-                "individual_id": query.individual_id,
-                "user_profile_id": query.user_profile_id,
-                "agent_instance_id": query.agent_instance_id
-            }
-
-            primary_result = await call_service(
-                settings.EMOTIONAL_SERVICE_URL,
-                emotional_payload,
-                timing,
-                "emotional_companion",
-                timeout=PRIMARY_TIMEOUT
-            )
-        elif query.detected_agent == "mental_therapy":
-            # Convert checkpoint object to string if it exists
-            checkpoint_str = None
-            if current_checkpoint:
-                if isinstance(current_checkpoint, dict):
-                    checkpoint_str = current_checkpoint.get('name') or current_checkpoint.get('id', '')
-                else:
-                    checkpoint_str = str(current_checkpoint)
-            
-            # Convert context to dict format expected by therapy agent
-            context_dict = {}
-            if context:
-                if isinstance(context, list) and context:
-                    context_dict = context[0] if context else {}
-                elif isinstance(context, dict):
-                    context_dict = context
-                else:
-                    context_dict = {"context": str(context)}
-            
-            therapy_payload = {
-                "user_query": query.text,
-                "conversation_id": query.conversation_id,
-                "checkpoint": checkpoint_str,
-                "context": context_dict,
-                "individual_id": query.individual_id,
-                "user_profile_id": query.user_profile_id,
-                "agent_instance_id": query.agent_instance_id
-            }
-
-            primary_result = await call_service(
-                settings.THERAPY_SERVICE_URL,
-                therapy_payload,
-                timing,
-                "therapy_checkin",
-                timeout=PRIMARY_TIMEOUT
-            )
-        elif query.detected_agent == "social_anxiety":
-            # Convert checkpoint object to string if it exists
-            checkpoint_str = None
-            if current_checkpoint:
-                if isinstance(current_checkpoint, dict):
-                    checkpoint_str = current_checkpoint.get('name') or current_checkpoint.get('id', '')
-                else:
-                    checkpoint_str = str(current_checkpoint)
-            
-            # Convert context to dict format expected by anxiety agent
-            context_dict = {}
-            if context:
-                if isinstance(context, list) and context:
-                    context_dict = context[0] if context else {}
-                elif isinstance(context, dict):
-                    context_dict = context
-                else:
-                    context_dict = {"context": str(context)}
-            
-            anxiety_payload = {
-                "user_query": query.text,
-                "conversation_id": query.conversation_id,
-                "checkpoint": checkpoint_str,
-                "context": context_dict,
-                "individual_id": query.individual_id,
-                "user_profile_id": query.user_profile_id,
-                "agent_instance_id": query.agent_instance_id
-            }
-
-            primary_result = await call_service(
-                settings.ANXIETY_SERVICE_URL,
-                anxiety_payload,
-                timing,
-                "anxiety_support",
-                timeout=PRIMARY_TIMEOUT
-            )
+        # 2-4) Checkpoint evaluation and the specialist call, either one after
+        # the other or concurrently when speculation applies to this turn. Auxiliary agents run
+        # alongside; the reply is returned as soon as the turn's own agent answers
+        if (
+            settings.SPECULATIVE_CHECKLIST
+            and profile.uses_checkpoints
+            and not state.is_new_conversation()
+            and state.get_current_checkpoint()
+        ):
+            turn = _speculative_turn
         else:
-            # Prepare primary service payload with correct data types
-            primary_payload = {
-                "text": query.text,
-                "conversation_id": query.conversation_id,
-                "checkpoint": current_checkpoint,
-                "context": context,
-                "checkpoint_complete": bool(checkpoint_complete),
-                "specialist_responses": {},      # Dict - empty since no agents
-                "async_agent_results":  {},       # Dict - from previous interactions
-                "sync_agent_results": [],        # List - empty since no agents (FIXED DATA TYPE)
-                "task_stack": list(getattr(state, "task_stack", [])),
-                "patient_verified": bool(getattr(state, "patient_verified", False)),
-                "is_paused": bool(getattr(state, "is_paused", False)),
-                
-           
-            }
-
-            primary_result = await call_service(
-                settings.PRIMARY_SERVICE_URL,
-                primary_payload,
-                timing,
-                "primary",
-                timeout=PRIMARY_TIMEOUT
-            )
+            turn = _sequential_turn
+        primary_node = AgentNode(PRIMARY_NODE, run=lambda _: turn(profile, query, state, timing))
+        primary_result, auxiliary = await agent_graph.run(
+            [primary_node, *_auxiliary_nodes(profile, query, state, timing)]
+        )
         
-        timing.end("primary_service")
+        # Handle dynamic checkpoint generation in the background if needed. It runs
+        # alongside the commit below and waits for the turn lease before attaching
+        next_checkpoint_job = await _next_checkpoint_job(query, state)
+        if next_checkpoint_job:
+            _spawn_background(_orchestrator._generate_next_checkpoint(*next_checkpoint_job))
 
-        # 5) Update state in background
-        background_tasks.add_task(
-            _handle_simple_background_operations,
-            state, query, primary_result
-        )
+        # 5) Update state in background; the turn lease is released once it is saved.
+        # Started here rather than after the response is sent, so a client that
+        # disconnects or a failed send cannot leave the turn unsaved and its lease held
+        _spawn_background(_handle_simple_background_operations(state, query, primary_result, lease, auxiliary))
+        lease = None
 
         # 6) Return response
         timing.end("total_orchestration")
+        timing.observe_stages(profile.name, query.plan)
         
         metrics = timing.get_metrics()
         total_time = metrics.get("total_orchestration", 0)
-        response.headers["Server-Timing"] = f"total;dur={total_time}"
+        response.headers["Server-Timing"] = timing.server_timing()
 
         _logger.info(f"Orchestration completed in {total_time:.2f}ms")
 
-        return OrchestratorResponse(
-            response=primary_result["response"],
-            conversation_id=query.conversation_id,
-            checkpoints=[],
-            checkpoint_progress=getattr(state, "checkpoint_progress", {}),
-            task_stack=getattr(state, "task_stack", []),
-            has_summary=getattr(state, "has_summary", False),
-            summary=getattr(state, "summary", None),
-            key_points=getattr(state, "key_points", []),
-            tags=getattr(state, "tags", []),
-            requires_human=primary_result.get("requires_human", False),
-            is_paused=getattr(state, "is_paused", False),
-            patient_verified=getattr(state, "patient_verified", False),
-            async_agent_results=getattr(state, "async_agent_results", {}),
-            sync_agent_results=getattr(state, "sync_agent_results", {}),
-            timing_metrics=metrics,
-            is_enriched=False
+        return _build_orchestrator_response(query, state, primary_result, metrics).model_dump()
+
+    except DeadlineExceeded as e:
+        timing.end("total_orchestration")
+        _logger.warning(f"⚠️ {e} for conversation {query.conversation_id}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        timing.end("total_orchestration")
+        if not isinstance(e, HTTPException):
+            _logger.exception("⨯ Orchestration error")
+            raise HTTPException(status_code=500, detail=f"Orchestration service error: {str(e)}")
+        raise
+    finally:
+        # Nothing handed to the background commit: let the next turn in now
+        if lease is not None:
+            await lease.release()
+
+async def _sequential_turn(profile: AgentProfile, query: OrchestratorQuery, state, timing: TimingMetrics) -> Dict[str, Any]:
+    """Evaluate the checkpoint first, then call the specialist with the result."""
+    # Prepare checkpoint data efficiently (handles both new conversations and evaluations)
+    current_checkpoint, checkpoint_complete, checklist_result = await _orchestrator.prepare_checkpoint_data(
+        query, state, timing
+    )
+
+    # Prepare data for primary service call
+    timing.start("primary_service_preparation")
+    
+    # Get context with caching
+    context = await _agent_context(profile, query, state)
+    
+    timing.end("primary_service_preparation")
+
+    # Call primary service directly
+    timing.start("primary_service")
+
+    url, payload = _build_specialist_request(
+        profile, query, state, context, current_checkpoint, checkpoint_complete
+    )
+    primary_result = await _call_agent(profile, url, payload, timing)
+    
+    timing.end("primary_service")
+    return primary_result
+
+async def _speculative_turn(profile: AgentProfile, query: OrchestratorQuery, state, timing: TimingMetrics) -> Dict[str, Any]:
+    """
+    Call the specialist with the turn's starting checkpoint while the checklist
+    evaluation runs. If the evaluation advances the checkpoint, the agent's
+    re-issue policy decides whether the reply stands (the new checkpoint is
+    used from the next turn) or the specialist is called again with it.
+    """
+    speculated_checkpoint = state.get_current_checkpoint()
+
+    timing.start("primary_service_preparation")
+    context = await _agent_context(profile, query, state)
+    url, payload = _build_specialist_request(
+        profile, query, state, context, speculated_checkpoint, False
+    )
+    timing.end("primary_service_preparation")
+
+    timing.start("primary_service")
+    specialist_task = asyncio.create_task(_call_agent(profile, url, payload, timing))
+    try:
+        current_checkpoint, checkpoint_complete, _ = await _orchestrator.prepare_checkpoint_data(
+            query, state, timing
         )
+    except BaseException:
+        specialist_task.cancel()
+        raise
+
+    invalidated = bool(checkpoint_complete) and current_checkpoint != speculated_checkpoint
+    reissue = invalidated and speculation.should_reissue(profile.name)
+    left = remaining()
+    if reissue and left is not None and left < settings.REISSUE_MIN_BUDGET:
+        # No time for a second call: the speculative reply stands
+        _logger.info(f"Only {left:.2f}s left, not re-issuing {profile.service_name}")
+        reissue = False
+    speculation.record(profile.name, invalidated, reissue)
+
+    if reissue:
+        specialist_task.cancel()
+        _logger.info(f"Checkpoint advanced during speculative call, re-issuing {profile.service_name}")
+        timing.start("speculation_reissue")
+        url, payload = _build_specialist_request(
+            profile, query, state, context, current_checkpoint, checkpoint_complete
+        )
+        primary_result = await _call_agent(profile, url, payload, timing)
+        timing.end("speculation_reissue")
+    else:
+        if invalidated:
+            _logger.info(f"Checkpoint advanced during speculative call, '{current_checkpoint}' applies from next turn")
+        primary_result = await specialist_task
+
+    timing.end("primary_service")
+    return primary_result
+
+def _stream_url_for(profile: AgentProfile, url: str) -> Optional[str]:
+    """The specialist's /stream URL, or None when the agent only answers in one piece."""
+    if not profile.streaming or not url.endswith("/process"):
+        return None
+    return url[:-len("/process")] + "/stream"
+
+@app.post("/orchestrate/stream")
+async def orchestrate_stream_endpoint(
+    query: OrchestratorQuery,
+    x_deadline_ms: Optional[str] = Header(None, alias=DEADLINE_HEADER)
+):
+    """
+    Streaming variant of /orchestrate (Server-Sent Events).
+
+    Tokens from the selected specialist are forwarded as "content" events as
+    they arrive. Checkpoint evaluation/generation runs concurrently with the
+    stream, and the turn is committed to state once the reply is complete.
+    The last event is "complete", carrying the same fields as the
+    /orchestrate response; failures are reported as an "error" event.
+
+    A completed turn is stored like /orchestrate's: resubmitting its turn_id
+    replays the reply in one "content" event. Duplicates of a turn still
+    streaming are not attached to it; they wait for its turn lease and then
+    replay the result it stored.
+    """
+    replay = await _replay_stored_turn(query)
+    if replay is not None:
+        return replay
+
+    timing = TimingMetrics()
+    timing.start("total_orchestration")
+    lease = None
+    bookkeeping = None
+
+    try:
+        _logger.info(f"⟳ Streaming orchestration start for conversation {query.conversation_id}")
+
+        # Voice turns jump the LLM queue ahead of chat and background work, and get
+        # the shorter budget when the gateway did not pass a deadline on
+        set_priority(priority_for_channel(query.channel))
+        adopt_deadline(x_deadline_ms, query.channel)
+        set_trace_attribute("conversation.id", query.conversation_id)
+
+        lease = await _acquire_turn(query, timing)
+        # The lease may have been held by this very turn, submitted earlier
+        replay = await _replay_stored_turn(query)
+        if replay is not None:
+            timing.end("total_orchestration")
+            await lease.release()
+            return replay
+        state = await _load_conversation_state(query, timing)
+        profile = get_agent_profile(query.detected_agent)
+
+        # The specialist is called with the checkpoint as it stood before this
+        # turn's evaluation; the evaluation result is applied to state afterwards
+        current_checkpoint = state.get_current_checkpoint() if profile.uses_checkpoints else None
+        bookkeeping = asyncio.create_task(_orchestrator.prepare_checkpoint_data(query, state, timing))
+
+        timing.start("primary_service_preparation")
+        context = await _agent_context(profile, query, state)
+        url, payload = _build_specialist_request(
+            profile, query, state, context, current_checkpoint, False
+        )
+        timing.end("primary_service_preparation")
 
     except Exception as e:
         timing.end("total_orchestration")
+        if bookkeeping is not None:
+            # The turn is rejected; its checkpoint evaluation must not go on editing state
+            bookkeeping.cancel()
+            await asyncio.gather(bookkeeping, return_exceptions=True)
+        if lease is not None:
+            await lease.release()
+        if isinstance(e, DeadlineExceeded):
+            raise HTTPException(status_code=504, detail=str(e))
         if not isinstance(e, HTTPException):
             _logger.exception("⨯ Orchestration error")
             raise HTTPException(status_code=500, detail=f"Orchestration service error: {str(e)}")
         raise
 
+    return StreamingResponse(
+        _orchestrate_stream(profile, query, state, timing, bookkeeping, url, payload, lease),
+        media_type=SSE_MEDIA_TYPE,
+        headers=SSE_HEADERS
+    )
+
+async def _replay_stored_turn(query: OrchestratorQuery) -> Optional[StreamingResponse]:
+    """Replay of the stored result of this turn_id, or None when it has not completed."""
+    if not query.turn_id or turn_results is None:
+        return None
+    found, stored = await turn_results.get(_turn_key(query))
+    if not found:
+        return None
+    _logger.info(f"Turn {query.turn_id} of conversation {query.conversation_id} already processed, replaying its response")
+    return StreamingResponse(
+        _replay_stream(stored),
+        media_type=SSE_MEDIA_TYPE,
+        headers={**SSE_HEADERS, REPLAYED_HEADER: "true"}
+    )
+
+async def _replay_stream(stored: Dict[str, Any]):
+    """Events of a stored /orchestrate/stream turn: the whole reply, then "complete"."""
+    yield encode_event({"type": "start", "conversation_id": stored["conversation_id"]})
+    yield encode_event({"type": "content", "data": stored["response"], "conversation_id": stored["conversation_id"]})
+    yield encode_event({"type": "complete", **stored})
+
+async def _orchestrate_stream(
+    profile: AgentProfile,
+    query: OrchestratorQuery,
+    state,
+    timing: TimingMetrics,
+    bookkeeping: asyncio.Task,
+    url: str,
+    payload: Dict[str, Any],
+    lease: Lease
+):
+    """Body of /orchestrate/stream: forward specialist tokens, then commit the turn."""
+    committed = False
+    try:
+        yield encode_event({"type": "start", "conversation_id": query.conversation_id})
+
+        timing.start("primary_service")
+        timing.start("first_token")
+        stream_url = _stream_url_for(profile, url)
+        if stream_url:
+            full_response = ""
+            screen: Dict[str, Any] = {}
+            async for event in stream_service(
+                stream_url, payload, profile.service_name, timeout=_agent_timeout(profile), pool=profile.pool
+            ):
+                event_type = event.get("type")
+                if event_type == "content" and event.get("data"):
+                    if not full_response:
+                        timing.end("first_token")
+                    full_response += event["data"]
+                    yield encode_event({"type": "content", "data": event["data"], "conversation_id": query.conversation_id})
+                elif event_type == "done":
+                    full_response = event.get("data") or full_response
+                elif event_type == "complete":
+                    # The specialist's crisis screen result rides on its final event
+                    screen = {k: event[k] for k in ("requires_human", "risk_level") if k in event}
+                elif event_type == "error":
+                    raise HTTPException(status_code=502, detail=f"{profile.service_name} stream error: {event.get('data')}")
+            primary_result = {"response": full_response.strip(), **screen}
+        else:
+            # Agent has no token stream: send its reply as a single chunk
+            primary_result = await _call_agent(profile, url, payload, timing)
+            timing.end("first_token")
+            yield encode_event({"type": "content", "data": primary_result["response"], "conversation_id": query.conversation_id})
+        timing.end("primary_service")
+
+        # Checkpoint bookkeeping ran alongside the stream; apply it, then commit the turn.
+        # The reply has already been delivered, so a failure here must not fail the turn
+        try:
+            _, checkpoint_complete, _ = await bookkeeping
+            if profile.uses_checkpoints:
+                speculation.record(profile.name, bool(checkpoint_complete))
+        except Exception:
+            _logger.exception("Checkpoint bookkeeping failed for streamed turn")
+        next_checkpoint_job = await _next_checkpoint_job(query, state)
+        if next_checkpoint_job:
+            _spawn_background(_orchestrator._generate_next_checkpoint(*next_checkpoint_job))
+
+        timing.end("total_orchestration")
+        timing.observe_stages(profile.name, query.plan)
+        metrics = timing.get_metrics()
+        _logger.info(
+            f"Streaming orchestration completed in {metrics.get('total_orchestration', 0):.2f}ms "
+            f"(first token {metrics.get('first_token', 0):.2f}ms)"
+        )
+
+        final = _build_orchestrator_response(query, state, primary_result, metrics).model_dump()
+
+        # Commit before anything else can suspend: the client may go away at the last
+        # yield, and a stored result must never belong to a turn that was not saved
+        committed = True
+        _spawn_background(_handle_simple_background_operations(state, query, primary_result, lease))
+        if query.turn_id and turn_results is not None:
+            await turn_results.put(_turn_key(query), final)
+        yield encode_event({"type": "complete", **final})
+
+    except Exception as e:
+        timing.end("total_orchestration")
+        _logger.exception("⨯ Streaming orchestration error")
+        detail = e.detail if isinstance(e, HTTPException) else f"Orchestration service error: {str(e)}"
+        yield encode_event({"type": "error", "data": detail, "conversation_id": query.conversation_id})
+    finally:
+        # Client went away or the stream failed: nothing is committed for this turn
+        if not committed:
+            if not bookkeeping.done():
+                bookkeeping.cancel()
+            await lease.release()
+
 async def _handle_simple_background_operations(
     state,
     query: OrchestratorQuery,
-    primary_result: Dict[str, Any]
+    primary_result: Dict[str, Any],
+    lease: Optional[Lease] = None,
+    auxiliary: Optional[asyncio.Task] = None
 ):
-    """Simplified background operations."""
+    """
+    Simplified background operations. Releases the turn lease once state is saved.
+    Results of auxiliary agents still running are awaited (within their deadlines)
+    and saved with the turn.
+    """
+    # Runs after the reply: the request's deadline no longer applies
+    set_deadline(None)
     try:
-        # Update context
-        await state.update_context(query.text, primary_result["response"], query.plan)
+        if auxiliary is not None:
+            await _merge_auxiliary_results(state, auxiliary)
+
+        # Update context; committed together with the other changes below
+        await state.update_context(query.text, primary_result["response"], query.plan, save=False)
         
         # Handle state updates from primary response
         if "updated_task_stack" in primary_result:
@@ -679,19 +1122,45 @@ async def _handle_simple_background_operations(
         if "resume_after_subtask" in primary_result:
             state.resume_after_subtask = primary_result["resume_after_subtask"]
         
-        # Save state
+        # One commit for the whole turn
+        started = time.perf_counter()
         await state.save()
+        observe_stage("save", (time.perf_counter() - started) * 1000, get_agent_profile(query.detected_agent).name, query.plan)
         
         _logger.info("Background operations completed successfully")
         
     except Exception as e:
         _logger.exception(f"Error in background operations: {e}")
+    finally:
+        if lease is not None:
+            await lease.release()
+
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus metrics of this process"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "orchestrator", "version": "simplified"}
+    return {
+        "status": "healthy",
+        "service": "orchestrator",
+        "version": "simplified",
+        "turn_lanes": turn_lanes.get_stats(),
+        "turn_idempotency": turn_results.get_stats() if turn_results is not None else {"enabled": False},
+        "cache": cache_manager.get_stats(),
+        "context_store": get_context_store().get_stats(),
+        "journal": await get_memory_manager().get_journal_stats(),
+        "speculation": {
+            "enabled": settings.SPECULATIVE_CHECKLIST,
+            "reissue_agents": sorted(speculation.reissue_agents),
+            "agents": speculation.get_stats(),
+        },
+        "agent_graph": agent_graph.get_stats(),
+        "resilience": get_resilience_stats(),
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -24,6 +24,8 @@ class OrchestratorQuery(BaseModel):
 
     # Optional legacy fields (for backward compatibility during transition)
     channel: Optional[str] = None  # Communication channel (e.g., phone, chat)
+    # Idempotency key of the turn, assigned by the gateway and kept across retries
+    turn_id: Optional[str] = None
 class OrchestratorResponse(BaseModel):
     """Model representing the response from the orchestrator."""
     response: str
@@ -40,6 +42,7 @@ class OrchestratorResponse(BaseModel):
 
     # State flags
     requires_human: bool
+    risk_level: Optional[int] = None  # Specialist crisis-screen level, when reported
     is_paused: bool = False
     is_enriched: bool = False  # Flag to indicate if response was enriched by specialists
 
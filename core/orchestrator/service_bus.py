@@ -0,0 +1,185 @@
+"""
+In-process service bus for the co-mounted core sub-applications.
+When checkpoint, checklist and primary are mounted in the same process as the
+orchestrator, calls to them are dispatched straight to the route handler
+coroutine instead of going over loopback HTTP. Only URLs on the origin
+(scheme, host and port) the service is configured at are dispatched locally;
+anything else still goes over HTTP.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Type
+from urllib.parse import urlsplit
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+
+from common.deadline import timeout_for
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LocalRoute:
+    """A handler reachable without leaving the process"""
+    path: str
+    origin: str                 # "scheme://host:port" the service is configured at
+    handler: Callable[[BaseModel], Awaitable[Any]]
+    request_model: Type[BaseModel]
+    calls: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+
+
+# Registered routes keyed by the full mounted path, e.g. "/checkpoint/generate"
+_routes: Dict[str, LocalRoute] = {}
+_enabled = True
+
+
+def _normalize_path(path: str) -> str:
+    return "/" + path.strip("/")
+
+
+def _origin(url: str) -> str:
+    """scheme://host:port of a URL, with the scheme's default port filled in"""
+    parts = urlsplit(url)
+    port = parts.port or {"http": 80, "https": 443}.get(parts.scheme)
+    return f"{parts.scheme}://{(parts.hostname or '').lower()}:{port}"
+
+
+def register_local_route(path: str, base_url: str, handler: Callable, request_model: Type[BaseModel]) -> None:
+    """Register a single handler coroutine under its mounted path on the service's configured origin."""
+    path = _normalize_path(path)
+    _routes[path] = LocalRoute(path=path, origin=_origin(base_url), handler=handler, request_model=request_model)
+    _logger.debug(f"Registered in-process route {path} -> {handler.__name__}")
+
+
+def register_mounted_app(prefix: str, app, base_url: str) -> int:
+    """
+    Register every POST route of a mounted FastAPI app whose only input is a
+    single Pydantic request body. Routes that need the raw Request, headers,
+    background tasks or dependencies are left on the HTTP path.
+
+    Args:
+        prefix: Mount path of the app, e.g. "/checkpoint"
+        app: The mounted FastAPI app
+        base_url: URL the orchestrator is configured to call the service at;
+            only calls to its origin are dispatched in-process
+
+    Returns:
+        Number of routes registered
+    """
+    registered = 0
+    for route in getattr(app, "routes", []):
+        dependant = getattr(route, "dependant", None)
+        if dependant is None or "POST" not in (getattr(route, "methods", None) or set()):
+            continue
+
+        if (
+            len(dependant.body_params) != 1
+            or dependant.path_params
+            or dependant.query_params
+            or dependant.header_params
+            or dependant.cookie_params
+            or dependant.dependencies
+            or dependant.request_param_name
+            or dependant.websocket_param_name
+            or dependant.response_param_name
+            or dependant.background_tasks_param_name
+        ):
+            continue
+
+        request_model = dependant.body_params[0].type_
+        if not (isinstance(request_model, type) and issubclass(request_model, BaseModel)):
+            continue
+
+        register_local_route(f"{prefix}{route.path}", base_url, route.endpoint, request_model)
+        registered += 1
+
+    return registered
+
+
+def set_enabled(enabled: bool) -> None:
+    """Turn in-process dispatch on or off (HTTP is always used when off)."""
+    global _enabled
+    _enabled = enabled
+
+
+def resolve_local_route(url: str) -> Optional[LocalRoute]:
+    """Return the local route serving this URL, or None when it must go over HTTP."""
+    if not _enabled or not _routes:
+        return None
+    try:
+        path, origin = urlsplit(url).path, _origin(url)
+    except ValueError:
+        return None
+    route = _routes.get(_normalize_path(path))
+    if route is None or route.origin != origin:
+        return None
+    return route
+
+
+async def dispatch_local(route: LocalRoute, payload: dict, timeout: Optional[float] = None) -> dict:
+    """
+    Validate the payload into the route's request model and await its handler,
+    for at most `timeout` seconds (capped at the request's remaining deadline).
+
+    Errors are surfaced the same way the HTTP path surfaces them so callers
+    do not need to know which transport was used.
+    """
+    start = time.perf_counter()
+    route.calls += 1
+    try:
+        try:
+            request = route.request_model.model_validate(payload)
+        except ValidationError as e:
+            _logger.error(f"Validation error in in-process call to {route.path}: {e.errors()}")
+            raise HTTPException(
+                status_code=422,
+                detail=f"Invalid request to service: {e.errors()}. Please check your input data."
+            )
+
+        limit = timeout_for(timeout)
+        try:
+            result = await asyncio.wait_for(route.handler(request), limit)
+        except asyncio.TimeoutError:
+            _logger.error(f"In-process call to {route.path} timed out after {limit}s")
+            raise HTTPException(
+                status_code=504,
+                detail=f"Service timeout. Service took longer than {limit}s to respond."
+            )
+
+        if isinstance(result, BaseModel):
+            # JSON values (datetimes as strings, enums as values), as the HTTP path decodes them
+            return result.model_dump(mode="json")
+        return result
+    except HTTPException:
+        route.errors += 1
+        raise
+    except Exception as e:
+        route.errors += 1
+        _logger.exception(f"In-process call to {route.path} failed")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal service error ({type(e).__name__}): {str(e)}"
+        )
+    finally:
+        route.total_ms += (time.perf_counter() - start) * 1000
+
+
+def get_bus_stats() -> Dict[str, Any]:
+    """Per-route call counters for health/diagnostics endpoints."""
+    return {
+        "enabled": _enabled,
+        "routes": {
+            path: {
+                "calls": route.calls,
+                "errors": route.errors,
+                "avg_ms": round(route.total_ms / route.calls, 2) if route.calls else 0.0,
+            }
+            for path, route in _routes.items()
+        },
+    }
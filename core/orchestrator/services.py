@@ -8,21 +8,26 @@ Manages calls to various specialized services and handles responses.
 
 import asyncio
 import logging
-from typing import List, Dict, Optional, Any, Callable
+from typing import List, Dict, Optional, Any, AsyncIterator, Callable
 import httpx
 from fastapi import HTTPException
+from common.deadline import deadline_headers, expired, remaining
+from common.llm_gateway import PRIORITY_HEADER, current_priority
+from common.resilience import CircuitOpenError, get_breaker, get_retry_budget, hedged
+from common.sse import parse_event_line
+from common.tracing import CLIENT, STATUS_ERROR, Span, inject_headers, start_detached_span, start_span
 
 if __name__ == "__main__" and __package__ is None:
     from orchestrator.timing import TimingMetrics
     from orchestrator.agents import get_service_url
-    from orchestrator.caching import get_cached_checkpoint_evaluation, cache_checkpoint_evaluation
     from orchestrator.config import get_settings
+    from orchestrator.service_bus import resolve_local_route, dispatch_local
     from common.models import AgentResult, AgentResponseStatus, CheckpointType, Checkpoint
 else:
     from .timing import TimingMetrics
     from .agents import get_service_url
-    from .caching import get_cached_checkpoint_evaluation, cache_checkpoint_evaluation
     from .config import get_settings
+    from .service_bus import resolve_local_route, dispatch_local
     from common.models import AgentResult, AgentResponseStatus, CheckpointType, Checkpoint
 
 _logger = logging.getLogger(__name__)
@@ -110,21 +115,97 @@ def ensure_http_client():
         )
         _logger.debug("HTTP client initialized with optimized settings")
 
+# Dedicated downstream connection pools keyed by name (see AgentProfile.pool),
+# so one slow downstream cannot exhaust the connections everyone else needs
+_pool_clients: Dict[str, httpx.AsyncClient] = {}
+
+def get_pool_client(pool: Optional[str] = None) -> httpx.AsyncClient:
+    """HTTP client for a named connection pool; no pool means the shared client."""
+    ensure_http_client()
+    if not pool:
+        return http_client
+
+    client = _pool_clients.get(pool)
+    if client is None:
+        client = _pool_clients[pool] = httpx.AsyncClient(
+            timeout=SERVICE_TIMEOUTS["default"],
+            limits=httpx.Limits(
+                max_keepalive_connections=settings.MAX_KEEPALIVE_CONNECTIONS,
+                max_connections=settings.MAX_CONNECTIONS,
+                keepalive_expiry=30.0
+            ),
+            http2=True
+        )
+        _logger.debug(f"HTTP connection pool '{pool}' initialized")
+    return client
+
+async def close_pool_clients() -> None:
+    """Close every named connection pool."""
+    while _pool_clients:
+        _, client = _pool_clients.popitem()
+        await client.aclose()
+
 def get_service_timeout(service_name: str) -> httpx.Timeout:
     """Get appropriate timeout for a specific service."""
     return SERVICE_TIMEOUTS.get(service_name, SERVICE_TIMEOUTS["default"])
 
+def get_service_breaker(url: str):
+    """Circuit breaker of one service endpoint"""
+    return get_breaker(
+        url,
+        failure_rate=settings.CIRCUIT_FAILURE_RATE,
+        slow_call_ms=settings.CIRCUIT_SLOW_CALL_MS,
+        open_for=settings.CIRCUIT_OPEN_SECONDS
+    )
+
+def request_headers(span: Optional[Span] = None) -> Dict[str, str]:
+    """Headers of every service call: downstream LLM calls inherit our priority, remaining deadline and trace"""
+    return inject_headers({PRIORITY_HEADER: current_priority().name.lower(), **deadline_headers()}, span)
+
+def clamp_timeout(timeout: httpx.Timeout) -> httpx.Timeout:
+    """Cap every phase of a timeout at the request's remaining budget"""
+    left = remaining()
+    if left is None:
+        return timeout
+    left = max(left, 0.001)
+    cap = lambda value: left if value is None else min(value, left)
+    return httpx.Timeout(
+        connect=cap(timeout.connect),
+        read=cap(timeout.read),
+        write=cap(timeout.write),
+        pool=cap(timeout.pool)
+    )
+
+def _is_service_failure(e: BaseException) -> bool:
+    """Whether an error counts against the endpoint's breaker (client errors do not)"""
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code >= 500
+    return not isinstance(e, HTTPException)
+
 async def call_service(
     url: str,
     payload: dict,
     timing: TimingMetrics,
     service_name: str,
     timeout: Optional[httpx.Timeout] = None,
-    max_retries: int = 3  # Increased default retries
+    max_retries: int = 3,  # Increased default retries
+    pool: Optional[str] = None,
+    idempotent: bool = False
 ) -> dict:
     """
     Enhanced function to call services with advanced error handling, dynamic timeouts, and
-    intelligent retry logic.
+    intelligent retry logic. If the target is mounted in this process (see service_bus),
+    its handler is awaited directly and no HTTP request is made.
+
+    Each endpoint has a circuit breaker: while it is open the call fails at once
+    with a 503 instead of waiting on a service that is down. Retries (at most
+    max_retries) are drawn from a shared retry budget, so an outage does not
+    multiply the load. Idempotent calls are hedged: a second request is sent
+    when the first has not answered within the endpoint's p95 latency.
+
+    The request's deadline (common.deadline) bounds the whole call: each
+    attempt's timeout is capped at the remaining budget, which is passed on in
+    the X-Deadline-Ms header, and no retry starts that could not finish in time.
 
     Args:
         url: The service URL
@@ -133,6 +214,8 @@ async def call_service(
         service_name: Name of the service for timing metrics
         timeout: Optional custom timeout
         max_retries: Maximum number of retries for failed requests
+        pool: Optional named connection pool (see get_pool_client)
+        idempotent: Whether the call may be sent twice (enables hedging)
 
     Returns:
         Service response as dictionary
@@ -142,47 +225,89 @@ async def call_service(
     """
     global http_client
 
-    # Ensure HTTP client is initialized
-    ensure_http_client()
+    # Nothing to gain from a call that cannot answer before the deadline
+    if expired():
+        _logger.warning(f"⚠️ Deadline passed, not calling {service_name}")
+        raise HTTPException(status_code=504, detail=f"Deadline exceeded before calling {service_name}")
 
     # Use service-specific timeout if not provided
     if timeout is None:
         timeout = get_service_timeout(service_name)
 
+    # Co-mounted services are called directly, skipping the loopback hop; the
+    # service's read timeout bounds the handler as it bounds the HTTP response
+    local_route = resolve_local_route(url)
+    if local_route is not None:
+        timing.start(f"service_call_{service_name}")
+        try:
+            return await dispatch_local(local_route, payload, timeout.read)
+        finally:
+            timing.end(f"service_call_{service_name}")
+
+    # Ensure HTTP client is initialized
+    client = get_pool_client(pool)
+
     timing.start(f"service_call_{service_name}")
     _logger.info(f"Making request to {url} with payload keys: {list(payload.keys())}")
 
     last_exception = None
+    breaker = get_service_breaker(url)
+    retry_budget = get_retry_budget("services", ratio=settings.RETRY_BUDGET_RATIO)
+    retry_budget.record_request()
+
+    # Make the request with timeout, sized to what is left of the deadline
+    async def post():
+        with start_span(f"POST {service_name}", CLIENT, {"http.url": url, "peer.service": service_name}) as span:
+            resp = await client.post(
+                url,
+                json=payload,
+                timeout=clamp_timeout(timeout),
+                headers=request_headers()
+            )
+            span.set_attribute("http.status_code", resp.status_code)
+            return resp
 
     for attempt in range(max_retries + 1):
         try:
             if attempt > 0:
+                # Add exponential backoff, unless the deadline passes before it ends
+                backoff = 0.5 * (2 ** (attempt - 1))
+                left = remaining()
+                if left is not None and left <= backoff:
+                    _logger.warning(f"⚠️ Deadline too close, not retrying {service_name}")
+                    break
+                if not retry_budget.try_retry():
+                    _logger.warning(f"⚠️ Retry budget spent, not retrying {service_name}")
+                    break
                 _logger.info(f"Retry attempt {attempt} for {service_name}")
-                # Add exponential backoff
-                await asyncio.sleep(0.5 * (2 ** (attempt - 1)))
-
-            # Make the request with timeout
-            resp = await http_client.post(url, json=payload, timeout=timeout)
-
-            # Handle validation errors (422)
-            if resp.status_code == 422:
-                error_detail = "Unknown validation error"
-                try:
-                    error_data = resp.json()
-                    if "detail" in error_data:
-                        error_detail = str(error_data["detail"])
-                except Exception:
-                    pass
-
-                _logger.error(f"Validation error in request to {url}: {error_detail}")
-                _logger.debug(f"Request payload that caused 422: {payload}")
-                raise HTTPException(
-                    status_code=422,
-                    detail=f"Invalid request to service: {error_detail}. Please check your input data."
-                )
-
-            # Raise for other HTTP errors
-            resp.raise_for_status()
+                await asyncio.sleep(backoff)
+
+            with breaker.guard(_is_service_failure):
+                if idempotent and settings.HEDGE_IDEMPOTENT_CALLS:
+                    p95 = breaker.latency_percentile(95)
+                    resp = await hedged(post, p95 / 1000 if p95 else None)
+                else:
+                    resp = await post()
+
+                # Handle validation errors (422)
+                if resp.status_code == 422:
+                    error_detail = "Unknown validation error"
+                    try:
+                        error_data = resp.json()
+                        if "detail" in error_data:
+                            error_detail = str(error_data["detail"])
+                    except Exception:
+                        pass
+
+                    _logger.error(f"Validation error in request to {url}: {error_detail}")
+                    _logger.debug(f"Request payload that caused 422: {payload}")
+                    raise HTTPException(
+                        status_code=422,
+                        detail=f"Invalid request to service: {error_detail}. Please check your input data."
+                    )
+
+                # Raise for other HTTP errors
+                resp.raise_for_status()
 
             # Parse JSON response
             result = resp.json()
@@ -193,6 +318,11 @@ async def call_service(
 
             return result
 
+        except CircuitOpenError as e:
+            last_exception = e
+            _logger.warning(f"⚠️ {e}")
+            break
+
         except httpx.HTTPStatusError as e:
             last_exception = e
             status_code = e.response.status_code
@@ -252,6 +382,11 @@ async def call_service(
             status_code=504,
             detail=f"Service timeout after {max_retries + 1} attempts. Service took longer than {timeout.read}s to respond."
         )
+    elif isinstance(last_exception, CircuitOpenError):
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service {service_name} is unavailable, retry in {last_exception.retry_in:.0f}s"
+        )
     elif isinstance(last_exception, httpx.RequestError):
         error_type = type(last_exception).__name__
         raise HTTPException(
@@ -267,6 +402,68 @@ async def call_service(
 
     timing.end(f"service_call_{service_name}")
 
+async def stream_service(
+    url: str,
+    payload: dict,
+    service_name: str,
+    timeout: Optional[httpx.Timeout] = None,
+    pool: Optional[str] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    POST to a service's SSE endpoint and yield its events as they arrive.
+
+    No retries: once tokens have been forwarded to the caller a retry would
+    duplicate them. Errors before the first event are raised as HTTPException
+    like call_service does; the caller decides whether to fall back.
+    """
+    client = get_pool_client(pool)
+
+    if timeout is None:
+        timeout = get_service_timeout(service_name)
+
+    if expired():
+        raise HTTPException(status_code=504, detail=f"Deadline exceeded before calling {service_name}")
+
+    _logger.info(f"Opening stream to {url} with payload keys: {list(payload.keys())}")
+    # Not made current: the caller's code runs between our yields
+    span = start_detached_span(f"POST {service_name} (stream)", CLIENT, {"http.url": url, "peer.service": service_name})
+    try:
+        async with client.stream(
+            "POST",
+            url,
+            json=payload,
+            timeout=clamp_timeout(timeout),
+            headers=request_headers(span)
+        ) as resp:
+            span.set_attribute("http.status_code", resp.status_code)
+            if resp.status_code != 200:
+                body = await resp.aread()
+                _logger.error(f"Stream request to {url} failed: {resp.status_code} - {body[:200]!r}")
+                raise HTTPException(
+                    status_code=502,
+                    detail=f"Streaming service error: {resp.status_code} {resp.reason_phrase}"
+                )
+
+            async for line in resp.aiter_lines():
+                event = parse_event_line(line)
+                if event is not None:
+                    yield event
+
+    except httpx.TimeoutException as e:
+        span.record_error(e)
+        _logger.error(f"Stream timeout: {url} - {str(e)}")
+        raise HTTPException(status_code=504, detail=f"Streaming service timeout: {str(e)}")
+    except httpx.RequestError as e:
+        span.record_error(e)
+        error_type = type(e).__name__
+        _logger.error(f"Stream request error: {url} - {error_type} - {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Service connection failed ({error_type}): {str(e)}")
+    except HTTPException:
+        span.status = STATUS_ERROR
+        raise
+    finally:
+        span.end()
+
 async def call_checklist_service(
     conversation_id: str,
     text: str,
@@ -276,23 +473,12 @@ async def call_checklist_service(
     timing: TimingMetrics
 ) -> dict:
     """
-    Dedicated function for checklist calls with caching for evaluation calls.
+    Dedicated function for checklist calls. Evaluation results are cached at
+    the LLM level by the checklist agent (exact-match on the full prompt).
     """
-    # Try to get from cache first for evaluation calls
-    if evaluation_only:
-        cached_result = await get_cached_checkpoint_evaluation(
-            conversation_id,
-            checkpoint,
-            hash(text)
-        )
-        if cached_result:
-            _logger.info(f"Cache hit for checkpoint evaluation: {checkpoint}")
-            return cached_result
-
-    # Call the service if not in cache
     checklist_url = get_service_url("checklist")
 
-    result = await call_service(
+    return await call_service(
         checklist_url,
         {
             "text": text,
@@ -302,20 +488,10 @@ async def call_checklist_service(
             "evaluation_only": evaluation_only,
         },
         timing,
-        "checklist"
+        "checklist",
+        idempotent=evaluation_only
     )
 
-    # Cache evaluation results
-    if evaluation_only:
-        await cache_checkpoint_evaluation(
-            conversation_id,
-            checkpoint,
-            hash(text),
-            result
-        )
-
-    return result
-
 async def call_specialists(
     specialists: List[str],
     text: str,
@@ -0,0 +1,52 @@
+# orchestrator/speculation.py
+"""
+Bookkeeping for speculative checklist evaluation.
+
+In speculative mode the specialist is called with the checkpoint as it stood
+at the start of the turn, concurrently with the checklist evaluation. When the
+evaluation completes that checkpoint the speculation is "invalidated": the
+reply was produced against a stale checkpoint. Each agent's policy decides
+what happens then - either the reply stands and the new checkpoint takes
+effect from the next turn, or the specialist call is re-issued.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable
+
+
+@dataclass
+class AgentSpeculationStats:
+    """Counters for one agent"""
+    turns: int = 0
+    invalidated: int = 0
+    reissued: int = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["invalidation_rate"] = round(self.invalidated / self.turns, 3) if self.turns else 0.0
+        return data
+
+
+class SpeculationTracker:
+    """Per-agent re-issue policy plus invalidation counters"""
+
+    def __init__(self, reissue_agents: Iterable[str] = ()):
+        self.reissue_agents = set(reissue_agents)
+        self._agents: Dict[str, AgentSpeculationStats] = {}
+
+    def should_reissue(self, agent: str) -> bool:
+        """True when a checkpoint change invalidates this agent's reply for the current turn"""
+        return agent in self.reissue_agents
+
+    def record(self, agent: str, invalidated: bool, reissued: bool = False) -> None:
+        stats = self._agents.get(agent)
+        if stats is None:
+            stats = self._agents[agent] = AgentSpeculationStats()
+        stats.turns += 1
+        if invalidated:
+            stats.invalidated += 1
+        if reissued:
+            stats.reissued += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {agent: stats.snapshot() for agent, stats in self._agents.items()}
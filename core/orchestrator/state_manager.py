@@ -11,25 +11,34 @@ import asyncio
 import json
 import hashlib
 from typing import Dict, List, Optional, Any, Literal, Union, Set
-from collections import defaultdict, OrderedDict
+from collections import defaultdict
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 import httpx
 import redis.asyncio as redis
 from contextlib import asynccontextmanager
 from functools import wraps
-import pickle
-import threading
+import uuid
 from concurrent.futures import ThreadPoolExecutor
 
+from common.codec import decode, encode
+from common.metrics import TimedRedis, cache_samples, get_registry, register_cache_sizes
+from common.tiered_cache import DEFAULT_NAMESPACE, INVALIDATION_CHANNEL, LocalTier
+
 if __name__ == "__main__" and __package__ is None:
     from orchestrator.config import get_settings
+    from orchestrator.default_checkpoints import is_default_task
+    from orchestrator.task_stack import TaskStack
     from common.models import Conversation, AgentResult, Task, Checkpoint
     from memory.memory_manager import get_memory_manager
+    from memory.change_set import StateSnapshot, diff_state
 else:
     from .config import get_settings
+    from .default_checkpoints import is_default_task
+    from .task_stack import TaskStack
     from common.models import Conversation, AgentResult, Task, Checkpoint
     from ..memory.memory_manager import get_memory_manager
+    from ..memory.change_set import StateSnapshot, diff_state
 
 _logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -45,66 +54,52 @@ AgentResponseStatus = Literal["success", "error", "partial"]
 # Cache configuration from settings
 REDIS_URL = settings.REDIS_URL
 CACHE_TTL = settings.CACHE_TTL
-LOCAL_CACHE_SIZE = settings.LOCAL_CACHE_SIZE
+CONTEXT_WINDOW_MESSAGES = settings.CONTEXT_WINDOW_MESSAGES
 BATCH_SIZE = 100
+INVALIDATION_RETRY_AFTER = 5.0
 
 @dataclass
 class CacheStats:
     """Cache performance statistics"""
     redis_hits: int = 0
     redis_misses: int = 0
-    local_hits: int = 0
-    local_misses: int = 0
     api_calls: int = 0
     cache_writes: int = 0
-
-class LocalCache:
-    """Thread-safe LRU local cache"""
-    def __init__(self, max_size: int = LOCAL_CACHE_SIZE):
-        self.cache = OrderedDict()
-        self.max_size = max_size
-        self.lock = threading.RLock()
-        self.stats = CacheStats()
-
-    def get(self, key: str) -> Optional[Any]:
-        with self.lock:
-            if key in self.cache:
-                # Move to end (most recently used)
-                value = self.cache.pop(key)
-                self.cache[key] = value
-                self.stats.local_hits += 1
-                return value
-            self.stats.local_misses += 1
-            return None
-
-    def set(self, key: str, value: Any) -> None:
-        with self.lock:
-            if key in self.cache:
-                self.cache.pop(key)
-            elif len(self.cache) >= self.max_size:
-                # Remove least recently used
-                self.cache.popitem(last=False)
-
-            self.cache[key] = value
-
-    def delete(self, key: str) -> bool:
-        with self.lock:
-            return self.cache.pop(key, None) is not None
-
-    def clear(self) -> None:
-        with self.lock:
-            self.cache.clear()
+    invalidations_sent: int = 0
+    invalidations_received: int = 0
 
 class CacheManager:
-    """Manages Redis and local caching with intelligent fallback"""
+    """
+    Two-tier cache: a byte-bounded local tier in front of Redis.
+
+    Every write or delete is published on the invalidation channel and every
+    worker drops its local copy of the key, so a conversation saved by one
+    worker is not served stale by another. While the channel is down local
+    copies only live for LOCAL_CACHE_UNSYNCED_TTL.
+    """
 
     def __init__(self):
         self.redis_client: Optional[redis.Redis] = None
-        self.local_cache = LocalCache()
+        self.local_cache = LocalTier(
+            quotas=settings.LOCAL_CACHE_QUOTA_BYTES,
+            default_quota=settings.LOCAL_CACHE_DEFAULT_QUOTA_BYTES
+        )
         self.stats = CacheStats()
         self.connection_pool = None
         self.redis_available = False
         self._lock = asyncio.Lock()
+        # Tags this worker's invalidations so it does not drop what it just wrote
+        self._origin = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+        self._invalidation_live = False
+        # Bumped per invalidation received; a Redis read that overlapped one is not kept locally
+        self._invalidation_seq = 0
+        get_registry().register_collector("state_cache", lambda: cache_samples(
+            "state", self.local_cache.get_stats(), {"local_hits": "local_hit", "redis_hits": "redis_hit", "misses": "miss"}
+        ))
+        register_cache_sizes("state", lambda: {
+            namespace: stats["entries"] for namespace, stats in self.local_cache.get_stats().items()
+        })
 
     async def initialize(self):
         """Initialize Redis connection with fallback"""
@@ -116,33 +111,105 @@ class CacheManager:
                 socket_connect_timeout=2,
                 socket_timeout=2
             )
-            self.redis_client = redis.Redis(connection_pool=self.connection_pool)
+            self.redis_client = TimedRedis(redis.Redis(connection_pool=self.connection_pool), "redis")
 
             # Test connection
             await self.redis_client.ping()
             self.redis_available = True
             _logger.debug("✅ Redis cache initialized successfully")
 
+            if settings.CACHE_INVALIDATION and (self._listener is None or self._listener.done()):
+                self._listener = asyncio.create_task(self._listen_for_invalidations())
+
         except Exception as e:
             _logger.warning(f"⚠️ Redis unavailable, using local cache only: {e}")
             self.redis_available = False
 
-    async def get(self, key: str) -> Optional[Any]:
+    async def close(self) -> None:
+        """Stop the invalidation listener and release the Redis pool"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self.connection_pool is not None:
+            await self.connection_pool.disconnect()
+
+    # ------------------------------------------------------------------
+    # Cross-worker invalidation
+    # ------------------------------------------------------------------
+    async def _listen_for_invalidations(self) -> None:
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Whatever was published while we were not listening is lost
+                self.local_cache.clear()
+                self._invalidation_live = True
+                _logger.info("✅ Listening for cache invalidations")
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self._on_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                _logger.warning(
+                    f"⚠️ Cache invalidation channel lost, local entries expire within "
+                    f"{settings.LOCAL_CACHE_UNSYNCED_TTL:.0f}s until it is back: {e}"
+                )
+            finally:
+                self._invalidation_live = False
+                try:
+                    await pubsub.reset()
+                except Exception:
+                    pass
+            await asyncio.sleep(INVALIDATION_RETRY_AFTER)
+
+    def _on_invalidation(self, data: Union[bytes, str]) -> None:
+        if isinstance(data, bytes):
+            data = data.decode()
+        origin, _, key = data.partition("|")
+        if origin == self._origin:
+            return
+        self._invalidation_seq += 1
+        self.stats.invalidations_received += 1
+        self.local_cache.invalidate(key)
+
+    def _local_ttl(self, ttl: float) -> float:
+        # Another worker's write can only go unnoticed while Redis is shared but the channel is down
+        if self.redis_available and settings.CACHE_INVALIDATION and not self._invalidation_live:
+            return min(ttl, settings.LOCAL_CACHE_UNSYNCED_TTL)
+        return ttl
+
+    def _keep_local(self, key: str, value: Any, size: int, namespace: str, seq: int) -> None:
+        """Fill the local tier from a Redis read, unless an invalidation arrived while it was in flight"""
+        if seq == self._invalidation_seq:
+            self.local_cache.set(key, value, size, namespace, self._local_ttl(CACHE_TTL))
+
+    # ------------------------------------------------------------------
+    # Cache operations
+    # ------------------------------------------------------------------
+    async def get(self, key: str, namespace: str = DEFAULT_NAMESPACE) -> Optional[Any]:
         """Get from cache with multi-level fallback"""
         # Try local cache first (fastest)
-        local_value = self.local_cache.get(key)
+        local_value = self.local_cache.get(key, namespace)
         if local_value is not None:
             return local_value
 
         # Try Redis if available
         if self.redis_available:
             try:
+                seq = self._invalidation_seq
                 redis_value = await self.redis_client.get(key)
                 if redis_value:
                     self.stats.redis_hits += 1
+                    self.local_cache.stats(namespace).redis_hits += 1
                     # Deserialize and cache locally
-                    value = pickle.loads(redis_value)
-                    self.local_cache.set(key, value)
+                    value = decode(redis_value, allow_pickle=True)
+                    self._keep_local(key, value, len(redis_value), namespace, seq)
                     return value
                 else:
                     self.stats.redis_misses += 1
@@ -150,18 +217,22 @@ class CacheManager:
                 _logger.warning(f"Redis get error for key {key}: {e}")
                 self.redis_available = False
 
+        self.local_cache.stats(namespace).misses += 1
         return None
 
-    async def set(self, key: str, value: Any, ttl: int = CACHE_TTL) -> None:
+    async def set(self, key: str, value: Any, ttl: int = CACHE_TTL, namespace: str = DEFAULT_NAMESPACE) -> None:
         """Set in cache with multi-level storage"""
-        # Always cache locally
-        self.local_cache.set(key, value)
+        # The encoded size is what the local tier accounts for
+        serialized = encode(value)
+        self.local_cache.set(key, value, len(serialized), namespace, self._local_ttl(ttl))
 
         # Try Redis if available
         if self.redis_available:
             try:
-                serialized = pickle.dumps(value)
-                await self.redis_client.setex(key, ttl, serialized)
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    pipe.setex(key, ttl, serialized)
+                    self._publish_invalidation(pipe, key)
+                    await pipe.execute()
                 self.stats.cache_writes += 1
             except Exception as e:
                 _logger.warning(f"Redis set error for key {key}: {e}")
@@ -173,18 +244,26 @@ class CacheManager:
 
         if self.redis_available:
             try:
-                await self.redis_client.delete(key)
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    pipe.delete(key)
+                    self._publish_invalidation(pipe, key)
+                    await pipe.execute()
             except Exception as e:
                 _logger.warning(f"Redis delete error for key {key}: {e}")
 
-    async def batch_get(self, keys: List[str]) -> Dict[str, Any]:
+    def _publish_invalidation(self, pipe, key: str) -> None:
+        if settings.CACHE_INVALIDATION:
+            pipe.publish(INVALIDATION_CHANNEL, f"{self._origin}|{key}")
+            self.stats.invalidations_sent += 1
+
+    async def batch_get(self, keys: List[str], namespace: str = DEFAULT_NAMESPACE) -> Dict[str, Any]:
         """Batch get operation for better performance"""
         results = {}
         missing_keys = []
 
         # Check local cache first
         for key in keys:
-            local_value = self.local_cache.get(key)
+            local_value = self.local_cache.get(key, namespace)
             if local_value is not None:
                 results[key] = local_value
             else:
@@ -193,33 +272,42 @@ class CacheManager:
         # Batch get from Redis for missing keys
         if missing_keys and self.redis_available:
             try:
+                seq = self._invalidation_seq
                 redis_values = await self.redis_client.mget(missing_keys)
                 for key, redis_value in zip(missing_keys, redis_values):
                     if redis_value:
-                        value = pickle.loads(redis_value)
+                        value = decode(redis_value, allow_pickle=True)
                         results[key] = value
-                        self.local_cache.set(key, value)
+                        self._keep_local(key, value, len(redis_value), namespace, seq)
                         self.stats.redis_hits += 1
+                        self.local_cache.stats(namespace).redis_hits += 1
                     else:
                         self.stats.redis_misses += 1
             except Exception as e:
                 _logger.warning(f"Redis batch get error: {e}")
 
+        self.local_cache.stats(namespace).misses += sum(1 for key in missing_keys if key not in results)
         return results
 
     def get_stats(self) -> Dict[str, Any]:
         """Get cache performance statistics"""
+        namespaces = self.local_cache.get_stats()
+        local_hits = sum(ns["local_hits"] for ns in namespaces.values())
+        misses = sum(ns["misses"] for ns in namespaces.values())
         return {
             "redis_available": self.redis_available,
+            "invalidation_live": self._invalidation_live,
             "redis_hits": self.stats.redis_hits,
             "redis_misses": self.stats.redis_misses,
-            "local_hits": self.stats.local_hits,
-            "local_misses": self.stats.local_misses,
+            "local_hits": local_hits,
             "api_calls": self.stats.api_calls,
             "cache_writes": self.stats.cache_writes,
-            "hit_rate": (self.stats.redis_hits + self.stats.local_hits) /
-                       max(1, self.stats.redis_hits + self.stats.redis_misses +
-                           self.stats.local_hits + self.stats.local_misses) * 100
+            "invalidations_sent": self.stats.invalidations_sent,
+            "invalidations_received": self.stats.invalidations_received,
+            "resident_bytes": self.local_cache.resident_bytes,
+            "hit_rate": (self.stats.redis_hits + local_hits) /
+                       max(1, self.stats.redis_hits + local_hits + misses) * 100,
+            "namespaces": namespaces,
         }
 
 # Global cache manager instance
@@ -241,14 +329,14 @@ def cached(ttl: int = CACHE_TTL, prefix: str = "default"):
             key = cache_key(f"{prefix}:{func.__name__}", *key_args)
 
             # Try cache first
-            cached_result = await cache_manager.get(key)
+            cached_result = await cache_manager.get(key, namespace=prefix)
             if cached_result is not None:
                 return cached_result
 
             # Execute function and cache result
             result = await func(self, *args, **kwargs)
             if result is not None:
-                await cache_manager.set(key, result, ttl)
+                await cache_manager.set(key, result, ttl, namespace=prefix)
 
             return result
         return wrapper
@@ -268,7 +356,7 @@ class ConversationState:
         self.call_log_id: Optional[str] = None
 
         # Pre-allocate data structures for better memory efficiency
-        self.task_stack: List[Task] = []
+        self._task_stack = TaskStack()
         self.checkpoint_progress: Dict[str, bool] = {}
         self.type_of_checkpoints_active: str = "Main"
 
@@ -298,9 +386,16 @@ class ConversationState:
 
         # Performance optimizations
         self._dirty_fields: Set[str] = set()
-        self._last_save_time: Optional[datetime] = None
         self._http_client: Optional[httpx.AsyncClient] = None
 
+        # Delta persistence: what the store holds (None until loaded or saved) and its version
+        self._snapshot: Optional[StateSnapshot] = None
+        self._state_version: int = 0
+        # Save coalescing: the in-flight save, and whether another round was requested meanwhile
+        self._saving: Optional[asyncio.Future] = None
+        self._save_again: bool = False
+        self._force_save: bool = False
+
     async def __aenter__(self):
         """Async context manager entry"""
         await self._ensure_http_client()
@@ -319,6 +414,20 @@ class ConversationState:
                 limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
             )
 
+    @property
+    def task_stack(self) -> TaskStack:
+        return self._task_stack
+
+    @task_stack.setter
+    def task_stack(self, tasks: List[Dict[str, Any]]) -> None:
+        # Replaced in place so change tracking carries over
+        self._task_stack.replace(tasks.to_list() if isinstance(tasks, TaskStack) else tasks or [])
+
+    @property
+    def state_version(self) -> int:
+        """Version of the stored state this copy was loaded from or last saved as"""
+        return self._state_version
+
     def _mark_dirty(self, field: str):
         """Mark field as dirty for incremental saves"""
         self._dirty_fields.add(field)
@@ -328,17 +437,21 @@ class ConversationState:
         """
         Get existing conversation state or create new with optimized caching
         """
-        instance = cls(conversation_id, individual_id)
+        return cls.from_stored(conversation_id, individual_id, await cls.fetch_stored(conversation_id))
 
+    @staticmethod
+    async def fetch_stored(conversation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        The stored state of a conversation as a dict (cache first, then memory),
+        or None when there is none and a new conversation starts
+        """
         # Try cache first
         cache_key_str = cache_key("conversation", conversation_id)
-        cached_data = await cache_manager.get(cache_key_str)
+        cached_data = await cache_manager.get(cache_key_str, namespace="conversation")
 
         if cached_data:
-            instance._load_from_dict(cached_data)
-            instance.is_new = False
             _logger.info(f"✅ Loaded conversation {conversation_id} from cache")
-            return instance
+            return cached_data
 
         # Fallback to direct memory access (no HTTP overhead)
         try:
@@ -346,18 +459,25 @@ class ConversationState:
             data = await memory_manager.get_conversation_state(conversation_id)
 
             if data:
-                instance._load_from_dict(data)
-                instance.is_new = False
-
                 # Cache for future use
-                await cache_manager.set(cache_key_str, data)
+                await cache_manager.set(cache_key_str, data, namespace="conversation")
                 cache_manager.stats.api_calls += 1
 
                 _logger.info(f"✅ Loaded conversation {conversation_id} from memory")
+                return data
 
         except Exception as e:
             _logger.warning(f"Could not fetch conversation (will start new): {type(e).__name__}: {str(e)}")
 
+        return None
+
+    @classmethod
+    def from_stored(cls, conversation_id: str, individual_id: Optional[str], data: Optional[Dict[str, Any]]) -> 'ConversationState':
+        """A state object over stored data from fetch_stored; it takes ownership of `data`"""
+        instance = cls(conversation_id, individual_id)
+        if data:
+            instance._load_from_dict(data)
+            instance.is_new = False
         return instance
 
     def _load_from_dict(self, data: Dict[str, Any]):
@@ -390,6 +510,13 @@ class ConversationState:
         self.call_log_id = data.get("call_log_id", self.call_log_id)
         self._update_current_task()
 
+        # The loaded data is what the store holds and later saves write the difference,
+        # unless it was cached after a failed save (state_version present but None)
+        self._state_version = data.get("state_version") or 0
+        unsaved = "state_version" in data and data["state_version"] is None
+        self._snapshot = None if unsaved else StateSnapshot.capture(self._storage_dict())
+        self._task_stack.clear_changes()
+
     def is_new_conversation(self) -> bool:
         """Check if this is a new conversation"""
         return self.is_new or len(self.task_stack) == 0
@@ -461,23 +588,39 @@ class ConversationState:
 
         _logger.info(f"Set tasks - current_task: {self.current_task.get('task_id') if self.current_task else 'None'}")
 
-    def get_current_checkpoint(self) -> Optional[Dict[str, Any]]:
-        """Optimized current checkpoint retrieval"""
-        if not self.task_stack:
-            return self._legacy_checkpoint_fallback()
+    def attach_generated_checkpoints(self, checkpoints: List[Union[str, dict, Checkpoint]], task: Union[Task, dict]) -> bool:
+        """
+        Attach checkpoints generated in the background for a new conversation.
 
-        # Check active tasks from end to beginning
-        for task in reversed(self.task_stack):
-            if not task.get('is_active', False):
-                continue
+        Replaces a seeded default task: default checkpoints already completed
+        are kept and the generated ones take over from there. Returns False
+        (and changes nothing) when the conversation already has a tailored task.
+        """
+        if self.task_stack and not any(is_default_task(t) for t in self.task_stack):
+            _logger.info("Conversation already has generated checkpoints, discarding late set")
+            return False
 
-            checklist = task.get('checklist', [])
-            current_index = task.get('current_checkpoint_index', 0)
+        completed = [
+            cp for t in self.task_stack if is_default_task(t)
+            for cp in t.get("checklist", []) if cp.get("status") == "complete"
+        ]
+        self.set_Tasks(checkpoints, task)
+        if completed:
+            main_task = self.task_stack[0]
+            main_task["checklist"] = completed + main_task["checklist"]
+            main_task["current_checkpoint_index"] = len(completed)
+            self.task_stack.touch(main_task.get("task_id"))
+            self.checkpoints = [cp["id"] for cp in main_task["checklist"]]
+            self.checkpoint_progress = {cp["id"]: cp.get("status") == "complete" for cp in main_task["checklist"]}
+            self._update_current_task()
+        return True
 
-            if checklist and current_index < len(checklist):
-                checkpoint = checklist[current_index]
-                if checkpoint.get("status") != "complete":
-                    return checkpoint
+    def get_current_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Optimized current checkpoint retrieval"""
+        # The last active task whose current checkpoint is not complete
+        task = self.task_stack.current()
+        if task is not None:
+            return task["checklist"][task.get("current_checkpoint_index", 0)]
 
         return self._legacy_checkpoint_fallback()
 
@@ -493,23 +636,15 @@ class ConversationState:
         """Ultra-fast current task update"""
         old_id = self.current_task.get('task_id') if self.current_task else None
 
-        for task in reversed(self.task_stack):
-            if not task.get("is_active", False):
-                continue
-
-            checklist = task.get("checklist", [])
-            current_index = task.get("current_checkpoint_index", 0)
-
-            if (checklist and current_index < len(checklist) and
-                checklist[current_index].get("status") != "complete"):
-
-                self.current_task = task
-                self.type_of_checkpoints_active = task.get("label", "Main")
+        task = self.task_stack.current()
+        if task is not None:
+            self.current_task = task
+            self.type_of_checkpoints_active = task.get("label", "Main")
 
-                new_id = task.get('task_id')
-                if old_id != new_id:
-                    _logger.info(f"current_task updated: {old_id} → {new_id}")
-                return
+            new_id = task.get('task_id')
+            if old_id != new_id:
+                _logger.info(f"current_task updated: {old_id} → {new_id}")
+            return
 
         if self.current_task:
             _logger.info(f"current_task cleared (was {old_id})")
@@ -528,49 +663,13 @@ class ConversationState:
 
         current_time = datetime.now().isoformat()
 
-        # Single pass optimization
-        for task in self.task_stack:
-            checklist = task.get("checklist")
-            if not checklist:
-                continue
-
-            for i, cp in enumerate(checklist):
-                if cp["name"] != checkpoint_name:
-                    continue
-
-                # Update checkpoint
-                cp.update({
-                    "status": "complete",
-                    "end_time": current_time
-                })
-                cp.setdefault("collected_inputs", []).append(text)
-
-                task["is_active"] = True
-
-                # Advance to next checkpoint
-                checklist_len = len(checklist)
-                if i == checklist_len - 1:
-                    task["is_active"] = False
-                    task["current_checkpoint_index"] = checklist_len
-                else:
-                    # Find next incomplete checkpoint
-                    for j in range(i + 1, checklist_len):
-                        if checklist[j]["status"] != "complete":
-                            task["current_checkpoint_index"] = j
-                            checklist[j].update({
-                                "status": "in_progress",
-                                "start_time": current_time
-                            })
-                            break
-                    else:
-                        task["current_checkpoint_index"] = checklist_len
-                        task["is_active"] = False
-
-                self._update_current_task()
-                self._mark_dirty("task_stack")
+        # Indexed by checkpoint name; advances the task to its next incomplete checkpoint
+        if self.task_stack.complete_checkpoint(checkpoint_name, text, current_time) is not None:
+            self._update_current_task()
+            self._mark_dirty("task_stack")
 
-                _logger.info(f"Checkpoint '{checkpoint_name}' completed")
-                return
+            _logger.info(f"Checkpoint '{checkpoint_name}' completed")
+            return
 
         _logger.warning(f"Checkpoint '{checkpoint_name}' not found")
         self._update_current_task()
@@ -599,8 +698,8 @@ class ConversationState:
 
         return self.context[-16:] if len(self.context) > 16 else self.context
 
-    async def update_context(self, query: str, response: str, plan: str) -> None:
-        """Optimized context update with batch processing"""
+    async def update_context(self, query: str, response: str, plan: str, save: bool = True) -> None:
+        """Append a turn to the context; `save=False` leaves the commit to the caller's save()"""
         new_messages = [
             {"role": "user", "content": query},
             {"role": "assistant", "content": response}
@@ -610,27 +709,10 @@ class ConversationState:
         self.complete_context.extend(new_messages)
         self._mark_dirty("context")
 
-        # Async save without blocking
-        asyncio.create_task(self._save_context_async(plan))
-
-    async def _save_context_async(self, plan: str):
-        """Async context saving using direct memory access"""
-        try:
-            memory_manager = get_memory_manager()
-            await memory_manager.update_conversation_context(
-                conversation_id=self.conversation_id,
-                context=self.context,
-                individual_id=self.individual_id
-            )
-
-            # Update cache
-            cache_key_str = cache_key("conversation", self.conversation_id)
-            await cache_manager.set(cache_key_str, self._to_dict())
-
-        except Exception as e:
-            _logger.error(f"Failed to save context: {type(e).__name__}: {str(e)}")
-            if hasattr(e, 'response') and hasattr(e.response, 'text'):
-                _logger.error(f"Response content: {e.response.text[:500]}")
+        # Awaited rather than fired off so the save finishes while the caller
+        # still holds the conversation's turn lease; only the new messages are written
+        if save:
+            await self.save()
 
     async def set_async_agent_result(self, agent_name: str, result: AgentResult) -> None:
         """Optimized async agent result storage"""
@@ -716,7 +798,7 @@ class ConversationState:
             "call_log_id": self.call_log_id,
             "detected_agent": self.detected_agent,
             "agent_instance_id": self.agent_instance_id,
-            "task_stack": self.task_stack,
+            "task_stack": self.task_stack.to_list(),
             "checkpoint_progress": self.checkpoint_progress,
             "type_of_checkpoints_active": self.type_of_checkpoints_active,
             "context": self.context,
@@ -731,57 +813,132 @@ class ConversationState:
             "has_summary": self.has_summary,
             "summary": self.summary,
             "key_points": self.key_points,
-            "tags": self.tags
+            "tags": self.tags,
+            "state_version": self._state_version
         }
 
+    def _storage_dict(self) -> Dict[str, Any]:
+        """State in the shape the memory store expects"""
+        state_dict = self._to_dict()
+
+        # Ensure state_dict matches memory service ConversationState schema
+        # (tasks unchanged since the last save were already normalized)
+        changed_tasks = self._task_stack.changed_ids()
+        for task in state_dict.get("task_stack", []):
+            task_id = task.get("task_id")
+            if changed_tasks is not None and task_id is not None and task_id not in changed_tasks:
+                continue
+            normalized = False
+            if "checklist" in task and isinstance(task["checklist"], list):
+                for checkpoint in task["checklist"]:
+                    # Truncate checkpoint names that are too long (max 200 chars)
+                    if "name" in checkpoint and isinstance(checkpoint["name"], str) and len(checkpoint["name"]) > 200:
+                        checkpoint["name"] = checkpoint["name"][:197] + "..."
+                        normalized = True
+
+                    # Convert collected_inputs from dict to list as expected by memory service
+                    if "collected_inputs" in checkpoint and isinstance(checkpoint["collected_inputs"], dict):
+                        checkpoint["collected_inputs"] = list(checkpoint["collected_inputs"].keys())
+            if normalized:
+                # Keep the checkpoint-name index in step with the truncated names
+                self._task_stack.touch(task_id)
+
+        return state_dict
+
     async def save(self, force: bool = False) -> None:
-        """Optimized save with incremental updates and caching"""
-        if not force and not self._dirty_fields:
-            return  # Nothing to save
-
-        # Rate limiting
-        now = datetime.now()
-        if (not force and self._last_save_time and
-            (now - self._last_save_time).seconds < 5):
+        """
+        Persist what changed since the last save.
+
+        Only the difference is written (see memory.change_set); `force` writes
+        the whole state. Saves are coalesced: while one is in flight, further
+        calls wait for a single follow-up save that picks up everything changed
+        meanwhile, so no change is dropped and each conversation has at most
+        one write in flight.
+        """
+        self._force_save = self._force_save or force
+        if self._saving is not None:
+            self._save_again = True
+            await asyncio.shield(self._saving)
             return
 
+        self._saving = saving = asyncio.get_running_loop().create_future()
         try:
-            state_dict = self._to_dict()
+            while True:
+                self._save_again = False
+                force, self._force_save = self._force_save, False
+                await self._write_changes(force)
+                if not self._save_again:
+                    break
+        finally:
+            self._saving = None
+            saving.set_result(None)
 
-            # Update cache immediately
-            cache_key_str = cache_key("conversation", self.conversation_id)
-            await cache_manager.set(cache_key_str, state_dict)
-
-            # Ensure state_dict matches memory service ConversationState schema
-            # Convert task_stack, sync_agent_results, and async_agent_results to match expected schema
-            for i, task in enumerate(state_dict.get("task_stack", [])):
-                if "checklist" in task and isinstance(task["checklist"], list):
-                    for j, checkpoint in enumerate(task["checklist"]):
-                        # Truncate checkpoint names that are too long (max 200 chars)
-                        if "name" in checkpoint and isinstance(checkpoint["name"], str) and len(checkpoint["name"]) > 200:
-                            state_dict["task_stack"][i]["checklist"][j]["name"] = checkpoint["name"][:197] + "..."
-                            
-                        # Convert collected_inputs from dict to list as expected by memory service
-                        if "collected_inputs" in checkpoint and isinstance(checkpoint["collected_inputs"], dict):
-                            state_dict["task_stack"][i]["checklist"][j]["collected_inputs"] = list(checkpoint["collected_inputs"].keys())
+    async def _write_changes(self, force: bool) -> None:
+        try:
+            state_dict = self._storage_dict()
+            limits = {"context": CONTEXT_WINDOW_MESSAGES}
+            # Only tasks changed through the stack since the last save are fingerprinted
+            tasks_mark, changed_tasks = self._task_stack.change_mark(), self._task_stack.changed_ids()
+            changes = diff_state(
+                self.conversation_id,
+                None if force else self._snapshot,
+                state_dict,
+                self._state_version,
+                dirty=self._dirty_fields,
+                limits=limits,
+                changed_tasks=changed_tasks,
+            )
+            if changes.is_empty():
+                self._dirty_fields.clear()
+                self._task_stack.clear_changes(tasks_mark)
+                return
 
             # Direct memory save (no HTTP overhead)
             memory_manager = get_memory_manager()
-            success = await memory_manager.save_conversation_state(state_dict)
-            
-            if success:
-                self._dirty_fields.clear()
-                self._last_save_time = now
-                cache_manager.stats.api_calls += 1
-                _logger.info(f"✅ Saved conversation state")
-            else:
+            version = await memory_manager.apply_conversation_changes(changes)
+            if version is None and not changes.full:
+                # Saved elsewhere since we loaded it: fall back to writing everything
+                _logger.warning(f"⚠️ Conversation {self.conversation_id} changed underneath, writing full state")
+                changes = diff_state(self.conversation_id, None, state_dict, self._state_version, limits=limits)
+                version = await memory_manager.apply_conversation_changes(changes)
+
+            if version is None:
                 _logger.error("Failed to save conversation state to memory")
-                
+                await self._cache_unsaved()
+                return
+
+            # Mirror the window the store keeps, then re-baseline on what was written
+            if len(self.context) > CONTEXT_WINDOW_MESSAGES:
+                del self.context[:-CONTEXT_WINDOW_MESSAGES]
+            self._state_version = version
+            self._snapshot = StateSnapshot.capture(
+                self._storage_dict(), previous=self._snapshot, changed_tasks=self._task_stack.changed_ids()
+            )
+            self._task_stack.clear_changes(tasks_mark)
+            self._dirty_fields.clear()
+
+            # Cache only what was persisted, so a reload diffs against the stored version
+            cache_key_str = cache_key("conversation", self.conversation_id)
+            await cache_manager.set(cache_key_str, self._to_dict(), namespace="conversation")
+            cache_manager.stats.api_calls += 1
+            _logger.info(f"✅ Saved conversation state ({changes.describe()})")
+
         except Exception as e:
             _logger.error(f"Failed to save conversation state: {type(e).__name__}: {str(e)}")
             # Log the state dict size for debugging
             if 'state_dict' in locals():
                 _logger.error(f"State dict size: {len(str(state_dict))} chars")
+            await self._cache_unsaved()
+
+    async def _cache_unsaved(self) -> None:
+        """Keep serving unsaved state from cache, flagged so its next save is a full write"""
+        try:
+            cache_key_str = cache_key("conversation", self.conversation_id)
+            await cache_manager.set(
+                cache_key_str, {**self._to_dict(), "state_version": None}, namespace="conversation"
+            )
+        except Exception as e:
+            _logger.error(f"Failed to cache unsaved conversation state: {e}")
 
     async def set_sync_agent_checklists(self, sync_agent_checklists: Dict[str, Dict[str, Any]]) -> None:
         """
@@ -803,8 +960,8 @@ class ConversationState:
             else:
                 non_privacy_tasks.append(task)
 
-        # Set the task stack to non-privacy tasks for now
-        self.task_stack = non_privacy_tasks
+        # Work on the non-privacy tasks for now (indexed by task_id)
+        task_stack = TaskStack(non_privacy_tasks)
 
         # Process new tasks
         new_privacy_checklists = []
@@ -814,23 +971,13 @@ class ConversationState:
 
             is_privacy_checklist = task_def.get("label") == "privacy" and task_def.get("is_active") is True
 
-            # Search for an existing task with the same ID
-            existing_task_index = None
-            for i, task in enumerate(self.task_stack):
-                if isinstance(task, dict) and task.get("task_id") == task_def.get("task_id"):
-                    existing_task_index = i
-                    break
-
             # Handle based on whether it's privacy checklist or not
             if is_privacy_checklist:
                 # Add to our collection of new privacy checklists
                 new_privacy_checklists.append(task_def)
             else:
-                # Regular task - update existing or append
-                if existing_task_index is not None:
-                    self.task_stack[existing_task_index] = task_def
-                else:
-                    self.task_stack.append(task_def)
+                # Regular task - replace the task with the same ID or append
+                task_stack.upsert(task_def)
 
         # Merge all privacy checklists (old and new) while removing duplicates
         all_privacy_checklists = []
@@ -851,7 +998,8 @@ class ConversationState:
                 seen_task_ids.add(task_id)
 
         # Append all unique privacy checklists at the end
-        self.task_stack.extend(all_privacy_checklists)
+        task_stack.extend(all_privacy_checklists)
+        self.task_stack = task_stack
 
         # FIXED: Always update current_task after modifying task stack
 
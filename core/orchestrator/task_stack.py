@@ -0,0 +1,253 @@
+# orchestrator/task_stack.py
+
+"""
+Indexed task stack for a conversation.
+
+Tasks stay plain dicts in stack order, so the stack serializes exactly like
+the list it replaces (documents, cache entries and the primary service's
+`task_stack` payload are unchanged). Alongside the list the stack keeps:
+
+- a task_id -> position index, for O(1) lookups by id;
+- an ordered queue of pending tasks (active, with an incomplete current
+  checkpoint); the current task is the last one, as the reverse scan it
+  replaces would find;
+- a checkpoint name -> positions index, for completing a checkpoint by name;
+- the ids of tasks changed since the last save, so the persistence layer
+  only fingerprints those (see memory.change_set.diff_state).
+
+Mutations made through the stack keep all of this up to date. Code that
+edits a task dict in place must call touch(task_id) afterwards.
+"""
+
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+
+class _TaskRecord:
+    """Index entry of one task"""
+    __slots__ = ("pending", "checkpoints")
+
+    def __init__(self):
+        self.pending = False
+        self.checkpoints: Tuple[str, ...] = ()     # checkpoint names indexed for this task
+
+
+def is_pending(task: Dict[str, Any]) -> bool:
+    """Active, with a current checkpoint that is not complete"""
+    if not task.get("is_active", False):
+        return False
+    checklist = task.get("checklist") or []
+    index = task.get("current_checkpoint_index", 0)
+    return index < len(checklist) and checklist[index].get("status") != "complete"
+
+
+def _remove_sorted(values: List[int], value: int) -> None:
+    i = bisect_left(values, value)
+    if i < len(values) and values[i] == value:
+        del values[i]
+
+
+class TaskStack:
+    """Ordered task dicts with an id index, a pending queue and change tracking"""
+    __slots__ = ("_tasks", "_records", "_index", "_pending", "_by_checkpoint", "_changed", "_reshaped", "_seq")
+
+    def __init__(self, tasks: Optional[Iterable[Dict[str, Any]]] = None):
+        self._tasks: List[Dict[str, Any]] = []
+        self._records: List[_TaskRecord] = []
+        self._index: Dict[Any, int] = {}                      # task_id -> position (first task with the id)
+        self._pending: List[int] = []                         # positions, ascending
+        self._by_checkpoint: Dict[str, List[int]] = {}        # checkpoint name -> positions, ascending
+        # Change tracking: task_id -> sequence number of its last change, and the
+        # sequence number of the last change to the stack's shape (0: none pending)
+        self._changed: Dict[Any, int] = {}
+        self._reshaped = 0
+        self._seq = 0
+        self._rebuild(list(tasks or []))
+        self._reshaped = 0
+
+    # ------------------------------------------------------------------
+    # Sequence protocol (read-only; mutate through the methods below)
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._tasks)
+
+    def __reversed__(self) -> Iterator[Dict[str, Any]]:
+        return reversed(self._tasks)
+
+    def __getitem__(self, index: Union[int, slice]):
+        return self._tasks[index]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, TaskStack):
+            other = other._tasks
+        return self._tasks == other
+
+    def __repr__(self) -> str:
+        return f"TaskStack({self._tasks!r})"
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """The tasks in stack order, as stored"""
+        return list(self._tasks)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def get(self, task_id: Any) -> Optional[Dict[str, Any]]:
+        position = self._index.get(task_id)
+        return self._tasks[position] if position is not None else None
+
+    def current(self) -> Optional[Dict[str, Any]]:
+        """The last pending task in stack order"""
+        return self._tasks[self._pending[-1]] if self._pending else None
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Pending tasks in stack order"""
+        return [self._tasks[position] for position in self._pending]
+
+    def find_checkpoint(self, name: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        """The first task (in stack order) with a checkpoint called `name`, and the checkpoint's index"""
+        positions = self._by_checkpoint.get(name)
+        if not positions:
+            return None
+        task = self._tasks[positions[0]]
+        for i, checkpoint in enumerate(task.get("checklist") or []):
+            if checkpoint.get("name") == name:
+                return task, i
+        return None
+
+    # ------------------------------------------------------------------
+    # Mutations
+    # ------------------------------------------------------------------
+    def append(self, task: Dict[str, Any]) -> None:
+        position = len(self._tasks)
+        self._tasks.append(task)
+        self._records.append(_TaskRecord())
+        self._index.setdefault(task.get("task_id"), position)
+        self._reindex(position)
+        self._mark_reshaped()
+
+    def extend(self, tasks: Iterable[Dict[str, Any]]) -> None:
+        for task in tasks:
+            self.append(task)
+
+    def upsert(self, task: Dict[str, Any]) -> None:
+        """Replace the task with the same id, or append it"""
+        position = self._index.get(task.get("task_id"))
+        if position is None:
+            self.append(task)
+            return
+        self._tasks[position] = task
+        self._reindex(position)
+        self._mark_changed(task.get("task_id"))
+
+    def replace(self, tasks: Iterable[Dict[str, Any]]) -> None:
+        """Replace the whole stack"""
+        self._rebuild(list(tasks))
+
+    def touch(self, task_id: Any) -> None:
+        """Re-index a task edited in place and mark it changed"""
+        position = self._index.get(task_id)
+        if position is not None:
+            self._reindex(position)
+            self._mark_changed(task_id)
+
+    def complete_checkpoint(self, name: str, text: str, now: str) -> Optional[Dict[str, Any]]:
+        """
+        Mark the first checkpoint called `name` complete, record `text` as its
+        input and move its task on to the next incomplete checkpoint (or
+        deactivate the task). Returns the task, or None if no checkpoint has
+        that name.
+        """
+        found = self.find_checkpoint(name)
+        if found is None:
+            return None
+        task, i = found
+        checklist = task["checklist"]
+
+        checkpoint = checklist[i]
+        checkpoint.update({"status": "complete", "end_time": now})
+        checkpoint.setdefault("collected_inputs", []).append(text)
+        task["is_active"] = True
+
+        # Advance to the next incomplete checkpoint
+        for j in range(i + 1, len(checklist)):
+            if checklist[j].get("status") != "complete":
+                task["current_checkpoint_index"] = j
+                checklist[j].update({"status": "in_progress", "start_time": now})
+                break
+        else:
+            task["current_checkpoint_index"] = len(checklist)
+            task["is_active"] = False
+
+        self.touch(task.get("task_id"))
+        return task
+
+    # ------------------------------------------------------------------
+    # Change tracking
+    # ------------------------------------------------------------------
+    def change_mark(self) -> int:
+        """A mark to pass to clear_changes once the changes seen so far are persisted"""
+        return self._seq
+
+    def changed_ids(self) -> Optional[Set[Any]]:
+        """Ids of tasks changed since the last clear_changes, or None when the shape changed (all tasks)"""
+        if self._reshaped:
+            return None
+        return set(self._changed)
+
+    def clear_changes(self, mark: Optional[int] = None) -> None:
+        """Forget changes made up to `mark` (all changes by default)"""
+        mark = self._seq if mark is None else mark
+        self._changed = {task_id: seq for task_id, seq in self._changed.items() if seq > mark}
+        if self._reshaped <= mark:
+            self._reshaped = 0
+
+    def _mark_changed(self, task_id: Any) -> None:
+        self._seq += 1
+        self._changed[task_id] = self._seq
+
+    def _mark_reshaped(self) -> None:
+        self._seq += 1
+        self._reshaped = self._seq
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+    def _rebuild(self, tasks: List[Dict[str, Any]]) -> None:
+        self._tasks = tasks
+        self._records = [_TaskRecord() for _ in tasks]
+        self._index = {}
+        self._pending = []
+        self._by_checkpoint = {}
+        for position, task in enumerate(tasks):
+            self._index.setdefault(task.get("task_id"), position)
+            self._reindex(position)
+        self._mark_reshaped()
+
+    def _reindex(self, position: int) -> None:
+        task, record = self._tasks[position], self._records[position]
+
+        pending = is_pending(task)
+        if pending != record.pending:
+            if pending:
+                insort(self._pending, position)
+            else:
+                _remove_sorted(self._pending, position)
+            record.pending = pending
+
+        names = tuple(dict.fromkeys(
+            cp.get("name") for cp in task.get("checklist") or [] if cp.get("name") is not None
+        ))
+        if names != record.checkpoints:
+            for name in record.checkpoints:
+                positions = self._by_checkpoint.get(name)
+                if positions is not None:
+                    _remove_sorted(positions, position)
+                    if not positions:
+                        del self._by_checkpoint[name]
+            for name in names:
+                insort(self._by_checkpoint.setdefault(name, []), position)
+            record.checkpoints = names
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from core.orchestrator.agent_graph import PRIMARY_NODE, AgentGraphError, AgentGraphExecutor, AgentNode, topological_order
+
+
+def _node(name, result, delay=0.0, dependencies=(), deadline=None, seen=None):
+    async def run(dependency_results):
+        if seen is not None:
+            seen[name] = dependency_results
+        await asyncio.sleep(delay)
+        return result
+    return AgentNode(name, run, tuple(dependencies), deadline)
+
+
+def test_primary_result_is_returned_before_slow_auxiliary_nodes():
+    executor = AgentGraphExecutor(default_deadline=1.0)
+    seen = {}
+
+    async def scenario():
+        primary, auxiliary = await executor.run([
+            _node(PRIMARY_NODE, {"response": "hi"}),
+            _node("screen", {"risk": "low"}, delay=0.05),
+            _node("followup", {"ok": True}, dependencies=["screen"], seen=seen),
+        ])
+        assert not auxiliary.done()
+        return primary, await auxiliary
+
+    primary, late = asyncio.run(scenario())
+
+    assert primary == {"response": "hi"}
+    assert late == {"screen": {"risk": "low"}, "followup": {"ok": True}}
+    assert seen["followup"] == {"screen": {"risk": "low"}}
+    assert executor.get_stats()["late"] == 2
+
+
+def test_deadlines_and_failures_do_not_fail_the_turn():
+    executor = AgentGraphExecutor(default_deadline=0.01)
+
+    async def broken(_):
+        raise RuntimeError("down")
+
+    async def scenario():
+        primary, auxiliary = await executor.run([
+            _node(PRIMARY_NODE, "reply", delay=0.02),
+            _node("slow", "never", delay=1.0),
+            AgentNode("broken", broken),
+        ])
+        return primary, await auxiliary
+
+    primary, late = asyncio.run(scenario())
+
+    assert primary == "reply"
+    assert late["slow"]["status"] == "timeout"
+    assert late["broken"] == {"error": "down", "status": "error"}
+    assert executor.stats.timeouts == 1 and executor.stats.errors == 1
+
+
+def test_graph_must_be_acyclic():
+    nodes = [_node("a", 1, dependencies=["b"]), _node("b", 2, dependencies=["a"])]
+    with pytest.raises(AgentGraphError):
+        topological_order(nodes)
+    assert [n.name for n in topological_order([_node("a", 1, dependencies=["b"]), _node("b", 2)])] == ["b", "a"]
+
+
+def test_only_auxiliary_agents_become_nodes(monkeypatch):
+    from core.orchestrator import agents
+
+    monkeypatch.setitem(agents.AGENT_CONFIG, "screen", {"dependencies": [], "run_with": ["loneliness"]})
+    monkeypatch.setitem(agents.AGENT_CONFIG, "followup", {"dependencies": ["screen", "checklist", "primary"], "run_with": ["*"]})
+
+    assert agents.auxiliary_agents("loneliness") == ["screen", "followup"]
+    assert agents.auxiliary_agents("emotional") == ["screen", "followup"]
+    assert PRIMARY_NODE not in agents.AGENT_CONFIG
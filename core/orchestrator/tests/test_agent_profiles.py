@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+from core.orchestrator.agent_profiles import AGENT_PROFILES, get_agent_profile
+
+
+def _query(agent):
+    return SimpleNamespace(
+        text="I feel a bit low today",
+        conversation_id="conv-1",
+        individual_id="ind-1",
+        user_profile_id="profile-1",
+        agent_instance_id="agent-1",
+        detected_agent=agent,
+    )
+
+
+def test_unknown_agent_falls_back_to_primary():
+    assert get_agent_profile("nutrition") is AGENT_PROFILES["primary"]
+    assert get_agent_profile(None) is AGENT_PROFILES["primary"]
+
+
+def test_dict_context_agents_get_stringified_checkpoint_and_first_context_entry():
+    profile = get_agent_profile("emotional")
+    checkpoint = {"id": "cp_0", "name": "How have you been sleeping?"}
+    payload = profile.build_payload(_query("emotional"), None, [{"day": "monday"}, {"day": "tuesday"}], checkpoint, False)
+
+    assert payload["checkpoint"] == "How have you been sleeping?"
+    assert payload["context"] == {"day": "monday"}
+    assert payload["individual_id"] == "ind-1"
+
+
+def test_agents_that_ignore_checkpoints_skip_checkpoint_stages():
+    assert not get_agent_profile("loneliness").uses_checkpoints
+    assert not get_agent_profile("accountability").uses_context
+    assert get_agent_profile("mental_therapy").uses_checkpoints
+
+    payload = get_agent_profile("accountability").build_payload(_query("accountability"), None, [], None, False)
+    assert payload["checkpoint"] == "" and payload["user_id"] == "ind-1"
+
+
+def test_primary_payload_carries_task_state():
+    state = SimpleNamespace(task_stack=[{"task_id": "t1"}], patient_verified=True, is_paused=False)
+    payload = get_agent_profile("primary").build_payload(_query(None), state, [], "cp", True)
+
+    assert payload["checkpoint_complete"] is True
+    assert payload["task_stack"] == [{"task_id": "t1"}]
+    assert payload["task_stack"] is not state.task_stack
@@ -0,0 +1,28 @@
+from core.orchestrator.default_checkpoints import (
+    DEFAULT_CHECKPOINTS,
+    GENERAL_CHECKPOINTS,
+    build_default_task,
+    get_default_checkpoints,
+    is_default_task,
+)
+
+
+def test_every_specialist_has_a_default_set():
+    for agent in ("loneliness", "accountability", "emotional", "mental_therapy", "social_anxiety"):
+        checkpoints = get_default_checkpoints(agent)
+        assert len(checkpoints) == len(DEFAULT_CHECKPOINTS[agent]) > 0
+        assert all(cp["name"] and cp["expected_inputs"] for cp in checkpoints)
+
+
+def test_unknown_agent_gets_general_set_and_copies_are_independent():
+    checkpoints = get_default_checkpoints(None)
+    assert [cp["name"] for cp in checkpoints] == [cp["name"] for cp in GENERAL_CHECKPOINTS]
+
+    checkpoints[0]["expected_inputs"].append("mutated")
+    assert "mutated" not in GENERAL_CHECKPOINTS[0]["expected_inputs"]
+    assert len({cp["id"] for cp in checkpoints}) == len(checkpoints)
+
+
+def test_default_task_is_recognized():
+    assert is_default_task(build_default_task("conv-1"))
+    assert not is_default_task({"task_id": "task_conv-1_20250101120000"})
@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from pydantic import BaseModel
+
+from core.orchestrator import service_bus
+
+BASE_URL = "http://localhost:8002/echo"
+
+
+class EchoRequest(BaseModel):
+    text: str
+
+
+class EchoResponse(BaseModel):
+    text: str
+    length: int
+    received_at: datetime = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/process", response_model=EchoResponse)
+    async def process_endpoint(request: EchoRequest):
+        if request.text == "boom":
+            raise HTTPException(status_code=500, detail="boom")
+        if request.text == "slow":
+            await asyncio.sleep(1.0)
+        return EchoResponse(text=request.text, length=len(request.text))
+
+    @app.post("/debug")
+    async def debug_endpoint(request: Request):
+        return {}
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "ok"}
+
+    return app
+
+
+def test_register_mounted_app_only_takes_plain_body_routes():
+    registered = service_bus.register_mounted_app("/echo", _make_app(), BASE_URL)
+
+    assert registered == 1
+    assert service_bus.resolve_local_route("http://localhost:8002/echo/process") is not None
+    assert service_bus.resolve_local_route("http://LOCALHOST:8002/echo/process/") is not None
+    assert service_bus.resolve_local_route("http://localhost:8002/echo/debug") is None
+    assert service_bus.resolve_local_route("http://localhost:8002/echo/health") is None
+    # Same path on another service is not ours
+    assert service_bus.resolve_local_route("http://core:8002/echo/process") is None
+    assert service_bus.resolve_local_route("http://localhost:8015/echo/process") is None
+
+
+def test_dispatch_local_returns_plain_dict():
+    service_bus.register_mounted_app("/echo", _make_app(), BASE_URL)
+    route = service_bus.resolve_local_route("http://localhost:8002/echo/process")
+
+    result = asyncio.run(service_bus.dispatch_local(route, {"text": "hello"}))
+
+    assert result == {"text": "hello", "length": 5, "received_at": "2024-01-01T00:00:00Z"}
+
+
+def test_dispatch_local_maps_validation_and_handler_errors():
+    service_bus.register_mounted_app("/echo", _make_app(), BASE_URL)
+    route = service_bus.resolve_local_route("http://localhost:8002/echo/process")
+
+    with pytest.raises(HTTPException) as invalid:
+        asyncio.run(service_bus.dispatch_local(route, {"text": 1}))
+    assert invalid.value.status_code == 422
+
+    with pytest.raises(HTTPException) as failed:
+        asyncio.run(service_bus.dispatch_local(route, {"text": "boom"}))
+    assert failed.value.status_code == 500
+
+    with pytest.raises(HTTPException) as slow:
+        asyncio.run(service_bus.dispatch_local(route, {"text": "slow"}, timeout=0.01))
+    assert slow.value.status_code == 504
+
+
+def test_disabled_bus_resolves_nothing():
+    service_bus.register_mounted_app("/echo", _make_app(), BASE_URL)
+    service_bus.set_enabled(False)
+    try:
+        assert service_bus.resolve_local_route("http://localhost:8002/echo/process") is None
+    finally:
+        service_bus.set_enabled(True)
@@ -0,0 +1,23 @@
+from core.orchestrator.speculation import SpeculationTracker
+
+
+def test_reissue_policy_is_per_agent():
+    tracker = SpeculationTracker(["primary"])
+
+    assert tracker.should_reissue("primary")
+    assert not tracker.should_reissue("loneliness")
+
+
+def test_invalidation_rate_per_agent():
+    tracker = SpeculationTracker(["primary"])
+    tracker.record("primary", invalidated=True, reissued=True)
+    tracker.record("primary", invalidated=False)
+    tracker.record("emotional", invalidated=True)
+    tracker.record("emotional", invalidated=False)
+    tracker.record("emotional", invalidated=False)
+    tracker.record("emotional", invalidated=False)
+
+    stats = tracker.get_stats()
+    assert stats["primary"] == {"turns": 2, "invalidated": 1, "reissued": 1, "invalidation_rate": 0.5}
+    assert stats["emotional"]["invalidation_rate"] == 0.25
+    assert stats["emotional"]["reissued"] == 0
@@ -0,0 +1,46 @@
+from core.orchestrator.task_stack import TaskStack
+
+
+def _task(task_id, names, index=0, active=True):
+    checklist = [{"id": name, "name": name, "status": "complete" if i < index else "pending"}
+                 for i, name in enumerate(names)]
+    return {"task_id": task_id, "checklist": checklist, "current_checkpoint_index": index, "is_active": active}
+
+
+def test_current_is_the_last_pending_task_and_follows_completions():
+    stack = TaskStack([_task("main", ["a", "b"]), _task("sub", ["c"]), _task("done", ["d"], index=1)])
+    assert stack.current()["task_id"] == "sub"
+    assert stack.get("main")["checklist"][0]["name"] == "a"
+
+    stack.complete_checkpoint("c", "answer", now="t")
+    sub = stack.get("sub")
+    assert (sub["is_active"], sub["current_checkpoint_index"]) == (False, 1)
+    assert sub["checklist"][0]["collected_inputs"] == ["answer"]
+    assert stack.current()["task_id"] == "main"
+
+    stack.complete_checkpoint("a", "x", now="t")
+    assert stack.get("main")["current_checkpoint_index"] == 1
+    assert stack.get("main")["checklist"][1]["status"] == "in_progress"
+    assert stack.complete_checkpoint("missing", "x", now="t") is None
+    assert stack.to_list() == list(stack) and len(stack) == 3
+
+
+def test_tracks_changed_tasks_until_they_are_persisted():
+    stack = TaskStack([_task("main", ["a"]), _task("sub", ["b"])])
+    assert stack.changed_ids() == set()
+
+    stack.complete_checkpoint("b", "x", now="t")
+    mark = stack.change_mark()
+    stack.get("main")["checklist"].append({"id": "z", "name": "z", "status": "pending"})
+    stack.touch("main")
+    assert stack.changed_ids() == {"sub", "main"}
+    assert stack.find_checkpoint("z")[1] == 1
+
+    # Only what the save saw is cleared
+    stack.clear_changes(mark)
+    assert stack.changed_ids() == {"main"}
+
+    stack.upsert(_task("new", ["n"]))
+    assert stack.changed_ids() is None
+    stack.clear_changes()
+    assert stack.changed_ids() == set()
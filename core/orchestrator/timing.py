@@ -5,16 +5,35 @@ Utilities for tracking execution time of different operations.
 
 import time
 from collections import defaultdict
+from typing import Optional
+
+from common.metrics import observe_stage, server_timing
+from common.tracing import start_detached_span
+
+# Steps of a turn recorded as pipeline stages in the turn_stage_seconds histogram
+STAGES = {
+    "turn_lease_wait": "lease_wait",
+    "state_initialization": "state_load",
+    "primary_service_preparation": "context_fetch",
+    "checkpoint_generation": "checkpoint",
+    "checkpoint_evaluation": "checklist",
+    "primary_service": "specialist",
+    "speculation_reissue": "specialist_reissue",
+    "first_token": "first_token",
+    "total_orchestration": "total",
+}
 
 class TimingMetrics:
-    """Helper class to track execution time of different steps"""
+    """Helper class to track execution time of different steps; each step is also a span of the turn's trace"""
     def __init__(self):
         self.metrics = defaultdict(float)
         self.start_times = {}
+        self.spans = {}
 
     def start(self, step_name: str):
         """Start timing a step"""
         self.start_times[step_name] = time.time()
+        self.spans[step_name] = start_detached_span(step_name)
 
     def end(self, step_name: str):
         """End timing a step and record duration"""
@@ -22,7 +41,18 @@ class TimingMetrics:
             duration = time.time() - self.start_times[step_name]
             self.metrics[step_name] = round(duration * 1000, 2)  # Convert to milliseconds
             del self.start_times[step_name]
+            self.spans.pop(step_name).end()
 
     def get_metrics(self):
         """Get all collected metrics"""
         return dict(self.metrics)
+
+    def server_timing(self, total: Optional[str] = "total_orchestration") -> str:
+        """Server-Timing header value with every completed step"""
+        return server_timing(self.metrics, total=total)
+
+    def observe_stages(self, agent: Optional[str], plan: Optional[str]) -> None:
+        """Record the turn's pipeline stages in the process-wide latency histograms"""
+        for step, stage in STAGES.items():
+            if step in self.metrics:
+                observe_stage(stage, self.metrics[step], agent, plan)
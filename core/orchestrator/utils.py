@@ -5,6 +5,7 @@ Utility functions for the orchestrator service.
 Contains helper functions used throughout the orchestrator.
 """
 
+import copy
 import logging
 from typing import Optional, Dict, List
 import asyncio
@@ -14,18 +15,33 @@ if __name__ == "__main__" and __package__ is None:
     from orchestrator.state_manager import ConversationState
     from orchestrator.timing import TimingMetrics
     from orchestrator.services import call_service, CHECKPOINT_URL
+    from orchestrator.config import get_settings
     from common.models import Conversation, Task, Checkpoint, CheckpointType, CheckpointStatus
 else:
     from .state_manager import ConversationState
     from .timing import TimingMetrics
     from .services import call_service, CHECKPOINT_URL
+    from .config import get_settings
     from common.models import Conversation, Task, Checkpoint, CheckpointType, CheckpointStatus
 
+from common.single_flight import get_single_flight
+
 _logger = logging.getLogger(__name__)
 
+_settings = get_settings()
+
+# Concurrent loads of the same conversation (client retries, double-posted turns)
+# share one fetch of the stored state
+_state_loads = get_single_flight(
+    "conversation_state",
+    redis_url=_settings.REDIS_URL if _settings.CONVERSATION_LOAD_LOCK else None,
+)
+
 async def get_conversation_state(conversation_id: str, individual_id: Optional[str] = None) -> ConversationState:
     """
     Helper function to fetch or create a conversation state.
+    Identical concurrent loads share one fetch; each caller gets its own
+    ConversationState over its own copy of the data, since turns edit it in place.
 
     Args:
         conversation_id: The conversation ID
@@ -34,7 +50,8 @@ async def get_conversation_state(conversation_id: str, individual_id: Optional[s
     Returns:
         The conversation state object
     """
-    return await ConversationState.get_or_create(conversation_id, individual_id)
+    data = await _state_loads.do(conversation_id, lambda: ConversationState.fetch_stored(conversation_id))
+    return ConversationState.from_stored(conversation_id, individual_id, copy.deepcopy(data))
 
 async def generate_checkpoints(
     text: str,
@@ -5,6 +5,7 @@ Handles multiple concurrent user sessions in a single instance
 import asyncio
 import logging
 import json
+import uuid
 import aiohttp
 import websockets
 from typing import Dict, Optional
@@ -771,6 +772,10 @@ class NoycoAssistant(Agent):
             logger.info(f"⚠️ [{self.session_id}] Skipping backend request - shutting down")
             return "I'm disconnecting now. Thank you for talking with me!"
         
+        # One id per utterance, sent on every attempt: the backend processes a turn_id
+        # once, so the HTTP fallback after a WebSocket timeout does not repeat the turn
+        turn_id = uuid.uuid4().hex
+        
         # Try WebSocket first
         if self.ws_connected and self.websocket:
             try:
@@ -778,7 +783,8 @@ class NoycoAssistant(Agent):
                 
                 await self.websocket.send(json.dumps({
                     "type": "user_message",
-                    "text": user_text
+                    "text": user_text,
+                    "turn_id": turn_id
                 }))
                 
                 response = await asyncio.wait_for(
@@ -816,6 +822,7 @@ class NoycoAssistant(Agent):
             payload = {
                 "session_id": self.session_id,
                 "text": user_text,
+                "turn_id": turn_id,
             }
             
             if self.session_data.get("conversation_id"):
@@ -1,6 +1,6 @@
 
 # memory/main.py - Ultra Low Latency Optimized Version
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
@@ -18,6 +18,8 @@ import hashlib
 import weakref
 from concurrent.futures import ThreadPoolExecutor
 
+from common.metrics import CONTENT_TYPE, register_cache_sizes, render_metrics
+
 if __name__ == "__main__" and __package__ is None:
     import sys
     from os import path
@@ -72,6 +74,12 @@ conversation_cache = TTLCache(maxsize=2000, ttl=600)  # 10 minutes
 agent_result_cache = TTLCache(maxsize=1000, ttl=300)  # 5 minutes
 semantic_cache = TTLCache(maxsize=500, ttl=900)       # 15 minutes
 patient_cache = TTLCache(maxsize=500, ttl=1800)      # 30 minutes
+register_cache_sizes("memory", lambda: {
+    "conversation_cache": len(conversation_cache.cache),
+    "agent_result_cache": len(agent_result_cache.cache),
+    "semantic_cache": len(semantic_cache.cache),
+    "patient_cache": len(patient_cache.cache),
+})
 
 # Pre-compiled JSON encoders
 def fast_json_encode(obj):
@@ -792,6 +800,11 @@ async def health_check():
         }
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
 # Cache management endpoints
 @app.post("/admin/clear_cache")
 async def clear_cache(cache_type: str = "all"):
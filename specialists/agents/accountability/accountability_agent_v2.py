@@ -10,6 +10,8 @@ import logging
 import time
 from typing import Any, AsyncGenerator, Dict, Optional
 
+from common.single_flight import get_single_flight
+
 from .data_manager_v2 import AccountabilityDataManagerV2
 from .gemini_streaming import get_streaming_client
 
@@ -66,6 +68,13 @@ class AccountabilityAgentV2:
             self._initialized = True
 
     async def get_cached_data(self, user_profile_id: str, agent_instance_id: str):
+        # Concurrent calls for the same user (retried/double-posted turns) share one fetch
+        return await get_single_flight("accountability_profile_data").do(
+            f"{user_profile_id}_{agent_instance_id}",
+            lambda: self._fetch_profile_data(user_profile_id, agent_instance_id)
+        )
+
+    async def _fetch_profile_data(self, user_profile_id: str, agent_instance_id: str):
         profile = await self.data_manager.get_user_profile(user_profile_id)
         agent_data = await self.data_manager.get_accountability_agent_data(user_profile_id, agent_instance_id)
         # Convert Pydantic objects to dictionaries for compatibility
@@ -19,6 +19,10 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(os.path.dirname(current_dir))
 sys.path.insert(0, parent_dir)
 
+from common.codec import decode, encode
+from common.metrics import track_cache_sizes
+from common.resilience import guard_mongo, guard_redis
+
 # Import required modules
 from pydantic import BaseModel, Field
 from uuid import uuid4
@@ -132,14 +136,6 @@ class DateTimeEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super().default(obj)
 
-def safe_json_loads(data) -> dict:
-    """Safely load JSON with datetime parsing"""
-    if isinstance(data, str):
-        return json.loads(data)
-    elif isinstance(data, dict):
-        return data
-    return {}
-
 class AccountabilityDataManagerV2:
     """MongoDB-based data manager for accountability agent following loneliness agent pattern exactly"""
     
@@ -151,11 +147,22 @@ class AccountabilityDataManagerV2:
         self.user_profile_cache: Dict[str, UserProfile] = {}
         self.accountability_agent_cache: Dict[str, AccountabilityAgent] = {}
         self._session_cache: Dict[str, Dict[str, Any]] = {}
+        track_cache_sizes("accountability_data_manager", self, ("user_profile_cache", "accountability_agent_cache", "_session_cache"))
         
         # Cache TTL and stats
         self._cache_ttl = 300  # 5 minutes
         self.cache_stats = {"profile_hits": 0, "profile_misses": 0, "agent_hits": 0, "agent_misses": 0}
 
+    @property
+    def redis(self):
+        """Redis client behind the specialists' Redis circuit breaker"""
+        return guard_redis(getattr(self.redis_client, "redis", None), "specialists.redis")
+
+    @property
+    def db(self):
+        """MongoDB database behind the specialists' MongoDB circuit breaker"""
+        return guard_mongo(getattr(self.mongo_client, "db", None), "specialists.mongo")
+
     async def get_user_profile(self, user_profile_id: str) -> UserProfile:
         """Fetch user profile with multi-level caching - mirrors loneliness agent exactly"""
         # Check in-memory cache first
@@ -168,9 +175,9 @@ class AccountabilityDataManagerV2:
         # Check Redis cache
         redis_key = f"user_profile:{user_profile_id}"
         try:
-            cached_data = await self.redis_client.redis.get(redis_key)
+            cached_data = await self.redis.get(redis_key)
             if cached_data:
-                profile_dict = safe_json_loads(cached_data)
+                profile_dict = decode(cached_data)
                 profile = UserProfile(**profile_dict)
                 self.user_profile_cache[user_profile_id] = profile
                 return profile
@@ -193,7 +200,7 @@ class AccountabilityDataManagerV2:
                 logger.warning(f"MongoDB connection not available, creating default profile for {user_profile_id}")
                 return self._create_default_user_profile(user_profile_id)
                 
-            profile_doc = self.mongo_client.db.user_profiles.find_one(
+            profile_doc = self.db.user_profiles.find_one(
                 {"user_profile_id": user_profile_id}
             )
             
@@ -229,8 +236,8 @@ class AccountabilityDataManagerV2:
             
             # Cache in Redis with TTL
             redis_key = f"user_profile:{user_profile_id}"
-            profile_json = profile.model_dump_json()
-            await self.redis_client.redis.set(redis_key, profile_json, ex=self._cache_ttl)
+            profile_data = encode(profile.model_dump())
+            await self.redis.set(redis_key, profile_data, ex=self._cache_ttl)
             
         except Exception as e:
             logger.warning(f"Failed to cache user profile {user_profile_id}: {e}")
@@ -249,9 +256,9 @@ class AccountabilityDataManagerV2:
         # Check Redis cache
         redis_key = f"accountability_agent:{cache_key}"
         try:
-            cached_data = await self.redis_client.redis.get(redis_key)
+            cached_data = await self.redis.get(redis_key)
             if cached_data:
-                agent_dict = safe_json_loads(cached_data)
+                agent_dict = decode(cached_data)
                 agent = AccountabilityAgent(**agent_dict)
                 self.accountability_agent_cache[cache_key] = agent
                 return agent
@@ -275,7 +282,7 @@ class AccountabilityDataManagerV2:
                 logger.warning(f"MongoDB connection not available, creating default agent for {user_profile_id}")
                 return self._create_default_agent_data(user_profile_id, agent_instance_id)
                 
-            agent_doc = self.mongo_client.db.accountability_agents.find_one({
+            agent_doc = self.db.accountability_agents.find_one({
                 "user_profile_id": user_profile_id
             })
             
@@ -344,7 +351,7 @@ class AccountabilityDataManagerV2:
                 # Convert datetime objects to ISO strings for MongoDB
                 agent_dict = json.loads(json.dumps(agent_dict, cls=DateTimeEncoder))
                 
-                self.mongo_client.db.accountability_agents.update_one(
+                self.db.accountability_agents.update_one(
                     {"user_profile_id": agent.user_profile_id},
                     {"$set": agent_dict},
                     upsert=True
@@ -360,8 +367,8 @@ class AccountabilityDataManagerV2:
             
             # Cache in Redis with TTL
             redis_key = f"accountability_agent:{cache_key}"
-            agent_json = agent.model_dump_json()
-            await self.redis_client.redis.set(redis_key, agent_json, ex=self._cache_ttl)
+            agent_data = encode(agent.model_dump())
+            await self.redis.set(redis_key, agent_data, ex=self._cache_ttl)
             
         except Exception as e:
             logger.warning(f"Failed to cache agent data {cache_key}: {e}")
@@ -529,7 +536,7 @@ class AccountabilityDataManagerV2:
             
             if agent and self.mongo_client and hasattr(self.mongo_client, 'db') and self.mongo_client.db is not None:
                 # Get the full agent document to preserve other goals
-                full_agent_doc = self.mongo_client.db.accountability_agents.find_one({
+                full_agent_doc = self.db.accountability_agents.find_one({
                     "user_profile_id": user_profile_id
                 })
                 
@@ -554,7 +561,7 @@ class AccountabilityDataManagerV2:
                     agent_dict = full_agent.model_dump()
                     agent_dict = json.loads(json.dumps(agent_dict, cls=DateTimeEncoder))
                     
-                    self.mongo_client.db.accountability_agents.update_one(
+                    self.db.accountability_agents.update_one(
                         {"user_profile_id": user_profile_id},
                         {"$set": agent_dict},
                         upsert=True
@@ -564,7 +571,7 @@ class AccountabilityDataManagerV2:
                     agent_dict = agent.model_dump()
                     agent_dict = json.loads(json.dumps(agent_dict, cls=DateTimeEncoder))
                     
-                    self.mongo_client.db.accountability_agents.insert_one(agent_dict)
+                    self.db.accountability_agents.insert_one(agent_dict)
                 
                 logger.debug(f"Synced accountability agent data to DB for {user_profile_id}:{agent_instance_id}")
                 
@@ -27,6 +27,8 @@ except ImportError:
     #     STREAM_CHUNK_SIZE = 3
     # settings = FallbackSettings()
 
+from common.llm_gateway import get_llm_gateway
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -80,7 +82,15 @@ class AccountabilityGeminiClient:
                     self.text = text
             return _Resp(fallback_text)
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, lambda: self.model.generate_content(prompt))
+
+        async def _call():
+            async with get_llm_gateway().request("accountability") as call:
+                response = await loop.run_in_executor(None, lambda: self.model.generate_content(prompt))
+                call.record_response(prompt, response)
+                return response
+
+        # A retried/double-posted turn shares the in-flight call instead of paying twice
+        return await get_llm_gateway().coalesce("accountability", prompt, _call)
 
     async def stream_generate_content(
         self,
@@ -101,9 +111,12 @@ class AccountabilityGeminiClient:
                 yield {"type": "content", "data": " ".join(words[i:i+chunk_size]) + (" " if i+chunk_size < len(words) else ""), "timestamp": time.time()}
             yield {"type": "done", "data": fallback, "timestamp": time.time()}
             return
-        loop = asyncio.get_event_loop()
-        stream = await loop.run_in_executor(
-            None,
+        # The gateway slot covers reading Gemini, not the client consuming the chunks
+        buffer = ""
+        full = ""
+        async for text in get_llm_gateway().stream(
+            "accountability",
+            prompt,
             lambda: self.model.generate_content(
                 prompt,
                 stream=True,
@@ -114,19 +127,15 @@ class AccountabilityGeminiClient:
                     top_k=settings.DEFAULT_TOP_K,
                 ),
             ),
-        )
-        buffer = ""
-        full = ""
-        for chunk in stream:
-            if hasattr(chunk, "text") and chunk.text:
-                buffer += chunk.text
-                full += chunk.text
+        ):
+            buffer += text
+            full += text
+            words = buffer.split()
+            while len(words) >= chunk_size:
+                out = " ".join(words[:chunk_size]) + " "
+                buffer = " ".join(words[chunk_size:])
                 words = buffer.split()
-                while len(words) >= chunk_size:
-                    out = " ".join(words[:chunk_size]) + " "
-                    buffer = " ".join(words[chunk_size:])
-                    words = buffer.split()
-                    yield {"type": "content", "data": out, "timestamp": time.time()}
+                yield {"type": "content", "data": out, "timestamp": time.time()}
         if buffer.strip():
             yield {"type": "content", "data": buffer, "timestamp": time.time()}
         yield {"type": "done", "data": full.strip(), "timestamp": time.time()}
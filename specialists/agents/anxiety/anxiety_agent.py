@@ -25,6 +25,8 @@ import time
 from datetime import datetime
 from typing import Any, AsyncGenerator, Dict, List, Optional
 
+from common.single_flight import get_single_flight
+
 try:
     from .data_manager import AnxietyDataManager
     from .background_tasks import BackgroundTaskManager, AnxietyAnalyzer, ProgressTracker
@@ -160,6 +162,16 @@ class AnxietyCompanionAgent:
             if current_time - cached_data['timestamp'] < self._cache_ttl:
                 return cached_data['profile'], cached_data['agent']
         
+        # Concurrent misses for the same user (retried/double-posted turns) share one fetch
+        return await get_single_flight("anxiety_profile_data").do(
+            cache_key,
+            lambda: self._fetch_profile_data(cache_key, user_profile_id, agent_instance_id)
+        )
+
+    async def _fetch_profile_data(self, cache_key: str, user_profile_id: str, agent_instance_id: str):
+        """Fetch user profile and agent data and populate the local cache"""
+        current_time = time.time()
+        
         # Fetch data in parallel for faster response
         profile_task = asyncio.create_task(self.data_manager.get_user_profile(user_profile_id))
         agent_task = asyncio.create_task(self.data_manager.get_anxiety_agent_data(user_profile_id, agent_instance_id))
@@ -909,6 +921,16 @@ Your primary goal is to make the user feel heard and understood. Engage with the
 _anxiety_agent = AnxietyCompanionAgent()
 
 
+def screen_message(text: str) -> Dict[str, Any]:
+    """Run the crisis screen ``process_message`` applies before routing a turn.
+
+    The stream endpoint checks it first so a crisis turn gets the structured
+    ``/process`` reply instead of a free-form stream.
+    """
+    risk_level = PanicDetector.analyze(text)
+    return {"risk_level": risk_level, "requires_human": risk_level >= 4}
+
+
 async def process_message(
     user_query: str,
     conversation_id: str,
@@ -974,6 +996,8 @@ async def stream_anxiety_response(
     """Word-level streaming endpoint identical to therapy agent signature."""
     # send start
     yield {"type": "start", "conversation_id": conversation_id, "timestamp": time.time()}
+    t0 = time.time()
+    screen = screen_message(text)
 
     # Initialize agent if needed
     if not _anxiety_agent._initialized:
@@ -1023,12 +1047,17 @@ async def stream_anxiety_response(
         "type": "complete",
         "conversation_id": conversation_id,
         "response_length": len(full_response),
+        "requires_human": screen["requires_human"],
+        "risk_level": screen["risk_level"],
         "timestamp": time.time()
     }
 
     # Schedule background tasks (non-blocking)
     if full_response:
+        stress_level = _anxiety_agent._calculate_stress_level(text, _anxiety_agent._extract_stress_indicators(text))
         asyncio.create_task(_anxiety_agent._schedule_background_tasks_async(
-            user_profile_id, agent_instance_id,
-            text, full_response, "neutral", 5.0, 0, 0, 0.5
+            user_profile_id, agent_instance_id, text, full_response,
+            _anxiety_agent.anxiety_analyzer.quick_anxiety_analysis(text),
+            _anxiety_agent.progress_tracker.calculate_engagement_score(text, "", 1),
+            screen["risk_level"], stress_level, time.time() - t0
         ))
@@ -23,6 +23,10 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(os.path.dirname(current_dir))
 sys.path.insert(0, parent_dir)
 
+from common.codec import decode, encode
+from common.metrics import register_cache_sizes, track_cache_sizes
+from common.resilience import guard_mongo, guard_redis
+
 try:
     from memory.redis_client import RedisMemory
     from memory.mongo_client import MongoMemory
@@ -202,30 +206,10 @@ class DateTimeEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super().default(obj)
 
-def safe_json_loads(data) -> dict:
-    """Safely load JSON with datetime parsing"""
-    # Handle bytes from Redis
-    if isinstance(data, bytes):
-        data = data.decode('utf-8')
-    elif not isinstance(data, str):
-        raise ValueError(f"Expected str or bytes, got {type(data)}")
-        
-    def datetime_parser(dct):
-        for key, value in dct.items():
-            if isinstance(value, str):
-                # Try to parse ISO datetime strings
-                try:
-                    if 'T' in value and (value.endswith('Z') or '+' in value[-6:] or value.count(':') >= 2):
-                        dct[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                except (ValueError, AttributeError):
-                    pass
-        return dct
-    
-    return json.loads(data, object_hook=datetime_parser)
-
 # Session and coping sessions cache (kept in memory for performance)
 _session_cache: Dict[str, Dict[str, Any]] = {}
 _coping_sessions: Dict[str, Dict[str, Any]] = {}
+register_cache_sizes("anxiety_sessions", lambda: {"sessions": len(_session_cache), "coping_sessions": len(_coping_sessions)})
 
 
 class AnxietyDataManager:
@@ -238,6 +222,7 @@ class AnxietyDataManager:
         # In-memory caches for ultra-low latency
         self.user_profile_cache: Dict[str, UserProfile] = {}
         self.anxiety_agent_cache: Dict[str, Any] = {}
+        track_cache_sizes("anxiety_data_manager", self, ("user_profile_cache", "anxiety_agent_cache"))
         
         # Cache statistics
         self.cache_stats = {
@@ -248,6 +233,16 @@ class AnxietyDataManager:
         }
         self._cache_ttl = 1800  # 30 minutes
 
+    @property
+    def redis(self):
+        """Redis client behind the specialists' Redis circuit breaker"""
+        return guard_redis(getattr(self.redis_client, "redis", None), "specialists.redis")
+
+    @property
+    def db(self):
+        """MongoDB database behind the specialists' MongoDB circuit breaker"""
+        return guard_mongo(getattr(self.mongo_client, "db", None), "specialists.mongo")
+
     async def get_user_profile(self, user_profile_id: str) -> UserProfile:
         """Fetch user profile with multi-level caching"""
         # Check in-memory cache first
@@ -260,9 +255,9 @@ class AnxietyDataManager:
         # Check Redis cache
         redis_key = f"user_profile:{user_profile_id}"
         try:
-            cached_data = await self.redis_client.redis.get(redis_key)
+            cached_data = await self.redis.get(redis_key)
             if cached_data:
-                profile_dict = safe_json_loads(cached_data)
+                profile_dict = decode(cached_data)
                 profile = UserProfile(**profile_dict)
                 self.user_profile_cache[user_profile_id] = profile
                 return profile
@@ -285,7 +280,7 @@ class AnxietyDataManager:
                 logger.warning(f"MongoDB connection not available, creating default profile for {user_profile_id}")
                 return self._create_default_user_profile(user_profile_id)
                 
-            profile_doc = self.mongo_client.db.user_profiles.find_one(
+            profile_doc = self.db.user_profiles.find_one(
                 {"user_profile_id": user_profile_id}
             )
             
@@ -344,8 +339,8 @@ class AnxietyDataManager:
             
             # Cache in Redis with TTL
             redis_key = f"user_profile:{user_profile_id}"
-            profile_json = profile.model_dump_json()
-            await self.redis_client.redis.set(redis_key, profile_json, ex=self._cache_ttl)
+            profile_data = encode(profile.model_dump())
+            await self.redis.set(redis_key, profile_data, ex=self._cache_ttl)
             
         except Exception as e:
             logger.warning(f"Failed to cache user profile {user_profile_id}: {e}")
@@ -364,9 +359,9 @@ class AnxietyDataManager:
         # Check Redis cache
         redis_key = f"anxiety_agent:{cache_key}"
         try:
-            cached_data = await self.redis_client.redis.get(redis_key)
+            cached_data = await self.redis.get(redis_key)
             if cached_data:
-                agent_dict = safe_json_loads(cached_data)
+                agent_dict = decode(cached_data)
                 agent = AnxietyAgent(**agent_dict)
                 self.anxiety_agent_cache[cache_key] = agent
                 return agent
@@ -390,7 +385,7 @@ class AnxietyDataManager:
                 logger.warning(f"MongoDB connection not available, creating default agent for {user_profile_id}")
                 return self._create_default_agent_data(user_profile_id, agent_instance_id)
                 
-            agent_doc = self.mongo_client.db.anxiety_agents.find_one({
+            agent_doc = self.db.anxiety_agents.find_one({
                 "user_profile_id": user_profile_id
             })
             
@@ -467,7 +462,7 @@ class AnxietyDataManager:
     async def _save_agent_with_new_goal(self, agent: Any):
         """Save agent back to DB when a new goal is added"""
         try:
-            self.mongo_client.db.anxiety_agents.update_one(
+            self.db.anxiety_agents.update_one(
                 {"user_profile_id": agent.user_profile_id},
                 {"$set": agent.model_dump()},
                 upsert=True
@@ -484,8 +479,8 @@ class AnxietyDataManager:
             
             # Cache in Redis with TTL
             redis_key = f"anxiety_agent:{cache_key}"
-            agent_json = agent.model_dump_json()
-            await self.redis_client.redis.set(redis_key, agent_json, ex=self._cache_ttl)
+            agent_data = encode(agent.model_dump())
+            await self.redis.set(redis_key, agent_data, ex=self._cache_ttl)
             
         except Exception as e:
             logger.warning(f"Failed to cache anxiety agent {cache_key}: {e}")
@@ -874,7 +869,7 @@ class AnxietyDataManager:
         try:
             if self.mongo_client and hasattr(self.mongo_client, 'db') and self.mongo_client.db is not None:
                 # Update the goal_id in the database
-                result = self.mongo_client.db.anxiety_agents.update_one(
+                result = self.db.anxiety_agents.update_one(
                     {"user_profile_id": user_profile_id},
                     {
                         "$set": {
@@ -901,7 +896,7 @@ class AnxietyDataManager:
                     goal_to_update = cached_agent.anxiety_goals[0]
                     
                     # First, fetch the full document from DB
-                    existing_doc = self.mongo_client.db.anxiety_agents.find_one({
+                    existing_doc = self.db.anxiety_agents.find_one({
                         "user_profile_id": user_profile_id
                     })
                     
@@ -926,14 +921,14 @@ class AnxietyDataManager:
                         full_agent.last_interaction = datetime.utcnow()
                         
                         # Save the full updated document
-                        self.mongo_client.db.anxiety_agents.update_one(
+                        self.db.anxiety_agents.update_one(
                             {"user_profile_id": user_profile_id},
                             {"$set": full_agent.model_dump()},
                             upsert=True
                         )
                     else:
                         # No existing document, create new one
-                        self.mongo_client.db.anxiety_agents.update_one(
+                        self.db.anxiety_agents.update_one(
                             {"user_profile_id": user_profile_id},
                             {"$set": cached_agent.model_dump()},
                             upsert=True
@@ -947,7 +942,7 @@ class AnxietyDataManager:
     async def save_user_profile(self, profile: UserProfile):
         """Save user profile to MongoDB"""
         try:
-            self.mongo_client.db.user_profiles.update_one(
+            self.db.user_profiles.update_one(
                 {"user_profile_id": profile.user_profile_id},
                 {"$set": profile.model_dump()},
                 upsert=True
@@ -28,8 +28,13 @@ except ImportError:
     #     STREAM_CHUNK_SIZE = 3
     # settings = FallbackSettings()
 
+from common.llm_gateway import get_llm_gateway
+
 logger = logging.getLogger(__name__)
 
+# Longest quota cooldown a non-streaming call waits out before retrying (the old backoff's cap)
+MAX_QUOTA_RETRY_WAIT = 6.0
+
 try:
     import google.generativeai as genai
     GENAI_LIB = True
@@ -77,6 +82,10 @@ class AnxietyGeminiClient:
         """Non-streaming generation with enhanced error handling and retry logic."""
         if not self.model:
             return self._get_contextual_fallback(prompt)
+
+        # Shared quota cooldown - another caller in this process already hit 429
+        if get_llm_gateway().in_cooldown():
+            return self._get_quota_fallback(prompt)
         
         # Retry logic for API calls
         max_retries = 3
@@ -86,14 +95,20 @@ class AnxietyGeminiClient:
             try:
                 timeout = base_timeout + (attempt * 10)  # Progressive timeout: 20s, 30s, 40s
                 
-                # Use ThreadPoolExecutor and asyncio.wait_for for timeout control
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(self.model.generate_content, prompt)
-                    response = await asyncio.wait_for(
-                        asyncio.wrap_future(future), 
-                        timeout=timeout
-                    )
+                # Gateway slot + asyncio.wait_for for timeout control
+                loop = asyncio.get_event_loop()
+
+                async def _call(timeout=timeout):
+                    async with get_llm_gateway().request("anxiety") as call:
+                        response = await asyncio.wait_for(
+                            loop.run_in_executor(None, self.model.generate_content, prompt),
+                            timeout=timeout
+                        )
+                        call.record_response(prompt, response)
+                        return response
+
+                # A retried/double-posted turn shares the in-flight call instead of paying twice
+                response = await get_llm_gateway().coalesce("anxiety", prompt, _call)
                 
                 # Validate response
                 if hasattr(response, 'text') and response.text and len(response.text.strip()) > 5:
@@ -111,15 +126,15 @@ class AnxietyGeminiClient:
                 error_str = str(e).lower()
                 logger.warning(f"Gemini API error on attempt {attempt + 1}: {type(e).__name__}: {e}")
                 
-                # Handle specific error types
+                # Handle specific error types. The gateway now knows when the quota
+                # resets; retry after that if it is soon, as before (2s, 4s)
                 if "quota" in error_str or "rate limit" in error_str or "429" in error_str:
-                    if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 2  # Progressive backoff: 2s, 4s, 6s
-                        logger.info(f"Quota/rate limit hit, waiting {wait_time}s before retry...")
+                    wait_time = get_llm_gateway().cooldown_remaining() or (attempt + 1) * 2
+                    if attempt < max_retries - 1 and wait_time <= MAX_QUOTA_RETRY_WAIT:
+                        logger.info(f"Quota/rate limit hit, waiting {wait_time:.1f}s before retry...")
                         await asyncio.sleep(wait_time)
                         continue
-                    else:
-                        return self._get_quota_fallback(prompt)
+                    return self._get_quota_fallback(prompt)
                         
                 elif "deadline exceeded" in error_str or "504" in error_str:
                     return self._get_timeout_fallback(prompt)
@@ -216,57 +231,38 @@ class AnxietyGeminiClient:
             yield {"type": "done", "data": fallback, "timestamp": time.time()}
             return
         
-        # Enhanced streaming with error handling
+        # Enhanced streaming with error handling. The gateway slot covers reading
+        # Gemini, not the client consuming the chunks
+        buffer = ""
+        full = ""
         try:
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(
-                    lambda: self.model.generate_content(
-                        prompt,
-                        stream=True,
-                        generation_config=genai.types.GenerationConfig(
-                            max_output_tokens=max_tokens,
-                            temperature=temperature,
-                            top_p=settings.DEFAULT_TOP_P,
-                            top_k=settings.DEFAULT_TOP_K,
-                        ),
-                    )
-                )
-                
-                # Timeout for streaming initialization
-                stream = await asyncio.wait_for(
-                    asyncio.wrap_future(future), 
-                    timeout=25.0
-                )
-            
-            buffer = ""
-            full = ""
-            
-            try:
-                for chunk in stream:
-                    if hasattr(chunk, "text") and chunk.text:
-                        buffer += chunk.text
-                        full += chunk.text
-                        words = buffer.split()
-                        while len(words) >= chunk_size:
-                            out = " ".join(words[:chunk_size]) + " "
-                            buffer = " ".join(words[chunk_size:])
-                            words = buffer.split()
-                            yield {"type": "content", "data": out, "timestamp": time.time()}
-                
-                if buffer.strip():
-                    yield {"type": "content", "data": buffer, "timestamp": time.time()}
-                yield {"type": "done", "data": full.strip(), "timestamp": time.time()}
-                
-            except Exception as stream_error:
-                logger.warning(f"Streaming chunk processing error: {stream_error}")
-                # If we have partial content, yield it
-                if full:
-                    yield {"type": "content", "data": full, "timestamp": time.time()}
-                    yield {"type": "done", "data": full.strip(), "timestamp": time.time()}
-                else:
-                    # Fall back to contextual response
-                    await self._stream_fallback_response(prompt, chunk_size)
+            async for text in get_llm_gateway().stream(
+                "anxiety",
+                prompt,
+                lambda: self.model.generate_content(
+                    prompt,
+                    stream=True,
+                    generation_config=genai.types.GenerationConfig(
+                        max_output_tokens=max_tokens,
+                        temperature=temperature,
+                        top_p=settings.DEFAULT_TOP_P,
+                        top_k=settings.DEFAULT_TOP_K,
+                    ),
+                ),
+                start_timeout=25.0,  # Timeout for streaming initialization
+            ):
+                buffer += text
+                full += text
+                words = buffer.split()
+                while len(words) >= chunk_size:
+                    out = " ".join(words[:chunk_size]) + " "
+                    buffer = " ".join(words[chunk_size:])
+                    words = buffer.split()
+                    yield {"type": "content", "data": out, "timestamp": time.time()}
+
+            if buffer.strip():
+                yield {"type": "content", "data": buffer, "timestamp": time.time()}
+            yield {"type": "done", "data": full.strip(), "timestamp": time.time()}
                     
         except asyncio.TimeoutError:
             logger.warning("Gemini streaming timeout, using fallback")
@@ -274,6 +270,14 @@ class AnxietyGeminiClient:
                 yield chunk
                 
         except Exception as e:
+            if full:
+                # The stream broke off: finish with the partial content
+                logger.warning(f"Streaming chunk processing error: {e}")
+                if buffer.strip():
+                    yield {"type": "content", "data": buffer, "timestamp": time.time()}
+                yield {"type": "done", "data": full.strip(), "timestamp": time.time()}
+                return
+
             error_str = str(e).lower()
             logger.warning(f"Gemini streaming error: {type(e).__name__}: {e}")
             
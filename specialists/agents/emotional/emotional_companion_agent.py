@@ -15,6 +15,8 @@ import time
 from datetime import datetime
 from typing import Any, AsyncGenerator, Dict, List, Optional
 
+from common.single_flight import get_single_flight
+
 from .data_manager import EmotionalDataManager
 from .background_tasks import BackgroundTaskManager, EmotionalAnalyzer, ProgressTracker
 from .gemini_streaming import get_streaming_client
@@ -223,6 +225,16 @@ class EmotionalCompanionAgent:
             if current_time - cached_data['timestamp'] < self._cache_ttl:
                 return cached_data['profile'], cached_data['agent']
         
+        # Concurrent misses for the same user (retried/double-posted turns) share one fetch
+        return await get_single_flight("emotional_profile_data").do(
+            cache_key,
+            lambda: self._fetch_profile_data(cache_key, user_profile_id, agent_instance_id)
+        )
+
+    async def _fetch_profile_data(self, cache_key: str, user_profile_id: str, agent_instance_id: str):
+        """Fetch user profile and agent data and populate the local cache"""
+        current_time = time.time()
+        
         # Fetch data in parallel for faster response
         profile_task = asyncio.create_task(self.data_manager.get_user_profile(user_profile_id))
         agent_task = asyncio.create_task(self.data_manager.get_emotional_agent_data(user_profile_id, agent_instance_id))
@@ -896,6 +908,16 @@ class EmotionalCompanionAgent:
 _emotional_agent = EmotionalCompanionAgent()
 
 
+def screen_message(text: str) -> Dict[str, Any]:
+    """Run the crisis screen ``process_message`` applies before routing a turn.
+
+    The stream endpoint checks it first so a crisis turn gets the structured
+    ``/process`` reply instead of a free-form stream.
+    """
+    risk_level = EmotionalIntensityDetector.analyze(text)
+    return {"risk_level": risk_level, "requires_human": risk_level >= 3}
+
+
 async def process_message(
     text: str,
     conversation_id: str,
@@ -934,6 +956,8 @@ async def stream_emotional_response(
     """Enhanced word-level streaming with comprehensive personalization like therapy agent"""
     # Send start signal
     yield {"type": "start", "conversation_id": conversation_id, "timestamp": time.time()}
+    t0 = time.time()
+    screen = screen_message(text)
 
     # Initialize agent if needed
     if not _emotional_agent._initialized:
@@ -1011,12 +1035,17 @@ async def stream_emotional_response(
         "type": "complete",
         "conversation_id": conversation_id,
         "response_length": len(full_response),
+        "requires_human": screen["requires_human"],
+        "risk_level": screen["risk_level"],
         "timestamp": time.time()
     }
 
     # Schedule background tasks (non-blocking)
     if full_response:
+        stress_level = _emotional_agent._calculate_stress_level(text, _emotional_agent._extract_stress_indicators(text))
         asyncio.create_task(_emotional_agent._schedule_background_tasks_async(
-            user_profile_id, agent_instance_id,
-            text, full_response, "seeking_comfort", 6.0, 2, 0.5
+            user_profile_id, agent_instance_id, text, full_response,
+            _emotional_agent.emotional_analyzer.quick_emotional_analysis(text),
+            _emotional_agent.progress_tracker.calculate_engagement_score(text, "", 1),
+            screen["risk_level"], stress_level, time.time() - t0
         ))
\ No newline at end of file
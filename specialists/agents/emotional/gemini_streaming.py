@@ -28,6 +28,8 @@ except ImportError:
     #     STREAM_CHUNK_SIZE = 3
     # settings = FallbackSettings()
 
+from common.llm_gateway import get_llm_gateway
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -114,17 +116,21 @@ class EmotionalGeminiClient:
             return _Resp(fallback_text)
             
         try:
-            # Use asyncio timeout to prevent 504 errors and avoid run_in_executor for better async handling
-            import concurrent.futures
-            
-            # Create a dedicated thread pool executor for Gemini calls to prevent blocking
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                # Use asyncio.wait_for to ensure proper timeout handling
-                future = executor.submit(self.model.generate_content, prompt)
-                response = await asyncio.wait_for(
-                    asyncio.wrap_future(future), 
-                    timeout=25.0  # Generous timeout to prevent 504 errors
-                )
+            # Admission, rate limiting and 429 backoff are shared through the LLM gateway
+            loop = asyncio.get_event_loop()
+
+            async def _call():
+                async with get_llm_gateway().request("emotional") as call:
+                    # Use asyncio.wait_for to ensure proper timeout handling
+                    response = await asyncio.wait_for(
+                        loop.run_in_executor(None, self.model.generate_content, prompt),
+                        timeout=25.0  # Generous timeout to prevent 504 errors
+                    )
+                    call.record_response(prompt, response)
+                    return response
+
+            # A retried/double-posted turn shares the in-flight call instead of paying twice
+            response = await get_llm_gateway().coalesce("emotional", prompt, _call)
             
             # Validate response
             if not hasattr(response, 'text') or not response.text:
@@ -187,11 +193,14 @@ class EmotionalGeminiClient:
                 yield {"type": "content", "data": " ".join(words[i:i+chunk_size]) + (" " if i+chunk_size < len(words) else ""), "timestamp": time.time()}
             yield {"type": "done", "data": fallback, "timestamp": time.time()}
             return
-        # real call with enhanced error handling for emotional support
+        # real call with enhanced error handling for emotional support. The gateway
+        # slot covers reading Gemini, not the client consuming the chunks
         try:
-            loop = asyncio.get_event_loop()
-            stream = await loop.run_in_executor(
-                None,
+            buffer = ""
+            full = ""
+            async for text in get_llm_gateway().stream(
+                "emotional",
+                prompt,
                 lambda: self.model.generate_content(
                     prompt,
                     stream=True,
@@ -202,35 +211,27 @@ class EmotionalGeminiClient:
                         top_k=settings.DEFAULT_TOP_K,
                     ),
                 ),
-            )
-            
-            buffer = ""
-            full = ""
-            chunk_count = 0
-            
-            for chunk in stream:
-                chunk_count += 1
-                if hasattr(chunk, "text") and chunk.text:
-                    buffer += chunk.text
-                    full += chunk.text
+            ):
+                buffer += text
+                full += text
+                words = buffer.split()
+                while len(words) >= chunk_size:
+                    out = " ".join(words[:chunk_size]) + " "
+                    buffer = " ".join(words[chunk_size:])
                     words = buffer.split()
-                    while len(words) >= chunk_size:
-                        out = " ".join(words[:chunk_size]) + " "
-                        buffer = " ".join(words[chunk_size:])
-                        words = buffer.split()
-                        yield {"type": "content", "data": out, "timestamp": time.time()}
-                        
+                    yield {"type": "content", "data": out, "timestamp": time.time()}
+
             if buffer.strip():
                 yield {"type": "content", "data": buffer, "timestamp": time.time()}
-                
+
             if full.strip():
-                logger.debug(f"Emotional streaming completed: {len(full)} characters, {chunk_count} chunks")
+                logger.debug(f"Emotional streaming completed: {len(full)} characters")
                 yield {"type": "done", "data": full.strip(), "timestamp": time.time()}
             else:
                 logger.warning("Emotional Gemini streaming returned empty content")
                 fallback = "I'm here with you, and I want you to know that your feelings are important. Can you tell me more about what's in your heart?"
                 yield {"type": "done", "data": fallback, "timestamp": time.time()}
-                
+
         except Exception as e:
             logger.error(f"Emotional Gemini streaming failed: {type(e).__name__}: {str(e)}")
             # Provide emotionally supportive fallback streaming response
@@ -17,6 +17,10 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(os.path.dirname(current_dir))
 sys.path.insert(0, parent_dir)
 
+from common.codec import decode, encode
+from common.metrics import track_cache_sizes
+from common.resilience import guard_mongo, guard_redis
+
 try:
     from memory.redis_client import RedisMemory
     from memory.mongo_client import MongoMemory
@@ -121,27 +125,6 @@ class DateTimeEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super().default(obj)
 
-def safe_json_loads(data) -> dict:
-    """Safely load JSON with datetime parsing"""
-    # Handle bytes from Redis
-    if isinstance(data, bytes):
-        data = data.decode('utf-8')
-    elif not isinstance(data, str):
-        raise ValueError(f"Expected str or bytes, got {type(data)}")
-        
-    def datetime_parser(dct):
-        for key, value in dct.items():
-            if isinstance(value, str):
-                # Try to parse ISO datetime strings
-                try:
-                    if 'T' in value and (value.endswith('Z') or '+' in value[-6:] or value.count(':') >= 2):
-                        dct[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                except (ValueError, AttributeError):
-                    pass
-        return dct
-    
-    return json.loads(data, object_hook=datetime_parser)
-
 class LonelinessDataManager:
     """Manages data operations for loneliness companion agent using unified schema"""
     
@@ -153,6 +136,7 @@ class LonelinessDataManager:
         self.user_profile_cache: Dict[str, UserProfile] = {}
         self.loneliness_agent_cache: Dict[str, LonelinessAgent] = {}
         self.session_state_cache: Dict[str, Dict[str, Any]] = {}
+        track_cache_sizes("loneliness_data_manager", self, ("user_profile_cache", "loneliness_agent_cache", "session_state_cache"))
         
         # Cache statistics
         self.cache_stats = {
@@ -162,6 +146,16 @@ class LonelinessDataManager:
             "agent_misses": 0
         }
     
+    @property
+    def redis(self):
+        """Redis client behind the specialists' Redis circuit breaker"""
+        return guard_redis(getattr(self.redis_client, "redis", None), "specialists.redis")
+
+    @property
+    def db(self):
+        """MongoDB database behind the specialists' MongoDB circuit breaker"""
+        return guard_mongo(getattr(self.mongo_client, "db", None), "specialists.mongo")
+
     async def get_user_profile(self, user_profile_id: str) -> UserProfile:
         """Fetch user profile with multi-level caching"""
         # Check in-memory cache first
@@ -174,9 +168,9 @@ class LonelinessDataManager:
         # Check Redis cache
         redis_key = f"user_profile:{user_profile_id}"
         try:
-            cached_data = await self.redis_client.redis.get(redis_key)
+            cached_data = await self.redis.get(redis_key)
             if cached_data:
-                profile_dict = safe_json_loads(cached_data)
+                profile_dict = decode(cached_data)
                 profile = UserProfile(**profile_dict)
                 self.user_profile_cache[user_profile_id] = profile
                 return profile
@@ -194,7 +188,7 @@ class LonelinessDataManager:
     async def _fetch_profile_from_db(self, user_profile_id: str) -> UserProfile:
         """Fetch user profile from MongoDB user_profiles collection"""
         try:
-            profile_doc = self.mongo_client.db.user_profiles.find_one(
+            profile_doc = self.db.user_profiles.find_one(
                 {"user_profile_id": user_profile_id}
             )
             
@@ -229,8 +223,8 @@ class LonelinessDataManager:
             
             # Cache in Redis with TTL
             redis_key = f"user_profile:{user_profile_id}"
-            profile_json = profile.model_dump_json()
-            await self.redis_client.redis.set(redis_key, profile_json, ex=1800)  # 30 min TTL
+            profile_data = encode(profile.model_dump())
+            await self.redis.set(redis_key, profile_data, ex=1800)  # 30 min TTL
             
         except Exception as e:
             logger.warning(f"Failed to cache user profile {user_profile_id}: {e}")
@@ -249,9 +243,9 @@ class LonelinessDataManager:
         # Check Redis cache
         redis_key = f"loneliness_agent:{cache_key}"
         try:
-            cached_data = await self.redis_client.redis.get(redis_key)
+            cached_data = await self.redis.get(redis_key)
             if cached_data:
-                agent_dict = safe_json_loads(cached_data)
+                agent_dict = decode(cached_data)
                 agent = LonelinessAgent(**agent_dict)
                 self.loneliness_agent_cache[cache_key] = agent
                 return agent
@@ -270,7 +264,7 @@ class LonelinessDataManager:
         """Fetch loneliness agent data from MongoDB loneliness_agents collection"""
         try:
             # Fetch document by user_profile_id only
-            agent_doc = self.mongo_client.db.loneliness_agents.find_one({
+            agent_doc = self.db.loneliness_agents.find_one({
                 "user_profile_id": user_profile_id
             })
             
@@ -332,7 +326,7 @@ class LonelinessDataManager:
     async def _save_agent_with_new_goal(self, agent: LonelinessAgent):
         """Save agent back to DB when a new goal is added"""
         try:
-            self.mongo_client.db.loneliness_agents.update_one(
+            self.db.loneliness_agents.update_one(
                 {"user_profile_id": agent.user_profile_id},
                 {"$set": agent.model_dump()},
                 upsert=True
@@ -349,8 +343,8 @@ class LonelinessDataManager:
             
             # Cache in Redis with TTL
             redis_key = f"loneliness_agent:{cache_key}"
-            agent_json = agent.model_dump_json()
-            await self.redis_client.redis.set(redis_key, agent_json, ex=1800)  # 30 min TTL
+            agent_data = encode(agent.model_dump())
+            await self.redis.set(redis_key, agent_data, ex=1800)  # 30 min TTL
             
         except Exception as e:
             logger.warning(f"Failed to cache loneliness agent {cache_key}: {e}")
@@ -484,7 +478,7 @@ class LonelinessDataManager:
                     goal_to_update = cached_agent.loneliness_goals[0]
                     
                     # First, fetch the full document from DB
-                    existing_doc = self.mongo_client.db.loneliness_agents.find_one({
+                    existing_doc = self.db.loneliness_agents.find_one({
                         "user_profile_id": user_profile_id
                     })
                     
@@ -509,14 +503,14 @@ class LonelinessDataManager:
                         full_agent.last_interaction = datetime.utcnow()
                         
                         # Save the full updated document
-                        self.mongo_client.db.loneliness_agents.update_one(
+                        self.db.loneliness_agents.update_one(
                             {"user_profile_id": user_profile_id},
                             {"$set": full_agent.model_dump()},
                             upsert=True
                         )
                     else:
                         # No existing document, create new one
-                        self.mongo_client.db.loneliness_agents.update_one(
+                        self.db.loneliness_agents.update_one(
                             {"user_profile_id": user_profile_id},
                             {"$set": cached_agent.model_dump()},
                             upsert=True
@@ -530,7 +524,7 @@ class LonelinessDataManager:
     async def save_user_profile(self, profile: UserProfile):
         """Save user profile to MongoDB"""
         try:
-            self.mongo_client.db.user_profiles.update_one(
+            self.db.user_profiles.update_one(
                 {"user_profile_id": profile.user_profile_id},
                 {"$set": profile.model_dump()},
                 upsert=True
@@ -17,6 +17,8 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
 from config import get_settings
+from common.llm_gateway import get_llm_gateway
+from common.utils import iterate_in_executor
 
 logger = logging.getLogger(__name__)
 
@@ -38,9 +40,8 @@ class GeminiStreamingClient:
         self.api_key = api_key or settings.GEMINI_API_KEY
         self.model_name = model_name or settings.LLM_ENGINE
         self.model = None
-        self.quota_exceeded = False
-        self.last_quota_error = 0
-        self.quota_retry_delay = 60  # 1 minute default retry delay
+        # Quota cooldown is shared process-wide through the LLM gateway
+        self.gateway = get_llm_gateway()
         self._initialize_client()
     
     def _initialize_client(self):
@@ -63,35 +64,6 @@ class GeminiStreamingClient:
             self.model = None
     
     
-    def _check_quota_status(self) -> bool:
-        """Check if we're in quota limit cooldown"""
-        current_time = time.time()
-        if self.quota_exceeded and (current_time - self.last_quota_error) < self.quota_retry_delay:
-            return False
-        elif self.quota_exceeded and (current_time - self.last_quota_error) >= self.quota_retry_delay:
-            # Reset quota status after cooldown
-            self.quota_exceeded = False
-            logger.info("Quota cooldown period ended, retrying Gemini API")
-        return True
-    
-    def _handle_quota_error(self, error_msg: str):
-        """Handle quota exceeded errors"""
-        self.quota_exceeded = True
-        self.last_quota_error = time.time()
-        # Extract retry delay from error if available
-        if "retry_delay" in error_msg:
-            try:
-                # Parse retry delay from error (simplified)
-                if "seconds: 30" in error_msg:
-                    self.quota_retry_delay = 35  # Add 5 sec buffer
-                elif "seconds: 60" in error_msg:
-                    self.quota_retry_delay = 65
-                else:
-                    self.quota_retry_delay = 60  # Default 1 minute
-            except:
-                self.quota_retry_delay = 60
-        logger.warning(f"Quota exceeded - will retry after {self.quota_retry_delay} seconds")
-
     async def stream_generate_content(
         self, 
         prompt: str, 
@@ -102,8 +74,8 @@ class GeminiStreamingClient:
         """
         Ultra-fast streaming content generation with quota management
         """
-        # Check quota status first
-        if not self._check_quota_status():
+        # Check shared quota status first
+        if self.gateway.in_cooldown():
             logger.info("In quota cooldown - using fallback response")
             fallback_response = "I'm here to listen and support you. How are you feeling today?"
             async for chunk in self._stream_fallback_response(fallback_response, chunk_size):
@@ -126,42 +98,44 @@ class GeminiStreamingClient:
                 top_k=20
             )
             
-            # Generate streaming response with timeout
-            response_stream = await asyncio.wait_for(
-                asyncio.get_event_loop().run_in_executor(
-                    None, 
-                    lambda: self.model.generate_content(
-                        prompt, 
-                        generation_config=generation_config,
-                        stream=True
-                    )
-                ),
-                timeout=5.0
-            )
-            
-            full_response = ""
-            buffer = ""
-            
-            # Process streaming chunks
-            for chunk in response_stream:
-                if hasattr(chunk, 'text') and chunk.text:
-                    text_chunk = chunk.text
-                    full_response += text_chunk
-                    buffer += text_chunk
-                    
-                    # Split into word chunks for smooth streaming
-                    words = buffer.split()
-                    if len(words) >= chunk_size:
-                        chunk_text = ' '.join(words[:chunk_size])
-                        buffer = ' '.join(words[chunk_size:])
-                        
-                        yield {
-                            "type": "content",
-                            "data": chunk_text + " ",
-                            "timestamp": time.time()
-                        }
+            async with self.gateway.request("loneliness") as call:
+                # Generate streaming response with timeout
+                response_stream = await asyncio.wait_for(
+                    asyncio.get_event_loop().run_in_executor(
+                        None, 
+                        lambda: self.model.generate_content(
+                            prompt, 
+                            generation_config=generation_config,
+                            stream=True
+                        )
+                    ),
+                    timeout=5.0
+                )
+                
+                full_response = ""
+                buffer = ""
+                
+                # Process streaming chunks
+                async for chunk in iterate_in_executor(response_stream):
+                    if hasattr(chunk, 'text') and chunk.text:
+                        text_chunk = chunk.text
+                        full_response += text_chunk
+                        buffer += text_chunk
                         
-                        await asyncio.sleep(0.05)  # Smooth streaming delay
+                        # Split into word chunks for smooth streaming
+                        words = buffer.split()
+                        if len(words) >= chunk_size:
+                            chunk_text = ' '.join(words[:chunk_size])
+                            buffer = ' '.join(words[chunk_size:])
+                            
+                            yield {
+                                "type": "content",
+                                "data": chunk_text + " ",
+                                "timestamp": time.time()
+                            }
+                            
+                            await asyncio.sleep(0.05)  # Smooth streaming delay
+                call.record_text(prompt, full_response)
             
             # Send remaining buffer
             if buffer.strip():
@@ -181,9 +155,8 @@ class GeminiStreamingClient:
         except Exception as e:
             error_str = str(e)
             
-            # Handle quota errors specifically
+            # Quota errors put the shared gateway into cooldown
             if "429" in error_str or "quota" in error_str.lower():
-                self._handle_quota_error(error_str)
                 logger.warning("Quota exceeded - using fallback response")
                 fallback_response = "I'm here to support you. Let's talk about how you're feeling."
             else:
@@ -222,8 +195,8 @@ class GeminiStreamingClient:
         Generate content with backward compatibility for loneliness agent
         Returns a response object with .text attribute
         """
-        # Check quota status first
-        if not self._check_quota_status():
+        # Check shared quota status first
+        if self.gateway.in_cooldown():
             logger.info("In quota cooldown - using fallback response")
             return type('Response', (), {
                 'text': "I'm here to support you. How are you feeling today?"
@@ -236,24 +209,30 @@ class GeminiStreamingClient:
             })()
         
         try:
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.model.generate_content(
-                    prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        max_output_tokens=150,
-                        temperature=0.7
+            async def _call():
+                async with self.gateway.request("loneliness") as call:
+                    response = await asyncio.get_event_loop().run_in_executor(
+                        None,
+                        lambda: self.model.generate_content(
+                            prompt,
+                            generation_config=genai.types.GenerationConfig(
+                                max_output_tokens=150,
+                                temperature=0.7
+                            )
+                        )
                     )
-                )
-            )
+                    call.record_response(prompt, response)
+                    return response
+
+            # A retried/double-posted turn shares the in-flight call instead of paying twice
+            response = await self.gateway.coalesce("loneliness", prompt, _call)
             return type('Response', (), {'text': response.text.strip()})()
             
         except Exception as e:
             error_str = str(e)
             
-            # Handle quota errors
+            # Quota errors put the shared gateway into cooldown
             if "429" in error_str or "quota" in error_str.lower():
-                self._handle_quota_error(error_str)
                 logger.warning("Quota exceeded - using fallback response")
             else:
                 logger.error(f"Generate content error: {e}")
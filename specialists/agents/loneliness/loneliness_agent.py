@@ -19,10 +19,13 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(os.path.dirname(current_dir))
 sys.path.insert(0, parent_dir)
 
+from common.metrics import track_cache_sizes
+
 try:
     from memory.redis_client import RedisMemory
     from memory.mongo_client import MongoMemory
     from common.gemini_client import get_gemini_client
+    from common.single_flight import get_single_flight
     
     # Import data manager with dual pattern
     try:
@@ -160,6 +163,7 @@ class LonelinessCompanionAgent:
         self._agent_cache = {}
         self._session_cache = {}
         self._cache_ttl = 300  # 5 minutes cache TTL
+        track_cache_sizes("loneliness_agent", self, ("_profile_cache", "_agent_cache", "_session_cache"))
         
         self._initialized = False
         
@@ -211,6 +215,16 @@ class LonelinessCompanionAgent:
             if current_time - cached_data['timestamp'] < self._cache_ttl:
                 return cached_data['profile'], cached_data['agent']
         
+        # Concurrent misses for the same user (retried/double-posted turns) share one fetch
+        return await get_single_flight("loneliness_profile_data").do(
+            cache_key,
+            lambda: self._fetch_profile_data(cache_key, user_profile_id, agent_instance_id)
+        )
+
+    async def _fetch_profile_data(self, cache_key: str, user_profile_id: str, agent_instance_id: str):
+        """Fetch user profile and agent data and populate the local cache"""
+        current_time = time.time()
+        
         # Fetch data in parallel for faster response
         profile_task = asyncio.create_task(self.data_manager.get_user_profile(user_profile_id))
         agent_task = asyncio.create_task(self.data_manager.get_loneliness_agent_data(user_profile_id, agent_instance_id))
@@ -4,9 +4,10 @@ Including Accountability Buddy for Life Reboots and Therapy Check-In Agent
 """
 
 import logging
+from contextlib import asynccontextmanager
 from typing import Dict, List, Optional, Any
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, StreamingResponse
 from pydantic import BaseModel, Field
 import uvicorn
 import time
@@ -28,19 +29,28 @@ if __name__ == "__main__" and __package__ is None:
     from os import path
     sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
 
-    from accountability.accountability_agent_v2 import AccountabilityAgentV2
-    from emotional.emotional_companion_agent import process_message as emotional_process
-    from anxiety.anxiety_agent import process_message as anxiety_process
-    from therapy.therapy_agent import process_message as therapy_process
+    from accountability.accountability_agent_v2 import AccountabilityAgentV2, accountability_agent_v2
+    from emotional.emotional_companion_agent import process_message as emotional_process, screen_message as emotional_screen, stream_emotional_response
+    from anxiety.anxiety_agent import process_message as anxiety_process, screen_message as anxiety_screen, stream_anxiety_response
+    from therapy.therapy_agent import process_message as therapy_process, screen_message as therapy_screen, stream_therapy_response
     from loneliness.loneliness_agent import process_message as loneliness_process
 else:
-    from .accountability.accountability_agent_v2 import AccountabilityAgentV2
-    from .emotional.emotional_companion_agent import process_message as emotional_process
-    from .anxiety.anxiety_agent import process_message as anxiety_process
-    from .therapy.therapy_agent import process_message as therapy_process
+    from .accountability.accountability_agent_v2 import AccountabilityAgentV2, accountability_agent_v2
+    from .emotional.emotional_companion_agent import process_message as emotional_process, screen_message as emotional_screen, stream_emotional_response
+    from .anxiety.anxiety_agent import process_message as anxiety_process, screen_message as anxiety_screen, stream_anxiety_response
+    from .therapy.therapy_agent import process_message as therapy_process, screen_message as therapy_screen, stream_therapy_response
     from .loneliness.loneliness_agent import process_message as loneliness_process
 
+from common.context_handle import ContextHandle, get_context_store
 from common.models import Checkpoint
+from common.resilience import get_resilience_stats
+from common.llm_gateway import PRIORITY_HEADER, get_llm_gateway, parse_priority, set_priority
+from common.deadline import DEADLINE_HEADER, parse_deadline, set_deadline
+from common.metrics import CONTENT_TYPE, observe_stage, render_metrics, start_loop_lag_monitor, stop_loop_lag_monitor
+from common.single_flight import get_single_flight_stats
+from common.sse import SSE_HEADERS, SSE_MEDIA_TYPE, encode_event
+from common.llm_replay import configure_llm_replay
+from common.tracing import TracingMiddleware, get_tracer
 # Configure logging
 logging.basicConfig(level=logging.INFO,
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -49,11 +59,43 @@ _logger = logging.getLogger(__name__)
 # Load settings
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_loop_lag_monitor()
+    yield
+    stop_loop_lag_monitor()
+    get_tracer().flush()
+
 app = FastAPI(
     title="Specialized Support Agents",
-    description="Accountability buddy, therapy check-in, emotional companion, loneliness support, mental health, and social anxiety preparation agents"
+    description="Accountability buddy, therapy check-in, emotional companion, loneliness support, mental health, and social anxiety preparation agents",
+    lifespan=lifespan
 )
 
+@app.middleware("http")
+async def llm_priority_middleware(request: Request, call_next):
+    """Adopt the caller's LLM priority (voice > chat > background) and remaining deadline for this request"""
+    set_priority(parse_priority(request.headers.get(PRIORITY_HEADER)))
+    set_deadline(parse_deadline(request.headers.get(DEADLINE_HEADER)))
+    return await call_next(request)
+
+@app.middleware("http")
+async def stage_metrics_middleware(request: Request, call_next):
+    """Record each agent endpoint's latency as the "specialist_handler" stage, labelled by agent"""
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    if route is not None and request.method == "POST":
+        agent = route.path.strip("/").split("/")[0] or "root"
+        observe_stage("specialist_handler", (time.perf_counter() - started) * 1000, agent)
+    return response
+
+# Outermost: one server span per request, continuing the orchestrator's trace
+app.add_middleware(TracingMiddleware, service="specialists")
+
+# Serve Gemini from recorded fixtures when LLM_REPLAY_MODE is set (offline load tests)
+configure_llm_replay()
+
 # === REQUEST/RESPONSE MODELS ===
 
 class AgentRequest(BaseModel):
@@ -85,6 +127,7 @@ class TherapyAgentRequest(BaseModel):
     individual_id: Optional[str] = Field(None, description="Reference to the individual agent instance")
     user_profile_id: str = Field(..., description="ID of the user's profile")
     agent_instance_id: str = Field(..., description="ID of the agent instance collection (existing)")
+    context_handle: Optional[ContextHandle] = Field(None, description="Reference to the context window in the shared context store; replaces `context` when it resolves")
 
 class EmotionalAgentRequest(BaseModel):
     user_query: str = Field(..., description="User's message")
@@ -94,6 +137,7 @@ class EmotionalAgentRequest(BaseModel):
     individual_id: Optional[str] = Field(None, description="Reference to the individual agent instance")
     user_profile_id: str = Field(..., description="ID of the user's profile")
     agent_instance_id: str = Field(..., description="ID of the agent instance collection (existing)")
+    context_handle: Optional[ContextHandle] = Field(None, description="Reference to the context window in the shared context store; replaces `context` when it resolves")
 
 class AnxietyAgentRequest(BaseModel):
     user_query: str = Field(..., description="User's message")
@@ -103,6 +147,7 @@ class AnxietyAgentRequest(BaseModel):
     individual_id: Optional[str] = Field(None, description="Reference to the individual agent instance")
     user_profile_id: str = Field(..., description="ID of the user's profile")
     agent_instance_id: str = Field(..., description="ID of the agent instance collection (existing)")
+    context_handle: Optional[ContextHandle] = Field(None, description="Reference to the context window in the shared context store; replaces `context` when it resolves")
 
 class LonelinessCompanionRequest(BaseModel):
     user_query: str
@@ -112,6 +157,7 @@ class LonelinessCompanionRequest(BaseModel):
     user_profile_id: str  # Updated to use user_profile_id
     agent_instance_id: str  # Added agent_instance_id
     user_id: str  # Keep for backward compatibility
+    context_handle: Optional[ContextHandle] = None  # replaces `context` when it resolves
 
 class LonelinessWebSocketRequest(BaseModel):
     user_query: str
@@ -163,6 +209,38 @@ def is_last_checkpoint(task_stack: list, checkpoint: Optional[Checkpoint]) -> bo
 
     return False  # If checkpoint not found
 
+async def _resolve_context_handle(request) -> Optional[List[Dict[str, Any]]]:
+    """Messages behind the request's context handle, or None to use the inline context"""
+    if request.context_handle is None:
+        return None
+    messages = await get_context_store().resolve(request.context_handle)
+    if messages is None:
+        _logger.warning(f"⚠️ Context handle for {request.conversation_id} did not resolve, using inline context")
+    return messages
+
+async def dict_context(request) -> Dict[str, Any]:
+    """Context for the dict-context agents: the first message of the window"""
+    messages = await _resolve_context_handle(request)
+    if messages is None:
+        return request.context or {}
+    return messages[0] if messages else {}
+
+async def text_context(request) -> str:
+    """Context for the loneliness agent: the window as a string"""
+    messages = await _resolve_context_handle(request)
+    return request.context if messages is None else str(messages)
+
+def accountability_context(request) -> Dict[str, Any]:
+    """Context for the accountability agent: a JSON object string parsed, any other text under "context" """
+    if not request.context:
+        return {}
+    try:
+        if request.context.strip().startswith('{'):
+            return json.loads(request.context)
+    except ValueError:
+        pass
+    return {"context": request.context}
+
 # === ENDPOINTS ===
 
 @app.post("/accountability/process")
@@ -175,17 +253,6 @@ async def process_accountability_message(request: AccountabilityAgentRequest):
         agent = AccountabilityAgentV2()
         await agent.initialize()
         
-        # Convert string context to dict if needed
-        context_dict = {}
-        if request.context:
-            try:
-                # Try to parse as JSON if it's a JSON string
-                import json
-                context_dict = json.loads(request.context) if request.context.strip().startswith('{') else {"context": request.context}
-            except:
-                # If not JSON, treat as simple string context
-                context_dict = {"context": request.context}
-        
         result = await agent.process_message(
             text=request.user_query,  # Use user_query instead of text
             conversation_id=request.conversation_id,
@@ -193,7 +260,7 @@ async def process_accountability_message(request: AccountabilityAgentRequest):
             agent_instance_id=request.agent_instance_id,
             user_id=request.user_id,  # Use the provided user_id
             checkpoint=request.checkpoint,
-            context=context_dict,  # Use converted context dict
+            context=accountability_context(request),
             individual_id=None  # Set to None since it's not in the request
         )
         
@@ -233,7 +300,7 @@ async def process_emotional_message(request: EmotionalAgentRequest):
             text=request.user_query,
             conversation_id=request.conversation_id,
             checkpoint=request.checkpoint,
-            context=request.context,
+            context=await dict_context(request),
             individual_id=request.individual_id,
             user_profile_id=request.user_profile_id,
             agent_instance_id=request.agent_instance_id,
@@ -269,7 +336,7 @@ async def process_therapy_message(request: TherapyAgentRequest):
             text=request.user_query,
             conversation_id=request.conversation_id,
             checkpoint=request.checkpoint,
-            context=request.context,
+            context=await dict_context(request),
             individual_id=request.individual_id,
             user_profile_id=request.user_profile_id,
             agent_instance_id=request.agent_instance_id,
@@ -304,7 +371,7 @@ async def process_loneliness(request: LonelinessCompanionRequest):
         
         result = await loneliness_process(
             user_query=request.user_query,
-            context=request.context,
+            context=await text_context(request),
             checkpoint=request.checkpoint,
             conversation_id=request.conversation_id,
             user_profile_id=request.user_profile_id,
@@ -340,7 +407,7 @@ async def process_anxiety_message(request: AnxietyAgentRequest):
             user_query=request.user_query,
             conversation_id=request.conversation_id,
             checkpoint=request.checkpoint,
-            context=request.context,
+            context=await dict_context(request),
             individual_id=request.individual_id,
             user_profile_id=request.user_profile_id,
             agent_instance_id=request.agent_instance_id,
@@ -367,12 +434,138 @@ async def process_anxiety_message(request: AnxietyAgentRequest):
         _logger.error(f"Error in anxiety agent: {e}")
         raise HTTPException(status_code=500, detail=f"Anxiety agent error: {str(e)}")
 
+# === STREAMING ENDPOINTS ===
+# Same request models as the /process endpoints; the reply is sent as SSE
+# events ("start", "content", "done", "complete") as Gemini produces it.
+# A turn that trips the agent's crisis screen is answered by /process and
+# replayed as the same events; "complete" carries requires_human/risk_level.
+
+def _sse_response(chunks, agent_name: str, conversation_id: str) -> StreamingResponse:
+    async def event_stream():
+        try:
+            async for chunk in chunks:
+                yield encode_event(chunk)
+        except Exception as e:
+            _logger.error(f"Error in {agent_name} stream: {e}")
+            yield encode_event({"type": "error", "data": str(e), "conversation_id": conversation_id})
+
+    return StreamingResponse(event_stream(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+async def _processed_events(response: AgentResponse, screen: Dict[str, Any]):
+    """Replay a /process reply as the event sequence a stream would send."""
+    yield {"type": "start", "conversation_id": response.conversation_id, "timestamp": time.time()}
+    yield {"type": "content", "data": response.response, "conversation_id": response.conversation_id}
+    yield {"type": "done", "data": response.response, "conversation_id": response.conversation_id}
+    yield {
+        "type": "complete",
+        "conversation_id": response.conversation_id,
+        "response_length": len(response.response),
+        "requires_human": response.requires_human,
+        "risk_level": screen["risk_level"],
+        "timestamp": time.time()
+    }
+
+async def _crisis_stream(process_handler, request, screen: Dict[str, Any], agent_name: str) -> StreamingResponse:
+    """Answer a turn that tripped the crisis screen through its /process handler."""
+    _logger.warning(f"⚠️ {agent_name} stream tripped the crisis screen (risk {screen['risk_level']}); using /process")
+    response = await process_handler(request)
+    return _sse_response(_processed_events(response, screen), agent_name, request.conversation_id)
+
+@app.post("/accountability/stream")
+async def stream_accountability_message(request: AccountabilityAgentRequest):
+    """Stream accountability buddy replies token by token"""
+    return _sse_response(
+        accountability_agent_v2.stream_accountability_response(
+            text=request.user_query,
+            conversation_id=request.conversation_id,
+            checkpoint=request.checkpoint,
+            context=accountability_context(request),
+            user_profile_id=request.user_profile_id,
+            agent_instance_id=request.agent_instance_id,
+            user_id=request.user_id
+        ),
+        "accountability",
+        request.conversation_id
+    )
+
+@app.post("/emotional/stream")
+async def stream_emotional_message(request: EmotionalAgentRequest):
+    """Stream emotional companion replies token by token"""
+    screen = emotional_screen(request.user_query)
+    if screen["requires_human"]:
+        return await _crisis_stream(process_emotional_message, request, screen, "emotional")
+    return _sse_response(
+        stream_emotional_response(
+            text=request.user_query,
+            conversation_id=request.conversation_id,
+            checkpoint=request.checkpoint,
+            context=await dict_context(request),
+            individual_id=request.individual_id,
+            user_profile_id=request.user_profile_id,
+            agent_instance_id=request.agent_instance_id
+        ),
+        "emotional",
+        request.conversation_id
+    )
+
+@app.post("/therapy/stream")
+async def stream_therapy_message(request: TherapyAgentRequest):
+    """Stream therapy check-in replies token by token"""
+    screen = therapy_screen(request.user_query)
+    if screen["requires_human"]:
+        return await _crisis_stream(process_therapy_message, request, screen, "therapy")
+    return _sse_response(
+        stream_therapy_response(
+            text=request.user_query,
+            conversation_id=request.conversation_id,
+            checkpoint=request.checkpoint,
+            context=await dict_context(request),
+            individual_id=request.individual_id,
+            user_profile_id=request.user_profile_id,
+            agent_instance_id=request.agent_instance_id
+        ),
+        "therapy",
+        request.conversation_id
+    )
+
+@app.post("/anxiety/stream")
+async def stream_anxiety_message(request: AnxietyAgentRequest):
+    """Stream anxiety support replies token by token"""
+    screen = anxiety_screen(request.user_query)
+    if screen["requires_human"]:
+        return await _crisis_stream(process_anxiety_message, request, screen, "anxiety")
+    return _sse_response(
+        stream_anxiety_response(
+            text=request.user_query,
+            conversation_id=request.conversation_id,
+            checkpoint=request.checkpoint,
+            context=await dict_context(request),
+            individual_id=request.individual_id,
+            user_profile_id=request.user_profile_id,
+            agent_instance_id=request.agent_instance_id
+        ),
+        "anxiety",
+        request.conversation_id
+    )
+
 # === HEALTH CHECKS ===
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
 @app.get("/health")
 async def health_check():
     """General health check for the specialized agents service"""
-    return {"status": "healthy", "message": "Specialized agents service is running"}
+    return {
+        "status": "healthy",
+        "message": "Specialized agents service is running",
+        "llm": get_llm_gateway().get_stats(),
+        "context_store": get_context_store().get_stats(),
+        "resilience": get_resilience_stats(),
+        "single_flight": get_single_flight_stats()
+    }
 
 @app.get("/therapy/health")
 async def therapy_health_check():
@@ -390,12 +583,6 @@ async def accountability_health_check():
     """Health check for the accountability agent"""
     return {"status": "healthy", "agent": "accountability_buddy"}
 
-# Therapy streaming endpoint removed as requested
-
-# Emotional streaming endpoint removed as requested
-
-# Anxiety streaming endpoint removed as requested
-
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -22,6 +22,10 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(os.path.dirname(current_dir))
 sys.path.insert(0, parent_dir)
 
+from common.codec import decode, encode
+from common.metrics import register_cache_sizes, track_cache_sizes
+from common.resilience import guard_mongo, guard_redis
+
 try:
     from memory.redis_client import RedisMemory
     from memory.mongo_client import MongoMemory
@@ -132,29 +136,9 @@ class DateTimeEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super().default(obj)
 
-def safe_json_loads(data) -> dict:
-    """Safely load JSON with datetime parsing"""
-    # Handle bytes from Redis
-    if isinstance(data, bytes):
-        data = data.decode('utf-8')
-    elif not isinstance(data, str):
-        raise ValueError(f"Expected str or bytes, got {type(data)}")
-        
-    def datetime_parser(dct):
-        for key, value in dct.items():
-            if isinstance(value, str):
-                # Try to parse ISO datetime strings
-                try:
-                    if 'T' in value and (value.endswith('Z') or '+' in value[-6:] or value.count(':') >= 2):
-                        dct[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                except (ValueError, AttributeError):
-                    pass
-        return dct
-    
-    return json.loads(data, object_hook=datetime_parser)
-
 # Session and breathing sessions cache (kept in memory for performance)
 _session_cache: Dict[str, Dict[str, Any]] = {}
+register_cache_sizes("therapy_sessions", lambda: {"sessions": len(_session_cache)})
 _breathing_sessions: Dict[str, Dict[str, Any]] = {}
 
 
@@ -168,6 +152,7 @@ class TherapyDataManager:
         # In-memory caches for ultra-low latency
         self.user_profile_cache: Dict[str, UserProfile] = {}
         self.therapy_agent_cache: Dict[str, TherapyAgent] = {}
+        track_cache_sizes("therapy_data_manager", self, ("user_profile_cache", "therapy_agent_cache"))
         
         # Cache statistics
         self.cache_stats = {
@@ -178,6 +163,16 @@ class TherapyDataManager:
         }
         self._cache_ttl = 1800  # 30 minutes
 
+    @property
+    def redis(self):
+        """Redis client behind the specialists' Redis circuit breaker"""
+        return guard_redis(getattr(self.redis_client, "redis", None), "specialists.redis")
+
+    @property
+    def db(self):
+        """MongoDB database behind the specialists' MongoDB circuit breaker"""
+        return guard_mongo(getattr(self.mongo_client, "db", None), "specialists.mongo")
+
     async def get_user_profile(self, user_profile_id: str) -> UserProfile:
         """Fetch user profile with multi-level caching"""
         # Check in-memory cache first
@@ -190,9 +185,9 @@ class TherapyDataManager:
         # Check Redis cache
         redis_key = f"user_profile:{user_profile_id}"
         try:
-            cached_data = await self.redis_client.redis.get(redis_key)
+            cached_data = await self.redis.get(redis_key)
             if cached_data:
-                profile_dict = safe_json_loads(cached_data)
+                profile_dict = decode(cached_data)
                 profile = UserProfile(**profile_dict)
                 self.user_profile_cache[user_profile_id] = profile
                 return profile
@@ -215,7 +210,7 @@ class TherapyDataManager:
                 logger.warning(f"MongoDB connection not available, creating default profile for {user_profile_id}")
                 return self._create_default_user_profile(user_profile_id)
                 
-            profile_doc = self.mongo_client.db.user_profiles.find_one(
+            profile_doc = self.db.user_profiles.find_one(
                 {"user_profile_id": user_profile_id}
             )
             
@@ -261,8 +256,8 @@ class TherapyDataManager:
             
             # Cache in Redis with TTL
             redis_key = f"user_profile:{user_profile_id}"
-            profile_json = profile.model_dump_json()
-            await self.redis_client.redis.set(redis_key, profile_json, ex=self._cache_ttl)
+            profile_data = encode(profile.model_dump())
+            await self.redis.set(redis_key, profile_data, ex=self._cache_ttl)
             
         except Exception as e:
             logger.warning(f"Failed to cache user profile {user_profile_id}: {e}")
@@ -281,9 +276,9 @@ class TherapyDataManager:
         # Check Redis cache
         redis_key = f"therapy_agent:{cache_key}"
         try:
-            cached_data = await self.redis_client.redis.get(redis_key)
+            cached_data = await self.redis.get(redis_key)
             if cached_data:
-                agent_dict = safe_json_loads(cached_data)
+                agent_dict = decode(cached_data)
                 agent = TherapyAgent(**agent_dict)
                 self.therapy_agent_cache[cache_key] = agent
                 return agent
@@ -307,7 +302,7 @@ class TherapyDataManager:
                 logger.warning(f"MongoDB connection not available, creating default agent for {user_profile_id}")
                 return self._create_default_agent_data(user_profile_id, agent_instance_id)
                 
-            agent_doc = self.mongo_client.db.therapy_agents.find_one({
+            agent_doc = self.db.therapy_agents.find_one({
                 "user_profile_id": user_profile_id
             })
             
@@ -371,7 +366,7 @@ class TherapyDataManager:
     async def _save_agent_with_new_goal(self, agent: TherapyAgent):
         """Save agent back to DB when a new goal is added"""
         try:
-            self.mongo_client.db.therapy_agents.update_one(
+            self.db.therapy_agents.update_one(
                 {"user_profile_id": agent.user_profile_id},
                 {"$set": agent.model_dump()},
                 upsert=True
@@ -388,8 +383,8 @@ class TherapyDataManager:
             
             # Cache in Redis with TTL
             redis_key = f"therapy_agent:{cache_key}"
-            agent_json = agent.model_dump_json()
-            await self.redis_client.redis.set(redis_key, agent_json, ex=self._cache_ttl)
+            agent_data = encode(agent.model_dump())
+            await self.redis.set(redis_key, agent_data, ex=self._cache_ttl)
             
         except Exception as e:
             logger.warning(f"Failed to cache therapy agent {cache_key}: {e}")
@@ -691,7 +686,7 @@ class TherapyDataManager:
                     goal_to_update = cached_agent.therapy_goals[0]
                     
                     # First, fetch the full document from DB
-                    existing_doc = self.mongo_client.db.therapy_agents.find_one({
+                    existing_doc = self.db.therapy_agents.find_one({
                         "user_profile_id": user_profile_id
                     })
                     
@@ -716,14 +711,14 @@ class TherapyDataManager:
                         full_agent.last_interaction = datetime.utcnow()
                         
                         # Save the full updated document
-                        self.mongo_client.db.therapy_agents.update_one(
+                        self.db.therapy_agents.update_one(
                             {"user_profile_id": user_profile_id},
                             {"$set": full_agent.model_dump()},
                             upsert=True
                         )
                     else:
                         # No existing document, create new one
-                        self.mongo_client.db.therapy_agents.update_one(
+                        self.db.therapy_agents.update_one(
                             {"user_profile_id": user_profile_id},
                             {"$set": cached_agent.model_dump()},
                             upsert=True
@@ -737,7 +732,7 @@ class TherapyDataManager:
     async def save_user_profile(self, profile: UserProfile):
         """Save user profile to MongoDB"""
         try:
-            self.mongo_client.db.user_profiles.update_one(
+            self.db.user_profiles.update_one(
                 {"user_profile_id": profile.user_profile_id},
                 {"$set": profile.model_dump()},
                 upsert=True
@@ -28,6 +28,8 @@ except ImportError:
     #     STREAM_CHUNK_SIZE = 3
     # settings = FallbackSettings()
 
+from common.llm_gateway import get_llm_gateway
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -109,7 +111,15 @@ class TherapyGeminiClient:
             
         try:
             loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(None, lambda: self.model.generate_content(prompt))
+
+            async def _call():
+                async with get_llm_gateway().request("therapy") as call:
+                    response = await loop.run_in_executor(None, lambda: self.model.generate_content(prompt))
+                    call.record_response(prompt, response)
+                    return response
+
+            # A retried/double-posted turn shares the in-flight call instead of paying twice
+            response = await get_llm_gateway().coalesce("therapy", prompt, _call)
             
             # Validate response
             if not hasattr(response, 'text') or not response.text:
@@ -152,11 +162,14 @@ class TherapyGeminiClient:
                 yield {"type": "content", "data": " ".join(words[i:i+chunk_size]) + (" " if i+chunk_size < len(words) else ""), "timestamp": time.time()}
             yield {"type": "done", "data": fallback, "timestamp": time.time()}
             return
-        # real call with error handling
+        # real call with error handling. The gateway slot covers reading Gemini,
+        # not the client consuming the chunks
         try:
-            loop = asyncio.get_event_loop()
-            stream = await loop.run_in_executor(
-                None,
+            buffer = ""
+            full = ""
+            async for text in get_llm_gateway().stream(
+                "therapy",
+                prompt,
                 lambda: self.model.generate_content(
                     prompt,
                     stream=True,
@@ -167,35 +180,27 @@ class TherapyGeminiClient:
                         top_k=settings.DEFAULT_TOP_K,
                     ),
                 ),
-            )
-            
-            buffer = ""
-            full = ""
-            chunk_count = 0
-            
-            for chunk in stream:
-                chunk_count += 1
-                if hasattr(chunk, "text") and chunk.text:
-                    buffer += chunk.text
-                    full += chunk.text
+            ):
+                buffer += text
+                full += text
+                words = buffer.split()
+                while len(words) >= chunk_size:
+                    out = " ".join(words[:chunk_size]) + " "
+                    buffer = " ".join(words[chunk_size:])
                     words = buffer.split()
-                    while len(words) >= chunk_size:
-                        out = " ".join(words[:chunk_size]) + " "
-                        buffer = " ".join(words[chunk_size:])
-                        words = buffer.split()
-                        yield {"type": "content", "data": out, "timestamp": time.time()}
-                        
+                    yield {"type": "content", "data": out, "timestamp": time.time()}
+
             if buffer.strip():
                 yield {"type": "content", "data": buffer, "timestamp": time.time()}
-                
+
             if full.strip():
-                logger.debug(f"Streaming completed: {len(full)} characters, {chunk_count} chunks")
+                logger.debug(f"Streaming completed: {len(full)} characters")
                 yield {"type": "done", "data": full.strip(), "timestamp": time.time()}
             else:
                 logger.warning("Gemini streaming returned empty content")
                 fallback = "I'm here to support you. Can you tell me more about what's on your mind?"
                 yield {"type": "done", "data": fallback, "timestamp": time.time()}
-                
+
         except Exception as e:
             logger.error(f"Gemini streaming failed: {type(e).__name__}: {str(e)}")
             # Provide fallback streaming response